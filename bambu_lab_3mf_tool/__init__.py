@@ -37,37 +37,75 @@ Features:
 - Millimeter workflow configuration
 """
 
-import bpy
-
-# Reload functionality.
-if "bpy" in locals():
-    import importlib
-    if "import_3mf" in locals():
-        importlib.reload(import_3mf)
-    if "export_3mf" in locals():
-        importlib.reload(export_3mf)
-    if "bambu_lab" in locals():
-        importlib.reload(bambu_lab)
-
-import bpy.utils  # To (un)register the add-on.
-import bpy.types  # To (un)register the add-on as an import/export function.
-
-from .import_3mf import Import3MF  # Imports 3MF files.
-from .export_3mf import Export3MF  # Exports 3MF files.
-from .bambu_lab import (  # Bambu Lab printer integration.
-    BambuProperties,
-    BAMBU_OT_setup_scene,
-    BAMBU_OT_create_build_volume,
-    BAMBU_OT_create_build_plate,
-    BAMBU_OT_full_setup,
-    BAMBU_OT_check_model_fit,
-    BAMBU_OT_center_on_plate,
-    BAMBU_OT_import_stl,
-    BAMBU_OT_import_3mf,
-    BAMBU_OT_export_stl,
-    BAMBU_OT_export_3mf,
-    BAMBU_PT_main_panel,
-)
+try:
+    import bpy
+except ImportError:  # Not running inside Blender. Only the Blender-independent `core` package can be used then.
+    bpy = None
+
+if bpy is not None:
+    # Reload functionality.
+    if "bpy" in locals():
+        import importlib
+        if "operators" in locals():
+            importlib.reload(operators)
+        if "import_3mf" in locals():
+            importlib.reload(import_3mf)
+        if "export_3mf" in locals():
+            importlib.reload(export_3mf)
+        if "bambu_lab" in locals():
+            importlib.reload(bambu_lab)
+        if "preferences" in locals():
+            importlib.reload(preferences)
+
+    import bpy.utils  # To (un)register the add-on.
+    import bpy.types  # To (un)register the add-on as an import/export function.
+
+    from .operators import Export3MF, Import3MF  # Imports and exports 3MF files. The implementations load on first use.
+    from .preferences import BambuPreferences  # Preferences of the add-on.
+    from .bambu_lab import (  # Bambu Lab printer integration.
+        BambuProperties,
+        BAMBU_OT_setup_scene,
+        BAMBU_OT_create_build_volume,
+        BAMBU_OT_create_build_plate,
+        BAMBU_OT_full_setup,
+        BAMBU_OT_check_model_fit,
+        BAMBU_OT_center_on_plate,
+        BAMBU_OT_check_mesh_health,
+        BAMBU_OT_estimate_filament,
+        BAMBU_OT_slice_preview,
+        BAMBU_OT_import_stl,
+        BAMBU_OT_import_3mf,
+        BAMBU_OT_export_stl,
+        BAMBU_OT_export_3mf,
+        BAMBU_OT_inspect_3mf_folder,
+        BAMBU_PT_main_panel,
+        register_fit_monitor,
+        unregister_fit_monitor,
+        register_filament_cache,
+        unregister_filament_cache,
+    )
+
+    classes = (
+        BambuProperties,  # Must be first (PropertyGroup)
+        BambuPreferences,
+        Import3MF,
+        Export3MF,
+        BAMBU_OT_setup_scene,
+        BAMBU_OT_create_build_volume,
+        BAMBU_OT_create_build_plate,
+        BAMBU_OT_full_setup,
+        BAMBU_OT_check_model_fit,
+        BAMBU_OT_center_on_plate,
+        BAMBU_OT_check_mesh_health,
+        BAMBU_OT_estimate_filament,
+        BAMBU_OT_slice_preview,
+        BAMBU_OT_import_stl,
+        BAMBU_OT_import_3mf,
+        BAMBU_OT_export_stl,
+        BAMBU_OT_export_3mf,
+        BAMBU_OT_inspect_3mf_folder,
+        BAMBU_PT_main_panel,  # Panel last
+    )
 
 
 def menu_import(self, _):
@@ -84,24 +122,6 @@ def menu_export(self, _):
     self.layout.operator(Export3MF.bl_idname, text="3D Manufacturing Format (.3mf)")
 
 
-classes = (
-    BambuProperties,  # Must be first (PropertyGroup)
-    Import3MF,
-    Export3MF,
-    BAMBU_OT_setup_scene,
-    BAMBU_OT_create_build_volume,
-    BAMBU_OT_create_build_plate,
-    BAMBU_OT_full_setup,
-    BAMBU_OT_check_model_fit,
-    BAMBU_OT_center_on_plate,
-    BAMBU_OT_import_stl,
-    BAMBU_OT_import_3mf,
-    BAMBU_OT_export_stl,
-    BAMBU_OT_export_3mf,
-    BAMBU_PT_main_panel,  # Panel last
-)
-
-
 def register():
     for cls in classes:
         bpy.utils.register_class(cls)
@@ -111,8 +131,14 @@ def register():
     bpy.types.TOPBAR_MT_file_import.append(menu_import)
     bpy.types.TOPBAR_MT_file_export.append(menu_export)
 
+    register_fit_monitor()
+    register_filament_cache()
+
 
 def unregister():
+    unregister_filament_cache()
+    unregister_fit_monitor()
+
     for cls in reversed(classes):
         bpy.utils.unregister_class(cls)
 
@@ -12,315 +12,167 @@
 # <pep8 compliant>
 
 import bpy  # To store the annotations long-term in the Blender context.
-import collections  # Namedtuple data structure for annotations, and Counter to write optimized content types.
+import hashlib  # To name the stored annotations after their targets.
 import json  # To serialize the data for long-term storage in the Blender scene.
 import logging  # Reporting parsing errors.
-import os.path  # To parse target paths in relationships.
-import urllib.parse  # To parse relative target paths in relationships.
-import xml.etree.ElementTree  # To parse the relationships files.
+import uuid  # To recognise whether the stored annotations changed.
 
-from .constants import *
-
-
-# These are the different types of annotations we can store.
-Relationship = collections.namedtuple("Relationship", ["namespace", "source"])
-ContentType = collections.namedtuple("ContentType", ["mime_type"])
-
-# Flag object to denote that different 3MF archives give different content types to the same file in the archive.
-ConflictingContentType = object()
+from .core import annotations as core_annotations  # The Blender-independent annotations collection.
+from .core.annotations import Relationship, ContentType, ConflictingContentType
 
 ANNOTATION_FILE = ".3mf_annotations"  # File name to use to store the annotations in the Blender data.
+TARGETS_PROPERTY = "3mf_targets"  # Custom property of that file, with the annotations of each target.
+REVISION_PROPERTY = "3mf_revision"  # Custom property of that file, which changes every time the annotations are stored.
 
+# The annotations that were last stored or retrieved, as a tuple of the revision they belong to, the annotations and the
+# targets that changed since. As long as the revision in the Blender data stays the same, they don't need to be read
+# again.
+_cache = None
 
-class Annotations:
-    """
-    This is a collection of annotations for a 3MF document. It annotates the files in the archive with metadata
-    information.
-
-    The class contains serialisation and deserialization functions in order to be able to load and save the annotations
-    from/to a 3MF archive, and to load and save the annotations in the Blender scene.
 
-    The annotations are stored in the `self.annotations` dictionary. The keys of this dictionary are the targets of the
-    annotations, normally the files in this archive. It can be any URI however, and the files don't necessarily need to
-    exist.
+class Annotations(core_annotations.Annotations):
+    """
+    Collection of annotations that can be stored in and retrieved from the Blender scene.
 
-    The values are sets of annotations. The annotations are named tuples as described in the beginning of this module.
-    The set can contain any mixture of these named tuples. Duplicates will get filtered out by the nature of the set
-    data structure.
+    See the base class for the structure of the annotations. In the Blender data, each target gets its own entry, so
+    that storing the annotations only needs to write the targets that changed. The annotations stay in memory between
+    imports and exports, so that they only need to be read again if the Blender data changed in the meantime, like
+    after undoing or loading a different file.
     """
 
-    def __init__(self):
-        """
-        Creates an empty collection of annotations.
+    def store(self):
         """
-        # All of the annotations so far. Keys are the target files of the annotations. Values are sets of annotation
-        # objects.
-        self.annotations = {}
+        Stores this `Annotations` instance in the Blender scene.
 
-    def add_rels(self, rels_file):
+        Only the targets that changed since the annotations were retrieved are written. This way the data can survive
+        until it needs to be saved to a 3MF document again, even when shared through a Blend file.
         """
-        Add relationships to this collection from a file stream containing a .rels file from a 3MF archive.
+        global _cache
+
+        text_file = bpy.data.texts.get(ANNOTATION_FILE)
+        if text_file is None:
+            text_file = bpy.data.texts.new(ANNOTATION_FILE)
+        if TARGETS_PROPERTY not in text_file:
+            # Might contain annotations stored by an older version. Those were retrieved as changed targets.
+            text_file.clear()
+            text_file.write("Annotations of imported 3MF archives, stored in the custom properties of this text.")
+            text_file[TARGETS_PROPERTY] = {}
+        stored_targets = text_file[TARGETS_PROPERTY]
+
+        for target in self.changed_targets:
+            key = self.target_key(target)
+            if self.annotations.get(target):
+                stored_targets[key] = json.dumps([target, self.serialize(self.annotations[target])])
+            elif key in stored_targets:
+                del stored_targets[key]
+        self.changed_targets.clear()
+
+        revision = uuid.uuid4().hex
+        text_file[REVISION_PROPERTY] = revision
+        _cache = (revision, self.annotations, self.changed_targets)
 
-        A relationship is treated as a file annotation, because it only contains a file that the relationship is
-        targeting, and a meaningless namespace. The relationship also originates from a source, indicated by the path to
-        the relationship file. This will also get stored, so that it can be properly restored later.
+    def retrieve(self):
+        """
+        Retrieves any existing annotations from the Blender scene.
 
-        Duplicate relationships won't get stored.
-        :param rels_file: A file stream containing a .rels file.
+        If the annotations in the Blender data didn't change since they were last stored or retrieved, the annotations
+        from then are used without reading them again.
         """
-        # Relationships are evaluated relative to the path that the _rels folder around the .rels file is on. If any.
-        base_path = os.path.dirname(rels_file.name) + "/"
-        if os.path.basename(os.path.dirname(base_path)) == RELS_FOLDER:
-            base_path = os.path.dirname(os.path.dirname(base_path)) + "/"
+        global _cache
 
-        try:
-            root = xml.etree.ElementTree.ElementTree(file=rels_file)
-        except xml.etree.ElementTree.ParseError as e:
-            logging.warning(
-                f"Relationship file {rels_file.name} has malformed XML (position {e.position[0]}:{e.position[1]}).")
-            return  # Skip this file.
+        text_file = bpy.data.texts.get(ANNOTATION_FILE)
+        if text_file is None:
+            # If there's nothing stored in the current scene, this clears the state of the annotations.
+            self.annotations = {}
+            self.changed_targets = set()
+            return  # Nothing to read. Done!
+        revision = text_file.get(REVISION_PROPERTY)
+        if _cache is not None and _cache[0] == revision and revision is not None and not _cache[2]:
+            # Share the annotations with the cache. Changing them also marks them as changed in the cache then.
+            _, self.annotations, self.changed_targets = _cache
+            return
 
-        for relationship_node in root.iterfind(RELS_RELATIONSHIP_FIND, RELS_NAMESPACES):
+        self.annotations = {}
+        self.changed_targets = set()
+        if TARGETS_PROPERTY in text_file:
+            for serialized_target in text_file[TARGETS_PROPERTY].values():
+                try:
+                    target, serialized_annotations = json.loads(serialized_target)
+                except (json.JSONDecodeError, TypeError, ValueError):
+                    logging.warning("Annotation file exists, but is not properly formatted.")
+                    continue
+                self.deserialize(target, serialized_annotations)
+        else:  # Stored by an older version, as a single JSON document.
             try:
-                target = relationship_node.attrib["Target"]
-                namespace = relationship_node.attrib["Type"]
-            except KeyError as e:
-                logging.warning(f"Relationship missing attribute: {str(e)}")
-                continue  # Skip this relationship.
-            if namespace == MODEL_REL:  # Don't store relationships that we will write ourselves.
-                continue
-
-            # Evaluate any relative URIs based on the path to this .rels file in the archive.
-            target = urllib.parse.urljoin(base_path, target)
-
-            if target != "" and target[0] == "/":
-                # To coincide with the convention held by the zipfile package, paths in this archive will not start with
-                # a slash.
-                target = target[1:]
-
-            if target not in self.annotations:
-                self.annotations[target] = set()
-
-            # Add to the annotations as a relationship (since it's a set, don't create duplicates).
-            self.annotations[target].add(Relationship(namespace=namespace, source=base_path))
-
-    def add_content_types(self, files_by_content_type):
+                annotation_data = json.loads(text_file.as_string())
+            except json.JSONDecodeError:
+                logging.warning("Annotation file exists, but is not properly formatted.")
+                return  # File was meddled with?
+            for target, serialized_annotations in annotation_data.items():
+                self.deserialize(target, serialized_annotations)
+            self.changed_targets.update(self.annotations)  # Convert them to the new format when storing.
+        _cache = (revision, self.annotations, self.changed_targets)
+
+    @staticmethod
+    def target_key(target):
         """
-        Add annotations that signal the content types of the files in the archive.
+        Get the name of the custom property that the annotations of a target are stored in.
 
-        If a file already got a different content type from a different 3MF archive, the content type of the file now
-        becomes unknown (and subsequently won't get stored in any exported 3MF archive).
-
-        Content types for files known to this 3MF implementation will not get stored. This add-on will rewrite those
-        files and may change the file location and such.
-        :param files_by_content_type: The files in this archive, sorted by content type.
+        Targets can be longer than the names of custom properties may be, so they are hashed.
+        :param target: The target of the annotations.
+        :return: A name for a custom property.
         """
-        for content_type, file_set in files_by_content_type.items():
-            if content_type == "":
-                continue  # Don't store content type if the content type is unknown.
-            if content_type in {RELS_MIMETYPE, MODEL_MIMETYPE}:
-                continue  # Don't store content type if it's a file we'll rewrite with this add-on.
-            for file in file_set:
-                filename = file.name
-                if filename not in self.annotations:
-                    self.annotations[filename] = set()
-                if ConflictingContentType in self.annotations[filename]:
-                    # Content type was already conflicting through multiple previous files. It'll stay in conflict.
-                    continue
-                content_type_annotations = list(filter(lambda annotation: type(annotation) == ContentType,
-                                                       self.annotations[filename]))
-                if any(content_type_annotations) and content_type_annotations[0].mime_type != content_type:
-                    # There was already a content type and it is different from this one.
-                    # This file now has conflicting content types!
-                    logging.warning(f"Found conflicting content types for file: {filename}")
-                    for annotation in content_type_annotations:
-                        self.annotations[filename].remove(annotation)
-                    self.annotations[filename].add(ConflictingContentType)
-                else:
-                    # No content type yet, or the existing content type is the same.
-                    # Adding it again wouldn't have any effect if it is the same.
-                    self.annotations[filename].add(ContentType(content_type))
+        return hashlib.sha1(target.encode("UTF-8")).hexdigest()
 
-    def write_rels(self, archive):
+    @staticmethod
+    def serialize(annotations):
         """
-        Write the relationship annotations in this collections to an archive as .rels files.
-
-        Multiple relationship files may be added to the archive, if relationships came from multiple sources in the
-        original archives.
-        :param archive: A zip archive to add the relationships to.
+        Serialize the annotations of a single target.
+        :param annotations: A set of annotations.
+        :return: A list of dictionaries that can be converted to JSON.
         """
-        current_id = 0  # Have an incrementing ID number to make all relationship IDs unique across the whole archive.
-
-        # First sort all relationships by their source, so that we know which relationship goes into which file.
-        # We always want to create a .rels file for the archive root, with our default relationships.
-        rels_by_source = {"/": set()}
-
-        for target, annotations in self.annotations.items():
-            for annotation in annotations:
-                if type(annotation) is not Relationship:
-                    continue
-                if annotation.source not in rels_by_source:
-                    rels_by_source[annotation.source] = set()
-                rels_by_source[annotation.source].add((target, annotation.namespace))
-
-        for source, annotations in rels_by_source.items():
-            if source == "/":  # Writing to the archive root. Don't want to start zipfile paths with a slash.
-                source = ""
-            # Create an XML document containing all relationships for this source.
-            root = xml.etree.ElementTree.Element(f"{{{RELS_NAMESPACE}}}Relationships")
-            for target, namespace in annotations:
-                xml.etree.ElementTree.SubElement(root, f"{{{RELS_NAMESPACE}}}Relationship", attrib={
-                    f"{{{RELS_NAMESPACE}}}Id": "rel" + str(current_id),
-                    f"{{{RELS_NAMESPACE}}}Target": "/" + target,
-                    f"{{{RELS_NAMESPACE}}}Type": namespace
+        serialized_annotations = []
+        for annotation in annotations:
+            if type(annotation) == Relationship:
+                serialized_annotations.append({
+                    "annotation": 'relationship',
+                    "namespace": annotation.namespace,
+                    "source": annotation.source
                 })
-                current_id += 1
-
-            # Write relationships for files that we create.
-            if source == "":
-                xml.etree.ElementTree.SubElement(root, f"{{{RELS_NAMESPACE}}}Relationship", attrib={
-                    f"{{{RELS_NAMESPACE}}}Id": "rel" + str(current_id),
-                    f"{{{RELS_NAMESPACE}}}Target": "/" + MODEL_LOCATION,
-                    f"{{{RELS_NAMESPACE}}}Type": MODEL_REL
+            elif type(annotation) == ContentType:
+                serialized_annotations.append({
+                    "annotation": 'content_type',
+                    "mime_type": annotation.mime_type
                 })
-                current_id += 1
-
-            document = xml.etree.ElementTree.ElementTree(root)
-
-            # Write that XML document to a file.
-            rels_file = source + RELS_FOLDER + "/.rels"  # _rels folder in the "source" folder.
-            with archive.open(rels_file, 'w') as f:
-                document.write(f, xml_declaration=True, encoding='UTF-8', default_namespace=RELS_NAMESPACE)
-
-    def write_content_types(self, archive):
-        """
-        Write a [Content_Types].xml file to a 3MF archive, containing all of the content types that we have assigned.
-        :param archive: A zip archive to add the content types to.
-        """
-        # First sort all of the content types by their extension, so that we can find out what the most common content
-        # type is for each extension.
-        content_types_by_extension = {}
-        for target, annotations in self.annotations.items():
-            for annotation in annotations:
-                if type(annotation) is not ContentType:
-                    continue
-                extension = os.path.splitext(target)[1]
-                if extension not in content_types_by_extension:
-                    content_types_by_extension[extension] = []
-                content_types_by_extension[extension].append(annotation.mime_type)
-
-        # Then find out which is the most common content type to assign to that extension.
-        most_common = {}
-        for extension, mime_types in content_types_by_extension.items():
-            counter = collections.Counter(mime_types)
-            most_common[extension] = counter.most_common(1)[0][0]
-
-        # Add the content types for files that this add-on creates by itself.
-        most_common[".rels"] = RELS_MIMETYPE
-        most_common[".model"] = MODEL_MIMETYPE
-
-        # Write an XML file that contains the extension rules for the most common cases,
-        # but specific overrides for the outliers.
-        root = xml.etree.ElementTree.Element(f"{{{CONTENT_TYPES_NAMESPACE}}}Types")
-
-        # First add all of the extension-based rules.
-        for extension, mime_type in most_common.items():
-            if not extension:  # Skip files without extension.
-                continue
-            xml.etree.ElementTree.SubElement(root, f"{{{CONTENT_TYPES_NAMESPACE}}}Default", attrib={
-                f"{{{CONTENT_TYPES_NAMESPACE}}}Extension": extension[1:],  # Don't include the period.
-                f"{{{CONTENT_TYPES_NAMESPACE}}}ContentType": mime_type
-            })
-
-        # Then write the overrides for files that don't have the same content type as most of their exceptions.
-        for target, annotations in self.annotations.items():
-            for annotation in annotations:
-                if type(annotation) is not ContentType:
-                    continue
-                extension = os.path.splitext(target)[1]
-                if not extension or annotation.mime_type != most_common[extension]:
-                    # This is an exceptional case that should be stored as an override.
-                    xml.etree.ElementTree.SubElement(root, f"{{{CONTENT_TYPES_NAMESPACE}}}Override", attrib={
-                        f"{{{CONTENT_TYPES_NAMESPACE}}}PartName": "/" + target,
-                        f"{{{CONTENT_TYPES_NAMESPACE}}}ContentType": annotation.mime_type
-                    })
-
-        # Output all that to the [Content_Types].xml file.
-        document = xml.etree.ElementTree.ElementTree(root)
-        with archive.open(CONTENT_TYPES_LOCATION, 'w') as f:
-            document.write(f, xml_declaration=True, encoding='UTF-8', default_namespace=CONTENT_TYPES_NAMESPACE)
-
-    def store(self):
-        """
-        Stores this `Annotations` instance in the Blender scene.
+            elif annotation == ConflictingContentType:
+                serialized_annotations.append({
+                    "annotation": 'content_type_conflict'
+                })
+        return serialized_annotations
 
-        The instance will serialize itself and put that data in a hidden JSON file in the scene. This way the data can
-        survive until it needs to be saved to a 3MF document again, even when shared through a Blend file.
+    def deserialize(self, target, serialized_annotations):
         """
-        # Generate a JSON document containing all annotations.
-        document = {}
-        for target, annotations in self.annotations.items():
-            serialized_annotations = []
-            for annotation in annotations:
-                if type(annotation) == Relationship:
-                    serialized_annotations.append({
-                        "annotation": 'relationship',
-                        "namespace": annotation.namespace,
-                        "source": annotation.source
-                    })
-                elif type(annotation) == ContentType:
-                    serialized_annotations.append({
-                        "annotation": 'content_type',
-                        "mime_type": annotation.mime_type
-                    })
-                elif annotation == ConflictingContentType:
-                    serialized_annotations.append({
-                        "annotation": 'content_type_conflict'
-                    })
-            document[target] = serialized_annotations
-
-        # Store this in the Blender context.
-        if ANNOTATION_FILE in bpy.data.texts:
-            bpy.data.texts.remove(bpy.data.texts[ANNOTATION_FILE])
-        text_file = bpy.data.texts.new(ANNOTATION_FILE)
-        text_file.write(json.dumps(document))
-
-    def retrieve(self):
+        Restore the annotations of a single target from their serialized form.
+        :param target: The target of the annotations.
+        :param serialized_annotations: A list of dictionaries, as created by `serialize`.
         """
-        Retrieves any existing annotations from the Blender scene.
-
-        This looks for a serialized annotation file in the Blender data. If it exists, it parses that file and retrieves
-        the data from it, restoring the state of the annotations collection that stored that file.
-        """
-        # If there's nothing stored in the current scene, this clears the state of the annotations.
-        self.annotations.clear()
-
-        if ANNOTATION_FILE not in bpy.data.texts:
-            return  # Nothing to read. Done!
+        self.annotations[target] = set()
         try:
-            annotation_data = json.loads(bpy.data.texts[ANNOTATION_FILE].as_string())
-        except json.JSONDecodeError:
-            logging.warning("Annotation file exists, but is not properly formatted.")
-            return  # File was meddled with?
-
-        for target, annotations in annotation_data.items():
-            self.annotations[target] = set()
-            try:
-                for annotation in annotations:
-                    if annotation['annotation'] == 'relationship':
-                        self.annotations[target].add(
-                            Relationship(namespace=annotation['namespace'], source=annotation['source']))
-                    elif annotation['annotation'] == 'content_type':
-                        self.annotations[target].add(ContentType(mime_type=annotation['mime_type']))
-                    elif annotation['annotation'] == 'content_type_conflict':
-                        self.annotations[target].add(ConflictingContentType)
-                    else:
-                        logging.warning(f"Unknown annotation type \"{annotation['annotation']}\" encountered.")
-                        continue
-            except TypeError:  # Raised when `annotations` is not iterable.
-                logging.warning(f"Annotation for target \"{target}\" is not properly structured.")
-            except KeyError as e:
-                # Raised when missing the 'annotation' key or a required key belonging to that annotation.
-                logging.warning(f"Annotation for target \"{target}\" missing key: {str(e)}")
-            if not self.annotations[target]:  # Nothing was added in the end.
-                del self.annotations[target]  # Don't store the empty target either then.
+            for annotation in serialized_annotations:
+                if annotation['annotation'] == 'relationship':
+                    self.annotations[target].add(
+                        Relationship(namespace=annotation['namespace'], source=annotation['source']))
+                elif annotation['annotation'] == 'content_type':
+                    self.annotations[target].add(ContentType(mime_type=annotation['mime_type']))
+                elif annotation['annotation'] == 'content_type_conflict':
+                    self.annotations[target].add(ConflictingContentType)
+                else:
+                    logging.warning(f"Unknown annotation type \"{annotation['annotation']}\" encountered.")
+                    continue
+        except TypeError:  # Raised when `annotations` is not iterable.
+            logging.warning(f"Annotation for target \"{target}\" is not properly structured.")
+        except KeyError as e:
+            # Raised when missing the 'annotation' key or a required key belonging to that annotation.
+            logging.warning(f"Annotation for target \"{target}\" missing key: {str(e)}")
+        if not self.annotations[target]:  # Nothing was added in the end.
+            del self.annotations[target]  # Don't store the empty target either then.
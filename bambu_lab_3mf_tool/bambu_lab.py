@@ -13,28 +13,230 @@
 
 # <pep8 compliant>
 
+import os
+import sys
+
 import bpy
 import mathutils
-from bpy.props import EnumProperty, BoolProperty, FloatProperty
-
-# Printer build volumes (X, Y, Z in mm)
-PRINTER_VOLUMES = {
-    'A1_MINI': (180, 180, 180),
-    'A1': (256, 256, 256),
-    'P1S': (256, 256, 256),
-    'P1P': (256, 256, 256),
-    'X1C': (256, 256, 256),
-    'X1E': (256, 256, 256),
-}
-
-PRINTER_NAMES = {
-    'A1_MINI': "A1 Mini (180×180×180)",
-    'A1': "A1 (256×256×256)",
-    'P1S': "P1S (256×256×256)",
-    'P1P': "P1P (256×256×256)",
-    'X1C': "X1 Carbon (256×256×256)",
-    'X1E': "X1E (256×256×256)",
-}
+from bpy.app.handlers import persistent
+from bpy.props import EnumProperty, BoolProperty, FloatProperty, IntProperty, StringProperty
+
+from .printers import FILAMENT_DENSITIES, FILAMENT_PRICES, PRINTER_VOLUMES, extents_fit
+
+# Objects created by this add-on as printer references. They are never checked for fit.
+REFERENCE_OBJECTS = {"Build Volume", "Build Plate"}
+
+
+# Live fit monitor.
+# The cache maps the session UID of every mesh object to a tuple (name, min_corner, max_corner, fits). It gets seeded
+# once when the monitor is enabled and is then only updated for the objects that the dependency graph reports as
+# changed, so that dragging an object around never rescans the whole scene.
+_fit_cache = {}
+
+
+def _world_extents(blender_object):
+    """
+    Get the world-space axis-aligned bounding box of an object.
+    :param blender_object: The object to measure. For modifiers to be taken into account, this must be an evaluated
+    object.
+    :return: A tuple of the minimum corner and the maximum corner, each a tuple of X, Y and Z.
+    """
+    matrix = blender_object.matrix_world
+    corners = [matrix @ mathutils.Vector(corner) for corner in blender_object.bound_box]
+    minimum = (min(c.x for c in corners), min(c.y for c in corners), min(c.z for c in corners))
+    maximum = (max(c.x for c in corners), max(c.y for c in corners), max(c.z for c in corners))
+    return minimum, maximum
+
+
+def _update_fit_entry(blender_object, volume):
+    """
+    Recompute the cached extents of a single object.
+    :param blender_object: The (evaluated) object that changed.
+    :param volume: The build volume of the selected printer.
+    :return: `True` if the fit status of the object changed, or `False` if it stayed the same.
+    """
+    key = blender_object.original.session_uid
+    if blender_object.type != 'MESH' or blender_object.name in REFERENCE_OBJECTS:
+        return _fit_cache.pop(key, None) is not None
+    minimum, maximum = _world_extents(blender_object)
+    fits = extents_fit(minimum, maximum, volume)
+    previous = _fit_cache.get(key)
+    _fit_cache[key] = (blender_object.name, minimum, maximum, fits)
+    return previous is None or previous[3] != fits or previous[0] != blender_object.name
+
+
+def _seed_fit_cache(scene):
+    """
+    Fill the fit cache with all mesh objects in a scene.
+
+    This is the only place where the whole scene gets scanned. It happens when the monitor gets enabled or when a file
+    is loaded with the monitor enabled.
+    :param scene: The scene to scan.
+    """
+    _fit_cache.clear()
+    volume = PRINTER_VOLUMES[scene.bambu_props.printer_model]
+    depsgraph = bpy.context.evaluated_depsgraph_get()
+    for blender_object in scene.objects:
+        _update_fit_entry(blender_object.evaluated_get(depsgraph), volume)
+
+
+def _refresh_fit_status(scene):
+    """
+    Re-evaluate the fit status of all cached extents, for instance when a different printer got selected.
+
+    No geometry is measured again. Only the cached extents get compared with the new build volume.
+    :param scene: The scene of which the printer changed.
+    """
+    volume = PRINTER_VOLUMES[scene.bambu_props.printer_model]
+    for key, (name, minimum, maximum, _) in _fit_cache.items():
+        _fit_cache[key] = (name, minimum, maximum, extents_fit(minimum, maximum, volume))
+
+
+def _tag_sidebar_redraw():
+    """
+    Redraw the sidebars of the 3D viewports, so that the panel shows the new fit status.
+    """
+    window_manager = bpy.context.window_manager
+    if window_manager is None:
+        return
+    for window in window_manager.windows:
+        for area in window.screen.areas:
+            if area.type == 'VIEW_3D':
+                for region in area.regions:
+                    if region.type == 'UI':
+                        region.tag_redraw()
+
+
+@persistent
+def _fit_monitor_depsgraph_update(scene, depsgraph):
+    """
+    Dependency graph handler that keeps the fit cache up to date.
+
+    Only the objects of which the transformation or geometry was updated get measured again.
+    :param scene: The scene that was updated.
+    :param depsgraph: The dependency graph with the updates.
+    """
+    props = getattr(scene, "bambu_props", None)
+    if props is None or not props.live_fit_check:
+        return
+    volume = PRINTER_VOLUMES[props.printer_model]
+    changed = False
+    for update in depsgraph.updates:
+        if not (update.is_updated_transform or update.is_updated_geometry):
+            continue
+        if not isinstance(update.id, bpy.types.Object):
+            continue
+        changed |= _update_fit_entry(update.id, volume)
+    if changed:
+        _tag_sidebar_redraw()
+
+
+@persistent
+def _fit_monitor_load_post(_):
+    """
+    After loading a file, restart the monitor if that file had it enabled.
+    """
+    scene = bpy.context.scene
+    if scene is not None and scene.bambu_props.live_fit_check:
+        _start_fit_monitor(scene)
+    else:
+        _stop_fit_monitor()
+
+
+def _start_fit_monitor(scene):
+    """
+    Seed the fit cache and start listening to dependency graph updates.
+    :param scene: The scene to monitor.
+    """
+    _seed_fit_cache(scene)
+    if _fit_monitor_depsgraph_update not in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.append(_fit_monitor_depsgraph_update)
+
+
+def _stop_fit_monitor():
+    """
+    Stop listening to dependency graph updates and forget all cached extents.
+    """
+    if _fit_monitor_depsgraph_update in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.remove(_fit_monitor_depsgraph_update)
+    _fit_cache.clear()
+
+
+def _update_live_fit_check(self, context):
+    """
+    Called when the live fit monitor gets toggled in the panel.
+    """
+    if self.live_fit_check:
+        _start_fit_monitor(context.scene)
+    else:
+        _stop_fit_monitor()
+
+
+def _update_printer_model(self, context):
+    """
+    Called when a different printer gets selected. Updates the fit status of the live fit monitor.
+    """
+    if self.live_fit_check:
+        _refresh_fit_status(context.scene)
+
+
+@persistent
+def _filament_cache_depsgraph_update(scene, depsgraph):
+    """
+    Dependency graph handler that drops the cached filament volumes of objects of which the geometry changed.
+    :param scene: The scene that was updated.
+    :param depsgraph: The dependency graph with the updates.
+    """
+    from .filament import forget_slot_volumes
+    for update in depsgraph.updates:
+        if update.is_updated_geometry and isinstance(update.id, bpy.types.Object):
+            forget_slot_volumes(update.id.original.session_uid)
+
+
+@persistent
+def _filament_cache_load_post(_):
+    """
+    After loading a file, forget the filament volumes of the objects of the previous file.
+    """
+    from .filament import forget_slot_volumes
+    forget_slot_volumes()
+
+
+def register_filament_cache():
+    """
+    Install the handlers that keep the cached filament volumes up to date.
+    """
+    if _filament_cache_depsgraph_update not in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.append(_filament_cache_depsgraph_update)
+    if _filament_cache_load_post not in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.append(_filament_cache_load_post)
+
+
+def unregister_filament_cache():
+    """
+    Remove the handlers of the filament volume cache.
+    """
+    if _filament_cache_depsgraph_update in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.remove(_filament_cache_depsgraph_update)
+    if _filament_cache_load_post in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.remove(_filament_cache_load_post)
+
+
+def register_fit_monitor():
+    """
+    Install the handler that restarts the live fit monitor when a file gets loaded.
+    """
+    if _fit_monitor_load_post not in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.append(_fit_monitor_load_post)
+
+
+def unregister_fit_monitor():
+    """
+    Remove all handlers of the live fit monitor.
+    """
+    _stop_fit_monitor()
+    if _fit_monitor_load_post in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.remove(_fit_monitor_load_post)
 
 
 class BambuProperties(bpy.types.PropertyGroup):
@@ -49,7 +251,33 @@ class BambuProperties(bpy.types.PropertyGroup):
             ('X1C', "X1 Carbon (256×256×256)", "Bambu Lab X1 Carbon"),
             ('X1E', "X1E (256×256×256)", "Bambu Lab X1E"),
         ],
-        default='A1_MINI'
+        default='A1_MINI',
+        update=_update_printer_model
+    )
+    live_fit_check: BoolProperty(
+        name="Live Fit Monitor",
+        description="Continuously check whether the objects in the scene fit within the build volume",
+        default=False,
+        update=_update_live_fit_check
+    )
+    filament_type: EnumProperty(
+        name="Filament",
+        description="Filament type for materials whose name doesn't mention a filament type",
+        items=[(name, name, f"{name} ({FILAMENT_DENSITIES[name]} g/cm³)") for name in FILAMENT_DENSITIES],
+        default='PLA'
+    )
+    layer_height: FloatProperty(
+        name="Layer Height",
+        description="Layer height for the slice preview, in mm",
+        default=0.2,
+        min=0.01,
+        max=1.0
+    )
+    preview_layer: IntProperty(
+        name="Layer",
+        description="Layer to show in the slice preview, counting from the build plate",
+        default=1,
+        min=1
     )
 
 
@@ -296,6 +524,220 @@ class BAMBU_OT_center_on_plate(bpy.types.Operator):
         return {'FINISHED'}
 
 
+class BAMBU_OT_check_mesh_health(bpy.types.Operator):
+    """Check the selected objects for open, non-manifold, degenerate or flipped geometry"""
+    bl_idname = "bambu.check_mesh_health"
+    bl_label = "Check Mesh Health"
+    bl_options = {'REGISTER'}
+
+    def execute(self, context):
+        from .mesh_arrays import vertex_coordinates, triangle_indices
+        from .mesh_health import analyze, describe, is_healthy
+
+        objects = [obj for obj in (context.selected_objects or context.scene.objects)
+                   if obj.type == 'MESH' and obj.name not in REFERENCE_OBJECTS]
+        if not objects:
+            self.report({'WARNING'}, "No objects to check")
+            return {'CANCELLED'}
+
+        num_unhealthy = 0
+        depsgraph = context.evaluated_depsgraph_get()
+        for obj in objects:
+            evaluated = obj.evaluated_get(depsgraph)
+            mesh = evaluated.to_mesh()
+            if mesh is None:
+                continue
+            mesh.calc_loop_triangles()
+            health = analyze(vertex_coordinates(mesh), triangle_indices(mesh))
+            evaluated.to_mesh_clear()
+            if not is_healthy(health):
+                num_unhealthy += 1
+                self.report({'WARNING'}, f"{obj.name}: {describe(health)}")
+
+        if num_unhealthy == 0:
+            self.report({'INFO'}, f"All {len(objects)} meshes are healthy")
+        else:
+            self.report({'WARNING'}, f"{num_unhealthy} of {len(objects)} meshes have problems")
+        return {'FINISHED'}
+
+
+class BAMBU_OT_estimate_filament(bpy.types.Operator):
+    """Estimate filament weight and cost of the selected objects, or of the whole plate if nothing is selected"""
+    bl_idname = "bambu.estimate_filament"
+    bl_label = "Estimate Filament"
+    bl_options = {'REGISTER'}
+
+    def execute(self, context):
+        from .filament import cached_slot_volumes, filament_type
+
+        props = context.scene.bambu_props
+
+        objects = [obj for obj in (context.selected_objects or context.scene.objects)
+                   if obj.type == 'MESH' and obj.name not in REFERENCE_OBJECTS]
+        if not objects:
+            self.report({'WARNING'}, "No objects to estimate")
+            return {'CANCELLED'}
+
+        # Volumes are computed in Blender units. Convert them to cm³.
+        scale_length = context.scene.unit_settings.scale_length or 1.0
+        to_cubic_cm = (scale_length ** 3) * 1e6
+
+        grams_per_material = {}
+        cost_per_material = {}
+        depsgraph = context.evaluated_depsgraph_get()
+        for obj in objects:
+            evaluated = obj.evaluated_get(depsgraph)
+            slots = obj.material_slots
+            volumes = cached_slot_volumes(evaluated, len(slots))
+            if volumes is None:
+                continue
+
+            # The volume scales along with the object's transformation. The volume of a slot may be negative on concave
+            # parts, so only the total volume tells whether the normals or the transformation turn the mesh inside out.
+            world_factor = evaluated.matrix_world.to_3x3().determinant() * to_cubic_cm
+            if volumes.sum() * world_factor < 0:
+                world_factor = -world_factor
+            object_grams = 0.0
+            object_cost = 0.0
+            for slot_index, volume in enumerate(volumes):
+                if volume == 0:
+                    continue
+                material = slots[slot_index].material if slot_index < len(slots) else None
+                material_name = material.name if material is not None else None
+                filament = filament_type(material_name, props.filament_type)
+                material_name = material_name or filament  # Unassigned triangles are grouped by filament type.
+                grams = volume * world_factor * FILAMENT_DENSITIES[filament]
+                cost = grams / 1000 * FILAMENT_PRICES[filament]
+                object_grams += grams
+                object_cost += cost
+                grams_per_material[material_name] = grams_per_material.get(material_name, 0.0) + grams
+                cost_per_material[material_name] = cost_per_material.get(material_name, 0.0) + cost
+            self.report({'INFO'}, f"{obj.name}: {object_grams:.1f}g, {object_cost:.2f}")
+
+        for material_name, grams in sorted(grams_per_material.items()):
+            self.report({'INFO'}, f"Material {material_name}: {grams:.1f}g, {cost_per_material[material_name]:.2f}")
+
+        total_grams = sum(grams_per_material.values())
+        total_cost = sum(cost_per_material.values())
+        self.report({'INFO'}, f"Plate total: {total_grams:.1f}g, {total_cost:.2f} ({len(objects)} objects)")
+        return {'FINISHED'}
+
+
+class BAMBU_OT_slice_preview(bpy.types.Operator):
+    """Slice the selected objects into layers, report layer statistics and show one layer as a curve"""
+    bl_idname = "bambu.slice_preview"
+    bl_label = "Slice Preview"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    def execute(self, context):
+        import numpy
+        from .slicing import estimate_print_time, layer_heights, layer_segments, slice_statistics
+
+        props = context.scene.bambu_props
+        volume = PRINTER_VOLUMES[props.printer_model]
+
+        objects = [obj for obj in (context.selected_objects or context.scene.objects)
+                   if obj.type == 'MESH' and obj.name not in REFERENCE_OBJECTS]
+        if not objects:
+            self.report({'WARNING'}, "No objects to slice")
+            return {'CANCELLED'}
+
+        # Slice in millimetres, in world space, with all objects combined into one buffer.
+        to_mm = (context.scene.unit_settings.scale_length or 1.0) * 1000
+        coordinates, triangles = self.gather_geometry(context, objects, to_mm)
+        if len(triangles) == 0:
+            self.report({'WARNING'}, "Nothing to slice")
+            return {'CANCELLED'}
+
+        # Only slice within the build volume of the selected printer, starting at the build plate.
+        layer_height = props.layer_height
+        top = min(coordinates[:, 2].max(), volume[2])
+        num_layers = max(int(numpy.ceil(top / layer_height)), 0)
+        perimeters, areas = slice_statistics(coordinates, triangles, layer_height, num_layers)
+        filled = numpy.nonzero(perimeters)[0]
+        if len(filled) == 0:
+            self.report({'WARNING'}, "Objects don't intersect any layer above the build plate")
+            return {'CANCELLED'}
+
+        thinnest = filled[numpy.argmin(areas[filled])]
+        minutes = estimate_print_time(perimeters, areas) / 60
+        self.report({'INFO'}, f"First layer contact area: {areas[filled[0]]:.1f}mm²")
+        self.report({'INFO'}, f"Smallest cross-section: {areas[thinnest]:.1f}mm² at layer {thinnest + 1}")
+        self.report({'INFO'}, f"Sliced {len(filled)} layers, {perimeters.sum() / 1000:.1f}m of perimeter, "
+                              f"roughly {minutes:.0f} minutes to print")
+
+        layer_index = min(props.preview_layer, num_layers) - 1
+        plane_z = layer_heights(num_layers, layer_height)[layer_index]
+        self.create_preview(context, layer_segments(coordinates, triangles, plane_z), plane_z, to_mm)
+        return {'FINISHED'}
+
+    def gather_geometry(self, context, objects, to_mm):
+        """
+        Combine the evaluated geometry of several objects into one world-space mesh.
+        :param context: The Blender context.
+        :param objects: The objects to combine.
+        :param to_mm: Scaling factor from Blender units to millimetres.
+        :return: A tuple of a coordinate array of shape (N, 3) and a triangle array of shape (M, 3).
+        """
+        import numpy
+        from .mesh_arrays import vertex_coordinates, triangle_indices
+
+        depsgraph = context.evaluated_depsgraph_get()
+        all_coordinates = []
+        all_triangles = []
+        offset = 0
+        for obj in objects:
+            evaluated = obj.evaluated_get(depsgraph)
+            mesh = evaluated.to_mesh()
+            if mesh is None:
+                continue
+            mesh.calc_loop_triangles()
+            matrix = numpy.array(evaluated.matrix_world)
+            coordinates = vertex_coordinates(mesh) @ matrix[:3, :3].T + matrix[:3, 3]
+            all_coordinates.append(coordinates * to_mm)
+            all_triangles.append(triangle_indices(mesh) + offset)
+            offset += len(coordinates)
+            evaluated.to_mesh_clear()
+        if not all_coordinates:
+            return numpy.zeros((0, 3)), numpy.zeros((0, 3), dtype=numpy.int64)
+        return numpy.concatenate(all_coordinates), numpy.concatenate(all_triangles)
+
+    def create_preview(self, context, segments, plane_z, to_mm):
+        """
+        Show the contours of one layer as a curve object.
+
+        Any previous slice preview gets replaced.
+        :param context: The Blender context.
+        :param segments: The intersection segments of the layer, in millimetres.
+        :param plane_z: The height of the layer, in millimetres.
+        :param to_mm: Scaling factor from Blender units to millimetres.
+        """
+        from .slicing import chain_segments
+
+        old_preview = bpy.data.objects.get("Slice Preview")
+        if old_preview:
+            old_curve = old_preview.data
+            bpy.data.objects.remove(old_preview, do_unlink=True)
+            if old_curve.users == 0:
+                bpy.data.curves.remove(old_curve)
+
+        curve = bpy.data.curves.new("Slice Preview", 'CURVE')
+        curve.dimensions = '3D'
+        for points, closed in chain_segments(segments):
+            spline = curve.splines.new('POLY')
+            spline.points.add(len(points) - 1)
+            coordinates = [0.0] * (len(points) * 4)
+            for index, (x, y) in enumerate(points):
+                coordinates[index * 4:index * 4 + 4] = (x / to_mm, y / to_mm, plane_z / to_mm, 1.0)
+            spline.points.foreach_set("co", coordinates)
+            spline.use_cyclic_u = closed
+
+        obj = bpy.data.objects.new("Slice Preview", curve)
+        obj.hide_select = True
+        obj.color = (1.0, 0.5, 0.0, 1.0)  # Orange
+        context.collection.objects.link(obj)
+
+
 class BAMBU_OT_import_stl(bpy.types.Operator):
     """Import STL file with correct scale for millimeter workflow"""
     bl_idname = "bambu.import_stl"
@@ -443,6 +885,118 @@ class BAMBU_OT_export_3mf(bpy.types.Operator):
         return {'RUNNING_MODAL'}
 
 
+def _follow_progress(stream, progress):
+    """
+    Keep track of the progress that the batch tool reports. This runs in a thread of its own, so it must not touch any
+    Blender data.
+    :param stream: The stderr of the batch tool, as text.
+    :param progress: A list of the number of files completed and the total number of files, which gets updated.
+    """
+    for line in stream:
+        if not line.startswith("["):  # Progress lines start with [completed/total].
+            continue
+        try:
+            completed, total = line[1:line.index("]")].split("/")
+            progress[:] = [int(completed), int(total)]
+        except ValueError:  # Some other output.
+            continue
+
+
+class BAMBU_OT_inspect_3mf_folder(bpy.types.Operator):
+    """Summarise every 3MF file in a folder for a library, without importing anything"""
+    bl_idname = "bambu.inspect_3mf_folder"
+    bl_label = "Inspect 3MF Folder"
+    bl_options = {'REGISTER'}
+
+    directory: StringProperty(subtype='DIR_PATH')
+    filter_folder: BoolProperty(default=True, options={'HIDDEN'})
+    summary_name: StringProperty(
+        name="Summary File",
+        description="Name of the JSON file to write the summary of every 3MF file to, in the chosen folder",
+        default="3mf_library.json"
+    )
+    extract_thumbnails: BoolProperty(
+        name="Extract Thumbnails",
+        description="Write the thumbnail of every 3MF file to a 'thumbnails' folder in the chosen folder",
+        default=True
+    )
+
+    def execute(self, context):
+        # The inspection runs in the batch tool, which has a pool of worker processes. Those can't import the add-on
+        # under the package name that Blender gives it, but can import it from the folder that it is installed in.
+        import subprocess
+        import threading
+
+        if not os.path.isdir(self.directory):
+            self.report({'ERROR'}, f"Not a folder: {self.directory}")
+            return {'CANCELLED'}
+        package_path = os.path.dirname(os.path.abspath(__file__))
+        self.summary_path = os.path.join(self.directory, self.summary_name)
+        if os.path.isfile(self.summary_path):
+            os.remove(self.summary_path)  # Don't mistake the summary of a previous run for this one.
+        command = [sys.executable, "-m", os.path.basename(package_path) + ".cli", self.directory, "--inspect",
+                   "--summary", self.summary_path]
+        if self.extract_thumbnails:
+            command += ["-o", os.path.join(self.directory, "thumbnails")]
+        environment = dict(os.environ)
+        environment["PYTHONPATH"] = os.pathsep.join(
+            path for path in (os.path.dirname(package_path), environment.get("PYTHONPATH")) if path)
+        self.process = subprocess.Popen(command, env=environment, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                                        text=True)
+        self.progress = [0, 0]
+        threading.Thread(target=_follow_progress, args=(self.process.stderr, self.progress), daemon=True).start()
+
+        window_manager = context.window_manager
+        window_manager.progress_begin(0, 1)
+        self.timer = window_manager.event_timer_add(0.1, window=context.window)
+        window_manager.modal_handler_add(self)
+        return {'RUNNING_MODAL'}
+
+    def modal(self, context, event):
+        import json
+
+        if event.type == 'ESC':
+            self.cancel(context)
+            self.report({'WARNING'}, "Inspection cancelled")
+            return {'CANCELLED'}
+        if event.type != 'TIMER' or event.timer != self.timer:
+            return {'PASS_THROUGH'}  # Nothing gets changed in Blender, so the user can keep working meanwhile.
+
+        completed, total = self.progress
+        if self.process.poll() is None:
+            if total:
+                context.window_manager.progress_update(completed / total)
+            context.workspace.status_text_set(f"Inspecting 3MF files: {completed}/{total}. Press Esc to cancel.")
+            return {'RUNNING_MODAL'}
+
+        self.stop(context)
+        if not os.path.isfile(self.summary_path):
+            self.report({'WARNING'}, "No 3MF files found in the folder")
+            return {'CANCELLED'}
+        with open(self.summary_path) as f:
+            summary = json.load(f)
+        self.report({'INFO'}, f"Inspected {summary['files']} files ({summary['errors']} failed). "
+                              f"Summary written to {self.summary_path}")
+        return {'FINISHED'}
+
+    def cancel(self, context):
+        self.process.terminate()
+        self.stop(context)
+
+    def stop(self, context):
+        """
+        Removes the progress from the interface, after the inspection ended.
+        """
+        window_manager = context.window_manager
+        window_manager.event_timer_remove(self.timer)
+        window_manager.progress_end()
+        context.workspace.status_text_set(None)
+
+    def invoke(self, context, event):
+        context.window_manager.fileselect_add(self)
+        return {'RUNNING_MODAL'}
+
+
 class BAMBU_PT_main_panel(bpy.types.Panel):
     """Main panel for Bambu Lab printer setup"""
     bl_label = "Bambu Lab Setup"
@@ -479,6 +1033,19 @@ class BAMBU_PT_main_panel(bpy.types.Panel):
         col = layout.column(align=True)
         col.operator("bambu.check_model_fit", icon='VIEWZOOM')
         col.operator("bambu.center_on_plate", icon='VIEW_PAN')
+        col.operator("bambu.check_mesh_health", icon='MESH_DATA')
+        layout.prop(props, "live_fit_check")
+        if props.live_fit_check:
+            self.draw_fit_status(layout, context)
+
+        row = layout.row(align=True)
+        row.prop(props, "filament_type", text="")
+        row.operator("bambu.estimate_filament", icon='MATERIAL')
+
+        row = layout.row(align=True)
+        row.prop(props, "layer_height", text="")
+        row.prop(props, "preview_layer")
+        layout.operator("bambu.slice_preview", icon='ALIGN_JUSTIFY')
 
         layout.separator()
 
@@ -487,8 +1054,28 @@ class BAMBU_PT_main_panel(bpy.types.Panel):
         row = layout.row(align=True)
         row.operator("bambu.import_stl", text="STL", icon='IMPORT')
         row.operator("bambu.import_3mf", text="3MF", icon='IMPORT')
+        layout.operator("bambu.inspect_3mf_folder", icon='FILEBROWSER')
 
         layout.label(text="Export:")
         row = layout.row(align=True)
         row.operator("bambu.export_stl", text="STL", icon='EXPORT')
         row.operator("bambu.export_3mf", text="3MF", icon='EXPORT')
+
+    def draw_fit_status(self, layout, context):
+        """
+        Show the state of the live fit monitor: whether everything fits, and which objects stick out.
+        """
+        box = layout.box()
+        outside = []
+        for name, _, _, fits in _fit_cache.values():
+            if not fits and name in context.scene.objects:  # Deleted objects may linger in the cache.
+                outside.append(name)
+        if not outside:
+            box.label(text="All objects fit", icon='CHECKMARK')
+            return
+        box.label(text=f"{len(outside)} object(s) outside build volume", icon='ERROR')
+        max_listed = 8
+        for name in sorted(outside)[:max_listed]:
+            box.label(text=name, icon='OBJECT_DATA')
+        if len(outside) > max_listed:
+            box.label(text=f"... and {len(outside) - max_listed} more")
@@ -0,0 +1,439 @@
+# Bambu Lab 3MF Tools - Headless batch conversion.
+# Copyright (C) 2025 jsonify
+#
+# This add-on is free software: you can redistribute it and/or modify it under the terms of the GNU General
+# Public License as published by the Free Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+# This add-on is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied
+# warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# details.
+# You should have received a copy of the GNU General Public License along with this plug-in. If not, see
+# <https://gnu.org/licenses/>.
+
+# <pep8 compliant>
+
+"""
+Converts and checks many model files at once, without starting Blender.
+
+Run it as a module, for instance:
+```
+python -m bambu_lab_3mf_tool.cli "parts/**/*.stl" -o converted --printer A1_MINI --center
+```
+
+Every input file is handled by a worker process using the Blender-independent `core` library. STL and 3MF files are
+read, optionally checked against the build volume of a printer and moved to the center of its build plate, and then
+written as 3MF files. Progress is streamed to stderr while the files complete, and a JSON summary with a record for
+every file is written at the end. Files that fail don't stop the run; they are listed in the summary with their error.
+
+With `--inspect`, 3MF files are only summarised for a library browser, without reading their geometry: their objects,
+triangle counts, unit, size and thumbnail.
+"""
+
+import argparse  # To parse the command line.
+import concurrent.futures  # To convert files in parallel worker processes.
+import glob  # To expand the input patterns.
+import json  # To write the summary.
+import os  # To find the file names to write.
+import sys  # To write progress and set the exit code.
+import time  # To measure how long each file takes.
+import xml.etree.ElementTree  # To catch malformed documents.
+import zipfile  # To catch corrupt archives.
+
+from .constants import *
+from .core import (
+    Annotations,
+    Metadata,
+    ModelReader,
+    create_archive,
+    inspect_archive,
+    is_supported,
+    model_unit,
+    parse_model,
+    read_archive,
+    read_compressed,
+    write_compressed,
+    writer,
+)
+from .core.archive import write_document
+from .core.geometry import model_extents, translation
+from .core.reader import BuildItem, ResourceObject, combine_document, identity, multiply
+from .core.stl import read_stl
+from .printers import PRINTER_VOLUMES, extents_fit
+from .unit_conversions import threemf_to_metre
+
+INPUT_EXTENSIONS = {".3mf", ".stl"}  # The types of files that can be converted.
+STL_UNIT = "millimeter"  # STL files have no unit. Slicers treat them as millimetres.
+
+
+def read_3mf(path):
+    """
+    Reads all 3D model documents of a 3MF archive.
+
+    If the archive contains multiple model documents, their resources are combined. Their resource IDs are prefixed
+    with the path of the document, since IDs are only unique within a document. Components that refer to objects in
+    other documents through the production extension, like in Bambu Studio projects, are resolved to those objects.
+    :param path: The path to the 3MF file.
+    :return: A tuple of the resource objects, the build items, the document metadata, the unit of the root document
+    and the annotations of the archive.
+    :raises: `ValueError` if the archive contains no model that can be read.
+    """
+    files_by_content_type = read_archive(path)
+    annotations = Annotations()
+    for rels_file in files_by_content_type.get(RELS_MIMETYPE, []):
+        annotations.add_rels(rels_file)
+    annotations.add_content_types(files_by_content_type)
+
+    roots = {}  # The root element of every model document, by its path.
+    for model_file in files_by_content_type.get(MODEL_MIMETYPE, []):
+        roots[model_file.name] = parse_model(model_file)
+        if not is_supported(roots[model_file.name].attrib.get("requiredextensions", "")):
+            raise ValueError(f"{model_file.name} requires unsupported 3MF extensions.")
+    if not roots:
+        raise ValueError("The archive contains no 3D model.")
+    root_document = MODEL_LOCATION if MODEL_LOCATION in roots else next(iter(roots))
+    unit = model_unit(roots[root_document])
+    # Documents in other units get scaled to the unit of the root document.
+    scales = {document: threemf_to_metre[model_unit(root)] / threemf_to_metre[unit] for document, root in roots.items()}
+
+    resource_objects = {}
+    build_items = []
+    document_metadata = None
+    # The root document goes last, since it refers to the objects of the others, and objects must be written after the
+    # objects that they refer to.
+    for document in sorted(roots, key=lambda document: document == root_document):
+        root = roots[document]
+        reader = ModelReader()
+        document_metadata = reader.read_metadata(root, document_metadata)
+        reader.read_materials(root)
+        reader.read_objects(root)
+        build_items_of_document = reader.read_build(root)
+        reader.emit_diagnostics(f"{path} ({document})")
+        combined_objects, combined_items = combine_document(
+            reader.resource_objects, build_items_of_document, document, root_document, scales)
+        resource_objects.update(combined_objects)
+        build_items.extend(combined_items)
+
+    return resource_objects, build_items, document_metadata, unit, annotations
+
+
+def read_stl_model(path):
+    """
+    Reads an STL file into the same structures as `read_3mf`, with a single object that gets built once.
+    :param path: The path to the STL file.
+    :return: A tuple of the resource objects and the build items.
+    """
+    vertices, triangles = read_stl(path)
+    resource_objects = {"1": ResourceObject(
+        vertices=vertices,
+        triangles=triangles,
+        materials=[None] * len(triangles),
+        components=[],
+        metadata=Metadata())}
+    build_items = [BuildItem(objectid="1", transformation=identity(), metadata=Metadata())]
+    return resource_objects, build_items
+
+
+def write_3mf(path, resource_objects, build_items, unit, precision, document_metadata=None, annotations=None,
+              source_path=None):
+    """
+    Writes a 3MF archive.
+    :param path: The path to write the archive to.
+    :param resource_objects: The resource objects to write, by their resource IDs.
+    :param build_items: The build items to write.
+    :param unit: The unit of the coordinates.
+    :param precision: The number of decimal digits to write for each coordinate.
+    :param document_metadata: The metadata of the document, if any.
+    :param annotations: The annotations of the original archive, if it was a 3MF archive.
+    :param source_path: The path to the original archive, if it was a 3MF archive. Files that must be preserved,
+    thumbnails and print settings are copied from there without decompressing them.
+    """
+    if annotations is None:
+        annotations = Annotations()
+    archive = create_archive(path)
+    try:
+        annotations.write_rels(archive)
+        annotations.write_content_types(archive)
+        if source_path is not None:
+            preserved_files = annotations.passthrough_targets()
+            for file_path, compressed_file in read_compressed(source_path, sorted(preserved_files)).items():
+                write_compressed(archive, file_path, compressed_file)
+
+        root = writer.new_model()
+        root.attrib[f"{{{MODEL_NAMESPACE}}}unit"] = unit
+        if document_metadata is not None:
+            writer.write_metadata(root, document_metadata)
+        writer.write_resources(root, resource_objects, build_items, precision)
+        write_document(archive, root)
+    finally:
+        archive.close()
+
+
+def convert(path, output_path, options):
+    """
+    Converts or checks a single file. This runs in a worker process.
+
+    Any error is caught and recorded, so that a broken file never ends the batch.
+    :param path: The path to the file to convert.
+    :param output_path: The path to write the 3MF file to, or `None` if nothing gets written.
+    :param options: A dictionary with the command line options that apply to every file.
+    :return: A dictionary with the results for this file, which becomes its record in the summary.
+    """
+    start_time = time.perf_counter()
+    result = {"input": path, "output": None, "status": "ok"}
+    try:
+        document_metadata = annotations = source_path = None
+        if os.path.splitext(path)[1].lower() == ".stl":
+            resource_objects, build_items = read_stl_model(path)
+            unit = STL_UNIT
+        else:
+            resource_objects, build_items, document_metadata, unit, annotations = read_3mf(path)
+            source_path = path
+        to_mm = threemf_to_metre[unit] * 1000.0
+
+        result["objects"] = len(build_items)
+        result["triangles"] = sum(len(resource_object.triangles) for resource_object in resource_objects.values())
+
+        extents = model_extents(resource_objects, build_items)
+        if extents is None:
+            raise ValueError("The file contains nothing to build.")
+        minimum, maximum = extents
+        volume = PRINTER_VOLUMES.get(options["printer"]) if options["printer"] else None
+
+        if options["center"] and volume is not None:
+            # Move the whole build so that its bounding box is centered on the plate and sits on Z=0.
+            offset = translation(
+                volume[0] / 2 / to_mm - (minimum[0] + maximum[0]) / 2,
+                volume[1] / 2 / to_mm - (minimum[1] + maximum[1]) / 2,
+                -minimum[2])
+            build_items = [build_item._replace(transformation=multiply(offset, build_item.transformation))
+                           for build_item in build_items]
+            minimum, maximum = model_extents(resource_objects, build_items)
+
+        minimum_mm = [coordinate * to_mm for coordinate in minimum]
+        maximum_mm = [coordinate * to_mm for coordinate in maximum]
+        result["size"] = [round(maximum_mm[axis] - minimum_mm[axis], 4) for axis in range(3)]
+        if volume is not None:
+            result["fits"] = extents_fit(minimum_mm, maximum_mm, volume)
+            if not result["fits"]:
+                result["status"] = "does_not_fit"
+
+        if output_path is not None:
+            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+            write_3mf(output_path, resource_objects, build_items, unit, options["precision"], document_metadata,
+                      annotations, source_path)
+            result["output"] = output_path
+    except (ValueError, KeyError, EnvironmentError, xml.etree.ElementTree.ParseError, zipfile.BadZipFile) as e:
+        result["status"] = "error"
+        result["error"] = f"{type(e).__name__}: {e}"
+    except Exception as e:  # Anything unexpected is still only a failure of this file.
+        result["status"] = "error"
+        result["error"] = f"Unexpected {type(e).__name__}: {e}"
+    result["seconds"] = round(time.perf_counter() - start_time, 3)
+    return result
+
+
+def inspect(path, output_path, options):
+    """
+    Summarises a single 3MF file. This runs in a worker process.
+    :param path: The path to the file to inspect.
+    :param output_path: The path to write the thumbnail to, or `None` if it doesn't get written.
+    :param options: A dictionary with the command line options that apply to every file.
+    :return: A dictionary with the summary of this file, which becomes its record in the summary.
+    """
+    start_time = time.perf_counter()
+    summary = inspect_archive(path)
+    result = {"input": path, "output": None, "status": "ok" if summary.error is None else "error"}
+    if summary.error is not None:
+        result["error"] = summary.error
+    else:
+        result["unit"] = summary.unit
+        result["vertices"] = summary.vertices
+        result["triangles"] = summary.triangles
+        if summary.minimum is not None:
+            result["size"] = [round(summary.maximum[axis] - summary.minimum[axis], 4) for axis in range(3)]
+            result["minimum"] = [round(coordinate, 4) for coordinate in summary.minimum]
+            result["maximum"] = [round(coordinate, 4) for coordinate in summary.maximum]
+        result["objects"] = [{
+            "id": indexed.objectid,
+            "document": indexed.document,
+            "name": indexed.name,
+            "type": indexed.object_type,
+            "triangles": indexed.triangles,
+            "built": indexed.built,
+            "plate": indexed.plate,
+        } for indexed in summary.objects]
+        if summary.thumbnail is not None and output_path is not None:
+            try:
+                os.makedirs(os.path.dirname(output_path), exist_ok=True)
+                with open(output_path, "wb") as f:
+                    f.write(summary.thumbnail)
+                result["output"] = output_path
+            except EnvironmentError as e:
+                result["status"] = "error"
+                result["error"] = f"{type(e).__name__}: {e}"
+    result["seconds"] = round(time.perf_counter() - start_time, 3)
+    return result
+
+
+def pattern_root(pattern):
+    """
+    Find the directory that an input pattern searches in, which is the part of the pattern before any wildcard.
+    :param pattern: A path, directory or glob pattern.
+    :return: The path of the directory.
+    """
+    if os.path.isdir(pattern):
+        return pattern
+    root = os.path.dirname(pattern)
+    while glob.has_magic(root):
+        root = os.path.dirname(root)
+    return root
+
+
+def find_inputs(patterns):
+    """
+    Expands the input patterns to the files to convert.
+
+    Directories are searched recursively for all files that can be converted. Files are only converted once, even if
+    multiple patterns match them.
+    :param patterns: Paths, directories or glob patterns. `**` matches any number of directories.
+    :return: A dictionary with the path of every file, relative to the directory that its pattern searches in, by the
+    path of the file. The first pattern that matches a file determines its relative path.
+    """
+    result = {}
+    for pattern in patterns:
+        root = pattern_root(pattern)
+        if os.path.isdir(pattern):
+            pattern = os.path.join(pattern, "**", "*")
+        for path in glob.glob(pattern, recursive=True):
+            if os.path.isfile(path) and os.path.splitext(path)[1].lower() in INPUT_EXTENSIONS:
+                result.setdefault(os.path.normpath(path), os.path.relpath(path, root or os.curdir))
+    return result
+
+
+def output_paths(inputs, output, extension):
+    """
+    Find the paths to write the results of the input files to, mirroring the directory structure of the inputs.
+
+    Files that would still get the same output, like `part.stl` and `part.3mf` next to each other, must not overwrite
+    each other. Only the first of those gets an output path.
+    :param inputs: The relative path of every input file, by its path, as found by `find_inputs`.
+    :param output: The directory to write to.
+    :param extension: The file extension of the results.
+    :return: A tuple of two dictionaries by the path of the input file. The first has the output path of each file
+    that can be written. The second has the input file that already writes to the same output, for the other files.
+    """
+    result = {}
+    conflicts = {}
+    writers = {}  # The input file that writes each output path.
+    for path in sorted(inputs):
+        output_path = os.path.normpath(os.path.join(output, os.path.splitext(inputs[path])[0] + extension))
+        key = os.path.normcase(output_path)
+        if key in writers:
+            conflicts[path] = writers[key]
+        else:
+            writers[key] = path
+            result[path] = output_path
+    return result, conflicts
+
+
+def parse_arguments(arguments):
+    """
+    Parses the command line.
+    :param arguments: The command line arguments, without the program name.
+    :return: The parsed arguments.
+    """
+    parser = argparse.ArgumentParser(
+        prog="python -m bambu_lab_3mf_tool.cli",
+        description="Convert STL and 3MF files to 3MF and check them against Bambu Lab printers, without Blender.")
+    parser.add_argument("inputs", nargs="+", help="Files, directories or glob patterns (use ** to recurse).")
+    parser.add_argument("-o", "--output", help="Directory to write the 3MF files to, or the thumbnails with --inspect.")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1, help="Number of worker processes.")
+    parser.add_argument("--printer", choices=sorted(PRINTER_VOLUMES), help="Check the fit against this printer.")
+    parser.add_argument("--center", action="store_true", help="Center the models on the build plate of the printer.")
+    parser.add_argument("--check-only", action="store_true", help="Only check the files, don't write anything.")
+    parser.add_argument("--precision", type=int, default=6, help="Decimal digits to write for each coordinate.")
+    parser.add_argument("--inspect", action="store_true",
+                        help="Only summarise the 3MF files for a library, without reading their geometry.")
+    parser.add_argument("--summary", help="Write the JSON summary to this file instead of stdout.")
+    args = parser.parse_args(arguments)
+    if not args.check_only and not args.inspect and not args.output:
+        parser.error("an output directory (-o) is required unless --check-only is given")
+    if args.center and not args.printer:
+        parser.error("--center requires --printer to know the size of the build plate")
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+    return args
+
+
+def main(arguments=None):
+    """
+    Runs the batch conversion.
+    :param arguments: The command line arguments, without the program name. Defaults to those of the process.
+    :return: The exit code: 0 if every file succeeded, or 1 if any file failed or doesn't fit.
+    """
+    args = parse_arguments(sys.argv[1:] if arguments is None else arguments)
+    inputs = find_inputs(args.inputs)
+    if args.inspect:
+        inputs = {path: relative for path, relative in inputs.items() if os.path.splitext(path)[1].lower() == ".3mf"}
+    paths = sorted(inputs)
+    if not paths:
+        print("No STL or 3MF files found.", file=sys.stderr)
+        return 1
+    if args.output:
+        os.makedirs(args.output, exist_ok=True)
+    options = {
+        "output": args.output,
+        "printer": args.printer,
+        "center": args.center,
+        "check_only": args.check_only,
+        "precision": args.precision,
+    }
+
+    start_time = time.perf_counter()
+    results = []
+    outputs = conflicts = {}
+    if args.output and not args.check_only:
+        outputs, conflicts = output_paths(inputs, args.output, ".png" if args.inspect else ".3mf")
+    with concurrent.futures.ProcessPoolExecutor(max_workers=min(args.jobs, len(paths))) as executor:
+        work = inspect if args.inspect else convert
+        futures = {executor.submit(work, path, outputs.get(path), options): path
+                   for path in paths if path not in conflicts}  # The input file of every future.
+        for path, other_path in conflicts.items():
+            future = concurrent.futures.Future()
+            future.set_exception(ValueError(f"Would overwrite the output of {other_path}"))
+            futures[future] = path
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as e:  # Like a worker that was killed, which breaks the pool. Still write the summary.
+                result = {
+                    "input": futures[future],
+                    "output": None,
+                    "status": "error",
+                    "error": f"{type(e).__name__}: {e}",
+                    "seconds": 0.0}
+            results.append(result)
+            message = result.get("error", f"{result['seconds']:.2f}s")
+            print(f"[{len(results)}/{len(paths)}] {result['status']}: {result['input']} ({message})",
+                  file=sys.stderr, flush=True)
+    results.sort(key=lambda result: result["input"])
+
+    summary = {
+        "files": len(results),
+        "ok": sum(1 for result in results if result["status"] == "ok"),
+        "does_not_fit": sum(1 for result in results if result["status"] == "does_not_fit"),
+        "errors": sum(1 for result in results if result["status"] == "error"),
+        "seconds": round(time.perf_counter() - start_time, 3),
+        "results": results,
+    }
+    if args.summary:
+        with open(args.summary, "w") as f:
+            json.dump(summary, f, indent=2)
+    else:
+        json.dump(summary, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    return 0 if summary["ok"] == summary["files"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -17,7 +17,6 @@ This module defines some constants for 3MF's file structure.
 These are the constants that are inherent to the 3MF file format.
 """
 
-SUPPORTED_EXTENSIONS = set()  # Set of namespaces for 3MF extensions that we support.
 # File contents to use when files must be preserved but there's a file with different content in a previous archive.
 # Only for flagging. This will not be in the final 3MF archives.
 conflicting_mustpreserve_contents = "<Conflicting MustPreserve file!>"
@@ -25,6 +24,9 @@ conflicting_mustpreserve_contents = "<Conflicting MustPreserve file!>"
 # Default storage locations.
 MODEL_LOCATION = "3D/3dmodel.model"  # Conventional location for the 3D model data.
 CONTENT_TYPES_LOCATION = "[Content_Types].xml"  # Location of the content types definition.
+BAMBU_SETTINGS_LOCATION = "Metadata/project_settings.config"  # Print settings of Bambu Studio projects.
+BAMBU_MODEL_SETTINGS_LOCATION = "Metadata/model_settings.config"  # Object names and plates of Bambu Studio projects.
+BAMBU_THUMBNAIL_LOCATION = "Metadata/plate_1.png"  # Thumbnail of the first plate of Bambu Studio projects.
 RELS_FOLDER = "_rels"  # Folder name to store relationships files in.
 
 # Relationship types.
@@ -37,10 +39,16 @@ MODEL_MIMETYPE = "application/vnd.ms-package.3dmanufacturing-3dmodel+xml"  # MIM
 
 # Constants in the 3D model file.
 MODEL_NAMESPACE = "http://schemas.microsoft.com/3dmanufacturing/core/2015/02"
+MATERIAL_NAMESPACE = "http://schemas.microsoft.com/3dmanufacturing/material/2015/02"  # For colors and textures.
+PRODUCTION_NAMESPACE = "http://schemas.microsoft.com/3dmanufacturing/production/2015/06"  # For paths to sub-models.
 MODEL_NAMESPACES = {
-    "3mf": MODEL_NAMESPACE
+    "3mf": MODEL_NAMESPACE,
+    "m": MATERIAL_NAMESPACE,
+    "p": PRODUCTION_NAMESPACE
 }
 MODEL_DEFAULT_UNIT = "millimeter"  # If the unit is missing, it will be this.
+# Set of namespaces for 3MF extensions that we support.
+SUPPORTED_EXTENSIONS = {MATERIAL_NAMESPACE, PRODUCTION_NAMESPACE}
 
 # Constants in the ContentTypes file.
 CONTENT_TYPES_NAMESPACE = "http://schemas.openxmlformats.org/package/2006/content-types"
@@ -0,0 +1,64 @@
+# Bambu Lab 3MF Tools - Blender-independent 3MF library.
+# Copyright (C) 2025 jsonify
+# This add-on is free software: you can redistribute it and/or modify it under the terms of the GNU General
+# Public License as published by the Free Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+# This add-on is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied
+# warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# details.
+# You should have received a copy of the GNU General Public License along with this plug-in. If not, see
+# <https://gnu.org/licenses/>.
+
+# <pep8 compliant>
+
+"""
+Reading and writing of 3MF files without Blender.
+
+Nothing in this package imports `bpy`, `mathutils` or `bpy_extras`, so it can be used from worker processes, plain
+CPython scripts and benchmarks. The import and export operators of the add-on are adapters over this package that
+convert between these data structures and Blender data.
+"""
+
+from .annotations import Annotations, ContentType, Relationship, ConflictingContentType
+from .archive import (
+    CompressedFile,
+    create_archive,
+    open_document,
+    read_archive,
+    read_compressed,
+    uncompressed_sizes,
+    write_compressed,
+    write_document,
+)
+from .color import parse_color
+from .content_types import read_content_types, assign_content_types
+from .diagnostics import Diagnostics
+from .index import (
+    IndexedObject,
+    ModelScan,
+    Reference,
+    ScannedObject,
+    Selection,
+    document_components,
+    index_archive,
+    index_model,
+    required_objects,
+    scan_model,
+    select_objects,
+)
+from .inspection import ArchiveSummary, inspect_archive, inspect_archives
+from .metadata import Metadata, MetadataEntry
+from .paint import decode_paint, filament_color, read_filament_colors
+from .reader import (
+    BuildItem,
+    Component,
+    ModelReader,
+    ResourceMaterial,
+    ResourceObject,
+    combine_document,
+    is_supported,
+    model_unit,
+    parse_model,
+    parse_model_incrementally,
+)
+from . import writer
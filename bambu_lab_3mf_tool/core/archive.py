@@ -0,0 +1,217 @@
+# Bambu Lab 3MF Tools - 3MF archives.
+# Original 3MF code by Ghostkeeper (2020).
+# Copyright (C) 2025 jsonify
+# This add-on is free software: you can redistribute it and/or modify it under the terms of the GNU General
+# Public License as published by the Free Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+# This add-on is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied
+# warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# details.
+# You should have received a copy of the GNU General Public License along with this plug-in. If not, see
+# <https://gnu.org/licenses/>.
+
+# <pep8 compliant>
+
+"""
+Opens and creates the zip archives that contain 3MF documents. Independent of Blender.
+
+Archives can be given as a path or as a file-like object, so that they can also be read from or written to buffers in
+memory.
+"""
+
+import collections  # For namedtuple.
+import logging  # To debug and log progress.
+import struct  # To read the local headers of compressed files.
+import time  # To date the files that are written.
+import xml.etree.ElementTree  # To write XML documents into the archive.
+import zipfile  # To read and write the 3MF files which are secretly zip archives.
+import zlib  # To decompress files that can't be copied as they are.
+
+from ..constants import *
+from .content_types import read_content_types, assign_content_types  # To sort the files by content type.
+
+log = logging.getLogger(__name__)
+
+# A file in an archive, still compressed. The compression is a zipfile constant like `zipfile.ZIP_DEFLATED`, the CRC is
+# the CRC-32 of the uncompressed data, and the size is the size of the uncompressed data.
+CompressedFile = collections.namedtuple("CompressedFile", ["data", "compression", "crc", "size"])
+
+LOCAL_HEADER = struct.Struct("<4s5H3L2H")  # The local header in front of every file in a zip archive.
+LOCAL_HEADER_SIGNATURE = b"PK\x03\x04"
+ENCRYPTED_FLAG = 0x1  # Flag bit of files that are encrypted.
+DATA_DESCRIPTOR_FLAG = 0x8  # Flag bit of files whose sizes and CRC come after the data, instead of in the header.
+PASSTHROUGH_COMPRESSIONS = {zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED}  # Compressions that every 3MF consumer reads.
+
+
+def read_archive(path):
+    """
+    Creates file streams from all the files in the archive.
+
+    The results are sorted by their content types. Consumers of this data can pick the content types that they know
+    from the file and process those.
+    :param path: The path to the archive to read, or a file-like object containing it.
+    :return: A dictionary with all of the resources in the archive by content type. The keys in this dictionary are
+    the different content types available in the file. The values in this dictionary are lists of input streams
+    referring to files in the archive.
+    """
+    result = {}
+    try:
+        archive = zipfile.ZipFile(path)
+        content_types = read_content_types(archive)
+        mime_types = assign_content_types(archive, content_types)
+        for file_path, mime_type in mime_types.items():
+            if mime_type not in result:
+                result[mime_type] = []
+            # Zipfile can open an infinite number of streams at the same time. Don't worry about it.
+            result[mime_type].append(archive.open(file_path))
+    except (zipfile.BadZipFile, EnvironmentError) as e:
+        # File is corrupt, or the OS prevents us from reading it (doesn't exist, no permissions, etc.)
+        log.error(f"Unable to read archive: {e}")
+        return result
+    return result
+
+
+def uncompressed_sizes(path):
+    """
+    Get the size of every file in an archive, from its central directory, without decompressing anything.
+    :param path: The path to the archive to read, or a file-like object containing it.
+    :return: A dictionary with the uncompressed size of each file in bytes, by its path in the archive. Empty if the
+    archive can't be read.
+    """
+    try:
+        with zipfile.ZipFile(path) as archive:
+            return {info.filename: info.file_size for info in archive.infolist()}
+    except (zipfile.BadZipFile, EnvironmentError) as e:
+        log.error(f"Unable to read archive: {e}")
+        return {}
+
+
+def create_archive(path):
+    """
+    Creates an empty zip archive to write a 3MF document into.
+    :param path: The path to write the file to, or a writable file-like object.
+    :return: A zip archive that other functions can add things to.
+    :raises: `EnvironmentError` if the file can't be written.
+    """
+    return zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_DEFLATED, compresslevel=9)
+
+
+def open_document(archive, location=MODEL_LOCATION):
+    """
+    Opens a file in an archive to stream a document into.
+
+    The size of the document doesn't need to be known up front. It may also grow past the 4GB limit of zip archives,
+    since the file is always written with the Zip64 extension. Otherwise the archive would fail only once the document
+    is complete, after all of the work to write it.
+    :param archive: The zip archive to write into.
+    :param location: The path of the document in the archive.
+    :return: A writable stream. The caller must close it before writing anything else to the archive.
+    """
+    return archive.open(location, 'w', force_zip64=True)
+
+
+def write_document(archive, root, location=MODEL_LOCATION, namespace=MODEL_NAMESPACE):
+    """
+    Writes an XML document into an archive.
+    :param archive: The zip archive to write into.
+    :param root: The root element of the document.
+    :param location: The path of the document in the archive.
+    :param namespace: The default namespace of the document.
+    """
+    document = xml.etree.ElementTree.ElementTree(root)
+    with open_document(archive, location) as f:
+        document.write(f, xml_declaration=True, encoding='UTF-8', default_namespace=namespace)
+
+
+def read_compressed(path, file_paths):
+    """
+    Reads files from an archive without decompressing them, so that they can be copied into another archive as they
+    are.
+
+    Files that are encrypted or use a compression that not all 3MF consumers can read are left out.
+    :param path: The path to the archive to read, or a file-like object containing it.
+    :param file_paths: The paths of the files in the archive to read.
+    :return: A dictionary with a `CompressedFile` for each path that could be read.
+    """
+    result = {}
+    try:
+        with zipfile.ZipFile(path) as archive:
+            for file_path in file_paths:
+                try:
+                    info = archive.getinfo(file_path)
+                except KeyError:
+                    continue  # Not in this archive.
+                if info.flag_bits & ENCRYPTED_FLAG or info.compress_type not in PASSTHROUGH_COMPRESSIONS:
+                    continue
+                archive.fp.seek(info.header_offset)
+                header = LOCAL_HEADER.unpack(archive.fp.read(LOCAL_HEADER.size))
+                if header[0] != LOCAL_HEADER_SIGNATURE:
+                    log.warning(f"Local header of {file_path} is corrupt. It will be compressed again.")
+                    continue
+                archive.fp.seek(header[-2] + header[-1], 1)  # Skip the file name and extra field.
+                data = archive.fp.read(info.compress_size)
+                result[file_path] = CompressedFile(data=data, compression=info.compress_type, crc=info.CRC,
+                                                   size=info.file_size)
+    except (zipfile.BadZipFile, EnvironmentError) as e:
+        log.error(f"Unable to read archive: {e}")
+    return result
+
+
+def write_compressed(archive, file_path, compressed_file):
+    """
+    Writes a file into an archive, where the file is already compressed.
+
+    The zipfile module can only write data that it compresses itself, so this adds the file in the same way that
+    `zipfile.ZipFile.open` does, which relies on the internals of the zipfile module. If those are different in this
+    version of Python, the file gets decompressed and compressed again instead. Files larger than 4GB get the Zip64
+    extension in their header.
+    :param archive: The zip archive to write into.
+    :param file_path: The path of the file in the archive.
+    :param compressed_file: The `CompressedFile` to write.
+    """
+    info = zipfile.ZipInfo(file_path, date_time=time.localtime(time.time())[:6])
+    info.compress_type = compressed_file.compression
+    info.external_attr = 0o600 << 16  # Same permissions as the files that zipfile writes.
+    try:
+        _write_raw(archive, info, compressed_file)
+    except AttributeError as e:
+        log.debug(f"Can't copy {file_path} as it is, so it gets compressed again: {e}")
+        data = compressed_file.data
+        if compressed_file.compression == zipfile.ZIP_DEFLATED:
+            data = zlib.decompress(data, -zlib.MAX_WBITS)  # Raw deflate streams, without a zlib header.
+        archive.writestr(info, data)
+
+
+def _write_raw(archive, info, compressed_file):
+    """
+    Writes the header and the compressed data of a file into an archive, using the internals of the zipfile module.
+
+    All internals are looked up before anything is written, so that if one of them doesn't exist, the archive is left
+    as it was.
+    :param archive: The zip archive to write into.
+    :param info: The `zipfile.ZipInfo` of the file, without its sizes and CRC.
+    :param compressed_file: The `CompressedFile` to write.
+    :raises: `AttributeError` if the zipfile module doesn't have the expected internals.
+    """
+    writing = archive._writing
+    lock = archive._lock
+    seekable = archive._seekable
+    start_dir = archive.start_dir
+    write_check = archive._writecheck
+    if writing:
+        raise ValueError("Can't write to ZIP archive while an open writing handle exists.")
+    info.CRC = compressed_file.crc
+    info.compress_size = len(compressed_file.data)
+    info.file_size = compressed_file.size
+    info.flag_bits &= ~DATA_DESCRIPTOR_FLAG  # The sizes and CRC are known up front, so they go in the header.
+    with lock:
+        if seekable:
+            archive.fp.seek(start_dir)
+        info.header_offset = archive.fp.tell()
+        write_check(info)
+        archive._didModify = True
+        archive.fp.write(info.FileHeader())
+        archive.fp.write(compressed_file.data)
+        archive.start_dir = archive.fp.tell()
+        archive.filelist.append(info)
+        archive.NameToInfo[info.filename] = info
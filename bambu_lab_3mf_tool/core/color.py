@@ -0,0 +1,35 @@
+# Bambu Lab 3MF Tools - Colors in 3MF files.
+# Copyright (C) 2025 jsonify
+# This add-on is free software: you can redistribute it and/or modify it under the terms of the GNU General
+# Public License as published by the Free Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+# This add-on is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied
+# warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# details.
+# You should have received a copy of the GNU General Public License along with this plug-in. If not, see
+# <https://gnu.org/licenses/>.
+
+# <pep8 compliant>
+
+"""
+Parses the colors that 3MF files and slicer settings write. Independent of Blender.
+"""
+
+
+def parse_color(color):
+    """
+    Parses a color as written in 3MF files: a hexadecimal number indicating RGB or RGBA, preceded by a #.
+    :param color: The color as a string.
+    :return: A tuple of red, green, blue and alpha, each between 0 and 1.
+    :raises: `ValueError` if the color is not a hexadecimal number.
+    """
+    color = color.lstrip("#")  # Should start with a #. We'll be lenient if it's not.
+    color_int = int(color, 16)
+    # Separate out up to four bytes from this int, from right to left.
+    b1 = (color_int & 0x000000FF) / 255
+    b2 = ((color_int & 0x0000FF00) >> 8) / 255
+    b3 = ((color_int & 0x00FF0000) >> 16) / 255
+    b4 = ((color_int & 0xFF000000) >> 24) / 255
+    if len(color) == 6:  # RGB format.
+        return b3, b2, b1, 1.0  # b1, b2 and b3 are B, G, R respectively. b4 is always 0.
+    return b4, b3, b2, b1  # RGBA format, or invalid. b1, b2, b3 and b4 are A, B, G, R respectively.
@@ -0,0 +1,104 @@
+# Bambu Lab 3MF Tools - 3MF content types.
+# Original 3MF code by Ghostkeeper (2020).
+# Copyright (C) 2025 jsonify
+# This add-on is free software: you can redistribute it and/or modify it under the terms of the GNU General
+# Public License as published by the Free Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+# This add-on is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied
+# warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# details.
+# You should have received a copy of the GNU General Public License along with this plug-in. If not, see
+# <https://gnu.org/licenses/>.
+
+# <pep8 compliant>
+
+"""
+Reads the content types of the files in a 3MF archive. Independent of Blender.
+"""
+
+import logging  # To debug and log progress.
+import re  # To find files in the archive based on the content types.
+import xml.etree.ElementTree  # To parse the [Content_Types].xml file.
+
+from ..constants import *
+
+log = logging.getLogger(__name__)
+
+
+def read_content_types(archive):
+    """
+    Read the content types from a 3MF archive.
+
+    The output of this reading is a list of MIME types that are each mapped to a regular expression that matches on
+    the file paths within the archive that could contain this content type. This encodes both types of descriptors
+    for the content types that can occur in the content types document: Extensions and full paths.
+
+    The output is ordered in priority. Matches that should be evaluated first will be put in the front of the output
+    list.
+    :param archive: The 3MF archive to read the contents from.
+    :return: A list of tuples, in order of importance, where the first element describes a regex of paths that
+    match, and the second element is the MIME type string of the content type.
+    """
+    result = []
+
+    try:
+        with archive.open(CONTENT_TYPES_LOCATION) as f:
+            try:
+                root = xml.etree.ElementTree.ElementTree(file=f)
+            except xml.etree.ElementTree.ParseError as e:
+                log.warning(
+                    f"{CONTENT_TYPES_LOCATION} has malformed XML"
+                    f"(position {e.position[0]}:{e.position[1]}).")
+                root = None
+
+            if root is not None:
+                # Overrides are more important than defaults, so put those in front.
+                for override_node in root.iterfind("ct:Override", CONTENT_TYPES_NAMESPACES):
+                    if "PartName" not in override_node.attrib or "ContentType" not in override_node.attrib:
+                        log.warning("[Content_Types].xml malformed: Override node without path or MIME type.")
+                        continue  # Ignore the broken one.
+                    match_regex = re.compile(re.escape(override_node.attrib["PartName"]))
+                    result.append((match_regex, override_node.attrib["ContentType"]))
+
+                for default_node in root.iterfind("ct:Default", CONTENT_TYPES_NAMESPACES):
+                    if "Extension" not in default_node.attrib or "ContentType" not in default_node.attrib:
+                        log.warning("[Content_Types].xml malformed: Default node without extension or MIME type.")
+                        continue  # Ignore the broken one.
+                    match_regex = re.compile(r".*\." + re.escape(default_node.attrib["Extension"]))
+                    result.append((match_regex, default_node.attrib["ContentType"]))
+    except KeyError:  # ZipFile reports that the content types file doesn't exist.
+        log.warning(f"{CONTENT_TYPES_LOCATION} file missing!")
+
+    # This parser should be robust to slightly broken files and retrieve what we can.
+    # In case the document is broken or missing, here we'll append the default ones for 3MF.
+    # If the content types file was fine, this gets least priority so the actual data still wins.
+    result.append((re.compile(r".*\.rels"), RELS_MIMETYPE))
+    result.append((re.compile(r".*\.model"), MODEL_MIMETYPE))
+
+    return result
+
+
+def assign_content_types(archive, content_types):
+    """
+    Assign a MIME type to each file in the archive.
+
+    The MIME types are obtained through the content types file from the archive. This content types file itself is
+    not in the result though.
+    :param archive: A 3MF archive with files to assign content types to.
+    :param content_types: The content types for files in that archive, in order of priority.
+    :return: A dictionary mapping all file paths in the archive to a content types. If the content type for a file
+    is unknown, the content type will be an empty string.
+    """
+    result = {}
+    for file_info in archive.filelist:
+        file_path = file_info.filename
+        if file_path == CONTENT_TYPES_LOCATION:  # Don't index this one.
+            continue
+        for pattern, content_type in content_types:  # Process in the correct order!
+            if pattern.fullmatch(file_path):
+                result[file_path] = content_type
+                break
+        else:  # None of the patterns matched.
+            result[file_path] = ""
+
+    return result
@@ -0,0 +1,128 @@
+# Bambu Lab 3MF Tools - Diagnostics of damaged 3MF documents.
+# Copyright (C) 2025 jsonify
+# This add-on is free software: you can redistribute it and/or modify it under the terms of the GNU General
+# Public License as published by the Free Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+# This add-on is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied
+# warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# details.
+# You should have received a copy of the GNU General Public License along with this plug-in. If not, see
+# <https://gnu.org/licenses/>.
+
+# <pep8 compliant>
+
+"""
+Collects the problems found while reading a 3MF document, to report them all at once. Independent of Blender.
+
+A damaged document can have a problem in every one of its elements. Logging each of those separately takes longer than
+reading the document, and floods the console. Instead, the reader counts the problems by category, remembering where
+the first few occurred, and a single summary is emitted when the document is done.
+"""
+
+# The categories of problems, and how to describe them.
+CATEGORIES = {
+    "metadata_without_name": "metadata entries without name were discarded",
+    "material_group_without_id": "material groups without resource ID were skipped",
+    "duplicate_material_id": "material groups with a duplicate resource ID were skipped",
+    "invalid_color": "materials with an invalid color got no color",
+    "invalid_group_color": "colors in color groups were missing or invalid, and became white",
+    "invalid_texture_coordinate": "texture coordinates were missing or not a number, and were set to 0",
+    "object_without_id": "objects without resource ID were skipped",
+    "missing_object_material": "objects refer to a material that doesn't exist",
+    "invalid_object_material_index": "objects have a material index that is not an integer",
+    "invalid_vertex_coordinate": "vertex coordinates were missing or not a number, and were set to 0",
+    "negative_vertex_index": "triangles with a negative vertex index were skipped",
+    "missing_vertex_index": "triangles with a missing vertex index were skipped",
+    "invalid_vertex_index": "triangles with a vertex index that is not an integer were skipped",
+    "missing_triangle_material": "triangles refer to a material that doesn't exist, and got the object's material",
+    "invalid_triangle_material_index": "triangles have a material index that is not an integer, and got the object's "
+                                       "material",
+    "invalid_paint": "triangles have paint that could not be decoded, and were left unpainted",
+    "missing_triangle_property": "triangles refer to a color or texture coordinate that doesn't exist, and got the "
+                                 "object's",
+    "invalid_triangle_property_index": "triangles have a color or texture coordinate index that is not an integer, and "
+                                       "got the object's",
+    "component_without_object": "components without object ID were skipped",
+    "too_many_transformation_components": "transformations have too many components, of which the rest was ignored",
+    "malformed_transformation": "transformations contain something that is not a number, which was ignored",
+    "invalid_build_item": "build items without a valid object ID were skipped",
+}
+MAX_SAMPLES = 3  # How many locations to remember for every category.
+
+
+class Diagnostics:
+    """
+    Counts problems by category, with the locations of the first few problems of each category.
+
+    Adding a problem only costs a dictionary update, and nothing is done for elements without problems, so readers can
+    collect problems in their innermost loops.
+    """
+
+    def __init__(self):
+        """
+        Creates a collection without any problems.
+        """
+        self.counts = {}  # For every category, how many problems there were.
+        self.samples = {}  # For every category, the locations of the first problems.
+
+    def add(self, category, location=None, *arguments):
+        """
+        Record a problem.
+
+        The location is only formatted for the first few problems of each category, so that a document with a problem
+        in every element doesn't spend its time on formatting.
+        :param category: The kind of problem, one of the keys of `CATEGORIES`.
+        :param location: Where the problem is, as a format string like "object {}, vertex {}", or `None` if that is not
+        known.
+        :param arguments: The values to fill in into the location.
+        """
+        count = self.counts.get(category, 0)
+        self.counts[category] = count + 1
+        if count < MAX_SAMPLES and location is not None:
+            self.samples.setdefault(category, []).append(location.format(*arguments))
+
+    def __bool__(self):
+        """
+        Checks whether any problem was recorded.
+        :return: `True` if there were problems, or `False` if there were none.
+        """
+        return bool(self.counts)
+
+    def __len__(self):
+        """
+        Returns the total number of problems recorded.
+        :return: The number of problems.
+        """
+        return sum(self.counts.values())
+
+    def clear(self):
+        """
+        Forget about all problems, to start with the next document.
+        """
+        self.counts.clear()
+        self.samples.clear()
+
+    def summary(self):
+        """
+        Describe all problems, most common first.
+        :return: One line for every category of problems.
+        """
+        lines = []
+        for category, count in sorted(self.counts.items(), key=lambda item: item[1], reverse=True):
+            line = f"{count} {CATEGORIES.get(category, category)}"
+            if category in self.samples:
+                line += f" (at {'; '.join(self.samples[category])}"
+                line += ", ...)" if count > len(self.samples[category]) else ")"
+            lines.append(line)
+        return lines
+
+    def emit(self, logger, document):
+        """
+        Log a single warning with all problems of a document, and clear them.
+        :param logger: The logger to emit the warning with.
+        :param document: A name for the document, to say where the problems were found.
+        """
+        if not self.counts:
+            return
+        logger.warning(f"Found {len(self)} problems in {document}:\n" + "\n".join(self.summary()))
+        self.clear()
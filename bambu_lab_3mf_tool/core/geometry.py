@@ -0,0 +1,83 @@
+# Bambu Lab 3MF Tools - Geometry of 3MF models.
+# Copyright (C) 2025 jsonify
+#
+# This add-on is free software: you can redistribute it and/or modify it under the terms of the GNU General
+# Public License as published by the Free Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+# This add-on is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied
+# warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# details.
+# You should have received a copy of the GNU General Public License along with this plug-in. If not, see
+# <https://gnu.org/licenses/>.
+
+# <pep8 compliant>
+
+"""
+Computes the extents of models read by the `ModelReader`, and the transformations to move them. Independent of
+Blender.
+"""
+
+import logging  # To debug and log progress.
+
+from .reader import identity, multiply  # To combine the transformations of build items and components.
+
+log = logging.getLogger(__name__)
+
+
+def translation(x, y, z):
+    """
+    Creates a transformation that moves things.
+    :param x: The distance to move along the X axis.
+    :param y: The distance to move along the Y axis.
+    :param z: The distance to move along the Z axis.
+    :return: A 4x4 matrix as nested lists.
+    """
+    result = identity()
+    result[0][3] = x
+    result[1][3] = y
+    result[2][3] = z
+    return result
+
+
+def model_extents(resource_objects, build_items):
+    """
+    Find the bounding box of everything that gets built.
+
+    Components are followed recursively, with their transformations applied.
+    :param resource_objects: The resource objects of the document, by their IDs.
+    :param build_items: The build items of the document.
+    :return: A tuple of the minimum and maximum corner of the bounding box, each a tuple of X, Y and Z. If nothing gets
+    built, `None` is returned.
+    """
+    minimum = [float("inf")] * 3
+    maximum = [float("-inf")] * 3
+
+    def visit(objectid, transformation, stack_trace):
+        resource_object = resource_objects.get(objectid)
+        if resource_object is None:
+            return
+        row_x, row_y, row_z = transformation[0], transformation[1], transformation[2]
+        for x, y, z in resource_object.vertices:
+            point = (
+                row_x[0] * x + row_x[1] * y + row_x[2] * z + row_x[3],
+                row_y[0] * x + row_y[1] * y + row_y[2] * z + row_y[3],
+                row_z[0] * x + row_z[1] * y + row_z[2] * z + row_z[3])
+            for axis in range(3):
+                if point[axis] < minimum[axis]:
+                    minimum[axis] = point[axis]
+                if point[axis] > maximum[axis]:
+                    maximum[axis] = point[axis]
+        for component in resource_object.components:
+            if component.resource_object in stack_trace:
+                log.warning(f"Recursive components in object ID: {component.resource_object}")
+                continue
+            stack_trace.append(component.resource_object)
+            visit(component.resource_object, multiply(transformation, component.transformation), stack_trace)
+            stack_trace.pop()
+
+    for build_item in build_items:
+        visit(build_item.objectid, build_item.transformation, [build_item.objectid])
+
+    if minimum[0] == float("inf"):
+        return None
+    return tuple(minimum), tuple(maximum)
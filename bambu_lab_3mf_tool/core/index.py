@@ -0,0 +1,343 @@
+# Bambu Lab 3MF Tools - Indexing the objects of 3MF archives.
+# Copyright (C) 2025 jsonify
+# This add-on is free software: you can redistribute it and/or modify it under the terms of the GNU General
+# Public License as published by the Free Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+# This add-on is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied
+# warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# details.
+# You should have received a copy of the GNU General Public License along with this plug-in. If not, see
+# <https://gnu.org/licenses/>.
+
+# <pep8 compliant>
+
+"""
+Lists the objects in a 3MF archive without reading their geometry. Independent of Blender.
+
+Indexing is a cheap first pass over the model documents. No element tree is built, and the vertices and triangles are
+only counted. From the index, objects can be chosen by name, resource ID or Bambu Studio plate, after which only those
+objects need to be read by the `ModelReader`.
+"""
+
+import collections  # For namedtuple.
+import logging  # To debug and log progress.
+import xml.etree.ElementTree  # To scan the documents.
+import zipfile  # To read the model settings of Bambu Studio.
+
+from ..constants import *
+from .archive import read_archive  # To find the model documents.
+from .reader import PARSE_CHUNK_SIZE, PATH_ATTRIBUTE  # To scan the documents the same way as they are parsed.
+
+log = logging.getLogger(__name__)
+
+# An object in a model document. The plate is the number of the Bambu Studio plate that it's on, or `None` if unknown.
+# Its components are tuples of the path of the document that the component's object is in, and the resource ID of it.
+IndexedObject = collections.namedtuple("IndexedObject", [
+    "document",
+    "objectid",
+    "name",
+    "object_type",
+    "vertices",
+    "triangles",
+    "components",
+    "built",
+    "plate"])
+# The resource IDs of the objects of one document that were chosen, and of all objects in that document that are needed
+# to build the chosen objects of any document, including components.
+Selection = collections.namedtuple("Selection", ["chosen", "required"])
+
+# An object as scanned from a model document. The components are `Reference`s. The minimum and maximum corner of its
+# bounding box are only known if bounds were requested and it has vertices; otherwise they are `None`.
+ScannedObject = collections.namedtuple("ScannedObject", [
+    "objectid",
+    "name",
+    "object_type",
+    "vertices",
+    "triangles",
+    "components",
+    "minimum",
+    "maximum"])
+# A component or build item. The path is the model document that the object is in, or `None` if it is in the same
+# document. The transformation is still as written in the document.
+Reference = collections.namedtuple("Reference", ["objectid", "path", "transformation"])
+# Everything that a scan finds in a model document: its unit, its `ScannedObject`s and the `Reference`s of its build.
+ModelScan = collections.namedtuple("ModelScan", ["unit", "objects", "items"])
+
+# Precompute the tag names, since the scan compares them for every element.
+MODEL_TAG = f"{{{MODEL_NAMESPACE}}}model"
+VERTEX_TAG = f"{{{MODEL_NAMESPACE}}}vertex"
+TRIANGLE_TAG = f"{{{MODEL_NAMESPACE}}}triangle"
+OBJECT_TAG = f"{{{MODEL_NAMESPACE}}}object"
+COMPONENT_TAG = f"{{{MODEL_NAMESPACE}}}component"
+ITEM_TAG = f"{{{MODEL_NAMESPACE}}}item"
+
+
+class _IndexTarget:
+    """
+    Parser target that only counts and remembers what the index needs, instead of building an element tree.
+    """
+
+    def __init__(self, bounds=False):
+        """
+        Prepares an empty scan.
+        :param bounds: Whether to also track the bounding box of every object. This parses the coordinates of every
+        vertex, which makes the scan slower.
+        """
+        self.bounds = bounds
+        self.unit = MODEL_DEFAULT_UNIT
+        self.objects = []  # The `ScannedObject`s so far.
+        self.items = []  # The `Reference`s of the build items.
+        self.current = None  # The attributes of the <object> element being scanned.
+        self.vertices = 0
+        self.triangles = 0
+        self.components = []
+        self.minimum = [float("inf")] * 3
+        self.maximum = [float("-inf")] * 3
+
+    def start(self, tag, attrib):
+        # Vertices and triangles are by far the most common, so check them first.
+        if tag == VERTEX_TAG:
+            self.vertices += 1
+            if self.bounds:
+                self.grow_bounds(attrib)
+        elif tag == TRIANGLE_TAG:
+            self.triangles += 1
+        elif tag == OBJECT_TAG:
+            self.current = attrib
+            self.vertices = 0
+            self.triangles = 0
+            self.components = []
+            self.minimum = [float("inf")] * 3
+            self.maximum = [float("-inf")] * 3
+        elif tag == COMPONENT_TAG:
+            if "objectid" in attrib:
+                self.components.append(self.reference(attrib))
+        elif tag == ITEM_TAG:
+            if "objectid" in attrib:
+                self.items.append(self.reference(attrib))
+        elif tag == MODEL_TAG:
+            self.unit = attrib.get("unit", MODEL_DEFAULT_UNIT)
+
+    def end(self, tag):
+        if tag == OBJECT_TAG and self.current is not None:
+            if "id" in self.current:
+                has_bounds = self.minimum[0] <= self.maximum[0]
+                self.objects.append(ScannedObject(
+                    objectid=self.current["id"],
+                    name=self.current.get("name", ""),
+                    object_type=self.current.get("type", "model"),
+                    vertices=self.vertices,
+                    triangles=self.triangles,
+                    components=self.components,
+                    minimum=tuple(self.minimum) if has_bounds else None,
+                    maximum=tuple(self.maximum) if has_bounds else None))
+            self.current = None
+
+    def close(self):
+        return ModelScan(unit=self.unit, objects=self.objects, items=self.items)
+
+    def grow_bounds(self, attrib):
+        """
+        Grows the bounding box of the current object to include a vertex.
+        :param attrib: The attributes of the <vertex> element.
+        """
+        try:
+            point = (float(attrib["x"]), float(attrib["y"]), float(attrib["z"]))
+        except (KeyError, ValueError):  # The reader reports malformed vertices. Here they just don't count.
+            return
+        for axis in range(3):
+            if point[axis] < self.minimum[axis]:
+                self.minimum[axis] = point[axis]
+            if point[axis] > self.maximum[axis]:
+                self.maximum[axis] = point[axis]
+
+    @staticmethod
+    def reference(attrib):
+        """
+        Creates a reference to an object from the attributes of a <component> or <item> element.
+        :param attrib: The attributes of the element.
+        :return: A `Reference`.
+        """
+        path = attrib.get(PATH_ATTRIBUTE)
+        return Reference(
+            objectid=attrib["objectid"],
+            path=path.lstrip("/") if path else None,  # Paths in the archive don't start with a slash.
+            transformation=attrib.get("transform", ""))
+
+
+def scan_model(stream, bounds=False):
+    """
+    Scans a 3D model document in a single streaming pass, without building its element tree.
+
+    Vertices and triangles are only counted. Components and build items are followed to other model documents through
+    the production extension, like Bambu Studio writes them.
+    :param stream: A binary file-like object containing the XML document.
+    :param bounds: Whether to also find the bounding box of every object, in the unit of the document.
+    :return: A `ModelScan`.
+    :raises: `xml.etree.ElementTree.ParseError` if the document is malformed.
+    """
+    parser = xml.etree.ElementTree.XMLParser(target=_IndexTarget(bounds))
+    chunk = stream.read(PARSE_CHUNK_SIZE)
+    while chunk:
+        parser.feed(chunk)
+        chunk = stream.read(PARSE_CHUNK_SIZE)
+    return parser.close()
+
+
+def index_model(stream, document=MODEL_LOCATION):
+    """
+    Lists the objects in a 3D model document, without building its element tree.
+    :param stream: A binary file-like object containing the XML document.
+    :param document: The path of the document in its archive.
+    :return: A list of `IndexedObject`s, in the order of the document. Their plates are not known yet.
+    :raises: `xml.etree.ElementTree.ParseError` if the document is malformed.
+    """
+    scan = scan_model(stream)
+    built = {item.objectid for item in scan.items}
+    return [IndexedObject(
+        document=document,
+        objectid=scanned.objectid,
+        name=scanned.name,
+        object_type=scanned.object_type,
+        vertices=scanned.vertices,
+        triangles=scanned.triangles,
+        components=[(component.path or document, component.objectid) for component in scanned.components],
+        built=scanned.objectid in built,
+        plate=None) for scanned in scan.objects]
+
+
+def read_model_settings(stream):
+    """
+    Reads the names and plates of objects from the model settings that Bambu Studio writes.
+
+    The resource IDs in there refer to the objects in the main model document.
+    :param stream: A file-like object containing the model settings.
+    :return: Two dictionaries by resource ID, with the name and the plate number of each object respectively.
+    """
+    names = {}
+    plates = {}
+    try:
+        root = xml.etree.ElementTree.ElementTree(file=stream).getroot()
+    except xml.etree.ElementTree.ParseError as e:
+        log.warning(f"Model settings are malformed: {e}")
+        return names, plates
+    for object_node in root.iterfind("object"):
+        for metadata_node in object_node.iterfind("metadata"):
+            if metadata_node.attrib.get("key") == "name" and "id" in object_node.attrib:
+                names[object_node.attrib["id"]] = metadata_node.attrib.get("value", "")
+    for plate_node in root.iterfind("plate"):
+        plate = None
+        for metadata_node in plate_node.iterfind("metadata"):
+            if metadata_node.attrib.get("key") == "plater_id":
+                try:
+                    plate = int(metadata_node.attrib.get("value", ""))
+                except ValueError:
+                    log.warning(f"Plate has an invalid number: {metadata_node.attrib.get('value')}")
+        if plate is None:
+            continue
+        for metadata_node in plate_node.iterfind("model_instance/metadata"):
+            if metadata_node.attrib.get("key") == "object_id":
+                plates[metadata_node.attrib.get("value")] = plate
+    return names, plates
+
+
+def index_archive(path):
+    """
+    Lists the objects in all 3D model documents of a 3MF archive, without reading their geometry.
+
+    For Bambu Studio projects, the names and plates of the objects are taken from the model settings.
+    :param path: The path to the archive, or a file-like object containing it.
+    :return: A list of `IndexedObject`s. Documents that are malformed are left out.
+    """
+    result = []
+    for model_file in read_archive(path).get(MODEL_MIMETYPE, []):
+        try:
+            result.extend(index_model(model_file, model_file.name))
+        except xml.etree.ElementTree.ParseError as e:
+            log.error(f"3MF document {model_file.name} is malformed: {e}")
+
+    try:
+        with zipfile.ZipFile(path) as archive:
+            try:
+                settings_file = archive.open(BAMBU_MODEL_SETTINGS_LOCATION)
+            except KeyError:  # Not a Bambu Studio project.
+                return result
+            with settings_file:
+                names, plates = read_model_settings(settings_file)
+    except (zipfile.BadZipFile, EnvironmentError) as e:
+        log.error(f"Unable to read archive: {e}")
+        return result
+    return [indexed._replace(
+        name=names.get(indexed.objectid, indexed.name),
+        plate=plates.get(indexed.objectid)) if indexed.document == MODEL_LOCATION else indexed for indexed in result]
+
+
+def document_components(root, document):
+    """
+    Lists the components of every object in a parsed model document.
+    :param root: The root element of the document.
+    :param document: The path of the document in its archive.
+    :return: A dictionary with, for every object by a tuple of the path of its document and its resource ID, a list of
+    such tuples for the objects of its components.
+    """
+    result = {}
+    for object_node in root.iterfind("./3mf:resources/3mf:object", MODEL_NAMESPACES):
+        components = []
+        for component_node in object_node.iterfind("./3mf:components/3mf:component", MODEL_NAMESPACES):
+            if "objectid" in component_node.attrib:
+                path = component_node.attrib.get(PATH_ATTRIBUTE)
+                components.append((path.lstrip("/") if path else document, component_node.attrib["objectid"]))
+        result[(document, object_node.attrib.get("id"))] = components
+    return result
+
+
+def required_objects(chosen, components):
+    """
+    Finds all objects that are needed to build some objects: the objects themselves, their components, the components
+    of those, and so on, across model documents.
+    :param chosen: Tuples of the path of a document and a resource ID, for the objects to build.
+    :param components: A dictionary with the components of objects, as made by `document_components`. Objects that
+    aren't in there are still needed, but their components are unknown.
+    :return: A set of tuples of the path of a document and a resource ID.
+    """
+    required = set()
+    pending = list(chosen)
+    while pending:  # Add the components, and their components, and so on.
+        key = pending.pop()
+        if key in required:
+            continue
+        required.add(key)
+        pending.extend(components.get(key, ()))
+    return required
+
+
+def select_objects(index, names=(), plates=()):
+    """
+    Chooses objects from an index, by name, resource ID or plate.
+
+    Only the objects of the root model document can be chosen, since those are the ones that get built. The objects of
+    other documents, like the parts in a Bambu Studio project, are required by the components of the chosen objects.
+    :param index: A list of `IndexedObject`s, as made by `index_archive`.
+    :param names: Names or resource IDs of objects to choose.
+    :param plates: Numbers of Bambu Studio plates of which to choose all objects.
+    :return: A dictionary with a `Selection` for each document that has any of the required objects, by the path of
+    the document.
+    """
+    names = set(names)
+    plates = set(plates)
+    if not index:
+        return {}
+    documents = {indexed.document for indexed in index}
+    root_document = MODEL_LOCATION if MODEL_LOCATION in documents else index[0].document
+    chosen = {(indexed.document, indexed.objectid) for indexed in index if indexed.document == root_document and (
+        indexed.objectid in names or indexed.name in names or indexed.plate in plates)}
+    components = {(indexed.document, indexed.objectid): indexed.components for indexed in index}
+    required = required_objects(chosen, components)
+
+    result = {}
+    for document, objectid in sorted(required):
+        selection = result.setdefault(document, Selection(chosen=set(), required=set()))
+        selection.required.add(objectid)
+        if (document, objectid) in chosen:
+            selection.chosen.add(objectid)
+    return result
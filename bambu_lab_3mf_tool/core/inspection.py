@@ -0,0 +1,253 @@
+# Bambu Lab 3MF Tools - Inspecting 3MF archives without importing them.
+# Copyright (C) 2025 jsonify
+# This add-on is free software: you can redistribute it and/or modify it under the terms of the GNU General
+# Public License as published by the Free Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+# This add-on is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied
+# warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# details.
+# You should have received a copy of the GNU General Public License along with this plug-in. If not, see
+# <https://gnu.org/licenses/>.
+
+# <pep8 compliant>
+
+"""
+Summarises 3MF archives for a library browser: their objects, triangle counts, unit, size and thumbnail. Independent of
+Blender.
+
+Only the central directory of the archive, the content types, the relationships, the thumbnail and the model settings
+of Bambu Studio are read in full. The model documents get a single streaming pass that counts the vertices and
+triangles and keeps track of the bounding box of each object, without building an element tree. Many archives can be
+inspected at once with a pool of worker processes.
+"""
+
+import collections  # For namedtuple.
+import concurrent.futures  # To inspect many archives in parallel worker processes.
+import logging  # To debug and log progress.
+import xml.etree.ElementTree  # To catch malformed documents.
+import zipfile  # To read the archives.
+
+from ..constants import *
+from ..unit_conversions import threemf_to_metre  # To report the size in millimetres.
+from .annotations import Annotations  # To find the thumbnails through the relationships.
+from .content_types import assign_content_types, read_content_types  # To find the model documents.
+from .index import IndexedObject, read_model_settings, scan_model  # To scan the model documents.
+from .reader import ModelReader, multiply  # To parse and combine the transformations.
+
+log = logging.getLogger(__name__)
+
+# The summary of a 3MF archive. The objects are `IndexedObject`s, each with the vertices and triangles of its own mesh.
+# The vertices and triangles of the summary are those of everything that gets built, counting every instance of a
+# mesh. The minimum and maximum corner of the bounding box of everything that gets built are in millimetres, or `None`
+# if nothing gets built. The thumbnail is the PNG image as
+# bytes, or `None` if the archive has none. If the archive couldn't be read, the error describes why.
+ArchiveSummary = collections.namedtuple("ArchiveSummary", [
+    "path",
+    "unit",
+    "objects",
+    "vertices",
+    "triangles",
+    "minimum",
+    "maximum",
+    "thumbnail",
+    "error"])
+
+
+def inspect_archive(path):
+    """
+    Summarises a 3MF archive without importing it.
+
+    Any error is caught and recorded in the summary, so that a broken archive never ends the inspection of a library.
+    :param path: The path to the archive.
+    :return: An `ArchiveSummary`.
+    """
+    try:
+        with zipfile.ZipFile(path) as archive:
+            return read_summary(path, archive)
+    except (ValueError, KeyError, EnvironmentError, xml.etree.ElementTree.ParseError, zipfile.BadZipFile) as e:
+        error = f"{type(e).__name__}: {e}"
+    except Exception as e:  # Anything unexpected is still only a failure of this archive.
+        error = f"Unexpected {type(e).__name__}: {e}"
+    return ArchiveSummary(
+        path=path,
+        unit=None,
+        objects=[],
+        vertices=0,
+        triangles=0,
+        minimum=None,
+        maximum=None,
+        thumbnail=None,
+        error=error)
+
+
+def read_summary(path, archive):
+    """
+    Summarises an opened 3MF archive.
+    :param path: The path to the archive, to put in the summary.
+    :param archive: The `zipfile.ZipFile` of the archive.
+    :return: An `ArchiveSummary`.
+    :raises: `ValueError` if the archive contains no 3D model, or `xml.etree.ElementTree.ParseError` if a model
+    document is malformed.
+    """
+    mime_types = assign_content_types(archive, read_content_types(archive))
+    documents = [file_path for file_path, mime_type in mime_types.items() if mime_type == MODEL_MIMETYPE]
+    if not documents:
+        raise ValueError("The archive contains no 3D model.")
+    root_document = MODEL_LOCATION if MODEL_LOCATION in documents else documents[0]
+
+    scans = {}
+    objects = []
+    for document in documents:
+        with archive.open(document) as stream:
+            scans[document] = scan_model(stream, bounds=True)
+        built = {item.objectid for item in scans[document].items}
+        objects.extend(IndexedObject(
+            document=document,
+            objectid=scanned.objectid,
+            name=scanned.name,
+            object_type=scanned.object_type,
+            vertices=scanned.vertices,
+            triangles=scanned.triangles,
+            components=[(component.path or document, component.objectid) for component in scanned.components],
+            built=document == root_document and scanned.objectid in built,
+            plate=None) for scanned in scans[document].objects)
+
+    try:
+        with archive.open(BAMBU_MODEL_SETTINGS_LOCATION) as settings_file:
+            names, plates = read_model_settings(settings_file)
+        objects = [indexed._replace(
+            name=names.get(indexed.objectid, indexed.name),
+            plate=plates.get(indexed.objectid)) if indexed.document == root_document else indexed
+            for indexed in objects]
+    except KeyError:  # Not a Bambu Studio project.
+        pass
+
+    unit = scans[root_document].unit
+    built_vertices = built_triangles = 0
+    for scanned, _ in built_instances(scans, root_document):
+        built_vertices += scanned.vertices
+        built_triangles += scanned.triangles
+    extents = build_extents(scans, root_document)
+    minimum = maximum = None
+    if extents is not None:
+        to_mm = threemf_to_metre[unit] * 1000.0
+        minimum = tuple(coordinate * to_mm for coordinate in extents[0])
+        maximum = tuple(coordinate * to_mm for coordinate in extents[1])
+
+    return ArchiveSummary(
+        path=path,
+        unit=unit,
+        objects=objects,
+        vertices=built_vertices,
+        triangles=built_triangles,
+        minimum=minimum,
+        maximum=maximum,
+        thumbnail=read_thumbnail(archive, mime_types),
+        error=None)
+
+
+def built_instances(scans, root_document):
+    """
+    Lists every object that the root document builds, with the transformation of each time that it gets built.
+
+    Components are followed recursively, also into other documents, with their transformations applied. Objects that
+    are used by multiple components or build items are listed once for every use.
+    :param scans: The `ModelScan` of every model document, by the path of the document.
+    :param root_document: The path of the document whose build items get built.
+    :return: A generator of tuples of a `ScannedObject` and its transformation, as 4x4 nested lists.
+    """
+    objects = {(document, scanned.objectid): scanned for document, scan in scans.items() for scanned in scan.objects}
+    reader = ModelReader()  # Only to parse transformations.
+
+    def visit(key, transformation, stack_trace):
+        scanned = objects.get(key)
+        if scanned is None:
+            return
+        yield scanned, transformation
+        for component in scanned.components:
+            component_key = (component.path or key[0], component.objectid)
+            if component_key in stack_trace:
+                log.warning(f"Recursive components in object ID: {component.objectid}")
+                continue
+            stack_trace.append(component_key)
+            component_transformation = reader.parse_transformation(component.transformation)
+            yield from visit(component_key, multiply(transformation, component_transformation), stack_trace)
+            stack_trace.pop()
+
+    for item in scans[root_document].items:
+        key = (item.path or root_document, item.objectid)
+        yield from visit(key, reader.parse_transformation(item.transformation), [key])
+
+
+def build_extents(scans, root_document):
+    """
+    Find the bounding box of everything that the root document builds, from the bounding boxes of the objects.
+
+    The corners of the bounding box of each built object are transformed, which may make the result slightly larger
+    than the exact bounding box of the transformed vertices if objects are rotated. The coordinates of other documents
+    are taken to be in the unit of the root document.
+    :param scans: The `ModelScan` of every model document, by the path of the document.
+    :param root_document: The path of the document whose build items get built.
+    :return: A tuple of the minimum and maximum corner of the bounding box, each a tuple of X, Y and Z. If nothing gets
+    built, `None` is returned.
+    """
+    minimum = [float("inf")] * 3
+    maximum = [float("-inf")] * 3
+    for scanned, transformation in built_instances(scans, root_document):
+        if scanned.minimum is None:
+            continue
+        row_x, row_y, row_z = transformation[0], transformation[1], transformation[2]
+        for x in (scanned.minimum[0], scanned.maximum[0]):
+            for y in (scanned.minimum[1], scanned.maximum[1]):
+                for z in (scanned.minimum[2], scanned.maximum[2]):
+                    point = (
+                        row_x[0] * x + row_x[1] * y + row_x[2] * z + row_x[3],
+                        row_y[0] * x + row_y[1] * y + row_y[2] * z + row_y[3],
+                        row_z[0] * x + row_z[1] * y + row_z[2] * z + row_z[3])
+                    for axis in range(3):
+                        if point[axis] < minimum[axis]:
+                            minimum[axis] = point[axis]
+                        if point[axis] > maximum[axis]:
+                            maximum[axis] = point[axis]
+
+    if minimum[0] == float("inf"):
+        return None
+    return tuple(minimum), tuple(maximum)
+
+
+def read_thumbnail(archive, mime_types):
+    """
+    Reads the thumbnail of an archive.
+
+    The thumbnail of the first plate of Bambu Studio projects is preferred. Otherwise the thumbnail that the
+    relationships of the package point to is used.
+    :param archive: The `zipfile.ZipFile` of the archive.
+    :param mime_types: The content type of every file in the archive, by its path.
+    :return: The image as bytes, or `None` if the archive has no thumbnail.
+    """
+    if BAMBU_THUMBNAIL_LOCATION in mime_types:
+        return archive.read(BAMBU_THUMBNAIL_LOCATION)
+    annotations = Annotations()
+    for file_path, mime_type in mime_types.items():
+        if mime_type == RELS_MIMETYPE:
+            with archive.open(file_path) as rels_file:
+                annotations.add_rels(rels_file)
+    for target in sorted(annotations.thumbnail_targets()):
+        if target in mime_types:
+            return archive.read(target)
+    return None
+
+
+def inspect_archives(paths, workers=None):
+    """
+    Summarises many 3MF archives in parallel worker processes.
+    :param paths: The paths to the archives.
+    :param workers: The number of worker processes. Defaults to the number of processors.
+    :return: A generator of `ArchiveSummary`s, in the order that the archives complete.
+    """
+    if not paths:
+        return
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(inspect_archive, path) for path in paths]
+        for future in concurrent.futures.as_completed(futures):
+            yield future.result()
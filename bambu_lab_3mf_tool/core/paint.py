@@ -0,0 +1,138 @@
+# Bambu Lab 3MF Tools - Filaments painted onto triangles.
+# Copyright (C) 2025 jsonify
+# This add-on is free software: you can redistribute it and/or modify it under the terms of the GNU General
+# Public License as published by the Free Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+# This add-on is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied
+# warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# details.
+# You should have received a copy of the GNU General Public License along with this plug-in. If not, see
+# <https://gnu.org/licenses/>.
+
+# <pep8 compliant>
+
+"""
+Encodes and decodes the filaments that Bambu Studio and PrusaSlicer paint onto triangles for multi-material prints.
+Independent of Blender.
+
+The slicers store the painting of a triangle as a hexadecimal string in an attribute of its <triangle> element. The
+string encodes a tree: a triangle may be split into smaller triangles, down to leaves that each have a state. State 0 is
+unpainted, and state N is painted with filament N. Nearly all triangles are painted as a whole, which gives only a
+handful of different strings. Those are looked up in a table. Only triangles that are split need to be decoded bit by
+bit, which gives the filament that covers the largest part of the triangle. Triangles are always written as a whole.
+"""
+
+import collections  # To add up the parts of split triangles.
+import json  # To read the print settings of Bambu Studio projects.
+import logging  # To debug and log progress.
+
+from .color import parse_color  # To read the colors of the filaments.
+
+log = logging.getLogger(__name__)
+
+SLIC3RPE_NAMESPACE = "http://schemas.slic3r.org/3mf/2017/06"
+# Attribute of <triangle> elements that Bambu Studio paints filaments in. Blender meshes keep the filament of each face
+# in an integer face attribute of the same name.
+PAINT_COLOR_ATTRIBUTE = "paint_color"
+MMU_SEGMENTATION_ATTRIBUTE = f"{{{SLIC3RPE_NAMESPACE}}}mmu_segmentation"  # The same, as PrusaSlicer writes it.
+MAX_FILAMENT = 18  # The highest state that a leaf can be encoded with.
+
+# The strings of triangles that are painted as a whole, indexed by their state. Unpainted triangles get no string.
+# States 1 and 2 fit in one hexadecimal digit. Higher states get a marker digit C, preceded by the state minus 3.
+PAINT_CODES = ["", "4", "8"] + [f"{state - 3:X}C" for state in range(3, MAX_FILAMENT + 1)]
+PAINT_STATES = {code: state for state, code in enumerate(PAINT_CODES)}  # The other way around.
+PAINT_STATES["0"] = 0
+
+# Colors of filaments that the project doesn't specify, in the order of the filaments.
+DEFAULT_FILAMENT_COLORS = [
+    (0.8, 0.8, 0.8, 1.0),
+    (0.1, 0.1, 0.1, 1.0),
+    (0.8, 0.1, 0.1, 1.0),
+    (0.1, 0.4, 0.8, 1.0),
+    (0.9, 0.8, 0.1, 1.0),
+    (0.1, 0.6, 0.2, 1.0),
+    (0.9, 0.5, 0.1, 1.0),
+    (0.5, 0.2, 0.7, 1.0),
+]
+
+
+def decode_paint(code):
+    """
+    Find the filament that a triangle is painted with.
+    :param code: The paint of the triangle, as the hexadecimal string from the 3MF document.
+    :return: The state of the triangle: 0 if it's unpainted, or the number of the filament. If the triangle is split,
+    the state that covers the largest part of it.
+    :raises: `ValueError` if the string is malformed.
+    """
+    state = PAINT_STATES.get(code)
+    if state is not None:
+        return state
+
+    # The string is written back to front, and the bits in each digit from least to most significant.
+    bits = []
+    for digit in reversed(code):
+        nibble = int(digit, 16)
+        bits.extend((nibble >> shift) & 1 for shift in range(4))
+    position = 0
+
+    def read(count):
+        nonlocal position
+        if position + count > len(bits):
+            raise ValueError(f"Paint ends in the middle of a triangle: {code}")
+        value = 0
+        for shift in range(count):
+            value |= bits[position + shift] << shift
+        position += count
+        return value
+
+    # Every triangle is split in as many parts as it has split sides plus one. The parts are counted as equally large.
+    shares = collections.Counter()
+    pending = [1.0]
+    while pending:
+        share = pending.pop()
+        split_sides = read(2)
+        if split_sides:
+            read(2)  # Which side is special. Only the shape of the parts depends on this.
+            pending.extend([share / (split_sides + 1)] * (split_sides + 1))
+        else:
+            state = read(2)
+            if state == 3:  # States from 3 upwards have 4 more bits.
+                state = read(4) + 3
+            shares[state] += share
+    return max(shares, key=shares.get)
+
+
+def read_filament_colors(stream):
+    """
+    Reads the colors of the filaments from the print settings of a Bambu Studio project.
+    :param stream: A file-like object containing the print settings, which are JSON.
+    :return: A list with the color of each filament, starting with filament 1. The colors are RGBA tuples, or `None`
+    where a color is invalid.
+    """
+    try:
+        settings = json.load(stream)
+    except ValueError as e:
+        log.warning(f"Print settings are malformed: {e}")
+        return []
+    if not isinstance(settings, dict):
+        return []
+    result = []
+    for color in settings.get("filament_colour", []):
+        try:
+            result.append(parse_color(color))
+        except (ValueError, AttributeError):
+            log.warning(f"Filament has an invalid color: {color}")
+            result.append(None)
+    return result
+
+
+def filament_color(filament, filament_colors):
+    """
+    Get the color to show a filament with.
+    :param filament: The number of the filament, starting from 1.
+    :param filament_colors: The colors of the filaments of the project, as read by `read_filament_colors`.
+    :return: An RGBA tuple.
+    """
+    if filament <= len(filament_colors) and filament_colors[filament - 1] is not None:
+        return filament_colors[filament - 1]
+    return DEFAULT_FILAMENT_COLORS[(filament - 1) % len(DEFAULT_FILAMENT_COLORS)]
@@ -0,0 +1,832 @@
+# Bambu Lab 3MF Tools - 3MF model reading.
+# Original 3MF code by Ghostkeeper (2020).
+# Copyright (C) 2025 jsonify
+# This add-on is free software: you can redistribute it and/or modify it under the terms of the GNU General
+# Public License as published by the Free Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+# This add-on is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied
+# warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# details.
+# You should have received a copy of the GNU General Public License along with this plug-in. If not, see
+# <https://gnu.org/licenses/>.
+
+# <pep8 compliant>
+
+"""
+Reads the 3D model documents of 3MF files into plain data structures. Independent of Blender.
+
+Transformations are represented as 4x4 nested lists, indexed as `matrix[row][column]` in the same way that Blender's
+matrices are, so that they can be converted to Blender matrices directly.
+"""
+
+import array  # To store the colors and texture coordinates of corners compactly.
+import collections  # For namedtuple.
+import html  # To unescape the attributes of objects of which the meshes may be skipped.
+import itertools  # To flatten the colors and texture coordinates of corners.
+import logging  # To debug and log progress.
+import re  # To find the meshes to skip in the bytes of a document.
+import xml.etree.ElementTree  # To parse the 3dmodel.model file.
+
+from ..constants import *
+from .color import parse_color  # To parse the colors of materials.
+from .diagnostics import Diagnostics  # To report problems in damaged documents.
+from .metadata import MetadataEntry, Metadata  # To store and serialize metadata.
+from .paint import MMU_SEGMENTATION_ATTRIBUTE, PAINT_COLOR_ATTRIBUTE, decode_paint  # To read multi-material painting.
+
+log = logging.getLogger(__name__)
+
+TRIANGLE_LOCATION = "object {}, triangle {}"  # How to report where a triangle with a problem is.
+DEFAULT_CORNER_COLOR = (1.0, 1.0, 1.0, 1.0)  # Color of corners that don't get a color of their own.
+DEFAULT_CORNER_UV = (0.0, 0.0)  # Texture coordinates of corners that don't get texture coordinates of their own.
+PARSE_CHUNK_SIZE = 1 << 20  # Number of bytes to parse at a time when parsing incrementally.
+PATH_ATTRIBUTE = f"{{{PRODUCTION_NAMESPACE}}}path"  # Attribute of components in other model documents.
+
+# Patterns to find the meshes of objects in the bytes of a document, whatever the namespace prefix of the elements.
+_OBJECT_START = re.compile(rb"<(?:[\w.-]+:)?object(?=[\s/>])")
+_OBJECT_TAG = re.compile(rb"""<(?:[\w.-]+:)?object((?:[^>"']|"[^"]*"|'[^']*')*)>""")
+_MESH_OR_OBJECT_END = re.compile(rb"<(?:[\w.-]+:)?mesh(?=[\s/>])|</(?:[\w.-]+:)?object\s*>")
+_MESH_TAG = re.compile(rb"""<(?:[\w.-]+:)?mesh((?:[^>"']|"[^"]*"|'[^']*')*)>""")
+_MESH_END = re.compile(rb"</(?:[\w.-]+:)?mesh\s*>")
+_ATTRIBUTE = re.compile(rb"""([\w.:-]+)\s*=\s*(?:"([^"]*)"|'([^']*)')""")
+_SKIP_MARGIN = 64  # Bytes to hold back at the end of a chunk, in case a tag that is looked for starts in there.
+
+# The paint is the filament of each triangle as painted in a slicer, with 0 for unpainted triangles, or `None` if no
+# triangle of the object is painted. The corner colors and corner UVs are flat arrays with the RGBA color or the UV
+# coordinates of the three corners of every triangle in turn, or `None` if no triangle of the object has them.
+ResourceObject = collections.namedtuple("ResourceObject", [
+    "vertices",
+    "triangles",
+    "materials",
+    "components",
+    "metadata",
+    "paint",
+    "corner_colors",
+    "corner_uvs"], defaults=[None, None, None])
+# The path of a component is the model document that its object is in, or `None` if it is in the same document.
+Component = collections.namedtuple("Component", ["resource_object", "transformation", "path"], defaults=[None])
+ResourceMaterial = collections.namedtuple("ResourceMaterial", ["name", "color"])
+BuildItem = collections.namedtuple("BuildItem", ["objectid", "transformation", "metadata"])
+
+
+def identity():
+    """
+    Creates an identity transformation.
+    :return: A 4x4 identity matrix as nested lists.
+    """
+    return [[1.0 if row == column else 0.0 for column in range(4)] for row in range(4)]
+
+
+def multiply(left, right):
+    """
+    Multiplies two transformations.
+    :param left: A 4x4 matrix as nested lists.
+    :param right: Another 4x4 matrix as nested lists.
+    :return: The matrix product `left @ right`.
+    """
+    return [[sum(left[row][k] * right[k][column] for k in range(4)) for column in range(4)] for row in range(4)]
+
+
+def parse_model(stream):
+    """
+    Parses a 3D model document.
+    :param stream: A file-like object containing the XML document, or a path to it.
+    :return: The root element of the document.
+    :raises: `xml.etree.ElementTree.ParseError` if the document is malformed.
+    """
+    return xml.etree.ElementTree.ElementTree(file=stream).getroot()
+
+
+class _MeshSkipper:
+    """
+    Removes the meshes of the objects that aren't needed from the bytes of a document, before they get parsed.
+
+    The parser never sees the vertices and triangles of those meshes, so skipping them costs little more than finding
+    where they end. The objects themselves are kept, with their attributes, metadata and components, but without a
+    mesh. The bytes are fed a chunk at a time, and tags that are split over two chunks are held back until they are
+    complete.
+    """
+
+    SEARCHING = 0  # Looking for the next object.
+    IN_OBJECT = 1  # In an object of which the mesh is skipped, before its mesh.
+    IN_MESH = 2  # In a mesh that is skipped.
+
+    def __init__(self, keep_mesh):
+        """
+        Prepares to filter a document.
+        :param keep_mesh: Function that gets the attributes of every <object> element, and tells whether to keep its
+        mesh.
+        """
+        self.keep_mesh = keep_mesh
+        self.state = self.SEARCHING
+        self.pending = b""  # The bytes held back from the previous chunk.
+
+    def filter(self, chunk):
+        """
+        Takes the next chunk of the document, and gives the bytes that can be parsed so far.
+        :param chunk: The next bytes of the document. Empty at the end of the document.
+        :return: The bytes to parse.
+        """
+        data = self.pending + chunk
+        final = not chunk
+        hold_back = len(data) if final else len(data) - _SKIP_MARGIN  # Where a search may stop if nothing is found.
+        result = []
+        position = 0
+        while True:
+            if self.state == self.SEARCHING:
+                match = _OBJECT_START.search(data, position)
+                if match is None:
+                    end = max(position, hold_back)
+                    result.append(data[position:end])
+                    position = end
+                    break
+                tag = _OBJECT_TAG.match(data, match.start())
+                if tag is None and not final:  # The rest of the tag is in the next chunk.
+                    result.append(data[position:match.start()])
+                    position = match.start()
+                    break
+                end = tag.end() if tag is not None else match.end()  # A malformed tag is left to the parser.
+                result.append(data[position:end])
+                position = end
+                if tag is not None and not tag.group(1).endswith(b"/") and not self.keep_mesh(self.attributes(tag)):
+                    self.state = self.IN_OBJECT
+            elif self.state == self.IN_OBJECT:
+                match = _MESH_OR_OBJECT_END.search(data, position)
+                if match is None:
+                    end = max(position, hold_back)
+                    result.append(data[position:end])
+                    position = end
+                    break
+                if match.group().startswith(b"</"):  # This object has no mesh.
+                    result.append(data[position:match.end()])
+                    position = match.end()
+                    self.state = self.SEARCHING
+                    continue
+                tag = _MESH_TAG.match(data, match.start())
+                if tag is None and not final:
+                    result.append(data[position:match.start()])
+                    position = match.start()
+                    break
+                result.append(data[position:match.start()])
+                position = tag.end() if tag is not None else match.end()
+                if tag is None or not tag.group(1).endswith(b"/"):  # An empty mesh only needs its tag removed.
+                    self.state = self.IN_MESH
+            else:
+                match = _MESH_END.search(data, position)
+                if match is None:
+                    position = max(position, hold_back)
+                    break
+                position = match.end()
+                self.state = self.IN_OBJECT  # Keep the rest of the object.
+        self.pending = data[position:]
+        return b"".join(result)
+
+    @staticmethod
+    def attributes(tag):
+        """
+        Reads the attributes of an object from its tag.
+        :param tag: The match of the tag of the <object> element.
+        :return: A dictionary of the attributes, by their names as they are written in the document.
+        """
+        return {match.group(1).decode("UTF-8"): html.unescape(
+            (match.group(2) if match.group(2) is not None else match.group(3)).decode("UTF-8"))
+            for match in _ATTRIBUTE.finditer(tag.group(1))}
+
+
+def parse_model_incrementally(stream, chunk_size=PARSE_CHUNK_SIZE, keep_mesh=None):
+    """
+    Parses a 3D model document a chunk at a time, so that the caller can do other things in between, like showing the
+    progress.
+    :param stream: A binary file-like object containing the XML document.
+    :param chunk_size: The number of bytes to parse in each step.
+    :param keep_mesh: Function that gets the attributes of every <object> element, and tells whether its mesh is
+    needed. The meshes of other objects are skipped before they are parsed. If `None`, the whole document is parsed.
+    :return: A generator that yields the number of bytes parsed so far after each chunk, and returns the root element.
+    :raises: `xml.etree.ElementTree.ParseError` if the document is malformed.
+    """
+    skipper = _MeshSkipper(keep_mesh) if keep_mesh is not None else None
+    parser = xml.etree.ElementTree.XMLParser()
+    parsed = 0
+    chunk = stream.read(chunk_size)
+    while chunk:
+        parser.feed(skipper.filter(chunk) if skipper is not None else chunk)
+        parsed += len(chunk)
+        yield parsed
+        chunk = stream.read(chunk_size)
+    if skipper is not None:
+        parser.feed(skipper.filter(b""))
+    return parser.close()
+
+
+def combine_document(resource_objects, build_items, document, root_document, scales):
+    """
+    Prepares the resource objects and build items of one model document to be combined with those of the other model
+    documents of an archive.
+
+    Resource IDs are only unique within a document, so those of other documents than the root document are prefixed
+    with the path of their document. Components are resolved to the objects that they refer to, which may be in other
+    documents through the production extension, like in Bambu Studio projects. Everything gets scaled to the unit of
+    the root document.
+    :param resource_objects: The resource objects read from the document, by resource ID.
+    :param build_items: The build items read from the document.
+    :param document: The path of the document in the archive.
+    :param root_document: The path of the root model document of the archive.
+    :param scales: For each model document by its path, the factor that converts its unit to that of the root document.
+    :return: A tuple of the resource objects by their combined IDs, and the build items referring to those.
+    """
+    def combined_id(target, objectid):
+        return objectid if target == root_document else f"{target}:{objectid}"
+
+    def scaling(factor):
+        result = identity()
+        for axis in range(3):
+            result[axis][axis] = factor
+        return result
+
+    combined_objects = {}
+    for objectid, resource_object in resource_objects.items():
+        components = []
+        for component in resource_object.components:
+            target = component.path or document
+            transformation = component.transformation
+            if scales.get(target, 1.0) != scales[document]:  # Scale the vertices of the other document along.
+                transformation = multiply(transformation, scaling(scales.get(target, 1.0) / scales[document]))
+            components.append(component._replace(
+                resource_object=combined_id(target, component.resource_object),
+                transformation=transformation,
+                path=None))
+        combined_objects[combined_id(document, objectid)] = resource_object._replace(components=components)
+    combined_items = [build_item._replace(
+        objectid=combined_id(document, build_item.objectid),
+        transformation=multiply(scaling(scales[document]), build_item.transformation)) for build_item in build_items]
+    return combined_objects, combined_items
+
+
+def model_unit(root):
+    """
+    Get the unit that the coordinates of a 3D model document are in.
+    :param root: The root element of the 3D model document.
+    :return: The name of the unit, which is a key of `unit_conversions.threemf_to_metre`.
+    """
+    return root.attrib.get("unit", MODEL_DEFAULT_UNIT)
+
+
+def is_supported(required_extensions):
+    """
+    Determines if a document is supported by this add-on.
+
+    The required extensions are listed by the prefixes of their namespaces. The XML parser doesn't keep the namespace
+    declarations, so the conventional prefixes are recognised, as well as the namespaces themselves.
+    :param required_extensions: The value of the `requiredextensions` attribute of the root node of the XML
+    document.
+    :return: `True` if the document is supported, or `False` if it's not.
+    """
+    extensions = required_extensions.split(" ")
+    extensions = {MODEL_NAMESPACES.get(extension, extension) for extension in extensions if extension != ""}
+    return extensions <= SUPPORTED_EXTENSIONS
+
+
+class ModelReader:
+    """
+    Reads the resources and build items from a 3D model document.
+
+    The resources get collected in `self.resource_materials`, `self.resource_colors`,
+    `self.resource_texture_coordinates` and `self.resource_objects`, keyed by their resource IDs.
+    Create a new reader for every document, since resource IDs are only unique within a document.
+
+    Problems in the document are collected in `self.diagnostics` rather than logged one by one. Call
+    `emit_diagnostics` when the document is read, to log a summary of them.
+    """
+
+    def __init__(self, metadata_class=Metadata):
+        """
+        Creates a reader without any resources.
+        :param metadata_class: The class to collect metadata in. Callers that want to store the metadata somewhere can
+        provide a subclass of `Metadata` here.
+        """
+        self.metadata_class = metadata_class
+        self.diagnostics = Diagnostics()
+        self.resource_objects = {}
+        self.resource_materials = {}
+        self.resource_colors = {}  # The colors of every color group, as lists of RGBA tuples.
+        self.resource_texture_coordinates = {}  # The coordinates of every texture group, as lists of UV tuples.
+
+    def read_metadata(self, node, original_metadata=None):
+        """
+        Reads the metadata tags from a metadata group.
+        :param node: A node in the 3MF document that contains <metadata> tags. This can be either a root node, or a
+        <metadatagroup> node.
+        :param original_metadata: If there was already metadata for this context from other documents, you can provide
+        that metadata here. The metadata of those documents will be combined then.
+        :return: A `Metadata` object.
+        """
+        if original_metadata is not None:
+            metadata = original_metadata
+        else:
+            metadata = self.metadata_class()  # Create a new Metadata object.
+
+        for metadata_node in node.iterfind("./3mf:metadata", MODEL_NAMESPACES):
+            if "name" not in metadata_node.attrib:
+                self.diagnostics.add("metadata_without_name")
+                continue  # This attribute has no name, so there's no key by which I can save the metadata.
+            name = metadata_node.attrib["name"]
+            preserve_str = metadata_node.attrib.get("preserve", "0")
+            # We don't use this ourselves since we always preserve, but the preserve attribute itself will also be
+            # preserved.
+            preserve = preserve_str != "0" and preserve_str.lower() != "false"
+            datatype = metadata_node.attrib.get("type", "")
+            value = metadata_node.text
+
+            # Always store all metadata so that they are preserved.
+            metadata[name] = MetadataEntry(name=name, preserve=preserve, datatype=datatype, value=value)
+
+        return metadata
+
+    def read_materials(self, root):
+        """
+        Read out all of the material resources from the 3MF document.
+
+        The materials will be stored in `self.resource_materials` until it gets used to build the items.
+        :param root: The root of an XML document that may contain materials.
+        """
+        for basematerials_item in root.iterfind("./3mf:resources/3mf:basematerials", MODEL_NAMESPACES):
+            try:
+                material_id = basematerials_item.attrib["id"]
+            except KeyError:
+                self.diagnostics.add("material_group_without_id")
+                continue  # Need to have an ID, or no item can reference to the materials. Skip this one.
+            if material_id in self.resource_materials:
+                self.diagnostics.add("duplicate_material_id", "material group {}", material_id)
+                continue
+
+            # Use a dictionary mapping indices to resources, because some indices may be skipped due to being invalid.
+            self.resource_materials[material_id] = {}
+            index = 0
+
+            # "Base" must be the stupidest name for a material resource. Oh well.
+            for base_item in basematerials_item.iterfind("./3mf:base", MODEL_NAMESPACES):
+                name = base_item.attrib.get("name", "3MF Material")
+                color = base_item.attrib.get("displaycolor")
+                if color is not None:
+                    try:
+                        color = parse_color(color)
+                    except ValueError:
+                        self.diagnostics.add(
+                            "invalid_color", "material {} of resource {}: {}", name, material_id, color)
+                        color = None  # Don't add a color for this material.
+
+                # Input is valid. Create a resource.
+                self.resource_materials[material_id][index] = ResourceMaterial(name=name, color=color)
+                index += 1
+
+            if len(self.resource_materials[material_id]) == 0:
+                del self.resource_materials[material_id]  # Don't leave empty material sets hanging.
+
+        self.read_property_groups(root)
+
+    def read_property_groups(self, root):
+        """
+        Read out the color groups and texture coordinate groups of the materials extension from the 3MF document.
+
+        Full-color scans have a color for every vertex, so these groups can be long. They are stored as plain lists in
+        `self.resource_colors` and `self.resource_texture_coordinates`, which triangles index into for each corner.
+        Invalid entries are replaced by a default rather than left out, so that the indices after them stay correct.
+        :param root: The root of an XML document that may contain color groups and texture coordinate groups.
+        """
+        for colorgroup_item in root.iterfind("./3mf:resources/m:colorgroup", MODEL_NAMESPACES):
+            group_id = colorgroup_item.attrib.get("id")
+            if group_id is None:
+                self.diagnostics.add("material_group_without_id")
+                continue
+            if group_id in self.resource_materials or group_id in self.resource_colors:
+                self.diagnostics.add("duplicate_material_id", "color group {}", group_id)
+                continue
+            colors = []
+            for color_item in colorgroup_item.iterfind("./m:color", MODEL_NAMESPACES):
+                try:
+                    colors.append(parse_color(color_item.attrib["color"]))
+                except (KeyError, ValueError):
+                    self.diagnostics.add("invalid_group_color", "color {} of resource {}", len(colors), group_id)
+                    colors.append(DEFAULT_CORNER_COLOR)
+            self.resource_colors[group_id] = colors
+
+        for texture_group_item in root.iterfind("./3mf:resources/m:texture2dgroup", MODEL_NAMESPACES):
+            group_id = texture_group_item.attrib.get("id")
+            if group_id is None:
+                self.diagnostics.add("material_group_without_id")
+                continue
+            if group_id in self.resource_materials or group_id in self.resource_colors \
+                    or group_id in self.resource_texture_coordinates:
+                self.diagnostics.add("duplicate_material_id", "texture group {}", group_id)
+                continue
+            coordinates = []
+            for coordinate_item in texture_group_item.iterfind("./m:tex2coord", MODEL_NAMESPACES):
+                attrib = coordinate_item.attrib
+                try:
+                    coordinates.append((float(attrib["u"]), float(attrib["v"])))
+                except (KeyError, ValueError):
+                    self.diagnostics.add(
+                        "invalid_texture_coordinate", "coordinate {} of resource {}", len(coordinates), group_id)
+                    coordinates.append(DEFAULT_CORNER_UV)
+            self.resource_texture_coordinates[group_id] = coordinates
+
+    def read_objects(self, root, objectids=None):
+        """
+        Reads all repeatable build objects from the resources of an XML root node.
+
+        This stores them in the resource_objects field.
+        :param root: The root node of a 3dmodel.model XML file.
+        :param objectids: The resource IDs of the objects to read, or `None` to read all of them. The geometry of the
+        other objects is not read at all.
+        """
+        for _ in self.read_objects_incrementally(root, objectids):
+            pass
+
+    def read_objects_incrementally(self, root, objectids=None):
+        """
+        Reads the build objects from the resources of an XML root node one at a time, like `read_objects`.
+        :param root: The root node of a 3dmodel.model XML file.
+        :param objectids: The resource IDs of the objects to read, or `None` to read all of them.
+        :return: A generator that yields the number of objects read so far after each object.
+        """
+        for object_index, object_node in enumerate(root.iterfind("./3mf:resources/3mf:object", MODEL_NAMESPACES), 1):
+            try:
+                objectid = object_node.attrib["id"]
+            except KeyError:
+                self.diagnostics.add("object_without_id")
+                continue  # ID is required, otherwise the build can't refer to it.
+            if objectids is not None and objectid not in objectids:
+                continue  # Not chosen.
+
+            pid = object_node.attrib.get("pid")  # Material ID.
+            pindex = object_node.attrib.get("pindex")  # Index within a collection of materials.
+            material = None
+            if pid is not None and pindex is not None and pid not in self.resource_colors \
+                    and pid not in self.resource_texture_coordinates:  # Those are applied to the corners instead.
+                try:
+                    index = int(pindex)
+                    material = self.resource_materials[pid][index]
+                except KeyError:
+                    self.diagnostics.add("missing_object_material", "object {}: material {}/{}", objectid, pid, pindex)
+                except ValueError:
+                    self.diagnostics.add("invalid_object_material_index", "object {}: index {}", objectid, pindex)
+
+            vertices = self.read_vertices(object_node)
+            triangles, materials, paint, corner_colors, corner_uvs = self.read_triangles(object_node, material, pid)
+            components = self.read_components(object_node)
+            metadata = self.metadata_class()
+            for metadata_node in object_node.iterfind("./3mf:metadatagroup", MODEL_NAMESPACES):
+                metadata = self.read_metadata(metadata_node, metadata)
+            if "partnumber" in object_node.attrib:
+                # Blender has no way to ensure that custom properties get preserved if a mesh is split up, but for most
+                # operations this is retained properly.
+                metadata["3mf:partnumber"] = MetadataEntry(
+                    name="3mf:partnumber",
+                    preserve=True,
+                    datatype="xs:string",
+                    value=object_node.attrib["partnumber"])
+            metadata["3mf:object_type"] = MetadataEntry(
+                name="3mf:object_type",
+                preserve=True,
+                datatype="xs:string",
+                value=object_node.attrib.get("type", "model"))
+
+            self.resource_objects[objectid] = ResourceObject(
+                vertices=vertices,
+                triangles=triangles,
+                materials=materials,
+                components=components,
+                metadata=metadata,
+                paint=paint,
+                corner_colors=corner_colors,
+                corner_uvs=corner_uvs)
+            yield object_index
+
+    def read_vertices(self, object_node):
+        """
+        Reads out the vertices from an XML node of an object.
+
+        If any vertex is corrupt, like with a coordinate missing or not proper floats, then the 0 coordinate will be
+        used. This is to prevent messing up the list of indices.
+        :param object_node: An <object> element from the 3dmodel.model file.
+        :return: List of vertices in that object. Each vertex is a tuple of 3 floats for X, Y and Z.
+        """
+        objectid = object_node.attrib.get("id")  # To report where problems are.
+        result = []
+        for vertex in object_node.iterfind("./3mf:mesh/3mf:vertices/3mf:vertex", MODEL_NAMESPACES):
+            attrib = vertex.attrib
+            try:
+                result.append((float(attrib.get("x", 0)), float(attrib.get("y", 0)), float(attrib.get("z", 0))))
+            except ValueError:  # Not a float. Only then parse the coordinates one by one to find out which is wrong.
+                coordinates = []
+                for axis in "xyz":
+                    try:
+                        coordinates.append(float(attrib.get(axis, 0)))
+                    except ValueError:
+                        self.diagnostics.add(
+                            "invalid_vertex_coordinate", "object {}, vertex {}, {}", objectid, len(result), axis)
+                        coordinates.append(0)
+                result.append(tuple(coordinates))
+        return result
+
+    def read_triangles(self, object_node, default_material, material_pid):
+        """
+        Reads out the triangles from an XML node of an object.
+
+        These triangles always consist of 3 vertices each. Each vertex is an index to the list of vertices read
+        previously. The triangle also contains an associated material, or None if the triangle gets no material.
+
+        Triangles may also be painted with filaments by Bambu Studio or PrusaSlicer, or refer to a color group or
+        texture coordinate group of the materials extension with a property for each corner. Only triangles that have
+        more than their three vertex indices are checked for materials, properties and paint, so that plain meshes
+        don't pay for them.
+        :param object_node: An <object> element from the 3dmodel.model file.
+        :param default_material: If the triangle specifies no material, it should get this material. May be `None` if
+        the model specifies no material.
+        :param material_pid: Triangles that specify a material index will get their material from this material group.
+        :return: Five values, of which the first three are lists of equal length. The first lists the vertices of each
+        triangle, which are 3-tuples of integers referring to the first, second and third vertex of the triangle. The
+        second list contains a material for each triangle, or `None` if the triangle doesn't get a material. The third
+        contains the filament that each triangle is painted with, or 0 if it's unpainted. If no triangle is painted, the
+        third is `None` instead. The fourth and fifth are the colors and texture coordinates of the corners, as made by
+        `read_corner_properties`.
+        """
+        vertices = []
+        materials = []
+        paint_codes = {}  # The encoded paint of the painted triangles, by the index of the triangle.
+        corner_properties = []  # Triangle index, group and corner indices of every triangle with properties per corner.
+        objectid = object_node.attrib.get("id")  # To report where problems are.
+        skipped = 0  # Number of triangles left out, to report where problems are.
+        for triangle in object_node.iterfind("./3mf:mesh/3mf:triangles/3mf:triangle", MODEL_NAMESPACES):
+            attrib = triangle.attrib
+            try:
+                v1 = int(attrib["v1"])
+                v2 = int(attrib["v2"])
+                v3 = int(attrib["v3"])
+                if v1 < 0 or v2 < 0 or v3 < 0:  # Negative indices are not allowed.
+                    self.diagnostics.add(
+                        "negative_vertex_index", TRIANGLE_LOCATION, objectid, len(vertices) + skipped)
+                    skipped += 1
+                    continue
+
+                pid = material_pid
+                p1 = None
+                if len(attrib) > 3:  # Has more than the vertex indices.
+                    pid = attrib.get("pid", material_pid)
+                    p1 = attrib.get("p1")
+                    paint_code = attrib.get(PAINT_COLOR_ATTRIBUTE) or attrib.get(MMU_SEGMENTATION_ATTRIBUTE)
+                    if paint_code:
+                        paint_codes[len(vertices)] = paint_code
+                if p1 is None:
+                    material = default_material
+                elif pid in self.resource_colors or pid in self.resource_texture_coordinates:
+                    corner_properties.extend((len(vertices), pid, p1, attrib.get("p2", p1), attrib.get("p3", p1)))
+                    material = default_material
+                else:
+                    try:
+                        material = self.resource_materials[pid][int(p1)]
+                    except KeyError:
+                        self.diagnostics.add(
+                            "missing_triangle_material", TRIANGLE_LOCATION, objectid, len(vertices) + skipped)
+                        material = default_material
+                    except ValueError:
+                        self.diagnostics.add(
+                            "invalid_triangle_material_index", TRIANGLE_LOCATION, objectid, len(vertices) + skipped)
+                        material = default_material
+
+                vertices.append((v1, v2, v3))
+                materials.append(material)
+            except KeyError:
+                self.diagnostics.add("missing_vertex_index", TRIANGLE_LOCATION, objectid, len(vertices) + skipped)
+                skipped += 1
+                continue
+            except ValueError:
+                self.diagnostics.add("invalid_vertex_index", TRIANGLE_LOCATION, objectid, len(vertices) + skipped)
+                skipped += 1
+                continue  # No fallback this time. Leave out the entire triangle.
+        paint = self.decode_paints(paint_codes, len(vertices), objectid)
+        return (vertices, materials, paint) + self.read_corner_properties(corner_properties, len(vertices), object_node)
+
+    def decode_paints(self, paint_codes, num_triangles, objectid):
+        """
+        Decodes the paint of all triangles of an object at once.
+
+        Painted triangles mostly share a handful of different codes, so every code is only decoded once.
+        :param paint_codes: The encoded paint of the painted triangles, by the index of the triangle.
+        :param num_triangles: The number of triangles of the object.
+        :param objectid: The resource ID of the object, to report where problems are.
+        :return: A list with the filament of each triangle, or 0 for unpainted triangles. If no triangle is painted,
+        `None` is returned.
+        """
+        if not paint_codes:
+            return None
+        result = [0] * num_triangles
+        states = {}  # The states that the codes decoded to so far.
+        for triangle_index, code in paint_codes.items():
+            state = states.get(code)
+            if state is None:
+                try:
+                    state = decode_paint(code)
+                except ValueError:
+                    self.diagnostics.add("invalid_paint", TRIANGLE_LOCATION, objectid, triangle_index)
+                    state = 0
+                states[code] = state
+            result[triangle_index] = state
+        return result
+
+    def read_corner_properties(self, corner_properties, num_triangles, object_node):
+        """
+        Looks up the colors and texture coordinates of the corners of all triangles of an object at once.
+
+        Every corner first gets an index into a palette of all the groups that the object uses. The flat arrays are
+        then made in a single pass over those indices, so that they can be given to Blender in one go. If all triangles
+        use the same group, as full-color scans do, their indices are converted a column at a time.
+        :param corner_properties: A flat list with, for each triangle with properties, the index of the triangle, the
+        resource ID of the group and the indices in the group of its three corners, still as strings.
+        :param num_triangles: The number of triangles of the object.
+        :param object_node: The <object> element, whose `pid` and `pindex` give the property of the other triangles.
+        :return: A tuple of the corner colors and the corner UVs. The corner colors are an array of 4 floats per
+        corner, and the corner UVs an array of 2 floats per corner, with three corners per triangle. Either is `None`
+        if no triangle of the object has them.
+        """
+        objectid = object_node.attrib.get("id")  # To report where problems are.
+        object_pid = object_node.attrib.get("pid")
+        used_pids = set(corner_properties[1::5])
+        result = []
+        for groups, default in (
+                (self.resource_colors, DEFAULT_CORNER_COLOR),
+                (self.resource_texture_coordinates, DEFAULT_CORNER_UV)):
+            palette = [default]  # All properties that corners may get. The first is for corners without one.
+            if object_pid in groups:
+                try:
+                    palette[0] = groups[object_pid][int(object_node.attrib.get("pindex", "0"))]
+                except (IndexError, ValueError):
+                    self.diagnostics.add("missing_triangle_property", "object {}", objectid)
+            elif used_pids.isdisjoint(groups):
+                result.append(None)  # The object doesn't use these properties.
+                continue
+
+            corners = [0] * (num_triangles * 3)  # The index in the palette of every corner.
+            for pid in used_pids.intersection(groups):
+                group = groups[pid]
+                offset = len(palette)
+                palette.extend(group)
+                if len(used_pids) == 1 and self.set_corners_at_once(corners, corner_properties, offset, len(group)):
+                    continue
+                columns = (corner_properties[column::5] for column in range(5))
+                for triangle_index, triangle_pid, p1, p2, p3 in zip(*columns):
+                    if triangle_pid != pid:
+                        continue  # Another group.
+                    try:
+                        i1, i2, i3 = int(p1), int(p2), int(p3)
+                    except ValueError:
+                        self.diagnostics.add(
+                            "invalid_triangle_property_index", TRIANGLE_LOCATION, objectid, triangle_index)
+                        continue
+                    if 0 <= i1 < len(group) and 0 <= i2 < len(group) and 0 <= i3 < len(group):
+                        start = triangle_index * 3
+                        corners[start:start + 3] = (offset + i1, offset + i2, offset + i3)
+                    else:
+                        self.diagnostics.add("missing_triangle_property", TRIANGLE_LOCATION, objectid, triangle_index)
+
+            # Pack every property of the palette once, so that the corners only need to join bytes.
+            packed = array.array("f", itertools.chain.from_iterable(palette)).tobytes()
+            width = len(packed) // len(palette)
+            packed_palette = [packed[start:start + width] for start in range(0, len(packed), width)]
+            corner_array = array.array("f")
+            corner_array.frombytes(b"".join(map(packed_palette.__getitem__, corners)))
+            result.append(corner_array)
+        return tuple(result)
+
+    @staticmethod
+    def set_corners_at_once(corners, corner_properties, offset, size):
+        """
+        Sets the palette indices of the corners of all triangles with properties, if they all use the same group.
+        :param corners: The palette index of every corner, to set.
+        :param corner_properties: The flat list of triangle properties, as given to `read_corner_properties`.
+        :param offset: Where the group starts in the palette.
+        :param size: The number of properties in the group.
+        :return: `True` if all corners were set, or `False` if some index is invalid, in which case nothing was set and
+        the triangles need to be checked one by one.
+        """
+        try:
+            columns = [list(map(int, corner_properties[column::5])) for column in (2, 3, 4)]
+        except ValueError:
+            return False
+        if any(min(column) < 0 or max(column) >= size for column in columns):
+            return False
+        if len(corners) == len(columns[0]) * 3:  # Every triangle has properties, so they are in order.
+            for corner, column in enumerate(columns):
+                corners[corner::3] = [offset + index for index in column]
+        else:
+            for triangle_index, i1, i2, i3 in zip(corner_properties[0::5], *columns):
+                start = triangle_index * 3
+                corners[start:start + 3] = (offset + i1, offset + i2, offset + i3)
+        return True
+
+    def read_components(self, object_node):
+        """
+        Reads out the components from an XML node of an object.
+
+        These components refer to other resource objects, with a transformation applied. They will eventually appear in
+        the scene as sub-objects. Through the production extension, the objects may be in other model documents, like
+        Bambu Studio writes them.
+        :param object_node: An <object> element from the 3dmodel.model file.
+        :return: List of components in this object node.
+        """
+        result = []
+        for component_node in object_node.iterfind("./3mf:components/3mf:component", MODEL_NAMESPACES):
+            try:
+                objectid = component_node.attrib["objectid"]
+            except KeyError:  # ID is required.
+                self.diagnostics.add("component_without_object", "object {}", object_node.attrib.get("id"))
+                continue  # Ignore this invalid component.
+            transform = self.parse_transformation(component_node.attrib.get("transform", ""))
+
+            path = component_node.attrib.get(PATH_ATTRIBUTE)
+            result.append(Component(
+                resource_object=objectid,
+                transformation=transform,
+                path=path.lstrip("/") if path else None))  # Paths in the archive don't start with a slash.
+        return result
+
+    def parse_transformation(self, transformation_str):
+        """
+        Parses a transformation matrix as written in the 3MF files.
+
+        Transformations in 3MF files are written in the form:
+        `m00 m01 m01 m10 m11 m12 m20 m21 m22 m30 m31 m32`
+
+        This would then result in a row-major matrix of the form:
+        ```
+        _                 _
+        | m00 m01 m02 0.0 |
+        | m10 m11 m12 0.0 |
+        | m20 m21 m22 0.0 |
+        | m30 m31 m32 1.0 |
+        -                 -
+        ```
+        :param transformation_str: A transformation as represented in 3MF.
+        :return: A 4x4 matrix as nested lists, with the correct transformation.
+        """
+        components = transformation_str.split(" ")
+        result = identity()
+        if transformation_str == "":  # Early-out if transformation is missing. This is not malformed.
+            return result
+        row = -1
+        col = 0
+        for component in components:
+            row += 1
+            if row > 2:
+                col += 1
+                row = 0
+                if col > 3:
+                    self.diagnostics.add("too_many_transformation_components", "{}", transformation_str)
+                    break  # Too many components. Ignore the rest.
+            try:
+                component_float = float(component)
+            except ValueError:  # Not a proper float. Skip this one.
+                self.diagnostics.add("malformed_transformation", "{}", transformation_str)
+                continue
+            result[row][col] = component_float
+        return result
+
+    def read_build(self, root):
+        """
+        Reads the build items of a 3D model document.
+
+        Build items that refer to objects that don't exist are skipped.
+        :param root: The root node of the 3dmodel.model XML document.
+        :return: A list of `BuildItem` tuples.
+        """
+        result = []
+        for build_item in root.iterfind("./3mf:build/3mf:item", MODEL_NAMESPACES):
+            try:
+                objectid = build_item.attrib["objectid"]
+                self.resource_objects[objectid]
+            except KeyError:  # ID is required, and it must be in the available resource_objects.
+                self.diagnostics.add("invalid_build_item", "object {}", build_item.attrib.get("objectid"))
+                continue  # Ignore this invalid item.
+
+            metadata = self.metadata_class()
+            for metadata_node in build_item.iterfind("./3mf:metadatagroup", MODEL_NAMESPACES):
+                metadata = self.read_metadata(metadata_node, metadata)
+            if "partnumber" in build_item.attrib:
+                metadata["3mf:partnumber"] = MetadataEntry(
+                    name="3mf:partnumber",
+                    preserve=True,
+                    datatype="xs:string",
+                    value=build_item.attrib["partnumber"])
+
+            transformation = self.parse_transformation(build_item.attrib.get("transform", ""))
+            result.append(BuildItem(objectid=objectid, transformation=transformation, metadata=metadata))
+        return result
+
+    def emit_diagnostics(self, document):
+        """
+        Log a single summary of the problems found in the document so far, and start collecting anew.
+        :param document: A name for the document, like the path of the archive, to say where the problems were found.
+        :return: The lines of the summary, which are empty if there were no problems.
+        """
+        summary = self.diagnostics.summary()
+        self.diagnostics.emit(log, document)
+        return summary
@@ -0,0 +1,94 @@
+# Bambu Lab 3MF Tools - STL reading.
+# Copyright (C) 2025 jsonify
+#
+# This add-on is free software: you can redistribute it and/or modify it under the terms of the GNU General
+# Public License as published by the Free Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+# This add-on is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied
+# warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# details.
+# You should have received a copy of the GNU General Public License along with this plug-in. If not, see
+# <https://gnu.org/licenses/>.
+
+# <pep8 compliant>
+
+"""
+Reads STL files into the same plain data structures as the 3MF reader. Independent of Blender.
+
+Both binary and ASCII STL files are supported. STL files store every triangle with its own copy of the vertices, so
+coinciding vertices are merged to get a connected mesh.
+"""
+
+import struct  # To read binary STL files.
+
+BINARY_HEADER_SIZE = 80  # Bytes of free-form header at the start of a binary STL file.
+BINARY_TRIANGLE = struct.Struct("<12fH")  # Normal, three vertices and an attribute byte count.
+
+
+def read_stl(path):
+    """
+    Reads the geometry of an STL file.
+    :param path: The path to the STL file.
+    :return: A tuple of a list of vertices, each a tuple of X, Y and Z, and a list of triangles, each a tuple of three
+    indices into the list of vertices.
+    :raises: `ValueError` if the file is not a valid STL file, or `EnvironmentError` if it can't be read.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+
+    if len(data) >= BINARY_HEADER_SIZE + 4:
+        num_triangles = struct.unpack_from("<I", data, BINARY_HEADER_SIZE)[0]
+        if len(data) == BINARY_HEADER_SIZE + 4 + num_triangles * BINARY_TRIANGLE.size:
+            return _read_binary(data, num_triangles)
+    if data.lstrip()[:5].lower() == b"solid":
+        return _read_ascii(data)
+    raise ValueError("Not a binary or ASCII STL file.")
+
+
+def _merge(corners):
+    """
+    Merge coinciding vertices of a list of triangle corners.
+    :param corners: A flat sequence of vertex positions, three for each triangle.
+    :return: The vertices and the triangles, like `read_stl`.
+    """
+    vertex_index = {}
+    vertices = []
+    indices = []
+    for corner in corners:
+        index = vertex_index.get(corner)
+        if index is None:
+            index = len(vertices)
+            vertex_index[corner] = index
+            vertices.append(corner)
+        indices.append(index)
+    triangles = list(zip(indices[0::3], indices[1::3], indices[2::3]))
+    return vertices, triangles
+
+
+def _read_binary(data, num_triangles):
+    """
+    Reads the triangles of a binary STL file.
+    """
+    corners = []
+    for values in BINARY_TRIANGLE.iter_unpack(memoryview(data)[BINARY_HEADER_SIZE + 4:]):
+        corners.append(values[3:6])
+        corners.append(values[6:9])
+        corners.append(values[9:12])
+    return _merge(corners)
+
+
+def _read_ascii(data):
+    """
+    Reads the triangles of an ASCII STL file.
+    """
+    corners = []
+    for line in data.decode("ascii", errors="replace").splitlines():
+        parts = line.split()
+        if len(parts) == 4 and parts[0].lower() == "vertex":
+            try:
+                corners.append((float(parts[1]), float(parts[2]), float(parts[3])))
+            except ValueError:
+                raise ValueError(f"Malformed vertex in STL file: {line.strip()}")
+    if len(corners) % 3 != 0:
+        raise ValueError("STL file contains an incomplete triangle.")
+    return _merge(corners)
@@ -0,0 +1,324 @@
+# Bambu Lab 3MF Tools - 3MF model writing.
+# Original 3MF code by Ghostkeeper (2020).
+# Copyright (C) 2025 jsonify
+# This add-on is free software: you can redistribute it and/or modify it under the terms of the GNU General
+# Public License as published by the Free Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+# This add-on is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied
+# warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# details.
+# You should have received a copy of the GNU General Public License along with this plug-in. If not, see
+# <https://gnu.org/licenses/>.
+
+# <pep8 compliant>
+
+"""
+Writes 3D model documents of 3MF files from plain data structures. Independent of Blender.
+
+Geometry can be given as nested sequences or as NumPy arrays. Transformations are 4x4 matrices indexed as
+`matrix[row][column]`, which includes Blender's matrices.
+"""
+
+import collections  # For Counter.
+import itertools
+import xml.etree.ElementTree  # To write XML documents with the 3D model data.
+
+from ..constants import *
+from .paint import PAINT_CODES, PAINT_COLOR_ATTRIBUTE  # To write the filaments that triangles are painted with.
+
+
+def new_model():
+    """
+    Creates the root element of a new 3D model document.
+    :return: An empty <model> element.
+    """
+    # Due to an open bug in Python 3.7 (Blender's version) we need to prefix all elements with the namespace.
+    # Bug: https://bugs.python.org/issue17088
+    # Workaround: https://stackoverflow.com/questions/4997848/4999510#4999510
+    return xml.etree.ElementTree.Element(f"{{{MODEL_NAMESPACE}}}model")
+
+
+def write_metadata(node, metadata):
+    """
+    Writes metadata from a metadata storage into an XML node.
+    :param node: The node to add <metadata> tags to.
+    :param metadata: The collection of metadata to write to that node.
+    """
+    for metadata_entry in metadata.values():
+        metadata_node = xml.etree.ElementTree.SubElement(node, f"{{{MODEL_NAMESPACE}}}metadata")
+        metadata_node.attrib[f"{{{MODEL_NAMESPACE}}}name"] = metadata_entry.name
+        if metadata_entry.preserve:
+            metadata_node.attrib[f"{{{MODEL_NAMESPACE}}}preserve"] = "1"
+        if metadata_entry.datatype:
+            metadata_node.attrib[f"{{{MODEL_NAMESPACE}}}type"] = metadata_entry.datatype
+        metadata_node.text = metadata_entry.value
+
+
+def format_color(color):
+    """
+    Formats a color in 3MF's hexadecimal sRGB notation.
+    :param color: A sequence of red, green, blue and alpha, each between 0 and 1.
+    :return: A string like #RRGGBB, or #RRGGBBAA if the color is not completely opaque.
+    """
+    red = min(255, round(color[0] * 255))
+    green = min(255, round(color[1] * 255))
+    blue = min(255, round(color[2] * 255))
+    alpha = color[3]
+    if alpha >= 1.0:  # Completely opaque. Leave out the alpha component.
+        return "#%0.2X%0.2X%0.2X" % (red, green, blue)
+    alpha = min(255, round(alpha * 255))
+    return "#%0.2X%0.2X%0.2X%0.2X" % (red, green, blue, alpha)
+
+
+def write_basematerials(resources_element, resource_id, materials):
+    """
+    Writes a <basematerials> group into the resources of a 3MF document.
+    :param resources_element: A <resources> node from a 3MF document.
+    :param resource_id: The resource ID of the material group.
+    :param materials: A sequence of tuples, each containing the name and the display color of a material, in the order
+    of their indices in the group.
+    :return: The <basematerials> element.
+    """
+    basematerials_element = xml.etree.ElementTree.SubElement(
+        resources_element,
+        f"{{{MODEL_NAMESPACE}}}basematerials", attrib={
+            f"{{{MODEL_NAMESPACE}}}id": str(resource_id)
+        })
+    for name, color_hex in materials:
+        xml.etree.ElementTree.SubElement(basematerials_element, f"{{{MODEL_NAMESPACE}}}base", attrib={
+            f"{{{MODEL_NAMESPACE}}}name": name,
+            f"{{{MODEL_NAMESPACE}}}displaycolor": color_hex
+        })
+    return basematerials_element
+
+
+def is_identity(transformation):
+    """
+    Tests whether a transformation leaves everything in place.
+    :param transformation: A 4x4 transformation matrix.
+    :return: `True` if the matrix is the identity matrix, or `False` otherwise.
+    """
+    return all(transformation[row][column] == (1.0 if row == column else 0.0)
+               for row in range(4) for column in range(4))
+
+
+def format_transformation(transformation):
+    """
+    Formats a transformation matrix in 3MF's formatting.
+
+    This transformation matrix can then be written to an attribute.
+    :param transformation: The transformation matrix to format.
+    :return: A serialisation of the transformation matrix.
+    """
+    columns = zip(*transformation)  # 3MF lists the matrix column by column.
+    pieces = (column[:3] for column in columns)  # Don't convert the 4th column.
+    result = ""
+    for cell in itertools.chain.from_iterable(pieces):
+        if result != "":  # First loop, don't put a space in.
+            result += " "
+        result += format_number(cell, 6)  # Never use scientific notation!
+    return result
+
+
+def write_component(components_element, objectid, transformation=None):
+    """
+    Adds a component to an object with components.
+    :param components_element: The <components> element of the object.
+    :param objectid: The resource ID of the object that this component refers to.
+    :param transformation: The transformation of the component relative to its parent, or `None` if it has none.
+    :return: The <component> element.
+    """
+    component_element = xml.etree.ElementTree.SubElement(components_element, f"{{{MODEL_NAMESPACE}}}component")
+    component_element.attrib[f"{{{MODEL_NAMESPACE}}}objectid"] = str(objectid)
+    if transformation is not None and not is_identity(transformation):
+        component_element.attrib[f"{{{MODEL_NAMESPACE}}}transform"] = format_transformation(transformation)
+    return component_element
+
+
+def write_build_item(build_element, objectid, transformation=None):
+    """
+    Adds an item to the build of a 3MF document.
+    :param build_element: The <build> element of the document.
+    :param objectid: The resource ID of the object to build.
+    :param transformation: The transformation of the item, or `None` if it has none.
+    :return: The <item> element.
+    """
+    item_element = xml.etree.ElementTree.SubElement(build_element, f"{{{MODEL_NAMESPACE}}}item")
+    item_element.attrib[f"{{{MODEL_NAMESPACE}}}objectid"] = str(objectid)
+    if transformation is not None and not is_identity(transformation):
+        item_element.attrib[f"{{{MODEL_NAMESPACE}}}transform"] = format_transformation(transformation)
+    return item_element
+
+
+def _as_list(values):
+    """
+    Converts NumPy arrays to plain lists, which are much faster to iterate over. Other sequences are left alone.
+    """
+    return values.tolist() if hasattr(values, "tolist") else values
+
+
+def write_vertices(mesh_element, vertices, precision):
+    """
+    Writes a list of vertices into the specified mesh element.
+
+    This then becomes a resource that can be used in a build.
+    :param mesh_element: The <mesh> element of the 3MF document.
+    :param vertices: A sequence of the X, Y and Z coordinates of the vertices to add, such as an array of shape (N, 3).
+    :param precision: The number of decimal digits to write for each coordinate.
+    """
+    vertices_element = xml.etree.ElementTree.SubElement(mesh_element, f"{{{MODEL_NAMESPACE}}}vertices")
+
+    # Precompute some names for better performance.
+    vertex_name = f"{{{MODEL_NAMESPACE}}}vertex"
+    x_name = f"{{{MODEL_NAMESPACE}}}x"
+    y_name = f"{{{MODEL_NAMESPACE}}}y"
+    z_name = f"{{{MODEL_NAMESPACE}}}z"
+
+    for x, y, z in _as_list(vertices):  # Create the <vertex> elements.
+        vertex_element = xml.etree.ElementTree.SubElement(vertices_element, vertex_name)
+        vertex_element.attrib[x_name] = format_number(x, precision)
+        vertex_element.attrib[y_name] = format_number(y, precision)
+        vertex_element.attrib[z_name] = format_number(z, precision)
+
+
+def write_triangles(mesh_element, triangles, material_indices=None, object_material_index=-1, paint=None):
+    """
+    Writes a list of triangles into the specified mesh element.
+
+    This then becomes a resource that can be used in a build.
+    :param mesh_element: The <mesh> element of the 3MF document.
+    :param triangles: A sequence of the three vertex indices of each triangle, such as an array of shape (M, 3).
+    :param material_indices: For each triangle, the index of its material in the material group of the object, or a
+    negative number if the triangle has no material. May be `None` if no triangle has a material.
+    :param object_material_index: The index of the material that the object was written with. Triangles with this
+    material don't need to specify it.
+    :param paint: For each triangle, the filament that it is painted with, from 0 for unpainted to `MAX_FILAMENT`. May
+    be `None` if no triangle is painted. Written the way Bambu Studio paints them.
+    """
+    triangles_element = xml.etree.ElementTree.SubElement(mesh_element, f"{{{MODEL_NAMESPACE}}}triangles")
+
+    # Precompute some names for better performance.
+    triangle_name = f"{{{MODEL_NAMESPACE}}}triangle"
+    v1_name = f"{{{MODEL_NAMESPACE}}}v1"
+    v2_name = f"{{{MODEL_NAMESPACE}}}v2"
+    v3_name = f"{{{MODEL_NAMESPACE}}}v3"
+    p1_name = f"{{{MODEL_NAMESPACE}}}p1"
+    paint_name = f"{{{MODEL_NAMESPACE}}}{PAINT_COLOR_ATTRIBUTE}"
+
+    triangles = _as_list(triangles)
+    material_indices = _as_list(material_indices) if material_indices is not None else itertools.repeat(-1)
+    paint = _as_list(paint) if paint is not None else itertools.repeat(0)
+    for (v1, v2, v3), material_index, filament in zip(triangles, material_indices, paint):
+        triangle_element = xml.etree.ElementTree.SubElement(triangles_element, triangle_name)
+        triangle_element.attrib[v1_name] = str(v1)
+        triangle_element.attrib[v2_name] = str(v2)
+        triangle_element.attrib[v3_name] = str(v3)
+
+        if material_index >= 0 and material_index != object_material_index:
+            # Not equal to the index that our parent object was written with, so we must override it here.
+            triangle_element.attrib[p1_name] = str(material_index)
+        if filament:
+            triangle_element.attrib[paint_name] = PAINT_CODES[filament]
+
+
+def _write_object_metadata(element, metadata):
+    """
+    Writes the metadata of an object or build item, the way that the reader collected it.
+
+    The part number and object type were attributes in the original document, so they are written as attributes again.
+    :param element: The <object> or <item> element to write the metadata for.
+    :param metadata: The metadata that the reader collected for it.
+    """
+    other_metadata = []
+    for metadata_entry in metadata.values():
+        if metadata_entry.name == "3mf:partnumber":
+            element.attrib[f"{{{MODEL_NAMESPACE}}}partnumber"] = metadata_entry.value
+        elif metadata_entry.name == "3mf:object_type":
+            if metadata_entry.value != "model":
+                element.attrib[f"{{{MODEL_NAMESPACE}}}type"] = metadata_entry.value
+        else:
+            other_metadata.append(metadata_entry)
+    if other_metadata:
+        metadatagroup_element = xml.etree.ElementTree.SubElement(element, f"{{{MODEL_NAMESPACE}}}metadatagroup")
+        write_metadata(metadatagroup_element, {entry.name: entry for entry in other_metadata})
+
+
+def write_resources(root, resource_objects, build_items, precision):
+    """
+    Writes resources and build items as read by a `ModelReader` into a new 3D model document.
+
+    The resources are numbered anew. All materials that are used are written into a single material group.
+    :param root: The <model> element of the new document.
+    :param resource_objects: The resource objects to write, by their original resource IDs. Objects that are
+    referenced as components must come before the objects that reference them, as they do in a valid document.
+    :param build_items: The `BuildItem` tuples to write into the build.
+    :param precision: The number of decimal digits to write for each coordinate.
+    """
+    resources_element = xml.etree.ElementTree.SubElement(root, f"{{{MODEL_NAMESPACE}}}resources")
+
+    material_indices = {}  # The index of each material in the material group.
+    for resource_object in resource_objects.values():
+        for material in resource_object.materials:
+            if material is not None and material not in material_indices:
+                material_indices[material] = len(material_indices)
+    next_resource_id = 1
+    material_group_id = None
+    if material_indices:
+        material_group_id = next_resource_id
+        next_resource_id += 1
+        write_basematerials(resources_element, material_group_id, [
+            (material.name, format_color(material.color) if material.color is not None else "#FFFFFF")
+            for material in material_indices])
+
+    new_ids = {}
+    for original_id, resource_object in resource_objects.items():
+        new_ids[original_id] = str(next_resource_id)
+        next_resource_id += 1
+
+        object_element = xml.etree.ElementTree.SubElement(resources_element, f"{{{MODEL_NAMESPACE}}}object")
+        object_element.attrib[f"{{{MODEL_NAMESPACE}}}id"] = new_ids[original_id]
+        if resource_object.components:
+            components_element = xml.etree.ElementTree.SubElement(
+                object_element,
+                f"{{{MODEL_NAMESPACE}}}components")
+            for component in resource_object.components:
+                if component.resource_object not in new_ids:
+                    continue  # Refers to an object that was invalid or comes later, which 3MF doesn't allow.
+                write_component(components_element, new_ids[component.resource_object], component.transformation)
+        else:
+            triangle_materials = [material_indices[material] if material is not None else -1
+                                  for material in resource_object.materials]
+            most_common_material = -1
+            if material_group_id is not None and any(index >= 0 for index in triangle_materials):
+                counts = collections.Counter(index for index in triangle_materials if index >= 0)
+                most_common_material = counts.most_common(1)[0][0]
+                object_element.attrib[f"{{{MODEL_NAMESPACE}}}pid"] = str(material_group_id)
+                object_element.attrib[f"{{{MODEL_NAMESPACE}}}pindex"] = str(most_common_material)
+            mesh_element = xml.etree.ElementTree.SubElement(object_element, f"{{{MODEL_NAMESPACE}}}mesh")
+            write_vertices(mesh_element, resource_object.vertices, precision)
+            write_triangles(mesh_element, resource_object.triangles, triangle_materials, most_common_material,
+                            resource_object.paint)
+        _write_object_metadata(object_element, resource_object.metadata)
+
+    build_element = xml.etree.ElementTree.SubElement(root, f"{{{MODEL_NAMESPACE}}}build")
+    for build_item in build_items:
+        if build_item.objectid not in new_ids:
+            continue
+        item_element = write_build_item(build_element, new_ids[build_item.objectid], build_item.transformation)
+        _write_object_metadata(item_element, build_item.metadata)
+
+
+def format_number(number, decimals):
+    """
+    Properly formats a floating point number to a certain precision.
+
+    This format will never use scientific notation (no 3.14e-5 nonsense) and will have a fixed limit to the number
+    of decimals. It will not have a limit to the length of the integer part. Any trailing zeros are stripped.
+    :param number: A floating point number to format.
+    :param decimals: The maximum number of places after the radix to write.
+    :return: A string representing that number.
+    """
+    formatted = ("{:." + str(decimals) + "f}").format(number).rstrip("0").rstrip(".")
+    if formatted == "":
+        return "0"
+    return formatted
@@ -0,0 +1,137 @@
+# Bambu Lab 3MF Tools - Triangle budget reduction for exports.
+# Copyright (C) 2025 jsonify
+#
+# This add-on is free software: you can redistribute it and/or modify it under the terms of the GNU General
+# Public License as published by the Free Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+# This add-on is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied
+# warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# details.
+# You should have received a copy of the GNU General Public License along with this plug-in. If not, see
+# <https://gnu.org/licenses/>.
+
+# <pep8 compliant>
+
+"""
+Reduces the number of triangles of a mesh by vertex clustering.
+
+All vertices within the same cell of a uniform grid are merged into their average position. Triangles that collapse
+this way are removed. Because every vertex stays within its grid cell, the deviation from the original surface is
+bounded by the diagonal of a cell, which makes it possible to reduce to a maximum deviation in millimetres. To reduce to
+a triangle budget instead, the cell size is searched for.
+
+This works entirely on NumPy arrays and doesn't touch Blender data, so that multiple meshes can be reduced in parallel.
+"""
+
+import math  # To compute the cell size from a deviation.
+import numpy  # Bundled with Blender. For the bulk clustering.
+
+# Rough number of bytes that a vertex and a triangle take in the uncompressed 3D model file.
+VERTEX_BYTES = 50
+TRIANGLE_BYTES = 45
+
+# How many times to refine the cell size when reducing to a triangle budget.
+BUDGET_ITERATIONS = 8
+
+
+def cluster(coordinates, triangles, material_indices, cell_size):
+    """
+    Merge all vertices that fall in the same grid cell.
+    :param coordinates: Array of shape (N, 3) with the vertex coordinates.
+    :param triangles: Integer array of shape (M, 3) with the vertex indices of each triangle.
+    :param material_indices: Integer array of length M with a material index for each triangle.
+    :param cell_size: The size of the grid cells.
+    :return: A tuple of new coordinates, triangles and material indices.
+    """
+    # Encode each grid cell as a single integer, so that the clusters can be found with a 1D sort.
+    cells = numpy.floor((coordinates - coordinates.min(axis=0)) / cell_size).astype(numpy.int64)
+    dimensions = cells.max(axis=0) + 1 if len(cells) else numpy.ones(3, dtype=numpy.int64)
+    if math.prod(int(dimension) for dimension in dimensions) < 2 ** 62:
+        cell_keys = (cells[:, 0] * dimensions[1] + cells[:, 1]) * dimensions[2] + cells[:, 2]
+        _, vertex_to_cluster = numpy.unique(cell_keys, return_inverse=True)
+    else:  # Cells too small to encode in one integer. Fall back to the slower row-wise sort.
+        _, vertex_to_cluster = numpy.unique(cells, axis=0, return_inverse=True)
+    vertex_to_cluster = vertex_to_cluster.ravel()
+    num_clusters = int(vertex_to_cluster.max()) + 1 if len(vertex_to_cluster) else 0
+
+    # Each cluster becomes a vertex at the average position of the vertices in it.
+    counts = numpy.bincount(vertex_to_cluster, minlength=num_clusters)
+    new_coordinates = numpy.empty((num_clusters, 3))
+    for axis in range(3):
+        new_coordinates[:, axis] = numpy.bincount(vertex_to_cluster, weights=coordinates[:, axis],
+                                                  minlength=num_clusters) / counts
+
+    new_triangles = vertex_to_cluster[triangles]
+    keep = (new_triangles[:, 0] != new_triangles[:, 1]) & (new_triangles[:, 1] != new_triangles[:, 2]) \
+        & (new_triangles[:, 2] != new_triangles[:, 0])
+    new_triangles = new_triangles[keep]
+    new_materials = material_indices[keep]
+
+    # Different triangles may collapse onto the same three vertices. Keep only one of them.
+    # The keys are built in two steps to prevent them from overflowing with many clusters.
+    sorted_corners = numpy.sort(new_triangles, axis=1)
+    _, first_pair = numpy.unique(sorted_corners[:, 0] * num_clusters + sorted_corners[:, 1], return_inverse=True)
+    _, unique_indices = numpy.unique(first_pair.ravel() * num_clusters + sorted_corners[:, 2], return_index=True)
+    unique_indices.sort()  # Keep the original order of triangles, for better compression.
+    return new_coordinates, new_triangles[unique_indices], new_materials[unique_indices]
+
+
+def reduce_to_deviation(coordinates, triangles, material_indices, deviation):
+    """
+    Reduce a mesh as much as possible without moving its surface further than a certain distance.
+    :param coordinates: Array of shape (N, 3) with the vertex coordinates.
+    :param triangles: Integer array of shape (M, 3) with the vertex indices of each triangle.
+    :param material_indices: Integer array of length M with a material index for each triangle.
+    :param deviation: The maximum distance that any vertex may move, in the units of the coordinates.
+    :return: A tuple of new coordinates, triangles and material indices.
+    """
+    return cluster(coordinates, triangles, material_indices, deviation / math.sqrt(3))
+
+
+def reduce_to_budget(coordinates, triangles, material_indices, budget):
+    """
+    Reduce a mesh to at most a certain number of triangles.
+
+    The cell size is first guessed from the surface area of the mesh, assuming that every cell that the surface passes
+    through ends up as about two triangles. It is then refined, using that the triangle count scales with the inverse
+    square of the cell size.
+    :param coordinates: Array of shape (N, 3) with the vertex coordinates.
+    :param triangles: Integer array of shape (M, 3) with the vertex indices of each triangle.
+    :param material_indices: Integer array of length M with a material index for each triangle.
+    :param budget: The maximum number of triangles of the result.
+    :return: A tuple of new coordinates, triangles and material indices.
+    """
+    corners = coordinates[triangles]
+    normals = numpy.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+    area = numpy.linalg.norm(normals, axis=1).sum() / 2
+    cell_size = math.sqrt(2 * area / budget) if area > 0 else numpy.ptp(coordinates, axis=0).max()
+
+    best = None  # The result closest to the budget that stays within the budget.
+    for _ in range(BUDGET_ITERATIONS):
+        result = cluster(coordinates, triangles, material_indices, cell_size)
+        count = len(result[1])
+        if count <= budget:
+            if best is None or count > len(best[1]):
+                best = result
+            if count >= budget * 0.9:
+                break  # Close enough.
+        cell_size *= math.sqrt(max(count, 1) / budget)
+        if count > budget:
+            cell_size *= 1.05  # Overshoot slightly so that the next attempt ends up under the budget.
+
+    while best is None:  # Never got under the budget. Keep coarsening until we do.
+        cell_size *= 1.5
+        result = cluster(coordinates, triangles, material_indices, cell_size)
+        if len(result[1]) <= budget:
+            best = result
+    return best
+
+
+def estimated_size(num_vertices, num_triangles):
+    """
+    Estimate how many bytes a mesh takes in the uncompressed 3D model file.
+    :param num_vertices: The number of vertices of the mesh.
+    :param num_triangles: The number of triangles of the mesh.
+    :return: An estimate of the size of the mesh, in bytes.
+    """
+    return num_vertices * VERTEX_BYTES + num_triangles * TRIANGLE_BYTES
@@ -12,64 +12,45 @@
 
 # <pep8 compliant>
 
-import base64  # To decode files that must be preserved.
 import bpy  # The Blender API.
-import bpy.props  # To define metadata properties for the operator.
-import bpy.types  # This class is an operator in Blender, and to find meshes in the scene.
-import bpy_extras.io_utils  # Helper functions to export meshes more easily.
 import bpy_extras.node_shader_utils  # Converting material colors to sRGB.
-import collections  # Counter, to find the most common material of an object.
-import itertools
+import collections  # Namedtuple for the mesh data.
+import concurrent.futures  # To reduce multiple meshes in parallel.
 import logging  # To debug and log progress.
 import mathutils  # For the transformation matrices.
+import numpy  # Bundled with Blender. To find the most common material of an object.
+import os.path  # To measure the size of the written archive.
 import xml.etree.ElementTree  # To write XML documents with the 3D model data.
-import zipfile  # To write zip archives, the shell of the 3MF file.
 
 from .annotations import Annotations  # To store file annotations
 from .constants import *
+from .core import writer  # To write the 3D model data.
+from .core.archive import create_archive, write_compressed, write_document  # To write the 3MF zip archive.
+from .core.paint import MAX_FILAMENT, PAINT_COLOR_ATTRIBUTE  # To write the filaments that faces are painted with.
+from .decimation import estimated_size, reduce_to_budget, reduce_to_deviation  # To reduce triangle counts.
+# To read meshes in bulk.
+from .mesh_arrays import triangle_face_attribute, triangle_indices, triangle_material_indices, vertex_coordinates
+from .mesh_health import analyze, describe, is_healthy  # To warn about meshes that slicers will complain about.
 from .metadata import Metadata  # To store metadata from the Blender scene into the 3MF file.
+from .operators import OperatorImplementation  # The operator that this implements.
+from . import preserved  # To read the files that must be preserved.
+from .profiling import profiled  # To measure the phases of the export.
 from .unit_conversions import blender_to_metre, threemf_to_metre
 
 log = logging.getLogger(__name__)
 
+# The geometry of an object to export, as NumPy arrays. The scale is the factor from the object's local space to
+# millimetres in the 3MF file. For geometry that is instanced, it is the largest factor of all instances. The paint is
+# the filament of each triangle, or `None` if no triangle is painted.
+MeshData = collections.namedtuple("MeshData", ["coordinates", "triangles", "material_indices", "scale", "paint"])
 
-class Export3MF(bpy.types.Operator, bpy_extras.io_utils.ExportHelper):
+
+class Exporter(OperatorImplementation):
     """
-    Operator that exports a 3MF file from Blender.
+    Implementation of the operator that exports a 3MF file from Blender.
     """
 
-    # Metadata.
-    bl_idname = "export_mesh.3mf"
-    bl_label = "Export 3MF"
-    bl_description = "Save the current scene to 3MF"
-    filename_ext = ".3mf"
-
-    # Options for the user.
-    filter_glob: bpy.props.StringProperty(
-        default="*.3mf",
-        options={'HIDDEN'})
-    use_selection: bpy.props.BoolProperty(
-        name="Selection Only",
-        description="Export selected objects only.",
-        default=False)
-    global_scale: bpy.props.FloatProperty(
-        name="Scale",
-        default=1.0,
-        soft_min=0.001,
-        soft_max=1000.0,
-        min=1e-6,
-        max=1e6)
-    use_mesh_modifiers: bpy.props.BoolProperty(
-        name="Apply Modifiers",
-        description="Apply the modifiers before saving.",
-        default=True)
-    coordinate_precision: bpy.props.IntProperty(
-        name="Precision",
-        description="The number of decimal digits to use in coordinates in the file.",
-        default=4,
-        min=0,
-        max=12)
-
+    @profiled("export")
     def execute(self, context):
         """
         The main routine that writes the 3MF archive.
@@ -83,8 +64,15 @@ class Export3MF(bpy.types.Operator, bpy_extras.io_utils.ExportHelper):
         self.material_resource_id = -1
         self.num_written = 0
         self.material_name_to_index = {}
-
-        archive = self.create_archive(self.filepath)
+        self.unhealthy_objects = []  # Tuples of object names and the problems found in their meshes.
+        self.mesh_data = {}  # The geometry to write for each object, by object name, or by key for instanced geometry.
+        self.mesh_names = {}  # The name to report problems with the geometry with, by the same keys as `mesh_data`.
+        self.instances = {}  # For each object that instances geometry, a list of the geometry and transformation.
+        self.instance_materials = {}  # The material of each slot of each instanced geometry, by key. None if empty.
+        self.instance_resource_ids = {}  # The resource ID of each instanced geometry that was written, by key.
+
+        with self.profile.phase("create_archive"):
+            archive = self.create_archive(self.filepath)
         if archive is None:
             return {'CANCELLED'}
 
@@ -95,27 +83,40 @@ class Export3MF(bpy.types.Operator, bpy_extras.io_utils.ExportHelper):
 
         global_scale = self.unit_scale(context)
 
-        # Due to an open bug in Python 3.7 (Blender's version) we need to prefix all elements with the namespace.
-        # Bug: https://bugs.python.org/issue17088
-        # Workaround: https://stackoverflow.com/questions/4997848/4999510#4999510
-        root = xml.etree.ElementTree.Element(f"{{{MODEL_NAMESPACE}}}model")
+        with self.profile.phase("collect_meshes"):
+            self.collect_meshes(blender_objects, global_scale)
+        if self.decimate_mode != 'NONE':
+            with self.profile.phase("decimate"):
+                self.decimate_meshes()
+        if self.check_mesh_health:
+            with self.profile.phase("mesh_health"):
+                self.check_meshes()
+
+        root = writer.new_model()
 
         scene_metadata = Metadata()
         scene_metadata.retrieve(bpy.context.scene)
-        self.write_metadata(root, scene_metadata)
+        writer.write_metadata(root, scene_metadata)
 
         resources_element = xml.etree.ElementTree.SubElement(root, f"{{{MODEL_NAMESPACE}}}resources")
-        self.material_name_to_index = self.write_materials(resources_element, blender_objects)
-        self.write_objects(root, resources_element, blender_objects, global_scale)
+        with self.profile.phase("write_materials"):
+            self.material_name_to_index = self.write_materials(resources_element, blender_objects)
+        with self.profile.phase("write_objects"):
+            self.write_objects(root, resources_element, blender_objects, global_scale)
 
-        document = xml.etree.ElementTree.ElementTree(root)
-        with archive.open(MODEL_LOCATION, 'w') as f:
-            document.write(f, xml_declaration=True, encoding='UTF-8', default_namespace=MODEL_NAMESPACE)
+        with self.profile.phase("write_document"):  # Serializes the XML and deflates it into the archive.
+            write_document(archive, root)
         try:
-            archive.close()
+            with self.profile.phase("close_archive"):
+                archive.close()
         except EnvironmentError as e:
             log.error(f"Unable to complete writing to 3MF archive: {e}")
             return {'CANCELLED'}
+        self.profile.count("objects_written", self.num_written)
+        self.profile.count("bytes_written", os.path.getsize(self.filepath))
+
+        for object_name, problems in self.unhealthy_objects:
+            self.report({'WARNING'}, f"{object_name}: {problems}")
 
         log.info(f"Exported {self.num_written} objects to 3MF archive {self.filepath}.")
         return {'FINISHED'}
@@ -131,7 +132,7 @@ class Export3MF(bpy.types.Operator, bpy_extras.io_utils.ExportHelper):
         :return: A zip archive that other functions can add things to.
         """
         try:
-            archive = zipfile.ZipFile(filepath, 'w', compression=zipfile.ZIP_DEFLATED, compresslevel=9)
+            archive = create_archive(filepath)
 
             # Store the file annotations we got from imported 3MF files, and store them in the archive.
             annotations = Annotations()
@@ -149,20 +150,12 @@ class Export3MF(bpy.types.Operator, bpy_extras.io_utils.ExportHelper):
         """
         Write files that must be preserved to the archive.
 
-        These files were stored in the Blender scene in a hidden location.
+        These files were stored in the Blender data in a hidden location, still compressed. They are copied into the
+        archive without compressing them again.
         :param archive: The archive to write files to.
         """
-        for textfile in bpy.data.texts:
-            filename = textfile.name
-            if not filename.startswith(".3mf_preserved/"):
-                continue  # Unrelated file. Not ours to read.
-            contents = textfile.as_string()
-            if contents == conflicting_mustpreserve_contents:
-                continue  # This file was in conflict. Don't preserve any copy of it then.
-            contents = base64.b85decode(contents.encode("UTF-8"))
-            filename = filename[len(".3mf_preserved/"):]
-            with archive.open(filename, 'w') as f:
-                f.write(contents)
+        for filename, compressed_file in preserved.retrieve():
+            write_compressed(archive, filename, compressed_file)
 
     def unit_scale(self, context):
         """
@@ -195,55 +188,232 @@ class Export3MF(bpy.types.Operator, bpy_extras.io_utils.ExportHelper):
         mapping, the objects and triangles can write down an index referring to the list of <base> tags.
 
         Since the <base> material can only hold a color, we'll write the diffuse color of the material to the file.
+
+        The materials of the geometry that these objects instance are written too, so `collect_meshes` must be called
+        first.
         :param resources_element: A <resources> node from a 3MF document.
         :param blender_objects: A list of Blender objects that may have materials which we need to write to the
         document.
         :return: A mapping from material name to the index of that material in the <basematerials> tag.
         """
         name_to_index = {}  # The output list, mapping from material name to indexes in the <basematerials> tag.
-        next_index = 0
-
-        # Create an element lazily. We don't want to create an element if there are no materials to write.
-        basematerials_element = None
+        materials = []  # The name and color of each material, in order of their indices.
+
+        all_materials = [material_slot.material
+                         for blender_object in blender_objects for material_slot in blender_object.material_slots]
+        for materials_of_instance in self.instance_materials.values():
+            all_materials.extend(materials_of_instance)
+        for material in all_materials:
+            if material is None:  # Empty material slot.
+                continue
+            material_name = material.name
+            if material_name in name_to_index:  # Already have this material through another object.
+                continue
 
-        for blender_object in blender_objects:
-            for material_slot in blender_object.material_slots:
-                material = material_slot.material
+            # Wrap this material into a principled render node, to convert its color to sRGB.
+            principled = bpy_extras.node_shader_utils.PrincipledBSDFWrapper(material, is_readonly=True)
+            color = principled.base_color
+            color_hex = writer.format_color((color[0], color[1], color[2], principled.alpha))
 
-                material_name = material.name
-                if material_name in name_to_index:  # Already have this material through another object.
-                    continue
+            name_to_index[material_name] = len(materials)
+            materials.append((material_name, color_hex))
 
-                # Wrap this material into a principled render node, to convert its color to sRGB.
-                principled = bpy_extras.node_shader_utils.PrincipledBSDFWrapper(material, is_readonly=True)
-                color = principled.base_color
-                red = min(255, round(color[0] * 255))
-                green = min(255, round(color[1] * 255))
-                blue = min(255, round(color[2] * 255))
-                alpha = principled.alpha
-                if alpha >= 1.0:  # Completely opaque. Leave out the alpha component.
-                    color_hex = "#%0.2X%0.2X%0.2X" % (red, green, blue)
-                else:
-                    alpha = min(255, round(alpha * 255))
-                    color_hex = "#%0.2X%0.2X%0.2X%0.2X" % (red, green, blue, alpha)
-
-                if basematerials_element is None:
-                    self.material_resource_id = str(self.next_resource_id)
-                    self.next_resource_id += 1
-                    basematerials_element = xml.etree.ElementTree.SubElement(
-                        resources_element,
-                        f"{{{MODEL_NAMESPACE}}}basematerials", attrib={
-                            f"{{{MODEL_NAMESPACE}}}id": self.material_resource_id
-                        })
-                xml.etree.ElementTree.SubElement(basematerials_element, f"{{{MODEL_NAMESPACE}}}base", attrib={
-                    f"{{{MODEL_NAMESPACE}}}name": material_name,
-                    f"{{{MODEL_NAMESPACE}}}displaycolor": color_hex
-                })
-                name_to_index[material_name] = next_index
-                next_index += 1
+        # Don't create an element if there are no materials to write.
+        if materials:
+            self.material_resource_id = str(self.next_resource_id)
+            self.next_resource_id += 1
+            writer.write_basematerials(resources_element, self.material_resource_id, materials)
 
         return name_to_index
 
+    def collect_meshes(self, blender_objects, global_scale):
+        """
+        Read the geometry of all objects that will be written, into `self.mesh_data`.
+
+        This visits the same objects as `write_objects` does. Reading all geometry up front allows processing the
+        meshes independently of each other before they get written.
+        :param blender_objects: A list of Blender objects that need to be written.
+        :param global_scale: A scaling factor to apply to all objects to convert the units.
+        """
+        if self.use_mesh_modifiers:
+            dependency_graph = bpy.context.evaluated_depsgraph_get()
+        pending = [blender_object for blender_object in blender_objects
+                   if blender_object.parent is None and blender_object.type in {'MESH', 'EMPTY'}]
+        while pending:
+            blender_object = pending.pop()
+            pending.extend(child for child in blender_object.children if child.type == 'MESH')
+            if blender_object.name in self.mesh_data:
+                continue
+
+            if blender_object.mode == 'EDIT':
+                blender_object.update_from_editmode()  # Apply recent changes made to the model.
+            # We may need to apply the mesh modifiers, which causes these objects to lose their children. That's why
+            # the evaluated object is only used to get the mesh.
+            evaluated_object = blender_object
+            if self.use_mesh_modifiers:
+                evaluated_object = blender_object.evaluated_get(dependency_graph)
+            scale = global_scale * max(abs(axis) for axis in blender_object.matrix_world.to_scale())
+            self.read_mesh(blender_object.name, blender_object.name, evaluated_object, scale)
+
+        with self.profile.phase("collect_instances"):
+            self.collect_instances(blender_objects, global_scale)
+
+    def read_mesh(self, key, name, evaluated_object, scale):
+        """
+        Read the geometry of one object into `self.mesh_data`.
+        :param key: The key to store the geometry under in `self.mesh_data`.
+        :param name: The name of the geometry, to report problems with.
+        :param evaluated_object: The object to get the mesh from.
+        :param scale: The factor from the object's local space to millimetres in the 3MF file.
+        """
+        try:
+            mesh = evaluated_object.to_mesh()
+        except RuntimeError:  # Object.to_mesh() is not guaranteed to return Optional[Mesh], apparently.
+            return
+        if mesh is None:
+            return
+
+        # Need to convert this to triangles-only, because 3MF doesn't support faces with more than 3 vertices.
+        mesh.calc_loop_triangles()
+        paint = None
+        if self.use_paint:
+            paint = triangle_face_attribute(mesh, PAINT_COLOR_ATTRIBUTE)
+            if paint is not None:
+                paint[(paint < 0) | (paint > MAX_FILAMENT)] = 0  # Filaments that can't be written count as unpainted.
+                if not paint.any():
+                    paint = None
+        mesh_data = MeshData(
+            coordinates=vertex_coordinates(mesh),
+            triangles=triangle_indices(mesh),
+            material_indices=triangle_material_indices(mesh),
+            scale=scale,
+            paint=paint)
+        evaluated_object.to_mesh_clear()
+        self.mesh_data[key] = mesh_data
+        self.mesh_names[key] = name
+
+    def collect_instances(self, blender_objects, global_scale):
+        """
+        Read the geometry that the objects instance, like the objects of a collection instance or the instances made
+        with geometry nodes.
+
+        Instances that share their geometry are only read once, so that their geometry is only written once. Each
+        instance is then written as a component that refers to that geometry, with its own transformation. The geometry
+        is stored in `self.mesh_data`, under a key of its own. For each object that instances anything, `self.instances`
+        gets a list of the key of the geometry and the world transformation of each instance.
+
+        Instances always use the evaluated geometry, since that is the only geometry that they have.
+        :param blender_objects: A list of Blender objects that need to be written.
+        :param global_scale: A scaling factor to apply to all objects to convert the units.
+        """
+        object_names = {blender_object.name for blender_object in blender_objects}
+        geometry_keys = {}  # The key of each geometry in `self.mesh_data`, by the address of its evaluated mesh.
+        dependency_graph = bpy.context.evaluated_depsgraph_get()
+        # The instances are only valid while iterating, so everything we need must be copied out of them right away.
+        for instance in dependency_graph.object_instances:
+            if not instance.is_instance or instance.object.type != 'MESH':
+                continue
+            instancer_name = instance.parent.original.name
+            if instancer_name not in object_names:
+                continue  # Not being exported.
+            evaluated_object = instance.object
+            address = evaluated_object.data.as_pointer()
+            key = geometry_keys.get(address)
+            scale = global_scale * max(abs(axis) for axis in instance.matrix_world.to_scale())
+            if key is None:  # First instance of this geometry.
+                key = ("instance", len(geometry_keys))  # Never the same as the name of an object.
+                geometry_keys[address] = key
+                self.read_mesh(key, evaluated_object.name, evaluated_object, scale)
+                self.instance_materials[key] = [
+                    material_slot.material.original if material_slot.material is not None else None
+                    for material_slot in evaluated_object.material_slots]
+            elif key in self.mesh_data and scale > self.mesh_data[key].scale:
+                # The geometry is reduced once for all instances, so the deviation must hold for the largest one.
+                self.mesh_data[key] = self.mesh_data[key]._replace(scale=scale)
+            self.instances.setdefault(instancer_name, []).append((key, instance.matrix_world.copy()))
+        self.profile.count("instances", sum(len(instances) for instances in self.instances.values()))
+
+    def decimate_meshes(self):
+        """
+        Reduce the number of triangles of the collected meshes, according to the settings of the export.
+
+        Meshes are independent of each other, so they are reduced in parallel. Meshes that are already within the
+        triangle budget are skipped. The result only replaces the collected geometry, so the scene is untouched.
+        """
+        jobs = {}
+        for name, mesh_data in self.mesh_data.items():
+            if len(mesh_data.triangles) == 0 or mesh_data.scale == 0:
+                continue
+            if self.decimate_mode == 'TRIANGLES' and len(mesh_data.triangles) <= self.decimate_triangles:
+                continue  # Already within budget.
+            jobs[name] = mesh_data
+        if not jobs:
+            return
+
+        # Operator properties may not be accessed from the worker threads. Read them out beforehand.
+        mode = self.decimate_mode
+        budget = self.decimate_triangles
+        deviation = self.decimate_deviation
+
+        num_states = MAX_FILAMENT + 1  # Number of different values that the paint of a triangle can have.
+
+        def reduce(mesh_data):
+            # Triangles only keep a single attribute through the reduction. Combine the paint into it, if any.
+            triangle_attribute = mesh_data.material_indices
+            if mesh_data.paint is not None:
+                triangle_attribute = triangle_attribute * num_states + mesh_data.paint
+            if mode == 'TRIANGLES':
+                result = reduce_to_budget(mesh_data.coordinates, mesh_data.triangles, triangle_attribute, budget)
+            else:  # The deviation is given in millimetres, but the coordinates are in the object's local space.
+                result = reduce_to_deviation(
+                    mesh_data.coordinates, mesh_data.triangles, triangle_attribute, deviation / mesh_data.scale)
+            coordinates, triangles, triangle_attribute = result
+            if mesh_data.paint is None:
+                return coordinates, triangles, triangle_attribute, None
+            return coordinates, triangles, triangle_attribute // num_states, triangle_attribute % num_states
+
+        size_before = 0
+        size_after = 0
+        triangles_before = 0
+        triangles_after = 0
+        with concurrent.futures.ThreadPoolExecutor() as pool:  # NumPy releases the GIL for the heavy lifting.
+            results = dict(zip(jobs.keys(), pool.map(reduce, jobs.values())))
+        for name, (coordinates, triangles, material_indices, paint) in results.items():
+            original = jobs[name]
+            if len(triangles) >= len(original.triangles) * 0.95:
+                continue  # Not worth it. Keep the original geometry.
+            self.mesh_data[name] = original._replace(
+                coordinates=coordinates,
+                triangles=triangles,
+                material_indices=material_indices,
+                paint=paint)
+            size_before += estimated_size(len(original.coordinates), len(original.triangles))
+            size_after += estimated_size(len(coordinates), len(triangles))
+            triangles_before += len(original.triangles)
+            triangles_after += len(triangles)
+
+        if triangles_before == 0:
+            self.report({'INFO'}, "No meshes needed to be reduced")
+            return
+        self.report({'INFO'}, f"Reduced {triangles_before} to {triangles_after} triangles "
+                              f"({100 - 100 * triangles_after / triangles_before:.0f}% less for the slicer to load), "
+                              f"saving about {(size_before - size_after) / 1e6:.1f}MB of model data")
+
+    def check_meshes(self):
+        """
+        Check the health of the collected meshes, and remember the problems to report them.
+
+        This happens after the meshes are reduced, so that the problems are those of the geometry that gets written.
+        """
+        for key, mesh_data in self.mesh_data.items():
+            if len(mesh_data.triangles) == 0:
+                continue
+            health = analyze(mesh_data.coordinates, mesh_data.triangles)
+            if not is_healthy(health):
+                name = self.mesh_names[key]
+                log.warning(f"Mesh of {name} has problems: {describe(health)}")
+                self.unhealthy_objects.append((name, describe(health)))
+
     def write_objects(self, root, resources_element, blender_objects, global_scale):
         """
         Writes a group of objects into the 3MF archive.
@@ -255,24 +425,15 @@ class Export3MF(bpy.types.Operator, bpy_extras.io_utils.ExportHelper):
         transformation = mathutils.Matrix.Scale(global_scale, 4)
 
         build_element = xml.etree.ElementTree.SubElement(root, f"{{{MODEL_NAMESPACE}}}build")
-        for blender_object in blender_objects:
-            if blender_object.parent is not None:
-                continue  # Only write objects that have no parent, since we'll get the child objects recursively.
-            if blender_object.type not in {'MESH', 'EMPTY'}:
-                continue
-
+        # Only write objects that have no parent, since we'll get the child objects recursively.
+        blender_objects = [blender_object for blender_object in blender_objects
+                           if blender_object.parent is None and blender_object.type in {'MESH', 'EMPTY'}]
+        for blender_object, metadata in zip(blender_objects, Metadata.retrieve_all(blender_objects)):
             objectid, mesh_transformation = self.write_object_resource(resources_element, blender_object)
 
-            item_element = xml.etree.ElementTree.SubElement(build_element, f"{{{MODEL_NAMESPACE}}}item")
+            item_element = writer.write_build_item(build_element, objectid, transformation @ mesh_transformation)
             self.num_written += 1
-            item_element.attrib[f"{{{MODEL_NAMESPACE}}}objectid"] = str(objectid)
-            mesh_transformation = transformation @ mesh_transformation
-            if mesh_transformation != mathutils.Matrix.Identity(4):
-                item_element.attrib[f"{{{MODEL_NAMESPACE}}}transform"] =\
-                    self.format_transformation(mesh_transformation)
-
-            metadata = Metadata()
-            metadata.retrieve(blender_object)
+
             if "3mf:partnumber" in metadata:
                 item_element.attrib[f"{{{MODEL_NAMESPACE}}}partnumber"] = metadata["3mf:partnumber"].value
                 del metadata["3mf:partnumber"]
@@ -280,16 +441,16 @@ class Export3MF(bpy.types.Operator, bpy_extras.io_utils.ExportHelper):
                 metadatagroup_element = xml.etree.ElementTree.SubElement(
                     item_element,
                     f"{{{MODEL_NAMESPACE}}}metadatagroup")
-                self.write_metadata(metadatagroup_element, metadata)
+                writer.write_metadata(metadatagroup_element, metadata)
 
     def write_object_resource(self, resources_element, blender_object):
         """
         Write a single Blender object and all of its children to the resources of a 3MF document.
 
         If the object contains a mesh it'll get written to the document as an object with a mesh resource. If the object
-        contains children it'll get written to the document as an object with components. If the object contains both,
-        two objects will be written; one with the mesh and another with the components. The mesh then gets added as a
-        component of the object with components.
+        contains children or instances it'll get written to the document as an object with components. If the object
+        contains both, two objects will be written; one with the mesh and another with the components. The mesh then
+        gets added as a component of the object with components.
         :param resources_element: The <resources> element of the 3MF document to write into.
         :param blender_object: A Blender object to write to that XML element.
         :return: A tuple, containing the object ID of the newly written resource and a transformation matrix that this
@@ -301,19 +462,20 @@ class Export3MF(bpy.types.Operator, bpy_extras.io_utils.ExportHelper):
         object_element.attrib[f"{{{MODEL_NAMESPACE}}}id"] = str(new_resource_id)
 
         metadata = Metadata()
-        metadata.retrieve(blender_object.data)
+        if blender_object.data is not None:  # Empties, like collection instances, have no data.
+            metadata.retrieve(blender_object.data)
         if "3mf:object_type" in metadata:
             object_type = metadata["3mf:object_type"].value
             if object_type != "model":  # Only write if not the default.
                 object_element.attrib[f"{{{MODEL_NAMESPACE}}}type"] = object_type
             del metadata["3mf:object_type"]
 
-        if blender_object.mode == 'EDIT':
-            blender_object.update_from_editmode()  # Apply recent changes made to the model.
         mesh_transformation = blender_object.matrix_world
 
         child_objects = blender_object.children
-        if child_objects:  # Only write the <components> tag if there are actually components.
+        instances = self.instances.get(blender_object.name, [])
+        has_components = bool(child_objects) or bool(instances)
+        if has_components:  # Only write the <components> tag if there are actually components.
             components_element = xml.etree.ElementTree.SubElement(
                 object_element,
                 f"{{{MODEL_NAMESPACE}}}components")
@@ -325,75 +487,39 @@ class Export3MF(bpy.types.Operator, bpy_extras.io_utils.ExportHelper):
                 # Use pseudo-inverse for safety, but the epsilon then doesn't matter since it'll get multiplied by 0
                 # later anyway then.
                 child_transformation = mesh_transformation.inverted_safe() @ child_transformation
-                component_element = xml.etree.ElementTree.SubElement(
-                    components_element,
-                    f"{{{MODEL_NAMESPACE}}}component")
+                writer.write_component(components_element, child_id, child_transformation)
+                self.num_written += 1
+            inverse_transformation = mesh_transformation.inverted_safe()
+            for key, instance_transformation in instances:
+                if key not in self.mesh_data:
+                    continue  # Instanced an object without mesh.
+                if key not in self.instance_resource_ids:  # Write each instanced geometry only once.
+                    self.instance_resource_ids[key] = self.write_instance_resource(resources_element, key)
+                instance_transformation = inverse_transformation @ instance_transformation
+                writer.write_component(components_element, self.instance_resource_ids[key], instance_transformation)
                 self.num_written += 1
-                component_element.attrib[f"{{{MODEL_NAMESPACE}}}objectid"] = str(child_id)
-                if child_transformation != mathutils.Matrix.Identity(4):
-                    component_element.attrib[f"{{{MODEL_NAMESPACE}}}transform"] =\
-                        self.format_transformation(child_transformation)
-
-        # In the tail recursion, get the vertex data.
-        # This is necessary because we may need to apply the mesh modifiers, which causes these objects to lose their
-        # children.
-        if self.use_mesh_modifiers:
-            dependency_graph = bpy.context.evaluated_depsgraph_get()
-            blender_object = blender_object.evaluated_get(dependency_graph)
 
-        try:
-            mesh = blender_object.to_mesh()
-        except RuntimeError:  # Object.to_mesh() is not guaranteed to return Optional[Mesh], apparently.
+        # In the tail recursion, write the vertex data that was collected before.
+        mesh_data = self.mesh_data.get(blender_object.name)
+        if mesh_data is None:
             return new_resource_id, mesh_transformation
-        if mesh is None:
-            return new_resource_id, mesh_transformation
-
-        # Need to convert this to triangles-only, because 3MF doesn't support faces with more than 3 vertices.
-        mesh.calc_loop_triangles()
 
-        if len(mesh.vertices) > 0:  # Only write a <mesh> tag if there is mesh data.
+        if len(mesh_data.coordinates) > 0:  # Only write a <mesh> tag if there is mesh data.
             # If this object already contains components, we can't also store a mesh. So create a new object and use
             # that object as another component.
-            if child_objects:
+            if has_components:
                 mesh_id = self.next_resource_id
                 self.next_resource_id += 1
                 mesh_object_element = xml.etree.ElementTree.SubElement(
                     resources_element,
                     f"{{{MODEL_NAMESPACE}}}object")
                 mesh_object_element.attrib[f"{{{MODEL_NAMESPACE}}}id"] = str(mesh_id)
-                component_element = xml.etree.ElementTree.SubElement(
-                    components_element,
-                    f"{{{MODEL_NAMESPACE}}}component")
+                writer.write_component(components_element, mesh_id)
                 self.num_written += 1
-                component_element.attrib[f"{{{MODEL_NAMESPACE}}}objectid"] = str(mesh_id)
             else:  # No components, then we can write directly into this object resource.
                 mesh_object_element = object_element
-            mesh_element = xml.etree.ElementTree.SubElement(mesh_object_element, f"{{{MODEL_NAMESPACE}}}mesh")
-
-            # Find the most common material for this mesh, for maximum compression.
-            material_indices = [triangle.material_index for triangle in mesh.loop_triangles]
-            # If there are no triangles, we provide 0 as index, but it'll not get read by write_triangles either then.
-            most_common_material_list_index = 0
-
-            if material_indices and blender_object.material_slots:
-                counter = collections.Counter(material_indices)
-                # most_common_material_object_index is an index from the MeshLoopTriangle, referring to the list of
-                # materials attached to the Blender object.
-                most_common_material_object_index = counter.most_common(1)[0][0]
-                most_common_material = blender_object.material_slots[most_common_material_object_index].material
-                # most_common_material_list_index is an index referring to our own list of materials that we put in the
-                # resources.
-                most_common_material_list_index = self.material_name_to_index[most_common_material.name]
-                # We always only write one group of materials. The resource ID was determined when it was written.
-                object_element.attrib[f"{{{MODEL_NAMESPACE}}}pid"] = str(self.material_resource_id)
-                object_element.attrib[f"{{{MODEL_NAMESPACE}}}pindex"] = str(most_common_material_list_index)
-
-            self.write_vertices(mesh_element, mesh.vertices)
-            self.write_triangles(
-                mesh_element,
-                mesh.loop_triangles,
-                most_common_material_list_index,
-                blender_object.material_slots)
+            materials = [material_slot.material for material_slot in blender_object.material_slots]
+            self.write_mesh(object_element, mesh_object_element, mesh_data, materials)
 
             # If the object has metadata, write that to a metadata object.
             if "3mf:partnumber" in metadata:
@@ -412,108 +538,77 @@ class Export3MF(bpy.types.Operator, bpy_extras.io_utils.ExportHelper):
                 metadatagroup_element = xml.etree.ElementTree.SubElement(
                     object_element,
                     f"{{{MODEL_NAMESPACE}}}metadatagroup")
-                self.write_metadata(metadatagroup_element, metadata)
+                writer.write_metadata(metadatagroup_element, metadata)
 
         return new_resource_id, mesh_transformation
 
-    def write_metadata(self, node, metadata):
+    def write_instance_resource(self, resources_element, key):
         """
-        Writes metadata from a metadata storage into an XML node.
-        :param node: The node to add <metadata> tags to.
-        :param metadata: The collection of metadata to write to that node.
-        """
-        for metadata_entry in metadata.values():
-            metadata_node = xml.etree.ElementTree.SubElement(node, f"{{{MODEL_NAMESPACE}}}metadata")
-            metadata_node.attrib[f"{{{MODEL_NAMESPACE}}}name"] = metadata_entry.name
-            if metadata_entry.preserve:
-                metadata_node.attrib[f"{{{MODEL_NAMESPACE}}}preserve"] = "1"
-            if metadata_entry.datatype:
-                metadata_node.attrib[f"{{{MODEL_NAMESPACE}}}type"] = metadata_entry.datatype
-            metadata_node.text = metadata_entry.value
-
-    def format_transformation(self, transformation):
+        Write geometry that is instanced to the resources of a 3MF document.
+        :param resources_element: The <resources> element of the 3MF document to write into.
+        :param key: The key of the instanced geometry in `self.mesh_data`.
+        :return: The object ID of the newly written resource.
         """
-        Formats a transformation matrix in 3MF's formatting.
+        new_resource_id = self.next_resource_id
+        self.next_resource_id += 1
+        object_element = xml.etree.ElementTree.SubElement(resources_element, f"{{{MODEL_NAMESPACE}}}object")
+        object_element.attrib[f"{{{MODEL_NAMESPACE}}}id"] = str(new_resource_id)
+        self.write_mesh(object_element, object_element, self.mesh_data[key], self.instance_materials[key])
+        return new_resource_id
 
-        This transformation matrix can then be written to an attribute.
-        :param transformation: The transformation matrix to format.
-        :return: A serialisation of the transformation matrix.
+    def write_mesh(self, object_element, mesh_object_element, mesh_data, materials):
         """
-        pieces = (row[:3] for row in transformation.transposed())  # Don't convert the 4th column.
-        result = ""
-        for cell in itertools.chain.from_iterable(pieces):
-            if result != "":  # First loop, don't put a space in.
-                result += " "
-            result += self.format_number(cell, 6)  # Never use scientific notation!
-        return result
-
-    def write_vertices(self, mesh_element, vertices):
+        Write the geometry of a mesh to an object resource.
+        :param object_element: The <object> element that gets the default material.
+        :param mesh_object_element: The <object> element to write the <mesh> into.
+        :param mesh_data: The `MeshData` to write.
+        :param materials: The material in each material slot of the mesh, or `None` for empty slots.
         """
-        Writes a list of vertices into the specified mesh element.
-
-        This then becomes a resource that can be used in a build.
-        :param mesh_element: The <mesh> element of the 3MF document.
-        :param vertices: A list of Blender vertices to add.
-        """
-        vertices_element = xml.etree.ElementTree.SubElement(mesh_element, f"{{{MODEL_NAMESPACE}}}vertices")
-
-        # Precompute some names for better performance.
-        vertex_name = f"{{{MODEL_NAMESPACE}}}vertex"
-        x_name = f"{{{MODEL_NAMESPACE}}}x"
-        y_name = f"{{{MODEL_NAMESPACE}}}y"
-        z_name = f"{{{MODEL_NAMESPACE}}}z"
-
-        for vertex in vertices:  # Create the <vertex> elements.
-            vertex_element = xml.etree.ElementTree.SubElement(vertices_element, vertex_name)
-            vertex_element.attrib[x_name] = self.format_number(vertex.co[0], self.coordinate_precision)
-            vertex_element.attrib[y_name] = self.format_number(vertex.co[1], self.coordinate_precision)
-            vertex_element.attrib[z_name] = self.format_number(vertex.co[2], self.coordinate_precision)
+        mesh_element = xml.etree.ElementTree.SubElement(mesh_object_element, f"{{{MODEL_NAMESPACE}}}mesh")
+
+        # Find the most common material for this mesh, for maximum compression.
+        material_indices = mesh_data.material_indices
+        # If there are no triangles, we provide 0 as index, but it'll not get read by write_triangles either then.
+        most_common_material_list_index = 0
+
+        filled_slots = [slot for slot, material in enumerate(materials) if material is not None]
+        if len(material_indices) > 0 and filled_slots:
+            # most_common_material_object_index is an index from the MeshLoopTriangle, referring to the list of
+            # materials attached to the Blender object. Empty slots can't be the default, since triangles that specify
+            # a material rely on the material group of the object.
+            slot_counts = numpy.bincount(material_indices, minlength=len(materials))
+            most_common_material_object_index = max(filled_slots, key=lambda slot: slot_counts[slot])
+            most_common_material = materials[most_common_material_object_index]
+            # most_common_material_list_index is an index referring to our own list of materials that we put in the
+            # resources.
+            most_common_material_list_index = self.material_name_to_index[most_common_material.name]
+            # We always only write one group of materials. The resource ID was determined when it was written.
+            object_element.attrib[f"{{{MODEL_NAMESPACE}}}pid"] = str(self.material_resource_id)
+            object_element.attrib[f"{{{MODEL_NAMESPACE}}}pindex"] = str(most_common_material_list_index)
+
+        with self.profile.phase("write_vertices"):
+            writer.write_vertices(mesh_element, mesh_data.coordinates, self.coordinate_precision)
+        with self.profile.phase("write_triangles"):
+            writer.write_triangles(
+                mesh_element,
+                mesh_data.triangles,
+                self.global_material_indices(material_indices, materials),
+                most_common_material_list_index,
+                mesh_data.paint)
+        self.profile.count("vertices", len(mesh_data.coordinates))
+        self.profile.count("triangles", len(mesh_data.triangles))
 
-    def write_triangles(self, mesh_element, triangles, object_material_list_index, material_slots):
-        """
-        Writes a list of triangles into the specified mesh element.
-
-        This then becomes a resource that can be used in a build.
-        :param mesh_element: The <mesh> element of the 3MF document.
-        :param triangles: A list of triangles. Each list is a list of indices to the list of vertices.
-        :param object_material_list_index: The index of the material that the object was written with to which these
-        triangles belong. If the triangle has a different index, we need to write the index with the triangle.
-        :param material_slots: List of materials belonging to the object for which we write triangles. These are
-        necessary to interpret the material indices stored in the MeshLoopTriangles.
+    def global_material_indices(self, material_indices, materials):
         """
-        triangles_element = xml.etree.ElementTree.SubElement(mesh_element, f"{{{MODEL_NAMESPACE}}}triangles")
-
-        # Precompute some names for better performance.
-        triangle_name = f"{{{MODEL_NAMESPACE}}}triangle"
-        v1_name = f"{{{MODEL_NAMESPACE}}}v1"
-        v2_name = f"{{{MODEL_NAMESPACE}}}v2"
-        v3_name = f"{{{MODEL_NAMESPACE}}}v3"
-        p1_name = f"{{{MODEL_NAMESPACE}}}p1"
-
-        for triangle in triangles:
-            triangle_element = xml.etree.ElementTree.SubElement(triangles_element, triangle_name)
-            triangle_element.attrib[v1_name] = str(triangle.vertices[0])
-            triangle_element.attrib[v2_name] = str(triangle.vertices[1])
-            triangle_element.attrib[v3_name] = str(triangle.vertices[2])
-
-            if triangle.material_index < len(material_slots):
-                # Convert to index in our global list.
-                material_index = self.material_name_to_index[material_slots[triangle.material_index].material.name]
-                if material_index != object_material_list_index:
-                    # Not equal to the index that our parent object was written with, so we must override it here.
-                    triangle_element.attrib[p1_name] = str(material_index)
-
-    def format_number(self, number, decimals):
-        """
-        Properly formats a floating point number to a certain precision.
-
-        This format will never use scientific notation (no 3.14e-5 nonsense) and will have a fixed limit to the number
-        of decimals. It will not have a limit to the length of the integer part. Any trailing zeros are stripped.
-        :param number: A floating point number to format.
-        :param decimals: The maximum number of places after the radix to write.
-        :return: A string representing that number.
+        Convert the material slot of each triangle to the index of its material in our <basematerials> tag.
+        :param material_indices: An array with the index of the material slot of each triangle.
+        :param materials: List of materials belonging to the object for which we write triangles, with `None` for empty
+        slots.
+        :return: An array with the index of the material of each triangle in our global list, or -1 for triangles of
+        which the material slot doesn't exist or is empty.
         """
-        formatted = ("{:." + str(decimals) + "f}").format(number).rstrip("0").rstrip(".")
-        if formatted == "":
-            return "0"
-        return formatted
+        slot_to_index = [self.material_name_to_index[material.name] if material is not None else -1
+                         for material in materials]
+        slot_to_index.append(-1)  # For any material slot that is out of range.
+        slot_to_index = numpy.array(slot_to_index)
+        return slot_to_index[numpy.minimum(material_indices, len(materials))]
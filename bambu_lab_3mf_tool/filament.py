@@ -0,0 +1,120 @@
+# Bambu Lab 3MF Tools - Filament usage estimation.
+# Copyright (C) 2025 jsonify
+#
+# This add-on is free software: you can redistribute it and/or modify it under the terms of the GNU General
+# Public License as published by the Free Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+# This add-on is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied
+# warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# details.
+# You should have received a copy of the GNU General Public License along with this plug-in. If not, see
+# <https://gnu.org/licenses/>.
+
+# <pep8 compliant>
+
+"""
+Estimates the amount of filament that a model needs, from the enclosed volume of its meshes.
+
+The estimate assumes solid parts. It doesn't account for infill, walls or supports, so it's an upper bound for the
+filament of the model itself.
+"""
+
+import numpy  # Bundled with Blender. For the vectorized volume calculation.
+import re  # To split material names into words.
+
+from .mesh_arrays import vertex_coordinates, triangle_indices, triangle_material_indices  # To read meshes in bulk.
+from .printers import FILAMENT_DENSITIES  # The filament types that are known.
+
+# Filament types in the order in which they are matched against material names. Longer names first, so that a
+# material called "PETG PC Blend" is taken for PETG.
+_MATCH_ORDER = sorted(FILAMENT_DENSITIES, key=len, reverse=True)
+# The words of a material name. Letters and digits are separate words, so that "PA6-CF" mentions PA.
+_WORD = re.compile(r"[A-Z]+|[0-9]+")
+
+# Volumes of meshes that were measured before. Keys are the session UIDs of the original objects. Values are tuples of
+# the number of material slots and the volume per material slot. Entries get dropped when the geometry changes.
+_volume_cache = {}
+
+
+def signed_volumes(coordinates, triangles, material_indices, num_slots):
+    """
+    Compute the enclosed volume of a triangle mesh, split by material slot.
+
+    Every triangle forms a tetrahedron with the centroid of the vertices. The signed volumes of these tetrahedra add up
+    to the enclosed volume of a closed mesh. Measuring from the centroid rather than the origin makes the split between
+    materials independent of where the object is placed, since each triangle then claims the cone of volume behind it.
+
+    Only the total is exact. The split between materials is an approximation: on concave parts, triangles that face
+    the centroid claim negative volume, so a slot can even get a negative volume.
+    :param coordinates: Array of shape (N, 3) with the vertex coordinates.
+    :param triangles: Array of shape (M, 3) with the vertex indices of each triangle.
+    :param material_indices: Array of length M with the material slot of each triangle.
+    :param num_slots: The number of material slots. The result has at least this length.
+    :return: An array with the volume per material slot, in cubed units of the coordinates.
+    """
+    if len(triangles) == 0:
+        return numpy.zeros(max(num_slots, 1))
+    centred = coordinates - coordinates.mean(axis=0)
+    a = centred[triangles[:, 0]]
+    b = centred[triangles[:, 1]]
+    c = centred[triangles[:, 2]]
+    tetrahedra = numpy.einsum("ij,ij->i", a, numpy.cross(b, c)) / 6.0
+    return numpy.bincount(material_indices, weights=tetrahedra, minlength=max(num_slots, 1))
+
+
+def filament_type(material_name, default_type):
+    """
+    Find out which filament type a material represents, based on its name.
+
+    Only whole words are matched, so that a material called "Transparent" or "Spare" isn't taken for PA.
+    :param material_name: The name of the Blender material, or `None` if the triangles have no material.
+    :param default_type: The filament type to use if the name doesn't mention any known filament type.
+    :return: A key of `FILAMENT_DENSITIES`.
+    """
+    if material_name:
+        words = set(_WORD.findall(material_name.upper()))
+        for candidate in _MATCH_ORDER:
+            if candidate in words:
+                return candidate
+    return default_type
+
+
+def cached_slot_volumes(blender_object, num_slots):
+    """
+    Get the volume per material slot of an object, re-using the previous result if its geometry didn't change since.
+
+    A cache hit doesn't evaluate or read the mesh at all. For that to be correct, `forget_slot_volumes` must be called
+    whenever the dependency graph reports that the geometry of an object changed.
+    :param blender_object: The evaluated object to measure.
+    :param num_slots: The number of material slots of the object.
+    :return: An array with the volume per material slot, in cubed Blender units, in the local space of the object. If
+    the object has no mesh, `None` is returned.
+    """
+    key = blender_object.original.session_uid
+    cached = _volume_cache.get(key)
+    if cached is not None and cached[0] == num_slots:
+        return cached[1]
+
+    mesh = blender_object.to_mesh()
+    if mesh is None:
+        return None
+    try:
+        mesh.calc_loop_triangles()
+        volumes = signed_volumes(
+            vertex_coordinates(mesh), triangle_indices(mesh), triangle_material_indices(mesh), num_slots)
+    finally:
+        blender_object.to_mesh_clear()
+    _volume_cache[key] = (num_slots, volumes)
+    return volumes
+
+
+def forget_slot_volumes(key=None):
+    """
+    Drop cached volumes, so that they get computed again the next time.
+    :param key: The session UID of the original object of which the geometry changed. If `None`, the whole cache is
+    cleared.
+    """
+    if key is None:
+        _volume_cache.clear()
+    else:
+        _volume_cache.pop(key, None)
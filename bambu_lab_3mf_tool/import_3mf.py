@@ -12,90 +12,155 @@
 
 # <pep8 compliant>
 
-import base64  # To encode MustPreserve files in the Blender scene.
 import bpy  # The Blender API.
 import bpy.ops  # To adjust the camera to fit models.
-import bpy.props  # To define metadata properties for the operator.
-import bpy.types  # This class is an operator in Blender.
-import bpy_extras.io_utils  # Helper functions to import meshes more easily.
 import bpy_extras.node_shader_utils  # Getting correct color spaces for materials.
+import collections  # To count how often resource objects are used.
 import logging  # To debug and log progress.
-import collections  # For namedtuple.
 import mathutils  # For the transformation matrices.
 import os.path  # To take file paths relative to the selected directory.
-import re  # To find files in the archive based on the content types.
-import xml.etree.ElementTree  # To parse the 3dmodel.model file.
-import zipfile  # To read the 3MF files which are secretly zip archives.
+import time  # To divide the import in steps of a certain duration.
+import xml.etree.ElementTree  # To catch errors parsing the 3dmodel.model file.
 
-from .annotations import Annotations, ContentType, Relationship  # To use annotations to decide on what to import.
+from .annotations import Annotations  # To use annotations to decide on what to import.
 from .constants import *
-from .metadata import MetadataEntry, Metadata  # To store and serialize metadata.
+# To read the 3MF files which are secretly zip archives.
+from .core.archive import read_archive, read_compressed, uncompressed_sizes
+# To choose which objects to import before reading their geometry.
+from .core.index import document_components, read_model_settings, required_objects
+# To show the filaments that triangles are painted with.
+from .core.paint import PAINT_COLOR_ATTRIBUTE, filament_color, read_filament_colors
+# To parse the 3dmodel.model file.
+from .core.reader import (
+    BuildItem,
+    ModelReader,
+    ResourceMaterial,
+    combine_document,
+    identity,
+    is_supported,
+    model_unit,
+    parse_model_incrementally,
+)
+from .metadata import Metadata  # To store and serialize metadata.
+from .operators import OperatorImplementation  # The operator that this implements.
+from . import preserved  # To store MustPreserve files in the Blender data.
+from .profiling import profiled  # To measure the phases of the import.
 from .unit_conversions import blender_to_metre, threemf_to_metre  # To convert to Blender's units.
 
 log = logging.getLogger(__name__)
 
-ResourceObject = collections.namedtuple("ResourceObject", [
-    "vertices",
-    "triangles",
-    "materials",
-    "components",
-    "metadata"])
-Component = collections.namedtuple("Component", ["resource_object", "transformation"])
-ResourceMaterial = collections.namedtuple("ResourceMaterial", ["name", "color"])
+CREATED_DATA = ("objects", "meshes", "materials", "collections")  # The kinds of data that the import creates.
+STEP_DURATION = 0.1  # Seconds to import before updating the interface, when importing in steps.
+TIMER_INTERVAL = 0.01  # Seconds between the end of a step and the start of the next, to let the interface update.
+# How the progress of a file is divided over parsing its model documents, reading their objects and building them.
+PARSE_SHARE = 0.5
+READ_SHARE = 0.2
+BUILD_SHARE = 0.3
 
 
-class Import3MF(bpy.types.Operator, bpy_extras.io_utils.ImportHelper):
+class Importer(OperatorImplementation):
     """
-    Operator that imports a 3MF file into Blender.
+    Implementation of the operator that imports a 3MF file into Blender.
     """
 
-    # Metadata.
-    bl_idname = "import_mesh.3mf"
-    bl_label = "Import 3MF"
-    bl_description = "Load a 3MF scene"
-    bl_options = {'UNDO'}
-    filename_ext = ".3mf"
-
-    # Options for the user.
-    filter_glob: bpy.props.StringProperty(default="*.3mf", options={'HIDDEN'})
-    files: bpy.props.CollectionProperty(name="File Path", type=bpy.types.OperatorFileListElement)
-    directory: bpy.props.StringProperty(subtype='DIR_PATH')
-    
-    scale_unit: bpy.props.EnumProperty(
-        name="Import Units",
-        description="How to scale the imported model",
-        items=[
-            ('MM_NATIVE', "Millimeters (1:1)", "Keep millimeter scale - 1 unit = 1mm (best for 3D printing)"),
-            ('MM_TO_M', "Millimeters → Meters", "Convert mm to meters (0.001x scale)"),
-            ('CUSTOM', "Custom Scale", "Use custom scale factor"),
-        ],
-        default='MM_NATIVE'
-    )
-    
-    global_scale: bpy.props.FloatProperty(
-        name="Custom Scale",
-        description="Custom scale factor (only used when Import Units is set to Custom)",
-        default=1.0,
-        soft_min=0.001,
-        soft_max=1000.0,
-        min=1e-6,
-        max=1e6
-    )
+    def execute(self, context):
+        """
+        Imports the 3MF files in one go.
+        :param context: The Blender context.
+        :return: A set of status flags to indicate whether the operation succeeded or not.
+        """
+        for _ in self.import_steps(context):
+            pass
+        return {'FINISHED'}
 
+    def start(self, context):
+        """
+        Starts importing the 3MF files in steps, in between which the interface shows the progress.
 
-    def execute(self, context):
+        The operator must then pass its modal events on to `modal`. Pressing Esc cancels the import.
+        :param context: The Blender context.
+        :return: A set of status flags for the operator.
+        """
+        # Remember what existed, to remove everything that the import created if it gets cancelled.
+        self.existing_data = {name: set(getattr(bpy.data, name)) for name in CREATED_DATA}
+        self.steps = self.import_steps(context)
+        window_manager = context.window_manager
+        window_manager.progress_begin(0, 1)
+        self.timer = window_manager.event_timer_add(TIMER_INTERVAL, window=context.window)
+        window_manager.modal_handler_add(self.operator)
+        return {'RUNNING_MODAL'}
+
+    def modal(self, context, event):
+        """
+        Handles an event while importing in steps. Timer events do the next steps of the import.
+        :param context: The Blender context.
+        :param event: The event that happened.
+        :return: A set of status flags for the operator.
+        """
+        if event.type == 'ESC':
+            self.cancel(context)
+            self.report({'WARNING'}, "Import cancelled")
+            return {'CANCELLED'}
+        if event.type != 'TIMER' or event.timer != self.timer:
+            return {'RUNNING_MODAL'}  # Don't let the user change the scene while we're adding to it.
+
+        deadline = time.perf_counter() + STEP_DURATION
+        try:
+            while time.perf_counter() < deadline:
+                progress = next(self.steps)
+        except StopIteration:
+            self.stop(context)
+            return {'FINISHED'}
+        except Exception:
+            self.cancel(context)
+            raise
+        context.window_manager.progress_update(progress)
+        context.workspace.status_text_set(
+            f"Importing 3MF: {self.bytes_parsed / 1e6:.0f} MB read, {self.num_loaded} objects built. "
+            f"Press Esc to cancel.")
+        return {'RUNNING_MODAL'}
+
+    def cancel(self, context):
+        """
+        Stops importing in steps, and removes everything that was created so far.
+        :param context: The Blender context.
+        """
+        self.steps.close()
+        created = [datablock for name, existing in self.existing_data.items()
+                   for datablock in getattr(bpy.data, name) if datablock not in existing]
+        bpy.data.batch_remove(created)
+        self.stop(context)
+
+    def stop(self, context):
+        """
+        Removes the progress from the interface, after importing in steps.
+        :param context: The Blender context.
+        """
+        window_manager = context.window_manager
+        window_manager.event_timer_remove(self.timer)
+        window_manager.progress_end()
+        context.workspace.status_text_set(None)
+
+    @profiled("import")
+    def import_steps(self, context):
         """
         The main routine that reads out the 3MF file.
 
-        This function serves as a high-level overview of the steps involved to read the 3MF file.
+        This function serves as a high-level overview of the steps involved to read the 3MF file. The work is done in
+        small steps, so that the import can show its progress and be cancelled. Nothing is stored in the scene or in the
+        Blender data other than the new objects, meshes, materials and collections until the very last step.
         :param context: The Blender context.
-        :return: A set of status flags to indicate whether the operation succeeded or not.
+        :return: A generator that yields the fraction of the import that is done after every step.
         """
         # Reset state.
         self.resource_objects = {}
-        self.resource_materials = {}
         self.resource_to_material = {}
         self.num_loaded = 0
+        self.bytes_parsed = 0
+        self.metadata_to_store = []  # Tuples of metadata and the Blender object to store it in, to store them at once.
+        self.files_to_preserve = []  # Arguments to `preserved.store`, to store them once the import is complete.
+        self.filament_colors = []  # The colors of the filaments of the current file, if it's a Bambu Studio project.
+        self.new_objects = []  # Objects built from the current file, to link them into the scene at once.
         scene_metadata = Metadata()
         # If there was already metadata in the scene, combine that with this file.
         scene_metadata.retrieve(bpy.context.scene)
@@ -115,245 +180,287 @@ class Import3MF(bpy.types.Operator, bpy_extras.io_utils.ImportHelper):
         if bpy.ops.object.select_all.poll():
             bpy.ops.object.select_all(action='DESELECT')  # Deselect other files.
 
-        for path in paths:
-            files_by_content_type = self.read_archive(path)  # Get the files from the archive.
+        # Only import some of the objects, if the user chose any.
+        chosen_names = [name.strip() for name in self.only_objects.split(",") if name.strip()]
+        chosen_plates = [self.only_plate] if self.only_plate > 0 else []
 
-            # File metadata.
-            for rels_file in files_by_content_type.get(RELS_MIMETYPE, []):
-                annotations.add_rels(rels_file)
-            annotations.add_content_types(files_by_content_type)
-            self.must_preserve(files_by_content_type, annotations)
+        for path_index, path in enumerate(paths):
+            with self.profile.phase("read_archive"):
+                files_by_content_type = read_archive(path)  # Get the files from the archive.
+                sizes = uncompressed_sizes(path)
+            is_chosen = None  # Tells whether an object was chosen, if not all objects are imported.
+            if chosen_names or chosen_plates:
+                is_chosen = self.choose_objects(files_by_content_type, chosen_names, chosen_plates)
 
-            # Read the model data.
-            for model_file in files_by_content_type.get(MODEL_MIMETYPE, []):
+            # File metadata.
+            with self.profile.phase("annotations"):
+                for rels_file in files_by_content_type.get(RELS_MIMETYPE, []):
+                    annotations.add_rels(rels_file)
+                annotations.add_content_types(files_by_content_type)
+                self.filament_colors = self.read_filament_colors(files_by_content_type)
+                self.must_preserve(path, files_by_content_type, annotations)
+
+            # Progress is divided equally over the files, and reading a file by the size of its model documents.
+            model_files = {model_file.name: model_file for model_file in files_by_content_type.get(MODEL_MIMETYPE, [])}
+            model_sizes = {document: max(1, sizes.get(document, 0)) for document in model_files}
+            total_size = max(1, sum(model_sizes.values()))
+            done_size = 0
+            model_size = 1
+
+            def progress(document_share):
+                read_share = (done_size * (PARSE_SHARE + READ_SHARE) + document_share * model_size) / total_size
+                return (path_index + read_share) / len(paths)
+
+            # Read the model data. The root document goes first, since the objects in there refer to those of others.
+            root_document = MODEL_LOCATION if MODEL_LOCATION in model_files else next(iter(model_files), None)
+            chosen = set()  # The chosen objects, as tuples of the path of their document and their resource ID.
+            components = {}  # The components of the objects in the documents parsed so far, as `document_components`.
+            units = {}  # The unit of each document that was read.
+            documents = {}  # The resource objects and build items of each document that was read.
+            for document in sorted(model_files, key=lambda document: document != root_document):
+                model_file = model_files[document]
+                model_size = model_sizes[document]
+                objectids = None  # The resource IDs of the objects to read, if not all of them.
                 try:
-                    document = xml.etree.ElementTree.ElementTree(file=model_file)
+                    if is_chosen is None:
+                        root = yield from self.parse_document(model_file, model_size, progress)
+                    else:
+                        objectids = {objectid for objectid_document, objectid in required_objects(chosen, components)
+                                     if objectid_document == document}
+                        if document != root_document and not objectids:
+                            done_size += model_size
+                            continue  # Nothing needed from this document. Don't even parse it.
+                        document_is_chosen = is_chosen if document == root_document else None
+                        root, objectids = yield from self.parse_selected(
+                            model_file, model_size, document, progress, document_is_chosen, chosen, components)
                 except xml.etree.ElementTree.ParseError as e:
-                    log.error(f"3MF document in {path} is malformed: {str(e)}")
-                    continue
-                if document is None:
                     # This file is corrupt or we can't read it. There is no error code to communicate this to Blender
                     # though.
+                    log.error(f"3MF document in {path} is malformed: {str(e)}")
+                    done_size += model_size
                     continue  # Leave the scene empty / skip this file.
-                root = document.getroot()
-                if not self.is_supported(root.attrib.get("requiredextensions", "")):
+                if not is_supported(root.attrib.get("requiredextensions", "")):
                     log.warning(f"3MF document in {path} requires unknown extensions.")
                     # Still continue processing even though the spec says not to. Our aim is to retrieve whatever
                     # information we can.
 
-                scale_unit = self.unit_scale(context, root)
-                self.resource_objects = {}
-                self.resource_materials = {}
-                scene_metadata = self.read_metadata(root, scene_metadata)
-                self.read_materials(root)
-                self.read_objects(root)
-                self.build_items(root, scale_unit)
-
-        scene_metadata.store(bpy.context.scene)
-        annotations.store()
+                reader = ModelReader(metadata_class=Metadata)
+                with self.profile.phase("read_objects"):
+                    scene_metadata = reader.read_metadata(root, scene_metadata)
+                    reader.read_materials(root)
+                    num_objects = max(1, len(root.findall("./3mf:resources/3mf:object", MODEL_NAMESPACES)))
+                    for num_read in reader.read_objects_incrementally(root, objectids):
+                        yield progress(PARSE_SHARE + READ_SHARE * num_read / num_objects)
+                    build_items = reader.read_build(root)
+                problems = reader.emit_diagnostics(f"{path} ({document})")
+                if problems:
+                    self.report({'WARNING'}, f"{os.path.basename(path)} is damaged: " + "; ".join(problems))
+                units[document] = model_unit(root)
+                documents[document] = (reader.resource_objects, build_items)
+                done_size += model_size
+
+            # Combine the documents, resolving the components that refer to objects in other documents.
+            root_unit = units.get(root_document, MODEL_DEFAULT_UNIT)
+            scales = {document: threemf_to_metre[unit] / threemf_to_metre[root_unit]
+                      for document, unit in units.items()}
+            self.resource_objects = {}
+            build_items = []
+            for document, (resource_objects, document_build_items) in documents.items():
+                combined_objects, combined_items = combine_document(
+                    resource_objects, document_build_items, document, root_document, scales)
+                self.resource_objects.update(combined_objects)
+                build_items.extend(combined_items)
+            if is_chosen is not None:
+                build_items = self.chosen_build_items(build_items, {objectid for _, objectid in chosen})
+            scale_unit = self.unit_scale(context, root_unit)
+            with self.profile.phase("build_objects"):
+                for num_built in self.build_items(build_items, scale_unit):
+                    built_share = BUILD_SHARE * num_built / len(build_items)
+                    yield (path_index + PARSE_SHARE + READ_SHARE + built_share) / len(paths)
+
+            with self.profile.phase("link_objects"):
+                self.link_objects(path)
+            yield (path_index + 1) / len(paths)
+
+        with self.profile.phase("store_metadata"):
+            Metadata.store_all(self.metadata_to_store)
+            scene_metadata.store(bpy.context.scene)
+            annotations.store()
+            for filename, contents, compressed_file in self.files_to_preserve:
+                preserved.store(filename, contents, compressed_file)
 
         # Zoom the camera to view the imported objects.
-        for area in bpy.context.screen.areas:
-            if area.type == 'VIEW_3D':
-                for region in area.regions:
-                    if region.type == 'WINDOW':
-                        with bpy.context.temp_override(area=area, region=region):
-                            bpy.ops.view3d.view_selected()
+        with self.profile.phase("view_selected"):
+            for area in bpy.context.screen.areas:
+                if area.type == 'VIEW_3D':
+                    for region in area.regions:
+                        if region.type == 'WINDOW':
+                            with bpy.context.temp_override(area=area, region=region):
+                                bpy.ops.view3d.view_selected()
+        self.profile.count("objects_built", self.num_loaded)
 
         log.info(f"Imported {self.num_loaded} objects from 3MF files.")
 
-        return {'FINISHED'}
-
-    # The rest of the functions are in order of when they are called.
-    def draw(self, context):
-        layout = self.layout
-        layout.use_property_split = True
-        layout.use_property_decorate = False
-        
-        layout.prop(self, "scale_unit")
-        
-        # Only show custom scale when "Custom" is selected
-        if self.scale_unit == 'CUSTOM':
-            layout.prop(self, "global_scale")
-
-    def read_archive(self, path):
-        """
-        Creates file streams from all the files in the archive.
-
-        The results are sorted by their content types. Consumers of this data can pick the content types that they know
-        from the file and process those.
-        :param path: The path to the archive to read.
-        :return: A dictionary with all of the resources in the archive by content type. The keys in this dictionary are
-        the different content types available in the file. The values in this dictionary are lists of input streams
-        referring to files in the archive.
-        """
-        result = {}
-        try:
-            archive = zipfile.ZipFile(path)
-            content_types = self.read_content_types(archive)
-            mime_types = self.assign_content_types(archive, content_types)
-            for path, mime_type in mime_types.items():
-                if mime_type not in result:
-                    result[mime_type] = []
-                # Zipfile can open an infinite number of streams at the same time. Don't worry about it.
-                result[mime_type].append(archive.open(path))
-        except (zipfile.BadZipFile, EnvironmentError) as e:
-            # File is corrupt, or the OS prevents us from reading it (doesn't exist, no permissions, etc.)
-            log.error(f"Unable to read archive: {e}")
-            return result
-        return result
-
-    def read_content_types(self, archive):
+    def choose_objects(self, files_by_content_type, chosen_names, chosen_plates):
         """
-        Read the content types from a 3MF archive.
-
-        The output of this reading is a list of MIME types that are each mapped to a regular expression that matches on
-        the file paths within the archive that could contain this content type. This encodes both types of descriptors
-        for the content types that can occur in the content types document: Extensions and full paths.
+        Makes the function that tells whether an object of the root model document was chosen to be imported.
 
-        The output is ordered in priority. Matches that should be evaluated first will be put in the front of the output
-        list.
-        :param archive: The 3MF archive to read the contents from.
-        :return: A list of tuples, in order of importance, where the first element describes a regex of paths that
-        match, and the second element is the MIME type string of the content type.
+        Bambu Studio projects store the names and plates of their objects in the model settings, which are read here.
+        This way the objects can be chosen while the model document is being parsed, without indexing it first.
+        :param files_by_content_type: The files in this 3MF archive, by content type.
+        :param chosen_names: Names or resource IDs of the objects to import.
+        :param chosen_plates: Numbers of Bambu Studio plates of which to import all objects.
+        :return: A function that gets the attributes of an <object> element, and tells whether it was chosen.
         """
-        namespaces = {"ct": "http://schemas.openxmlformats.org/package/2006/content-types"}
-        result = []
-
-        try:
-            with archive.open(CONTENT_TYPES_LOCATION) as f:
-                try:
-                    root = xml.etree.ElementTree.ElementTree(file=f)
-                except xml.etree.ElementTree.ParseError as e:
-                    log.warning(
-                        f"{CONTENT_TYPES_LOCATION} has malformed XML"
-                        f"(position {e.position[0]}:{e.position[1]}).")
-                    root = None
-
-                if root is not None:
-                    # Overrides are more important than defaults, so put those in front.
-                    for override_node in root.iterfind("ct:Override", namespaces):
-                        if "PartName" not in override_node.attrib or "ContentType" not in override_node.attrib:
-                            log.warning("[Content_Types].xml malformed: Override node without path or MIME type.")
-                            continue  # Ignore the broken one.
-                        match_regex = re.compile(re.escape(override_node.attrib["PartName"]))
-                        result.append((match_regex, override_node.attrib["ContentType"]))
-
-                    for default_node in root.iterfind("ct:Default", namespaces):
-                        if "Extension" not in default_node.attrib or "ContentType" not in default_node.attrib:
-                            log.warning("[Content_Types].xml malformed: Default node without extension or MIME type.")
-                            continue  # Ignore the broken one.
-                        match_regex = re.compile(r".*\." + re.escape(default_node.attrib["Extension"]))
-                        result.append((match_regex, default_node.attrib["ContentType"]))
-        except KeyError:  # ZipFile reports that the content types file doesn't exist.
-            log.warning(f"{CONTENT_TYPES_LOCATION} file missing!")
-
-        # This parser should be robust to slightly broken files and retrieve what we can.
-        # In case the document is broken or missing, here we'll append the default ones for 3MF.
-        # If the content types file was fine, this gets least priority so the actual data still wins.
-        result.append((re.compile(r".*\.rels"), RELS_MIMETYPE))
-        result.append((re.compile(r".*\.model"), MODEL_MIMETYPE))
-
+        names = {}
+        plates = {}
+        for files in files_by_content_type.values():
+            for file in files:
+                if file.name == BAMBU_MODEL_SETTINGS_LOCATION:
+                    names, plates = read_model_settings(file)
+                    file.seek(0)  # The model settings get preserved too.
+        chosen_names = set(chosen_names)
+        chosen_plates = set(chosen_plates)
+
+        def is_chosen(attrib):
+            objectid = attrib.get("id")
+            return objectid in chosen_names or names.get(objectid, attrib.get("name", "")) in chosen_names \
+                or plates.get(objectid) in chosen_plates
+        return is_chosen
+
+    def parse_document(self, model_file, model_size, progress, keep_mesh=None):
+        """
+        Parses a model document in steps.
+        :param model_file: The model document, as a file-like object.
+        :param model_size: The uncompressed size of the document in bytes, to tell how much of it has been parsed.
+        :param progress: Function that gets the share of the progress of the current document that is done, and gives
+        the progress of the import.
+        :param keep_mesh: Function that gets the attributes of every <object> element, and tells whether its mesh is
+        needed. If `None`, all meshes are parsed.
+        :return: A generator that yields the progress after every step, and returns the root element of the document.
+        :raises: `xml.etree.ElementTree.ParseError` if the document is malformed.
+        """
+        with self.profile.phase("parse"):  # Inflates the document from the archive while parsing it.
+            parser = parse_model_incrementally(model_file, keep_mesh=keep_mesh)
+            parsed_before = self.bytes_parsed
+            try:
+                while True:
+                    parsed = next(parser)
+                    self.bytes_parsed = parsed_before + parsed
+                    yield progress(PARSE_SHARE * min(1, parsed / model_size))
+            except StopIteration as done:
+                root = done.value
+        self.profile.count("bytes_inflated", model_file.tell())
+        return root
+
+    def parse_selected(self, model_file, model_size, document, progress, is_chosen, chosen, components):
+        """
+        Parses a model document, skipping the meshes of the objects that the chosen objects don't need.
+
+        Objects of the root document are needed if they are chosen. Objects of other documents are needed if the
+        objects read before refer to them. Objects are defined before the objects that refer to them, so if a chosen
+        object turns out to be assembled from objects of which the meshes were already skipped, the document is parsed
+        once more for those meshes.
+        :param model_file: The model document, as a file-like object.
+        :param model_size: The uncompressed size of the document in bytes.
+        :param document: The path of the document in the archive.
+        :param progress: Function that gives the progress of the import, like for `parse_document`.
+        :param is_chosen: Function that tells from the attributes of an object whether it was chosen, or `None` if no
+        objects can be chosen from this document.
+        :param chosen: The chosen objects so far, as tuples of the path of their document and their resource ID. Those
+        of this document get added.
+        :param components: The components of the objects parsed so far, as made by `document_components`. Those of this
+        document get added.
+        :return: A generator that yields the progress after every step, and returns a tuple of the root element of the
+        document and the resource IDs of the objects to read from it.
+        :raises: `xml.etree.ElementTree.ParseError` if the document is malformed.
+        """
+        needed = {objectid for objectid_document, objectid in required_objects(chosen, components)
+                  if objectid_document == document}
+        skipped = set()  # The resource IDs of the objects of which the mesh was skipped.
+
+        def keep_mesh(attrib):
+            objectid = attrib.get("id")
+            if is_chosen is not None and is_chosen(attrib):
+                chosen.add((document, objectid))
+                return True
+            if objectid in needed:
+                return True
+            skipped.add(objectid)
+            return False
+
+        root = yield from self.parse_document(model_file, model_size, progress, keep_mesh)
+        components.update(document_components(root, document))
+        objectids = {objectid for objectid_document, objectid in required_objects(chosen, components)
+                     if objectid_document == document}
+        if objectids & skipped:
+            needed = objectids
+            skipped.clear()
+            model_file.seek(0)
+            root = yield from self.parse_document(model_file, model_size, progress, keep_mesh)
+        return root, objectids
+
+    def chosen_build_items(self, build_items, chosen):
+        """
+        Get the build items that build the objects that were chosen to be imported.
+
+        Chosen objects that no build item refers to, like the parts of an assembly, are built on their own.
+        :param build_items: The build items of the archive.
+        :param chosen: The resource IDs of the chosen objects.
+        :return: The build items to build.
+        """
+        result = [build_item for build_item in build_items if build_item.objectid in chosen]
+        built = {build_item.objectid for build_item in result}
+        for objectid in sorted(chosen - built):
+            result.append(BuildItem(objectid=objectid, transformation=identity(), metadata=Metadata()))
         return result
 
-    def assign_content_types(self, archive, content_types):
+    def read_filament_colors(self, files_by_content_type):
         """
-        Assign a MIME type to each file in the archive.
-
-        The MIME types are obtained through the content types file from the archive. This content types file itself is
-        not in the result though.
-        :param archive: A 3MF archive with files to assign content types to.
-        :param content_types: The content types for files in that archive, in order of priority.
-        :return: A dictionary mapping all file paths in the archive to a content types. If the content type for a file
-        is unknown, the content type will be an empty string.
+        Reads the colors of the filaments from the print settings of a Bambu Studio project.
+        :param files_by_content_type: The files in this 3MF archive, by content type.
+        :return: A list with the color of each filament, starting with filament 1. Empty if the archive has no print
+        settings.
         """
-        result = {}
-        for file_info in archive.filelist:
-            file_path = file_info.filename
-            if file_path == CONTENT_TYPES_LOCATION:  # Don't index this one.
-                continue
-            for pattern, content_type in content_types:  # Process in the correct order!
-                if pattern.fullmatch(file_path):
-                    result[file_path] = content_type
-                    break
-            else:  # None of the patterns matched.
-                result[file_path] = ""
-
-        return result
-
-    def must_preserve(self, files_by_content_type, annotations):
-        """
-        Preserves files that are marked with the 'MustPreserve' relationship and PrintTickets.
-
-        These files are saved in the Blender context as text files in a hidden folder. If the preserved files are in
-        conflict with previously loaded 3MF archives (same file path, different content) then they will not be
-        preserved.
-
-        Archived files are stored in Base85 encoding to allow storing arbitrary files, even binary files. This sadly
-        means that the file size will increase by about 25%, and that the files are not human-readable any more when
-        opened in Blender, even if they were originally human-readable.
+        for files in files_by_content_type.values():
+            for file in files:
+                if file.name == BAMBU_SETTINGS_LOCATION:
+                    result = read_filament_colors(file)
+                    file.seek(0)  # The print settings get preserved too.
+                    return result
+        return []
+
+    def must_preserve(self, path, files_by_content_type, annotations):
+        """
+        Preserves files that are marked with the 'MustPreserve' relationship and PrintTickets, as well as thumbnails
+        and print settings.
+
+        These files are saved in the Blender data, compressed, in a hidden folder, once the import is complete. Until
+        then they are collected in `self.files_to_preserve`. If the preserved files are in conflict with previously
+        loaded 3MF archives (same file path, different content) then they will not be preserved. See the `preserved`
+        module for how they are stored. They are stored with the compressed data from the archive, so that they don't
+        need to be compressed again.
+        :param path: The path to the 3MF archive.
         :param files_by_content_type: The files in this 3MF archive, by content type. They must be provided by content
         type because that is how the ``read_archive`` function stores them, which is not ideal. But this function will
         sort that out.
         :param annotations: Collection of annotations gathered so far.
         """
-        preserved_files = set()  # Find all files which must be preserved according to the annotations.
-        for target, its_annotations in annotations.annotations.items():
-            for annotation in its_annotations:
-                if type(annotation) == Relationship:
-                    if annotation.namespace in {
-                        "http://schemas.openxmlformats.org/package/2006/relationships/mustpreserve",
-                        "http://schemas.microsoft.com/3dmanufacturing/2013/01/printticket"
-                    }:
-                        preserved_files.add(target)
-                elif type(annotation) == ContentType:
-                    if annotation.mime_type == "application/vnd.ms-printing.printticket+xml":
-                        preserved_files.add(target)
-
-        for files in files_by_content_type.values():
-            for file in files:
-                if file.name in preserved_files:
-                    filename = ".3mf_preserved/" + file.name
-                    if filename in bpy.data.texts:
-                        if bpy.data.texts[filename].as_string() == conflicting_mustpreserve_contents:
-                            # This file was previously already in conflict. The new file will always be in conflict with
-                            # one of the previous files.
-                            continue
-                    # Encode as Base85 so that the file can be saved in Blender's Text objects.
-                    file_contents = base64.b85encode(file.read()).decode('UTF-8')
-                    if filename in bpy.data.texts:
-                        if bpy.data.texts[filename].as_string() == file_contents:
-                            # File contents are EXACTLY the same, so the file is not in conflict.
-                            continue  # But we also don't need to re-add the same file then.
-                        else:  # Same file exists with different contents, so they are in conflict.
-                            bpy.data.texts[filename].clear()
-                            bpy.data.texts[filename].write(conflicting_mustpreserve_contents)
-                            continue
-                    else:  # File doesn't exist yet.
-                        handle = bpy.data.texts.new(filename)
-                        handle.write(file_contents)
-
-    def is_supported(self, required_extensions):
-        """
-        Determines if a document is supported by this add-on.
-        :param required_extensions: The value of the `requiredextensions` attribute of the root node of the XML
-        document.
-        :return: `True` if the document is supported, or `False` if it's not.
-        """
-        extensions = required_extensions.split(" ")
-        extensions = set(filter(lambda x: x != "", extensions))
-        return extensions <= SUPPORTED_EXTENSIONS
+        preserved_files = annotations.passthrough_targets()  # Find all files which must be preserved.
+        files = [file for files in files_by_content_type.values() for file in files if file.name in preserved_files]
+        if not files:
+            return
+        compressed_files = read_compressed(path, [file.name for file in files])
+        for file in files:
+            self.files_to_preserve.append((file.name, file.read(), compressed_files.get(file.name)))
 
-    def unit_scale(self, context, root):
+    def unit_scale(self, context, threemf_unit):
         """
         Get the scaling factor we need to use for this document, according to its unit.
         :param context: The Blender context.
-        :param root: An ElementTree root element containing the entire 3MF file.
+        :param threemf_unit: The unit of the root model document of the 3MF file.
         :return: Floating point value that we need to scale this model by.
         """
-        # Get the unit specified in the 3MF file (default is millimeter)
-        threemf_unit = root.attrib.get("unit", MODEL_DEFAULT_UNIT)
-        
         # Determine scale based on user's import unit preference
         if self.scale_unit == 'MM_NATIVE':
             # User wants millimeters: convert 3MF units to mm
@@ -368,316 +475,89 @@ class Import3MF(bpy.types.Operator, bpy_extras.io_utils.ImportHelper):
 
         return scale
 
-    def read_metadata(self, node, original_metadata=None):
+    def link_objects(self, path):
         """
-        Reads the metadata tags from a metadata group.
-        :param node: A node in the 3MF document that contains <metadata> tags. This can be either a root node, or a
-        <metadatagroup> node.
-        :param original_metadata: If there was already metadata for this context from other documents, you can provide
-        that metadata here. The metadata of those documents will be combined then.
-        :return: A `Metadata` object.
-        """
-        if original_metadata is not None:
-            metadata = original_metadata
-        else:
-            metadata = Metadata()  # Create a new Metadata object.
-
-        for metadata_node in node.iterfind("./3mf:metadata", MODEL_NAMESPACES):
-            if "name" not in metadata_node.attrib:
-                log.warning("Metadata entry without name is discarded.")
-                continue  # This attribute has no name, so there's no key by which I can save the metadata.
-            name = metadata_node.attrib["name"]
-            preserve_str = metadata_node.attrib.get("preserve", "0")
-            # We don't use this ourselves since we always preserve, but the preserve attribute itself will also be
-            # preserved.
-            preserve = preserve_str != "0" and preserve_str.lower() != "false"
-            datatype = metadata_node.attrib.get("type", "")
-            value = metadata_node.text
-
-            # Always store all metadata so that they are preserved.
-            metadata[name] = MetadataEntry(name=name, preserve=preserve, datatype=datatype, value=value)
-
-        return metadata
+        Adds the objects that were built from a 3MF file to the scene, and selects them.
 
-    def read_materials(self, root):
+        The objects are linked into a new collection named after the file, before that collection is added to the
+        scene. This way the view layer gets updated once, instead of once for every object.
+        :param path: The path to the 3MF file that the objects were built from.
         """
-        Read out all of the material resources from the 3MF document.
+        if not self.new_objects:
+            return
+        collection = bpy.data.collections.new(os.path.splitext(os.path.basename(path))[0])
+        for blender_object in self.new_objects:
+            collection.objects.link(blender_object)
+        bpy.context.collection.children.link(collection)
 
-        The materials will be stored in `self.resource_materials` until it gets used to build the items.
-        :param root: The root of an XML document that may contain materials.
-        """
-        for basematerials_item in root.iterfind("./3mf:resources/3mf:basematerials", MODEL_NAMESPACES):
-            try:
-                material_id = basematerials_item.attrib["id"]
-            except KeyError:
-                log.warning("Encountered a basematerials item without resource ID.")
-                continue  # Need to have an ID, or no item can reference to the materials. Skip this one.
-            if material_id in self.resource_materials:
-                log.warning(f"Duplicate material ID: {material_id}")
-                continue
+        for blender_object in self.new_objects:
+            blender_object.select_set(True)
+        bpy.context.view_layer.objects.active = self.new_objects[-1]
+        self.new_objects = []
 
-            # Use a dictionary mapping indices to resources, because some indices may be skipped due to being invalid.
-            self.resource_materials[material_id] = {}
-            index = 0
-
-            # "Base" must be the stupidest name for a material resource. Oh well.
-            for base_item in basematerials_item.iterfind("./3mf:base", MODEL_NAMESPACES):
-                name = base_item.attrib.get("name", "3MF Material")
-                color = base_item.attrib.get("displaycolor")
-                if color is not None:
-                    # Parse the color. It's a hexadecimal number indicating RGB or RGBA.
-                    color = color.lstrip("#")  # Should start with a #. We'll be lenient if it's not.
-                    try:
-                        color_int = int(color, 16)
-                        # Separate out up to four bytes from this int, from right to left.
-                        b1 = (color_int & 0x000000FF) / 255
-                        b2 = ((color_int & 0x0000FF00) >> 8) / 255
-                        b3 = ((color_int & 0x00FF0000) >> 16) / 255
-                        b4 = ((color_int & 0xFF000000) >> 24) / 255
-                        if len(color) == 6:  # RGB format.
-                            color = (b3, b2, b1, 1.0)  # b1, b2 and b3 are B, G, R respectively. b4 is always 0.
-                        else:  # RGBA format, or invalid.
-                            color = (b4, b3, b2, b1)  # b1, b2, b3 and b4 are A, B, G, R respectively.
-                    except ValueError:
-                        log.warning(f"Invalid color for material {name} of resource {material_id}: {color}")
-                        color = None  # Don't add a color for this material.
-
-                # Input is valid. Create a resource.
-                self.resource_materials[material_id][index] = ResourceMaterial(name=name, color=color)
-                index += 1
-
-            if len(self.resource_materials[material_id]) == 0:
-                del self.resource_materials[material_id]  # Don't leave empty material sets hanging.
-
-    def read_objects(self, root):
-        """
-        Reads all repeatable build objects from the resources of an XML root node.
-
-        This stores them in the resource_objects field.
-        :param root: The root node of a 3dmodel.model XML file.
-        """
-        for object_node in root.iterfind("./3mf:resources/3mf:object", MODEL_NAMESPACES):
-            try:
-                objectid = object_node.attrib["id"]
-            except KeyError:
-                log.warning("Object resource without ID!")
-                continue  # ID is required, otherwise the build can't refer to it.
-
-            pid = object_node.attrib.get("pid")  # Material ID.
-            pindex = object_node.attrib.get("pindex")  # Index within a collection of materials.
-            material = None
-            if pid is not None and pindex is not None:
-                try:
-                    index = int(pindex)
-                    material = self.resource_materials[pid][index]
-                except KeyError:
-                    log.warning(
-                        f"Object with ID {objectid} refers to material collection {pid} with index {pindex}"
-                        f"which doesn't exist.")
-                except ValueError:
-                    log.warning(f"Object with ID {objectid} specifies material index {pindex}, which is not integer.")
-
-            vertices = self.read_vertices(object_node)
-            triangles, materials = self.read_triangles(object_node, material, pid)
-            components = self.read_components(object_node)
-            metadata = Metadata()
-            for metadata_node in object_node.iterfind("./3mf:metadatagroup", MODEL_NAMESPACES):
-                metadata = self.read_metadata(metadata_node, metadata)
-            if "partnumber" in object_node.attrib:
-                # Blender has no way to ensure that custom properties get preserved if a mesh is split up, but for most
-                # operations this is retained properly.
-                metadata["3mf:partnumber"] = MetadataEntry(
-                    name="3mf:partnumber",
-                    preserve=True,
-                    datatype="xs:string",
-                    value=object_node.attrib["partnumber"])
-            metadata["3mf:object_type"] = MetadataEntry(
-                name="3mf:object_type",
-                preserve=True,
-                datatype="xs:string",
-                value=object_node.attrib.get("type", "model"))
-
-            self.resource_objects[objectid] = ResourceObject(
-                vertices=vertices,
-                triangles=triangles,
-                materials=materials,
-                components=components,
-                metadata=metadata)
-
-    def read_vertices(self, object_node):
-        """
-        Reads out the vertices from an XML node of an object.
-
-        If any vertex is corrupt, like with a coordinate missing or not proper floats, then the 0 coordinate will be
-        used. This is to prevent messing up the list of indices.
-        :param object_node: An <object> element from the 3dmodel.model file.
-        :return: List of vertices in that object. Each vertex is a tuple of 3 floats for X, Y and Z.
-        """
-        result = []
-        for vertex in object_node.iterfind("./3mf:mesh/3mf:vertices/3mf:vertex", MODEL_NAMESPACES):
-            attrib = vertex.attrib
-            try:
-                x = float(attrib.get("x", 0))
-            except ValueError:  # Not a float.
-                log.warning("Vertex missing X coordinate.")
-                x = 0
-            try:
-                y = float(attrib.get("y", 0))
-            except ValueError:
-                log.warning("Vertex missing Y coordinate.")
-                y = 0
-            try:
-                z = float(attrib.get("z", 0))
-            except ValueError:
-                log.warning("Vertex missing Z coordinate.")
-                z = 0
-            result.append((x, y, z))
-        return result
-
-    def read_triangles(self, object_node, default_material, material_pid):
-        """
-        Reads out the triangles from an XML node of an object.
-
-        These triangles always consist of 3 vertices each. Each vertex is an index to the list of vertices read
-        previously. The triangle also contains an associated material, or None if the triangle gets no material.
-        :param object_node: An <object> element from the 3dmodel.model file.
-        :param default_material: If the triangle specifies no material, it should get this material. May be `None` if
-        the model specifies no material.
-        :param material_pid: Triangles that specify a material index will get their material from this material group.
-        :return: Two lists of equal length. The first lists the vertices of each triangle, which are 3-tuples of
-        integers referring to the first, second and third vertex of the triangle. The second list contains a material
-        for each triangle, or `None` if the triangle doesn't get a material.
-        """
-        vertices = []
-        materials = []
-        for triangle in object_node.iterfind("./3mf:mesh/3mf:triangles/3mf:triangle", MODEL_NAMESPACES):
-            attrib = triangle.attrib
-            try:
-                v1 = int(attrib["v1"])
-                v2 = int(attrib["v2"])
-                v3 = int(attrib["v3"])
-                if v1 < 0 or v2 < 0 or v3 < 0:  # Negative indices are not allowed.
-                    log.warning("Triangle containing negative index to vertex list.")
-                    continue
-
-                pid = attrib.get("pid", material_pid)
-                p1 = attrib.get("p1")
-                if p1 is None:
-                    material = default_material
-                else:
-                    try:
-                        material = self.resource_materials[pid][int(p1)]
-                    except KeyError as e:
-                        # Sorry. It's hard to give an exception more specific than this.
-                        log.warning(f"Material {e} is missing.")
-                        material = default_material
-                    except ValueError as e:
-                        log.warning(f"Material index is not an integer: {e}")
-                        material = default_material
-
-                vertices.append((v1, v2, v3))
-                materials.append(material)
-            except KeyError as e:
-                log.warning(f"Vertex {e} is missing.")
-                continue
-            except ValueError as e:
-                log.warning(f"Vertex reference is not an integer: {e}")
-                continue  # No fallback this time. Leave out the entire triangle.
-        return vertices, materials
-
-    def read_components(self, object_node):
-        """
-        Reads out the components from an XML node of an object.
-
-        These components refer to other resource objects, with a transformation applied. They will eventually appear in
-        the scene as sub-objects.
-        :param object_node: An <object> element from the 3dmodel.model file.
-        :return: List of components in this object node.
-        """
-        result = []
-        for component_node in object_node.iterfind("./3mf:components/3mf:component", MODEL_NAMESPACES):
-            try:
-                objectid = component_node.attrib["objectid"]
-            except KeyError:  # ID is required.
-                continue  # Ignore this invalid component.
-            transform = self.parse_transformation(component_node.attrib.get("transform", ""))
-
-            result.append(Component(resource_object=objectid, transformation=transform))
-        return result
-
-    def parse_transformation(self, transformation_str):
-        """
-        Parses a transformation matrix as written in the 3MF files.
-
-        Transformations in 3MF files are written in the form:
-        `m00 m01 m01 m10 m11 m12 m20 m21 m22 m30 m31 m32`
-
-        This would then result in a row-major matrix of the form:
-        ```
-        _                 _
-        | m00 m01 m02 0.0 |
-        | m10 m11 m12 0.0 |
-        | m20 m21 m22 0.0 |
-        | m30 m31 m32 1.0 |
-        -                 -
-        ```
-        :param transformation_str: A transformation as represented in 3MF.
-        :return: A `Matrix` object with the correct transformation.
-        """
-        components = transformation_str.split(" ")
-        result = mathutils.Matrix.Identity(4)
-        if transformation_str == "":  # Early-out if transformation is missing. This is not malformed.
-            return result
-        row = -1
-        col = 0
-        for component in components:
-            row += 1
-            if row > 2:
-                col += 1
-                row = 0
-                if col > 3:
-                    log.warning(f"Transformation matrix contains too many components: {transformation_str}")
-                    break  # Too many components. Ignore the rest.
-            try:
-                component_float = float(component)
-            except ValueError:  # Not a proper float. Skip this one.
-                log.warning(f"Transformation matrix malformed: {transformation_str}")
-                continue
-            result[row][col] = component_float
-        return result
-
-    def build_items(self, root, scale_unit):
+    def build_items(self, build_items, scale_unit):
         """
         Builds the scene. This places objects with certain transformations in
         the scene.
-        :param root: The root node of the 3dmodel.model XML document.
+        :param build_items: The build items of the 3dmodel.model document, as read by the `ModelReader`.
         :param scale_unit: The scale to apply for the units of the model to be
         transformed to Blender's units, as a float ratio.
-        :return: A sequence of Blender Objects that need to be placed in the
-        scene. Each mesh gets transformed appropriately.
+        :return: A generator that yields the number of build items built so far after each build item.
         """
-        for build_item in root.iterfind("./3mf:build/3mf:item", MODEL_NAMESPACES):
-            try:
-                objectid = build_item.attrib["objectid"]
-                resource_object = self.resource_objects[objectid]
-            except KeyError:  # ID is required, and it must be in the available resource_objects.
-                log.warning("Encountered build item without object ID.")
-                continue  # Ignore this invalid item.
-
-            metadata = Metadata()
-            for metadata_node in build_item.iterfind("./3mf:metadatagroup", MODEL_NAMESPACES):
-                metadata = self.read_metadata(metadata_node, metadata)
-            if "partnumber" in build_item.attrib:
-                metadata["3mf:partnumber"] = MetadataEntry(
-                    name="3mf:partnumber",
-                    preserve=True,
-                    datatype="xs:string",
-                    value=build_item.attrib["partnumber"])
+        # Count how often each resource object is used, to find the components to instance.
+        self.reference_counts = collections.Counter(build_item.objectid for build_item in build_items)
+        for resource_object in self.resource_objects.values():
+            self.reference_counts.update(component.resource_object for component in resource_object.components)
+        self.instance_collections = {}  # The collections built for instanced components, by their resource IDs.
 
+        for num_built, build_item in enumerate(build_items, 1):
+            resource_object = self.resource_objects[build_item.objectid]
             transform = mathutils.Matrix.Scale(scale_unit, 4)
-            transform @= self.parse_transformation(build_item.attrib.get("transform", ""))
+            transform @= mathutils.Matrix(build_item.transformation)
 
-            self.build_object(resource_object, transform, metadata, [objectid])
+            self.build_reference(build_item.objectid, resource_object, transform, build_item.metadata,
+                                 [build_item.objectid])
+            yield num_built
+
+    def build_reference(self, objectid, resource_object, transformation, metadata, objectid_stack_trace, parent=None):
+        """
+        Converts a use of a resource object, by a build item or a component, into Blender objects.
+
+        If instancing is enabled and the resource object is an assembly of components that is used multiple times, it is
+        placed as an instance of a collection, which is only built the first time. Otherwise the object is built.
+        :param objectid: The resource ID of the resource object.
+        :param resource_object: The resource object that is used.
+        :param transformation: A transformation matrix to apply to this resource object.
+        :param metadata: A collection of metadata belonging to this build item.
+        :param objectid_stack_trace: A list of all object IDs that have been processed so far, including the object ID
+        we're processing now.
+        :param parent: The resulting object must be marked as a child of this Blender object.
+        """
+        if not self.use_instances or not resource_object.components or self.reference_counts[objectid] < 2:
+            self.build_object(resource_object, transformation, metadata, objectid_stack_trace, parent)
+            return
+
+        collection = self.instance_collections.get(objectid)
+        if collection is None:
+            # Build the assembly once, in its own coordinate system, in a collection that is not part of the scene.
+            outer_objects = self.new_objects
+            self.new_objects = []
+            self.build_object(resource_object, mathutils.Matrix.Identity(4), Metadata(), objectid_stack_trace)
+            collection = bpy.data.collections.new(f"3MF Component {objectid}")
+            for blender_object in self.new_objects:
+                collection.objects.link(blender_object)
+            self.new_objects = outer_objects
+            self.instance_collections[objectid] = collection
+
+        blender_object = bpy.data.objects.new("3MF Object", None)
+        blender_object.instance_type = 'COLLECTION'
+        blender_object.instance_collection = collection
+        self.num_loaded += 1
+        if parent is not None:
+            blender_object.parent = parent
+        blender_object.matrix_world = transformation
+        self.new_objects.append(blender_object)
+        self.metadata_to_store.append((metadata, blender_object))
 
     def build_object(self, resource_object, transformation, metadata, objectid_stack_trace, parent=None):
         """
@@ -698,39 +578,54 @@ class Import3MF(bpy.types.Operator, bpy_extras.io_utils.ImportHelper):
         # Create a mesh if there is mesh data here.
         mesh = None
         if resource_object.triangles:
-            mesh = bpy.data.meshes.new("3MF Mesh")
-            mesh.from_pydata(resource_object.vertices, [], resource_object.triangles)
-            mesh.update()
-            resource_object.metadata.store(mesh)
-
-            # Mapping resource materials to indices in the list of materials for this specific mesh.
-            materials_to_index = {}
-            for triangle_index, triangle_material in enumerate(resource_object.materials):
-                if triangle_material is None:
-                    continue
-
-                # Add the material to Blender if it doesn't exist yet. Otherwise create a new material in Blender.
-                if triangle_material not in self.resource_to_material:
-                    material = bpy.data.materials.new(triangle_material.name)
-                    material.use_nodes = True
-                    principled = bpy_extras.node_shader_utils.PrincipledBSDFWrapper(material, is_readonly=False)
-                    principled.base_color = triangle_material.color[:3]
-                    principled.alpha = triangle_material.color[3]
-                    self.resource_to_material[triangle_material] = material
-                else:
-                    material = self.resource_to_material[triangle_material]
-
-                # Add the material to this mesh if it doesn't have it yet. Otherwise re-use previous index.
-                if triangle_material not in materials_to_index:
-                    new_index = len(mesh.materials.items())
-                    if new_index > 32767:
-                        log.warning("Blender doesn't support more than 32768 different materials per mesh.")
+            with self.profile.phase("from_pydata"):
+                mesh = bpy.data.meshes.new("3MF Mesh")
+                mesh.from_pydata(resource_object.vertices, [], resource_object.triangles)
+                mesh.update()
+            self.profile.count("vertices", len(resource_object.vertices))
+            self.profile.count("triangles", len(resource_object.triangles))
+            self.metadata_to_store.append((resource_object.metadata, mesh))
+
+            with self.profile.phase("materials"):
+                triangle_materials = resource_object.materials
+                if resource_object.paint is not None:
+                    # Painted triangles get the material of their filament, so that the colors show.
+                    triangle_materials = self.paint_materials(resource_object.paint, triangle_materials)
+                    attribute = mesh.attributes.new(PAINT_COLOR_ATTRIBUTE, 'INT', 'FACE')
+                    attribute.data.foreach_set("value", resource_object.paint)
+
+                # Mapping resource materials to indices in the list of materials for this specific mesh.
+                materials_to_index = {}
+                material_indices = [0] * len(triangle_materials)
+                for triangle_index, triangle_material in enumerate(triangle_materials):
+                    if triangle_material is None:
                         continue
-                    mesh.materials.append(material)
-                    materials_to_index[triangle_material] = new_index
 
-                # Assign the material to the correct triangle.
-                mesh.polygons[triangle_index].material_index = materials_to_index[triangle_material]
+                    # Add the material to this mesh if it doesn't have it yet. Otherwise re-use previous index.
+                    if triangle_material not in materials_to_index:
+                        new_index = len(mesh.materials.items())
+                        if new_index > 32767:
+                            log.warning("Blender doesn't support more than 32768 different materials per mesh.")
+                            continue
+                        mesh.materials.append(self.blender_material(triangle_material))
+                        materials_to_index[triangle_material] = new_index
+
+                    # Assign the material to the correct triangle.
+                    material_indices[triangle_index] = materials_to_index[triangle_material]
+                if materials_to_index:
+                    mesh.polygons.foreach_set("material_index", material_indices)
+
+            with self.profile.phase("corner_properties"):
+                # Colors and texture coordinates of the materials extension go in attributes rather than materials,
+                # since full-color scans can have a different color on every corner. The corners of the mesh are in
+                # the same order as those of the triangles, so the flat arrays can be given to Blender as they are.
+                if resource_object.corner_colors is not None:
+                    color_attribute = mesh.color_attributes.new("Color", 'FLOAT_COLOR', 'CORNER')
+                    color_attribute.data.foreach_set("color_srgb", resource_object.corner_colors)
+                    mesh.color_attributes.active_color = color_attribute
+                if resource_object.corner_uvs is not None:
+                    uv_layer = mesh.uv_layers.new(name="UVMap", do_init=False)
+                    uv_layer.uv.foreach_set("vector", resource_object.corner_uvs)
 
         # Create an object.
         blender_object = bpy.data.objects.new("3MF Object", mesh)
@@ -738,10 +633,8 @@ class Import3MF(bpy.types.Operator, bpy_extras.io_utils.ImportHelper):
         if parent is not None:
             blender_object.parent = parent
         blender_object.matrix_world = transformation
-        bpy.context.collection.objects.link(blender_object)
-        bpy.context.view_layer.objects.active = blender_object
-        blender_object.select_set(True)
-        metadata.store(blender_object)
+        self.new_objects.append(blender_object)
+        self.metadata_to_store.append((metadata, blender_object))
         if "3mf:object_type" in resource_object.metadata\
                 and resource_object.metadata["3mf:object_type"].value in {"solidsupport", "support"}:
             # Don't render support meshes.
@@ -758,7 +651,39 @@ class Import3MF(bpy.types.Operator, bpy_extras.io_utils.ImportHelper):
             except KeyError:  # Invalid resource ID. Doesn't exist!
                 log.warning(f"Build item with unknown resource ID: {component.resource_object}")
                 continue
-            transform = transformation @ component.transformation  # Apply the child's transformation and pass it on.
+            # Apply the child's transformation and pass it on.
+            transform = transformation @ mathutils.Matrix(component.transformation)
             objectid_stack_trace.append(component.resource_object)
-            self.build_object(child_object, transform, metadata, objectid_stack_trace, parent=blender_object)
+            self.build_reference(component.resource_object, child_object, transform, metadata, objectid_stack_trace,
+                                 parent=blender_object)
             objectid_stack_trace.pop()
+
+    def paint_materials(self, paint, materials):
+        """
+        Give painted triangles the material of the filament that they are painted with.
+
+        Every filament gets a material named after its number, in the color of the filament in the project.
+        :param paint: The filament of each triangle, or 0 for unpainted triangles.
+        :param materials: The resource material of each triangle, or `None` if it has no material.
+        :return: The resource material of each triangle, with those of the painted triangles replaced.
+        """
+        filament_materials = {filament: ResourceMaterial(
+            name=f"Filament {filament}",
+            color=filament_color(filament, self.filament_colors)) for filament in set(paint) if filament}
+        return [filament_materials[filament] if filament else material for filament, material in zip(paint, materials)]
+
+    def blender_material(self, resource_material):
+        """
+        Get the Blender material for a resource material, creating it the first time.
+        :param resource_material: A `ResourceMaterial`.
+        :return: A Blender material.
+        """
+        if resource_material not in self.resource_to_material:
+            material = bpy.data.materials.new(resource_material.name)
+            material.use_nodes = True
+            if resource_material.color is not None:
+                principled = bpy_extras.node_shader_utils.PrincipledBSDFWrapper(material, is_readonly=False)
+                principled.base_color = resource_material.color[:3]
+                principled.alpha = resource_material.color[3]
+            self.resource_to_material[resource_material] = material
+        return self.resource_to_material[resource_material]
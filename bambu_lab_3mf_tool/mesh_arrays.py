@@ -0,0 +1,75 @@
+# Bambu Lab 3MF Tools - Bulk access to Blender mesh data.
+# Copyright (C) 2025 jsonify
+#
+# This add-on is free software: you can redistribute it and/or modify it under the terms of the GNU General
+# Public License as published by the Free Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+# This add-on is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied
+# warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# details.
+# You should have received a copy of the GNU General Public License along with this plug-in. If not, see
+# <https://gnu.org/licenses/>.
+
+# <pep8 compliant>
+
+"""
+Helpers to copy the geometry of a Blender mesh into NumPy arrays in bulk.
+
+Going through `foreach_get` copies the whole buffer in one call, instead of creating a Python object for every vertex
+and triangle. The mesh must have had `calc_loop_triangles()` called on it before the triangle data can be read.
+"""
+
+import numpy  # Bundled with Blender. To hold the geometry in flat buffers.
+
+
+def vertex_coordinates(mesh):
+    """
+    Get the coordinates of all vertices of a mesh.
+    :param mesh: A Blender mesh.
+    :return: A float64 array of shape (N, 3) with the X, Y and Z coordinates of each vertex.
+    """
+    coordinates = numpy.empty(len(mesh.vertices) * 3, dtype=numpy.float32)
+    mesh.vertices.foreach_get("co", coordinates)
+    return coordinates.reshape(-1, 3).astype(numpy.float64)
+
+
+def triangle_indices(mesh):
+    """
+    Get the vertex indices of all loop triangles of a mesh.
+    :param mesh: A Blender mesh, with its loop triangles calculated.
+    :return: An int64 array of shape (M, 3) with the indices of the three vertices of each triangle.
+    """
+    indices = numpy.empty(len(mesh.loop_triangles) * 3, dtype=numpy.int32)
+    mesh.loop_triangles.foreach_get("vertices", indices)
+    return indices.reshape(-1, 3).astype(numpy.int64)
+
+
+def triangle_material_indices(mesh):
+    """
+    Get the index of the material slot of all loop triangles of a mesh.
+    :param mesh: A Blender mesh, with its loop triangles calculated.
+    :return: An int64 array of length M with the material slot index of each triangle.
+    """
+    material_indices = numpy.empty(len(mesh.loop_triangles), dtype=numpy.int32)
+    mesh.loop_triangles.foreach_get("material_index", material_indices)
+    return material_indices.astype(numpy.int64)
+
+
+def triangle_face_attribute(mesh, name):
+    """
+    Get the value of an integer face attribute for all loop triangles of a mesh.
+
+    Every loop triangle gets the value of the face that it was made from.
+    :param mesh: A Blender mesh, with its loop triangles calculated.
+    :param name: The name of the attribute.
+    :return: An int64 array of length M with the value of each triangle, or `None` if the mesh has no integer face
+    attribute with that name.
+    """
+    attribute = mesh.attributes.get(name)
+    if attribute is None or attribute.domain != 'FACE' or attribute.data_type != 'INT':
+        return None
+    face_values = numpy.empty(len(mesh.polygons), dtype=numpy.int32)
+    attribute.data.foreach_get("value", face_values)
+    polygon_indices = numpy.empty(len(mesh.loop_triangles), dtype=numpy.int32)
+    mesh.loop_triangles.foreach_get("polygon_index", polygon_indices)
+    return face_values[polygon_indices].astype(numpy.int64)
@@ -0,0 +1,122 @@
+# Bambu Lab 3MF Tools - Mesh health checks before exporting.
+# Copyright (C) 2025 jsonify
+#
+# This add-on is free software: you can redistribute it and/or modify it under the terms of the GNU General
+# Public License as published by the Free Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+# This add-on is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied
+# warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# details.
+# You should have received a copy of the GNU General Public License along with this plug-in. If not, see
+# <https://gnu.org/licenses/>.
+
+# <pep8 compliant>
+
+"""
+Finds the problems in triangle meshes that slicers complain about.
+
+The analysis works on sorted arrays of edge keys. Each edge is encoded as a single integer, so that counting how often
+each edge occurs is a single sort rather than a loop over the edges.
+"""
+
+import collections  # For named tuples.
+import numpy  # Bundled with Blender. For the vectorized analysis.
+
+# The result of a health check. All fields are counts, except `inverted`, which is a boolean.
+MeshHealth = collections.namedtuple("MeshHealth", [
+    "out_of_range",  # Triangles referring to vertices that don't exist.
+    "degenerate",  # Triangles without area.
+    "boundary_edges",  # Edges with only one adjacent triangle. The mesh has holes.
+    "non_manifold_edges",  # Edges with more than two adjacent triangles.
+    "flipped_edges",  # Edges where the two adjacent triangles have opposite winding. Some normals are flipped.
+    "inverted"])  # The mesh is closed, but all normals point inwards.
+
+# Triangles with an area smaller than this fraction of the squared size of the mesh are considered degenerate.
+DEGENERATE_TOLERANCE = 1e-12
+
+
+def analyze(coordinates, triangles):
+    """
+    Check a triangle mesh for problems.
+    :param coordinates: Array of shape (N, 3) with the vertex coordinates.
+    :param triangles: Integer array of shape (M, 3) with the vertex indices of each triangle.
+    :return: A `MeshHealth` tuple describing the problems found.
+    """
+    num_vertices = len(coordinates)
+    triangles = numpy.asarray(triangles, dtype=numpy.int64).reshape(-1, 3)
+
+    in_range = ((triangles >= 0) & (triangles < num_vertices)).all(axis=1)
+    out_of_range = len(triangles) - int(numpy.count_nonzero(in_range))
+    triangles = triangles[in_range]
+    if len(triangles) == 0:
+        return MeshHealth(out_of_range, 0, 0, 0, 0, False)
+
+    # Triangles that repeat a vertex have no area and no proper edges. Leave them out of the edge analysis.
+    distinct = (triangles[:, 0] != triangles[:, 1]) & (triangles[:, 1] != triangles[:, 2]) \
+        & (triangles[:, 2] != triangles[:, 0])
+    corners = coordinates[triangles]
+    double_areas = numpy.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+    double_areas = numpy.einsum("ij,ij->i", double_areas, double_areas)
+    size = numpy.ptp(coordinates, axis=0).max() if num_vertices else 0.0
+    flat = double_areas <= DEGENERATE_TOLERANCE * size ** 4
+    degenerate = int(numpy.count_nonzero(flat | ~distinct))
+    triangles = triangles[distinct]
+
+    # Half-edges: Each triangle has three edges, running from one corner to the next.
+    starts = triangles.ravel()
+    ends = triangles[:, [1, 2, 0]].ravel()
+    undirected = numpy.minimum(starts, ends) * num_vertices + numpy.maximum(starts, ends)
+    directed = starts * num_vertices + ends
+
+    edge_keys, edge_counts = numpy.unique(undirected, return_counts=True)
+    boundary_edges = int(numpy.count_nonzero(edge_counts == 1))
+    non_manifold_edges = int(numpy.count_nonzero(edge_counts > 2))
+
+    # On a consistently wound manifold edge, the two triangles traverse the edge in opposite directions. If the same
+    # directed half-edge occurs twice, one of the two triangles is flipped.
+    _, first_half_edge, half_edge_counts = numpy.unique(directed, return_index=True, return_counts=True)
+    repeated = undirected[first_half_edge[half_edge_counts > 1]]
+    manifold_keys = edge_keys[edge_counts == 2]
+    flipped_edges = int(numpy.count_nonzero(numpy.isin(repeated, manifold_keys)))
+
+    # A closed mesh with consistent winding has positive volume if its normals point outward.
+    inverted = False
+    if boundary_edges == 0 and flipped_edges == 0 and non_manifold_edges == 0:
+        centred = coordinates - coordinates.mean(axis=0)
+        a = centred[triangles[:, 0]]
+        b = centred[triangles[:, 1]]
+        c = centred[triangles[:, 2]]
+        inverted = bool(numpy.einsum("ij,ij->i", a, numpy.cross(b, c)).sum() < 0)
+
+    return MeshHealth(out_of_range, degenerate, boundary_edges, non_manifold_edges, flipped_edges, inverted)
+
+
+def is_healthy(health):
+    """
+    Tests whether a health check found no problems at all.
+    :param health: The `MeshHealth` result of a health check.
+    :return: `True` if the mesh has no problems, or `False` if it has any.
+    """
+    return not any(health)
+
+
+def describe(health):
+    """
+    Describe the problems found by a health check in a single line.
+    :param health: The `MeshHealth` result of a health check.
+    :return: A human-readable summary of the problems, or "OK" if there are none.
+    """
+    problems = []
+    if health.out_of_range:
+        problems.append(f"{health.out_of_range} triangles with invalid vertex indices")
+    if health.degenerate:
+        problems.append(f"{health.degenerate} degenerate triangles")
+    if health.boundary_edges:
+        problems.append(f"{health.boundary_edges} open edges")
+    if health.non_manifold_edges:
+        problems.append(f"{health.non_manifold_edges} non-manifold edges")
+    if health.flipped_edges:
+        problems.append(f"{health.flipped_edges} edges between flipped normals")
+    if health.inverted:
+        problems.append("normals pointing inwards")
+    return ", ".join(problems) if problems else "OK"
@@ -11,140 +11,99 @@
 
 # <pep8 compliant>
 
-import collections  # For named tuples.
+import bpy  # To read the preferences of the add-on.
+import functools  # To cache decoded metadata.
 import idprop.types  # To interpret property groups as metadata entries.
+import json  # To serialize the metadata compactly.
 
-MetadataEntry = collections.namedtuple("MetadataEntry", ["name", "preserve", "datatype", "value"])
+from .core import metadata as core_metadata  # The Blender-independent metadata collection.
+from .core.metadata import MetadataEntry
 
+METADATA_PROPERTY = "3mf_metadata"  # Custom property with all metadata entries of a Blender object, serialized.
 
-class Metadata:
+
+def use_named_properties():
     """
-    This class tracks the metadata of a Blender object.
-
-    You can use it to update the metadata when importing, or to get the scene's metadata when exporting. It has a
-    routine to store the metadata in a Blender object and to retrieve it from that Blender object again.
-
-    This class functions like a temporary data structure only. It is blissfully unaware of the intricacies of the 3MF
-    file format specifically, save for knowing all of the properties of a metadata entry that can be specified.
-
-    The class' signature is like a dictionary. The keys of the dictionary are the names of the metadata entries. The
-    values of the dictionary are MetadataEntry named tuples, containing several properties of the metadata entries as
-    can be specified in the 3MF format. However the behaviour of the class is not entirely like a dictionary, since this
-    dictionary will only store metadata that is consistent across all of the attempts to store metadata. If you store
-    the same metadata entry multiple times, it will store only one copy, which is like a dictionary. However if you
-    store an entry with the same name but a different value, it'll know that the metadata is inconsistent across the
-    different files and thus will pretend that this metadata entry was not set. This way, if you load multiple 3MF files
-    into one scene in Blender, you will only get the intersection of the matching metadata entries.
+    Find out whether metadata must be stored as a custom property per entry, which is easier to edit by hand.
+    :return: `True` to store a property per entry, or `False` to store all entries in a single property.
     """
+    addon = bpy.context.preferences.addons.get(__package__)
+    return addon is not None and addon.preferences is not None and addon.preferences.named_metadata
 
-    def __init__(self):
-        """
-        Create an empty storage of metadata.
-        """
-        self.metadata = {}
 
-    def __setitem__(self, key, value):
-        """
-        Add a metadata entry to this storage.
-        :param key: The name of the entry.
-        :param value: A `MetadataEntry` object to store.
-        """
-        if key not in self.metadata:
-            # Completely new value. We can just store this one, since it's always consistent with existing metadata.
-            self.metadata[key] = value
-            return
-
-        if self.metadata[key] is None:
-            # This entry was already in conflict with another entry and erased.
-            # The new value will also be in conflict with at least one, so should also not be stored.
-            return
-
-        competing = self.metadata[key]
-        if value.value != competing.value or value.datatype != competing.datatype:
-            # These two are inconsistent. Erase both!
-            self.metadata[key] = None
-            return
-
-        # The two are consistent. Usually no need to store anything, since it's already stored.
-        # The "preserve" property may be different. Preserve if any of them says to preserve.
-        if not competing.preserve and value.preserve:  # Prevent unnecessary construction of namedtuples.
-            self.metadata[key] = MetadataEntry(
-                name=key,
-                preserve=True,
-                datatype=competing.datatype,
-                value=competing.value)
-
-    def __getitem__(self, key):
-        """
-        Retrieves a metadata entry, if it exists and was not in conflict.
-        :param key: The name of the metadata entry to get.
-        :return: The `MetadataEntry` object stored there.
-        :raises: `KeyError` if there is no metadata entry or it was in conflict.
-        """
-        if key not in self.metadata or self.metadata[key] is None:
-            # Metadata entry doesn't exist, or its values are conflicting with each other across multiple files.
-            raise KeyError(key)
-        return self.metadata[key]
+@functools.lru_cache(maxsize=1024)
+def decode(serialized):
+    """
+    Decode the metadata entries of the single metadata property of a Blender object.
 
-    def __contains__(self, item):
-        """
-        Tests if a metadata entry with a certain name is present and not in conflict.
-        :param item: The name of the metadata entry to test for.
-        :return: `True` if the metadata entry is present and not in conflict, or `False` if it's not present or in
-        conflict with metadata values from multiple files.
-        """
-        return item in self.metadata and self.metadata[item] is not None
+    Objects that were imported from the same 3MF resource share the same metadata, so their entries are only decoded
+    once.
+    :param serialized: The serialized metadata entries.
+    :return: A tuple of `MetadataEntry` objects.
+    """
+    try:
+        return tuple(MetadataEntry(name, preserve, datatype, value) for name, preserve, datatype, value
+                     in json.loads(serialized))
+    except (json.JSONDecodeError, TypeError, ValueError):
+        return ()  # Property was meddled with. Leave it alone.
 
-    def __bool__(self):
-        """
-        Checks if there is any content in this metadata storage.
 
-        Conflicting metadata entries are not counted as content in this case.
-        :return: `True` if there is metadata in this storage, or `False` if there isn't any.
-        """
-        return any(self.values())
+class Metadata(core_metadata.Metadata):
+    """
+    Metadata collection that can be stored in and retrieved from Blender objects.
 
-    def __len__(self):
-        """
-        Returns the number of valid items in this metadata storage.
+    See the base class for how conflicting metadata entries are treated.
 
-        An item is only valid if it's not in conflict, i.e. if it would be present in an iteration over the storage.
-        :return: The number of valid metadata entries.
-        """
-        return sum(1 for _ in self.values())
+    The entries are stored together in a single custom property, since plates can have thousands of objects. The add-on
+    preferences can make every entry get stored as a custom property of its own instead, so that metadata can be edited
+    by hand. Those properties are then read as well, and take precedence over the single property.
+    """
 
-    def __delitem__(self, key):
+    def store(self, blender_object):
         """
-        Completely delete all traces of a metadata entry from this storage.
-
-        Even if there was no real entry, but the shadow of entries being in conflict, that information will be removed.
-        That way it'll allow for a new value to be stored.
+        Store this metadata in a Blender object.
 
-        Contrary to the normal dictionary's version, this one does check for the key's existence, so you don't need to
-        do that manually.
+        The metadata will be stored as Blender properties. In the case of properties known to Blender they will be
+        translated appropriately.
+        :param blender_object: The Blender object to store the metadata in.
         """
-        if key in self.metadata:
-            del self.metadata[key]
+        Metadata.store_all([(self, blender_object)])
 
-    def __eq__(self, other):
+    @staticmethod
+    def store_all(metadata_and_objects):
         """
-        Compares two metadata groups together.
+        Store metadata in many Blender objects at once.
 
-        This is currently just used for the unit tests to see if the metadata is constructed correctly.
-        :param other: The metadata object to compare to.
-        :return: `True` if the two groups of metadata contain the same metadata (including which entries are in
-        conflict), or `False` otherwise.
+        Metadata that is stored in multiple objects is only serialized once.
+        :param metadata_and_objects: A sequence of tuples, each with a `Metadata` instance and the Blender object to
+        store it in.
         """
-        return self.metadata == other.metadata
+        named_properties = use_named_properties()
+        serialized = {}  # By the ID of the metadata instances. The sequence keeps them alive, so the IDs are unique.
+        for metadata, blender_object in metadata_and_objects:
+            if id(metadata) not in serialized:
+                serialized[id(metadata)] = None if named_properties else metadata.serialize()
+            metadata.store_entries(blender_object, named_properties, serialized[id(metadata)])
 
-    def store(self, blender_object):
+    def serialize(self):
         """
-        Store this metadata in a Blender object.
+        Serialize the metadata entries that are stored together in a single property.
+        :return: The serialized entries, or `None` if there are none.
+        """
+        entries = [[entry.name, entry.preserve, entry.datatype, entry.value]
+                   for entry in self.values() if entry.name not in {"Title", "3mf:partnumber"}]
+        if not entries:
+            return None
+        return json.dumps(entries, separators=(",", ":"))
 
-        The metadata will be stored as Blender properties. In the case of properties known to Blender they will be
-        translated appropriately.
+    def store_entries(self, blender_object, named_properties, serialized):
+        """
+        Store the metadata entries in a Blender object.
         :param blender_object: The Blender object to store the metadata in.
+        :param named_properties: Whether to store each entry as a property of its own.
+        :param serialized: The serialized entries, if they are not stored as properties of their own.
         """
+        existing_keys = set(blender_object.keys())
         for metadata_entry in self.values():
             name = metadata_entry.name
             value = metadata_entry.value
@@ -154,12 +113,19 @@ class Metadata:
                 # Special case: This is always a string and doesn't need the preserve attribute. We can simplify this to
                 # make it easier to edit.
                 blender_object[name] = value
-            else:
+            elif named_properties:
                 blender_object[name] = {
                     "datatype": metadata_entry.datatype,
                     "preserve": metadata_entry.preserve,
                     "value": value,
                 }
+            elif name in existing_keys:
+                del blender_object[name]  # Stored as a property of its own before. It is stored with the rest now.
+
+        if serialized is not None:
+            blender_object[METADATA_PROPERTY] = serialized
+        elif METADATA_PROPERTY in existing_keys:
+            del blender_object[METADATA_PROPERTY]
 
     def retrieve(self, blender_object):
         """
@@ -171,28 +137,56 @@ class Metadata:
         of conflicting metadata values, those metadata entries will be left out.
         :param blender_object: A Blender object to retrieve metadata from.
         """
-        for key in blender_object.keys():
-            entry = blender_object[key]
-            if key == "3mf:partnumber":
-                self[key] = MetadataEntry(name=key, preserve=True, datatype="xs:string", value=entry)
-                continue
-            if isinstance(entry, idprop.types.IDPropertyGroup)\
-                    and "datatype" in entry.keys()\
-                    and "preserve" in entry.keys()\
-                    and "value" in entry.keys():  # Most likely a metadata entry from a previous 3MF file.
-                self[key] = MetadataEntry(
-                    name=key,
-                    preserve=entry.get("preserve"),
-                    datatype=entry.get("datatype"),
-                    value=entry.get("value"))
-            # Don't mess with metadata added by the user or their other Blender add-ons. Don't want to break their
-            # behaviour.
-
+        self.retrieve_entries(blender_object, use_named_properties())
+
+    @staticmethod
+    def retrieve_all(blender_objects):
+        """
+        Retrieve the metadata of many Blender objects at once.
+        :param blender_objects: The Blender objects to retrieve the metadata of.
+        :return: A list with a new `Metadata` instance for each of the objects, in the same order.
+        """
+        named_properties = use_named_properties()
+        result = []
+        for blender_object in blender_objects:
+            metadata = Metadata()
+            metadata.retrieve_entries(blender_object, named_properties)
+            result.append(metadata)
+        return result
+
+    def retrieve_entries(self, blender_object, named_properties):
+        """
+        Retrieve the metadata entries from a Blender object.
+
+        The other custom properties of the object are only looked through for entries of their own if the preferences
+        store entries that way, or if the object has no single metadata property, like objects imported with those
+        preferences. Otherwise only the single property and the part number are looked up.
+        :param blender_object: The Blender object to retrieve the metadata from.
+        :param named_properties: Whether entries are stored as properties of their own.
+        """
+        entries = {}
+        serialized = blender_object.get(METADATA_PROPERTY)
+        if named_properties or not isinstance(serialized, str):
+            for key, entry in blender_object.items():
+                if isinstance(entry, idprop.types.IDPropertyGroup)\
+                        and "datatype" in entry\
+                        and "preserve" in entry\
+                        and "value" in entry:  # Most likely a metadata entry from a previous 3MF file.
+                    entries[key] = MetadataEntry(
+                        name=key,
+                        preserve=entry.get("preserve"),
+                        datatype=entry.get("datatype"),
+                        value=entry.get("value"))
+                # Don't mess with metadata added by the user or their other Blender add-ons. Don't want to break their
+                # behaviour.
+        partnumber = blender_object.get("3mf:partnumber")
+        if partnumber is not None:
+            entries["3mf:partnumber"] = MetadataEntry(
+                name="3mf:partnumber", preserve=True, datatype="xs:string", value=partnumber)
+        if isinstance(serialized, str):
+            for entry in decode(serialized):
+                entries.setdefault(entry.name, entry)  # Entries with a property of their own were edited by hand.
+
+        for name, entry in entries.items():
+            self[name] = entry
         self["Title"] = MetadataEntry(name="Title", preserve=True, datatype="xs:string", value=blender_object.name)
-
-    def values(self):
-        """
-        Return all metadata entries that are registered in this storage and not in conflict.
-        :return: A generator of metadata entries.
-        """
-        yield from filter(lambda entry: entry is not None, self.metadata.values())
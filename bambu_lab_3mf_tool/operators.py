@@ -0,0 +1,246 @@
+# Bambu Lab 3MF Tools - 3MF import and export operators.
+# Original 3MF code by Ghostkeeper (2020).
+# Copyright (C) 2025 jsonify
+# This add-on is free software: you can redistribute it and/or modify it under the terms of the GNU General
+# Public License as published by the Free Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+# This add-on is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied
+# warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# details.
+# You should have received a copy of the GNU General Public License along with this plug-in. If not, see
+# <https://gnu.org/licenses/>.
+
+# <pep8 compliant>
+
+"""
+The 3MF import and export operators, as they get registered in Blender.
+
+These only define the properties and the user interface of the operators. Their implementations are in `import_3mf` and
+`export_3mf`, which need XML parsing, zip archives and much more. Those modules are only imported when an operator is
+run for the first time, so that registering the add-on stays fast.
+"""
+
+import bpy  # The Blender API.
+import bpy.props  # To define metadata properties for the operators.
+import bpy.types  # These classes are operators in Blender.
+import bpy_extras.io_utils  # Helper functions to import and export meshes more easily.
+
+
+class OperatorImplementation:
+    """
+    Base class for the implementation of an operator, which is created anew every time that the operator runs.
+
+    Properties and functions of the operator, like `self.filepath` and `self.report`, can be used on the implementation
+    as if it were the operator itself. State that the implementation sets during the run stays on the implementation.
+    """
+
+    def __init__(self, operator):
+        """
+        Creates an implementation for one run of an operator.
+        :param operator: The operator that is being run.
+        """
+        self.operator = operator
+
+    def __getattr__(self, name):
+        """
+        Looks up anything that the implementation doesn't have on the operator.
+        :param name: The name of the attribute.
+        :return: The attribute of the operator.
+        """
+        if name == "operator":  # Not set yet. Don't recurse.
+            raise AttributeError(name)
+        return getattr(self.operator, name)
+
+
+class Import3MF(bpy.types.Operator, bpy_extras.io_utils.ImportHelper):
+    """
+    Operator that imports a 3MF file into Blender.
+    """
+
+    # Metadata.
+    bl_idname = "import_mesh.3mf"
+    bl_label = "Import 3MF"
+    bl_description = "Load a 3MF scene"
+    bl_options = {'UNDO'}
+    filename_ext = ".3mf"
+
+    # Options for the user.
+    filter_glob: bpy.props.StringProperty(default="*.3mf", options={'HIDDEN'})
+    files: bpy.props.CollectionProperty(name="File Path", type=bpy.types.OperatorFileListElement)
+    directory: bpy.props.StringProperty(subtype='DIR_PATH')
+    
+    scale_unit: bpy.props.EnumProperty(
+        name="Import Units",
+        description="How to scale the imported model",
+        items=[
+            ('MM_NATIVE', "Millimeters (1:1)", "Keep millimeter scale - 1 unit = 1mm (best for 3D printing)"),
+            ('MM_TO_M', "Millimeters → Meters", "Convert mm to meters (0.001x scale)"),
+            ('CUSTOM', "Custom Scale", "Use custom scale factor"),
+        ],
+        default='MM_NATIVE'
+    )
+    
+    global_scale: bpy.props.FloatProperty(
+        name="Custom Scale",
+        description="Custom scale factor (only used when Import Units is set to Custom)",
+        default=1.0,
+        soft_min=0.001,
+        soft_max=1000.0,
+        min=1e-6,
+        max=1e6
+    )
+
+    use_instances: bpy.props.BoolProperty(
+        name="Instance Repeated Components",
+        description="Build components that are used multiple times only once, as a collection, and place them with "
+                    "collection instances",
+        default=False
+    )
+
+    only_objects: bpy.props.StringProperty(
+        name="Only Objects",
+        description="Names or resource IDs of the objects to import, separated by commas. The geometry of other "
+                    "objects is not read at all. Leave empty to import all objects",
+        default=""
+    )
+
+    only_plate: bpy.props.IntProperty(
+        name="Only Plate",
+        description="Only import the objects on this plate of a Bambu Studio project. 0 imports all plates",
+        default=0,
+        min=0
+    )
+
+    # Set when the user starts the import, to show the progress. Imports from scripts are done at once.
+    show_progress: bpy.props.BoolProperty(default=False, options={'HIDDEN', 'SKIP_SAVE'})
+
+    def invoke(self, context, event):
+        """
+        Lets the user choose the files to import, and then imports them while showing the progress.
+        :param context: The Blender context.
+        :param event: The event that invoked the operator.
+        :return: A set of status flags to indicate whether the operation succeeded or not.
+        """
+        self.show_progress = True
+        return super().invoke(context, event)
+
+    def execute(self, context):
+        """
+        Reads the 3MF file, with the implementation in `import_3mf`.
+
+        If the user started the import, it runs in steps in between which the progress is shown, so that it can also be
+        cancelled.
+        :param context: The Blender context.
+        :return: A set of status flags to indicate whether the operation succeeded or not.
+        """
+        from .import_3mf import Importer  # Deferred until the first import, to keep registering the add-on fast.
+        self.importer = Importer(self)
+        if self.show_progress and context.window is not None:
+            return self.importer.start(context)
+        return self.importer.execute(context)
+
+    def modal(self, context, event):
+        """
+        Continues the import that was started in `execute`.
+        :param context: The Blender context.
+        :param event: The event that happened.
+        :return: A set of status flags to indicate whether the operation succeeded or not.
+        """
+        return self.importer.modal(context, event)
+
+    def cancel(self, context):
+        """
+        Cancels the import that was started in `execute`, like when the window gets closed.
+        :param context: The Blender context.
+        """
+        self.importer.cancel(context)
+
+    def draw(self, context):
+        layout = self.layout
+        layout.use_property_split = True
+        layout.use_property_decorate = False
+        
+        layout.prop(self, "scale_unit")
+        
+        # Only show custom scale when "Custom" is selected
+        if self.scale_unit == 'CUSTOM':
+            layout.prop(self, "global_scale")
+
+        layout.prop(self, "use_instances")
+        layout.prop(self, "only_objects")
+        layout.prop(self, "only_plate")
+
+
+class Export3MF(bpy.types.Operator, bpy_extras.io_utils.ExportHelper):
+    """
+    Operator that exports a 3MF file from Blender.
+    """
+
+    # Metadata.
+    bl_idname = "export_mesh.3mf"
+    bl_label = "Export 3MF"
+    bl_description = "Save the current scene to 3MF"
+    filename_ext = ".3mf"
+
+    # Options for the user.
+    filter_glob: bpy.props.StringProperty(
+        default="*.3mf",
+        options={'HIDDEN'})
+    use_selection: bpy.props.BoolProperty(
+        name="Selection Only",
+        description="Export selected objects only.",
+        default=False)
+    global_scale: bpy.props.FloatProperty(
+        name="Scale",
+        default=1.0,
+        soft_min=0.001,
+        soft_max=1000.0,
+        min=1e-6,
+        max=1e6)
+    use_mesh_modifiers: bpy.props.BoolProperty(
+        name="Apply Modifiers",
+        description="Apply the modifiers before saving.",
+        default=True)
+    coordinate_precision: bpy.props.IntProperty(
+        name="Precision",
+        description="The number of decimal digits to use in coordinates in the file.",
+        default=4,
+        min=0,
+        max=12)
+    check_mesh_health: bpy.props.BoolProperty(
+        name="Check Mesh Health",
+        description="Report open, non-manifold, degenerate or flipped geometry before writing it.",
+        default=True)
+    use_paint: bpy.props.BoolProperty(
+        name="Export Filament Paint",
+        description="Write the filament of each face from the 'paint_color' face attribute, for Bambu Studio.",
+        default=True)
+    decimate_mode: bpy.props.EnumProperty(
+        name="Reduce Triangles",
+        description="Reduce the number of triangles of dense meshes. The objects in the scene are not changed.",
+        items=[
+            ('NONE', "Off", "Export all triangles"),
+            ('TRIANGLES', "Triangle Budget", "Reduce each mesh to at most a number of triangles"),
+            ('DEVIATION', "Max Deviation", "Reduce each mesh as far as possible within a distance in mm"),
+        ],
+        default='NONE')
+    decimate_triangles: bpy.props.IntProperty(
+        name="Max Triangles",
+        description="Maximum number of triangles per mesh.",
+        default=200000,
+        min=4)
+    decimate_deviation: bpy.props.FloatProperty(
+        name="Max Deviation",
+        description="Maximum distance in mm that the surface may move.",
+        default=0.05,
+        min=0.0001,
+        soft_max=1.0)
+
+    def execute(self, context):
+        """
+        Writes the 3MF file, with the implementation in `export_3mf`.
+        :param context: The Blender context.
+        :return: A set of status flags to indicate whether the write succeeded or not.
+        """
+        from .export_3mf import Exporter  # Deferred until the first export, to keep registering the add-on fast.
+        return Exporter(self).execute(context)
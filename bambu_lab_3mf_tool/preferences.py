@@ -0,0 +1,46 @@
+# Bambu Lab 3MF Tools - Add-on preferences.
+# Copyright (C) 2025 jsonify
+# This add-on is free software: you can redistribute it and/or modify it under the terms of the GNU General
+# Public License as published by the Free Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+# This add-on is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied
+# warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# details.
+# You should have received a copy of the GNU General Public License along with this plug-in. If not, see
+# <https://gnu.org/licenses/>.
+
+# <pep8 compliant>
+
+import bpy  # The Blender API.
+from bpy.props import BoolProperty, StringProperty
+
+
+class BambuPreferences(bpy.types.AddonPreferences):
+    """Preferences of the add-on, shown in Edit > Preferences > Add-ons"""
+    bl_idname = __package__
+
+    enable_profiling: BoolProperty(
+        name="Profile Import and Export",
+        description="Time every phase of imports and exports, and report where the time went",
+        default=False
+    )
+
+    profile_directory: StringProperty(
+        name="cProfile Directory",
+        description="If set, profiled imports and exports also run cProfile and write its statistics to this directory",
+        subtype='DIR_PATH',
+        default=""
+    )
+
+    named_metadata: BoolProperty(
+        name="Metadata as Named Properties",
+        description="Store every 3MF metadata entry of imported objects as a custom property of its own, which is "
+                    "easier to edit by hand but slower for plates with many objects",
+        default=False
+    )
+
+    def draw(self, context):
+        layout = self.layout
+        layout.prop(self, "enable_profiling")
+        layout.prop(self, "profile_directory")
+        layout.prop(self, "named_metadata")
@@ -0,0 +1,134 @@
+# Bambu Lab 3MF Tools - Storage of files that must be preserved.
+# Copyright (C) 2025 jsonify
+# This add-on is free software: you can redistribute it and/or modify it under the terms of the GNU General
+# Public License as published by the Free Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+# This add-on is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied
+# warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# details.
+# You should have received a copy of the GNU General Public License along with this plug-in. If not, see
+# <https://gnu.org/licenses/>.
+
+# <pep8 compliant>
+
+"""
+Keeps the files of a 3MF archive that must be preserved in the Blender data, until they are exported again.
+
+Every preserved file gets a text datablock in a hidden folder, named after the path of the file in the archive. The
+contents of the file are stored compressed in a binary custom property of that datablock, along with the SHA-256 hash of
+the uncompressed contents. The text itself only describes the file. If archives with different contents for the same
+file are imported, the file is in conflict and is not preserved at all. That is detected by comparing the hashes.
+
+The compressed data is kept the way it was in the original archive, so that the exporter can copy it into the new
+archive without decompressing and compressing it again.
+
+Older versions of the add-on stored the contents as Base85 text in the datablock itself. Those can still be read.
+"""
+
+import base64  # To read files that were preserved by older versions.
+import bpy  # To store the files in the Blender data.
+import hashlib  # To compare files by their hash.
+import struct  # To store how the files are compressed.
+import zipfile  # For the compression constants.
+import zlib  # To compress the files.
+
+from .constants import conflicting_mustpreserve_contents
+from .core.archive import CompressedFile  # The files are stored the same as they are in the archive.
+
+PRESERVED_FOLDER = ".3mf_preserved/"  # Prefix of the names of the text datablocks with preserved files.
+DATA_PROPERTY = "3mf_data"  # Custom property with the compressed contents of the file.
+HASH_PROPERTY = "3mf_sha256"  # Custom property with the hash of the uncompressed contents of the file.
+# Custom property with the compression, the CRC-32 and the uncompressed size, packed with this format. Custom properties
+# can't hold unsigned 32-bit integers, so they are packed in bytes.
+COMPRESSION_PROPERTY = "3mf_compression"
+COMPRESSION_FORMAT = struct.Struct("<HLQ")
+COMPRESSION_LEVEL = 6  # For files that weren't compressed yet. The default level of zlib is fast enough.
+
+
+def content_hash(contents):
+    """
+    Calculate the hash that preserved files are compared with.
+    :param contents: The contents of a file.
+    :return: The SHA-256 hash of the contents, as hexadecimal string.
+    """
+    return hashlib.sha256(contents).hexdigest()
+
+
+def stored_hash(text):
+    """
+    Get the hash of the file stored in a text datablock.
+    :param text: A text datablock with a preserved file.
+    :return: The hash of the contents of the file, or `None` if the file is in conflict.
+    """
+    if HASH_PROPERTY in text:
+        return text[HASH_PROPERTY]
+    contents = text.as_string()
+    if contents == conflicting_mustpreserve_contents:
+        return None
+    return content_hash(base64.b85decode(contents.encode("UTF-8")))  # Stored by an older version.
+
+
+def compress(contents):
+    """
+    Compress a file the same way as files in a zip archive.
+    :param contents: The contents of the file, as bytes.
+    :return: A `CompressedFile`.
+    """
+    compressor = zlib.compressobj(COMPRESSION_LEVEL, zlib.DEFLATED, -zlib.MAX_WBITS)  # Raw Deflate, without header.
+    data = compressor.compress(contents) + compressor.flush()
+    return CompressedFile(data=data, compression=zipfile.ZIP_DEFLATED, crc=zlib.crc32(contents), size=len(contents))
+
+
+def store(filename, contents, compressed_file=None):
+    """
+    Preserve a file in the Blender data.
+
+    If a different file was preserved with the same name before, the file is marked as being in conflict, and neither
+    version gets exported.
+    :param filename: The path of the file in the 3MF archive.
+    :param contents: The contents of the file, as bytes.
+    :param compressed_file: The file as it was compressed in the archive, if available. If not, it gets compressed.
+    """
+    digest = content_hash(contents)
+    text = bpy.data.texts.get(PRESERVED_FOLDER + filename)
+    if text is None:  # File doesn't exist yet.
+        if compressed_file is None:
+            compressed_file = compress(contents)
+        text = bpy.data.texts.new(PRESERVED_FOLDER + filename)
+        text.write(f"File preserved from a 3MF archive. {len(contents)} bytes, SHA-256 {digest}.")
+        text[DATA_PROPERTY] = compressed_file.data
+        text[COMPRESSION_PROPERTY] = COMPRESSION_FORMAT.pack(
+            compressed_file.compression, compressed_file.crc, compressed_file.size)
+        text[HASH_PROPERTY] = digest
+        return
+
+    existing_digest = stored_hash(text)
+    if existing_digest is None or existing_digest == digest:
+        # Either the file was already in conflict, and will always be in conflict with one of the previous files, or
+        # the contents are the same and the file doesn't need to be stored again.
+        return
+    # Same file exists with different contents, so they are in conflict.
+    for key in (DATA_PROPERTY, COMPRESSION_PROPERTY, HASH_PROPERTY):
+        if key in text:
+            del text[key]
+    text.clear()
+    text.write(conflicting_mustpreserve_contents)
+
+
+def retrieve():
+    """
+    Get all files that are preserved in the Blender data and not in conflict.
+    :return: A sequence of tuples with the path of each file in the 3MF archive and the `CompressedFile` to write there.
+    """
+    for text in bpy.data.texts:
+        if not text.name.startswith(PRESERVED_FOLDER):
+            continue  # Unrelated file. Not ours to read.
+        filename = text.name[len(PRESERVED_FOLDER):]
+        if DATA_PROPERTY in text:
+            compression, crc, size = COMPRESSION_FORMAT.unpack(text[COMPRESSION_PROPERTY])
+            yield filename, CompressedFile(data=text[DATA_PROPERTY], compression=compression, crc=crc, size=size)
+            continue
+        contents = text.as_string()
+        if contents == conflicting_mustpreserve_contents:
+            continue  # This file was in conflict. Don't preserve any copy of it then.
+        yield filename, compress(base64.b85decode(contents.encode("UTF-8")))  # Stored by an older version.
@@ -0,0 +1,75 @@
+# Bambu Lab 3MF Tools - Bambu Lab printer profiles.
+# Copyright (C) 2025 jsonify
+#
+# This add-on is free software: you can redistribute it and/or modify it under the terms of the GNU General
+# Public License as published by the Free Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+# This add-on is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied
+# warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# details.
+# You should have received a copy of the GNU General Public License along with this plug-in. If not, see
+# <https://gnu.org/licenses/>.
+
+# <pep8 compliant>
+
+"""
+The Bambu Lab printers and filaments that the add-on knows about. Independent of Blender, so that batch tools can use
+them too.
+"""
+
+# Printer build volumes (X, Y, Z in mm)
+PRINTER_VOLUMES = {
+    'A1_MINI': (180, 180, 180),
+    'A1': (256, 256, 256),
+    'P1S': (256, 256, 256),
+    'P1P': (256, 256, 256),
+    'X1C': (256, 256, 256),
+    'X1E': (256, 256, 256),
+}
+
+PRINTER_NAMES = {
+    'A1_MINI': "A1 Mini (180×180×180)",
+    'A1': "A1 (256×256×256)",
+    'P1S': "P1S (256×256×256)",
+    'P1P': "P1P (256×256×256)",
+    'X1C': "X1 Carbon (256×256×256)",
+    'X1E': "X1E (256×256×256)",
+}
+
+# Density of each filament type, in g/cm³.
+FILAMENT_DENSITIES = {
+    'PLA': 1.24,
+    'PETG': 1.27,
+    'ABS': 1.04,
+    'ASA': 1.07,
+    'TPU': 1.21,
+    'PA': 1.14,
+    'PC': 1.20,
+    'PVA': 1.23,
+}
+
+# Price of each filament type, per kg.
+FILAMENT_PRICES = {
+    'PLA': 20.0,
+    'PETG': 22.0,
+    'ABS': 22.0,
+    'ASA': 28.0,
+    'TPU': 35.0,
+    'PA': 60.0,
+    'PC': 45.0,
+    'PVA': 90.0,
+}
+
+# Tolerance in mm when testing whether an object lies inside the build volume.
+FIT_TOLERANCE = 1e-4
+
+
+def extents_fit(minimum, maximum, volume):
+    """
+    Test whether a bounding box lies completely within a printer's build volume.
+    :param minimum: The minimum corner of the bounding box.
+    :param maximum: The maximum corner of the bounding box.
+    :param volume: The build volume of the printer, as X, Y and Z size in mm.
+    :return: `True` if the bounding box lies within the build volume, or `False` if it sticks out.
+    """
+    return all(minimum[axis] >= -FIT_TOLERANCE and maximum[axis] <= volume[axis] + FIT_TOLERANCE for axis in range(3))
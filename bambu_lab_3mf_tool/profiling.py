@@ -0,0 +1,214 @@
+# Bambu Lab 3MF Tools - Timing and profiling of imports and exports.
+# Copyright (C) 2025 jsonify
+# This add-on is free software: you can redistribute it and/or modify it under the terms of the GNU General
+# Public License as published by the Free Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+# This add-on is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied
+# warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# details.
+# You should have received a copy of the GNU General Public License along with this plug-in. If not, see
+# <https://gnu.org/licenses/>.
+
+# <pep8 compliant>
+
+"""
+Measures where the time of an import or export goes.
+
+Operators decorate their `execute` function with `profiled`, which gives them a `Run` in `self.profile`. They wrap each
+phase of their work in `self.profile.phase(name)` and count what they processed with `self.profile.count(name, n)`.
+Operators that do their work in steps, with a generator, can decorate the generator instead. The run then lasts until
+the generator is exhausted or closed.
+When profiling is disabled, phases and counters do nothing, so they can stay in the code at no noticeable cost.
+
+Profiling is enabled with the add-on preferences, or by setting the environment variable `BAMBU_3MF_PROFILE=1`. If a
+directory is given as well, in the preferences or in `BAMBU_3MF_PROFILE_DIR`, every run is also profiled with cProfile,
+and its statistics and report are written to that directory. This module does not depend on Blender itself.
+"""
+
+import contextlib  # For the phases, which are context managers.
+import cProfile  # To optionally profile a complete run.
+import functools  # To wrap the `execute` functions of operators.
+import inspect  # To find out whether an operator works in steps.
+import json  # To write the reports.
+import logging  # To emit the reports.
+import os  # To read the environment variables and to write the statistics.
+import time  # To time the phases.
+
+log = logging.getLogger(__name__)
+
+ENABLE_VARIABLE = "BAMBU_3MF_PROFILE"  # Environment variable that enables profiling when set to 1.
+DIRECTORY_VARIABLE = "BAMBU_3MF_PROFILE_DIR"  # Environment variable with a directory to write cProfile statistics to.
+MAX_REPORTS = 20  # Number of reports of recent runs to keep in `last_reports`.
+
+last_reports = []  # Reports of the most recent profiled runs, newest last. Benchmarks and scripts can read these.
+_disabled_phase = contextlib.nullcontext()  # Shared by all phases of disabled runs, to not allocate anything.
+
+
+class Run:
+    """
+    The timers and counters of a single import or export.
+    """
+
+    def __init__(self, name, enabled=False, directory=""):
+        """
+        Prepares a run. Call `start` to start measuring.
+        :param name: What is being run, like "import".
+        :param enabled: Whether to measure anything. If not, all methods do nothing.
+        :param directory: A directory to write cProfile statistics and the report to, or an empty string to not
+        use cProfile.
+        """
+        self.name = name
+        self.enabled = enabled
+        self.directory = directory if enabled else ""
+        self.phases = {}  # For every phase, a list of the total time spent in it and how often it was entered.
+        self.counters = {}
+        self.start_time = 0.0
+        self.end_time = 0.0
+        self.profiler = None
+
+    def start(self):
+        """
+        Starts measuring the total duration, and starts cProfile if it is used.
+        """
+        if not self.enabled:
+            return
+        if self.directory:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        self.start_time = time.perf_counter()
+
+    def phase(self, name):
+        """
+        Measures the code in a `with` block as a phase of the run.
+
+        Phases may be entered many times, like once per object. Their durations are added up. Phases may also be nested,
+        in which case the time of the inner phase is counted in the outer phase as well.
+        :param name: The name of the phase.
+        :return: A context manager.
+        """
+        if not self.enabled:
+            return _disabled_phase
+        return self._measure(name)
+
+    @contextlib.contextmanager
+    def _measure(self, name):
+        """
+        Times a phase of an enabled run.
+        :param name: The name of the phase.
+        """
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            totals = self.phases.setdefault(name, [0.0, 0])
+            totals[0] += time.perf_counter() - start_time
+            totals[1] += 1
+
+    def count(self, name, amount=1):
+        """
+        Adds to a counter, like the number of triangles processed.
+        :param name: The name of the counter.
+        :param amount: How much to add.
+        """
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def finish(self):
+        """
+        Stops measuring, and emits the report.
+        :return: The report, or `None` if the run is not enabled.
+        """
+        if not self.enabled:
+            return None
+        self.end_time = time.perf_counter()
+        if self.profiler is not None:
+            self.profiler.disable()
+
+        report = self.report()
+        if self.directory:
+            base_name = os.path.join(self.directory, f"{self.name}-{time.strftime('%Y%m%d-%H%M%S')}")
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                self.profiler.dump_stats(base_name + ".prof")
+                report["cprofile"] = base_name + ".prof"
+                with open(base_name + ".json", "w") as f:
+                    json.dump(report, f, indent=2)
+            except EnvironmentError as e:
+                log.error(f"Unable to write profile to {self.directory}: {e}")
+
+        last_reports.append(report)
+        del last_reports[:-MAX_REPORTS]
+        log.info(f"Profile of {self.name}: {json.dumps(report)}")
+        return report
+
+    def report(self):
+        """
+        Creates a structured report of the run.
+        :return: A dictionary with the total duration, the phases and the counters.
+        """
+        return {
+            "run": self.name,
+            "seconds": self.end_time - self.start_time,
+            "phases": {name: {"seconds": seconds, "calls": calls} for name, (seconds, calls) in self.phases.items()},
+            "counters": dict(self.counters),
+        }
+
+    def summary(self):
+        """
+        Summarizes the report in a single line, slowest phases first.
+        :return: A human-readable summary.
+        """
+        phases = sorted(self.phases.items(), key=lambda item: item[1][0], reverse=True)
+        parts = [f"{name} {seconds:.3f}s" for name, (seconds, _) in phases]
+        return f"{self.name.capitalize()} took {self.end_time - self.start_time:.3f}s: " + ", ".join(parts)
+
+
+def settings(context):
+    """
+    Find out whether profiling is enabled, from the environment and the add-on preferences.
+    :param context: The Blender context, to get the add-on preferences from.
+    :return: A tuple of whether profiling is enabled and the directory to write cProfile statistics to, if any.
+    """
+    enabled = os.environ.get(ENABLE_VARIABLE, "") not in {"", "0"}
+    directory = os.environ.get(DIRECTORY_VARIABLE, "")
+    addon = context.preferences.addons.get(__package__)
+    if addon is not None and addon.preferences is not None:
+        enabled = enabled or addon.preferences.enable_profiling
+        directory = directory or addon.preferences.profile_directory
+    return enabled, directory
+
+
+def profiled(name):
+    """
+    Decorates the `execute` function of an operator to measure it.
+
+    The operator gets the `Run` in `self.profile` while it executes. If profiling is enabled, the summary of the run is
+    reported to the user when it's done. A generator function that does the work in steps can be decorated as well. Its
+    run starts at the first step, and ends when the generator is exhausted or closed.
+    :param name: What the operator does, like "import".
+    :return: The decorator.
+    """
+    def decorator(execute):
+        if inspect.isgeneratorfunction(execute):
+            @functools.wraps(execute)
+            def steps(self, context):
+                self.profile = Run(name, *settings(context))
+                self.profile.start()
+                try:
+                    return (yield from execute(self, context))
+                finally:
+                    if self.profile.finish() is not None:
+                        self.report({'INFO'}, self.profile.summary())
+            return steps
+
+        @functools.wraps(execute)
+        def wrapper(self, context):
+            self.profile = Run(name, *settings(context))
+            self.profile.start()
+            try:
+                return execute(self, context)
+            finally:
+                if self.profile.finish() is not None:
+                    self.report({'INFO'}, self.profile.summary())
+        return wrapper
+    return decorator
@@ -0,0 +1,230 @@
+# Bambu Lab 3MF Tools - Layer cross-sections for slice previews.
+# Copyright (C) 2025 jsonify
+#
+# This add-on is free software: you can redistribute it and/or modify it under the terms of the GNU General
+# Public License as published by the Free Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+# This add-on is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied
+# warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# details.
+# You should have received a copy of the GNU General Public License along with this plug-in. If not, see
+# <https://gnu.org/licenses/>.
+
+# <pep8 compliant>
+
+"""
+Intersects triangle meshes with horizontal layer planes, the way a slicer does.
+
+All triangles are intersected with all layers in bulk. Each triangle is only paired with the layers that its Z range
+spans, which are found from an index of the triangles sorted by their lowest layer. Layer planes lie halfway each
+layer, like in most slicers, so that planes rarely coincide with flat faces of the model.
+"""
+
+import numpy  # Bundled with Blender. For the bulk intersection.
+
+# The maximum number of (triangle, layer) pairs to intersect at once. This bounds the memory use for huge models.
+CHUNK_PAIRS = 1 << 22
+
+# Rough print settings for the print time estimate, similar to Bambu Studio's standard profiles.
+WALL_LOOPS = 2
+LINE_WIDTH = 0.42  # mm.
+WALL_SPEED = 200.0  # mm/s.
+INFILL_DENSITY = 0.15
+INFILL_SPEED = 270.0  # mm/s.
+LAYER_CHANGE_TIME = 1.0  # Seconds spent per layer on travel and layer changes.
+
+# The edges of a triangle, as pairs of corner indices.
+_EDGES = numpy.array([[0, 1], [1, 2], [2, 0]])
+
+
+def layer_heights(num_layers, layer_height, bottom=0.0):
+    """
+    Get the heights of the planes where each layer gets sliced.
+    :param num_layers: The number of layers.
+    :param layer_height: The thickness of each layer.
+    :param bottom: The height of the bottom of the first layer.
+    :return: An array with the height of the slicing plane of each layer.
+    """
+    return bottom + (numpy.arange(num_layers) + 0.5) * layer_height
+
+
+def _interval_index(z_coordinates, triangles, planes):
+    """
+    Find the range of layers that each triangle spans, with the triangles sorted by their first layer.
+
+    A triangle crosses the plane at height Z if its lowest corner is below Z and its highest corner is at or above Z.
+    This is the same comparison that `_intersect` makes, so that vertices on a plane are counted the same by both.
+    :param z_coordinates: Array of shape (N,) with the Z coordinate of each vertex.
+    :param triangles: Array of shape (M, 3) with the vertex indices of the triangles.
+    :param planes: The ascending heights of the planes of the layers.
+    :return: A tuple of three arrays: The triangle indices sorted by their first layer, the first layer of each of those
+    triangles and the number of layers each of those triangles spans.
+    """
+    corner_z = z_coordinates[triangles]
+    first = numpy.searchsorted(planes, corner_z.min(axis=1), side="right")  # First plane above the lowest corner.
+    last = numpy.searchsorted(planes, corner_z.max(axis=1), side="right") - 1  # Last plane at or below the top.
+    counts = numpy.maximum(last - first + 1, 0)
+
+    order = numpy.argsort(first, kind="stable")
+    order = order[counts[order] > 0]  # Triangles that span no layer never need to be touched.
+    return order, first[order], counts[order]
+
+
+def _intersect(coordinates, triangles, normals, plane_z):
+    """
+    Intersect a batch of triangles with one plane each.
+    :param coordinates: Array of shape (N, 3) with the vertex coordinates.
+    :param triangles: Array of shape (P, 3) with the vertex indices of the triangles to intersect.
+    :param normals: Array of shape (P, 3) with the normals of those triangles.
+    :param plane_z: Array of length P with the height of the plane to intersect each triangle with.
+    :return: A tuple of two arrays. The first has shape (K, 2, 2) with the start and end point (X and Y) of each
+    intersection segment. Segments are oriented such that the inside of the model is to their left, so outer contours
+    run counter-clockwise. The second has the index in the batch of the triangle of each segment. Triangles that don't
+    cross their plane in exactly two edges get no segment.
+    """
+    corners = coordinates[triangles]  # (P, 3, 3)
+    signed_distance = corners[:, :, 2] - plane_z[:, None]
+    below = signed_distance < 0
+
+    start = _EDGES[:, 0]
+    end = _EDGES[:, 1]
+    crossing = below[:, start] != below[:, end]  # Exactly two edges cross for every triangle spanning the plane.
+    crossing &= (crossing.sum(axis=1) == 2)[:, None]  # Leave out anything else, like triangles that touch the plane.
+    rows, edges = numpy.nonzero(crossing)
+    edges = edges.reshape(-1, 2)
+    rows = rows[::2]
+
+    distance_start = signed_distance[rows[:, None], start[edges]]
+    distance_end = signed_distance[rows[:, None], end[edges]]
+    factor = distance_start / (distance_start - distance_end)
+    point_start = corners[rows[:, None], start[edges], :2]
+    point_end = corners[rows[:, None], end[edges], :2]
+    segments = point_start + (point_end - point_start) * factor[:, :, None]  # (P, 2, 2)
+
+    # Orient along Z × normal, which keeps the solid on the left of the segment.
+    direction = segments[:, 1] - segments[:, 0]
+    tangent_dot = direction[:, 0] * -normals[rows, 1] + direction[:, 1] * normals[rows, 0]
+    flip = tangent_dot < 0
+    segments[flip] = segments[flip][:, ::-1]
+    return segments, rows
+
+
+def slice_statistics(coordinates, triangles, layer_height, num_layers, bottom=0.0):
+    """
+    Compute the perimeter length and cross-section area of each layer of a mesh.
+
+    Holes in the cross-section are subtracted from the area, because their contours run clockwise. For this to work,
+    the mesh should be closed and have consistent normals.
+    :param coordinates: Array of shape (N, 3) with the vertex coordinates.
+    :param triangles: Array of shape (M, 3) with the vertex indices of each triangle.
+    :param layer_height: The thickness of each layer.
+    :param num_layers: The number of layers to slice.
+    :param bottom: The height of the bottom of the first layer.
+    :return: A tuple of two arrays of length `num_layers`: The perimeter length and the cross-section area per layer.
+    """
+    perimeters = numpy.zeros(num_layers)
+    areas = numpy.zeros(num_layers)
+    if num_layers <= 0 or len(triangles) == 0:
+        return perimeters, areas
+
+    planes = layer_heights(num_layers, layer_height, bottom)
+    order, first, counts = _interval_index(coordinates[:, 2], triangles, planes)
+    corners = coordinates[triangles[order]]
+    normals = numpy.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+
+    # Cut the sorted triangles into chunks that each produce at most CHUNK_PAIRS intersections.
+    pair_ends = numpy.cumsum(counts)
+    chunk_start = 0
+    while chunk_start < len(order):
+        pairs_before = pair_ends[chunk_start - 1] if chunk_start > 0 else 0
+        chunk_end = int(numpy.searchsorted(pair_ends, pairs_before + CHUNK_PAIRS, side="right"))
+        chunk_end = max(chunk_end, chunk_start + 1)
+
+        chunk_counts = counts[chunk_start:chunk_end]
+        local = numpy.repeat(numpy.arange(chunk_start, chunk_end), chunk_counts)
+        offsets = numpy.arange(len(local)) - numpy.repeat(numpy.cumsum(chunk_counts) - chunk_counts, chunk_counts)
+        layers = first[local] + offsets
+
+        segments, rows = _intersect(coordinates, triangles[order[local]], normals[local], planes[layers])
+        layers = layers[rows]
+        direction = segments[:, 1] - segments[:, 0]
+        perimeters += numpy.bincount(layers, weights=numpy.hypot(direction[:, 0], direction[:, 1]),
+                                     minlength=num_layers)
+        shoelace = segments[:, 0, 0] * segments[:, 1, 1] - segments[:, 1, 0] * segments[:, 0, 1]
+        areas += numpy.bincount(layers, weights=shoelace, minlength=num_layers) / 2
+        chunk_start = chunk_end
+
+    return perimeters, areas
+
+
+def estimate_print_time(perimeters, areas):
+    """
+    Make a rough estimate of the time it takes to print a sliced model.
+
+    This only accounts for walls, sparse infill and a fixed overhead per layer, with the settings defined at the top of
+    this module. It is meant to compare models, not to replace the estimate of the slicer.
+    :param perimeters: The perimeter length of each layer, in mm.
+    :param areas: The cross-section area of each layer, in mm².
+    :return: The estimated print time, in seconds.
+    """
+    wall_time = perimeters.sum() * WALL_LOOPS / WALL_SPEED
+    infill_time = numpy.abs(areas).sum() * INFILL_DENSITY / LINE_WIDTH / INFILL_SPEED
+    return wall_time + infill_time + numpy.count_nonzero(perimeters) * LAYER_CHANGE_TIME
+
+
+def layer_segments(coordinates, triangles, plane_z):
+    """
+    Intersect a mesh with a single horizontal plane.
+    :param coordinates: Array of shape (N, 3) with the vertex coordinates.
+    :param triangles: Array of shape (M, 3) with the vertex indices of each triangle.
+    :param plane_z: The height of the plane.
+    :return: Array of shape (K, 2, 2) with the oriented intersection segments.
+    """
+    corner_z = coordinates[:, 2][triangles]
+    spanning = (corner_z.min(axis=1) < plane_z) & (corner_z.max(axis=1) >= plane_z)
+    triangles = triangles[spanning]
+    corners = coordinates[triangles]
+    normals = numpy.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+    return _intersect(coordinates, triangles, normals, numpy.full(len(triangles), plane_z))[0]
+
+
+def chain_segments(segments, decimals=6):
+    """
+    Join oriented intersection segments into contours.
+
+    Segments are joined where the end of one segment coincides with the start of the next.
+    :param segments: Array of shape (K, 2, 2) with oriented segments.
+    :param decimals: The precision with which segment ends are considered to coincide.
+    :return: A list of contours. Each contour is a tuple of a list of (X, Y) points and a boolean indicating whether
+    the contour is closed.
+    """
+    rounded = numpy.round(segments, decimals)
+    exact = segments.tolist()
+    starts = {}
+    for index, start in enumerate(map(tuple, rounded[:, 0])):
+        starts.setdefault(start, index)
+    ends = {tuple(end) for end in rounded[:, 1]}
+
+    used = numpy.zeros(len(segments), dtype=bool)
+    contours = []
+    # Start with segments that no other segment leads into, so that open contours are traced from their start.
+    candidates = [index for index in range(len(segments)) if tuple(rounded[index, 0]) not in ends]
+    candidates.extend(range(len(segments)))
+    for index in candidates:
+        if used[index]:
+            continue
+        first_point = tuple(rounded[index, 0])
+        points = [tuple(exact[index][0])]
+        closed = False
+        while index is not None and not used[index]:
+            used[index] = True
+            points.append(tuple(exact[index][1]))
+            end = tuple(rounded[index, 1])
+            if end == first_point:
+                closed = True
+                break
+            index = starts.get(end)
+        if closed:
+            points.pop()  # The last point is the same as the first.
+        contours.append((points, closed))
+    return contours
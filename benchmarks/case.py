@@ -0,0 +1,201 @@
+# Bambu Lab 3MF Tools - A single benchmark case.
+# Copyright (C) 2025 jsonify
+# This add-on is free software: you can redistribute it and/or modify it under the terms of the GNU General
+# Public License as published by the Free Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+# This add-on is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied
+# warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# details.
+# You should have received a copy of the GNU General Public License along with this plug-in. If not, see
+# <https://gnu.org/licenses/>.
+
+# <pep8 compliant>
+
+"""
+Imports and exports one 3MF archive while timing each phase. This is started by `run.py` in a fresh process for every
+case, so that the peak memory of the process belongs to that case alone.
+
+In plain Python, the `core` library is measured:
+```
+python benchmarks/case.py corpus/single-100000.3mf
+```
+In Blender, the import and export operators of the add-on are measured:
+```
+blender --background --factory-startup --python benchmarks/case.py -- corpus/single-100000.3mf
+```
+The result is printed as a single line of JSON after `RESULT_PREFIX`, since Blender prints other things to stdout too.
+"""
+
+import argparse  # To parse the command line.
+import contextlib  # To measure phases with a context manager.
+import json  # To report the results.
+import os  # To find the add-on and to write temporary files.
+import sys  # To find the arguments meant for us when running in Blender.
+import tempfile  # To export to a file that doesn't stay around.
+import time  # To time the phases.
+import tracemalloc  # To measure the peak memory of each phase.
+
+try:
+    import resource  # To measure the peak memory of the whole process. Not available on Windows.
+except ImportError:
+    resource = None
+
+try:
+    import bpy  # Only available when running in Blender.
+except ImportError:
+    bpy = None
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+RESULT_PREFIX = "BENCHMARK_RESULT "
+
+
+def peak_rss():
+    """
+    Get the peak resident memory of this process so far.
+    :return: The peak in bytes, or `None` if the platform can't tell.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024  # Linux reports kilobytes, macOS bytes.
+
+
+class Phases:
+    """
+    Collects the duration, and optionally the peak Python memory, of named phases.
+    """
+
+    def __init__(self, trace_memory):
+        """
+        Creates an empty collection of phases.
+        :param trace_memory: Whether to trace the memory of each phase. This makes everything a lot slower, so the
+        durations are not representative then.
+        """
+        self.trace_memory = trace_memory
+        self.results = {}
+
+    @contextlib.contextmanager
+    def measure(self, name):
+        """
+        Measures the code in a `with` block as a phase.
+
+        Measuring the same phase multiple times adds up the durations, and keeps the highest peak memory.
+        :param name: The name of the phase.
+        """
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+        start_time = time.perf_counter()
+        yield
+        result = self.results.setdefault(name, {"seconds": 0.0})
+        result["seconds"] += time.perf_counter() - start_time
+        if self.trace_memory:
+            result["peak_bytes"] = max(result.get("peak_bytes", 0), tracemalloc.get_traced_memory()[1])
+
+
+def run_core(path, phases):
+    """
+    Reads an archive and writes it again with the Blender-independent library.
+    :param path: The path to the archive.
+    :param phases: The phases to record the measurements in.
+    :return: Counts of what was read.
+    """
+    from bambu_lab_3mf_tool.constants import MODEL_MIMETYPE
+    from bambu_lab_3mf_tool.core import ModelReader, create_archive, parse_model, read_archive, write_document, writer
+
+    with phases.measure("archive"):
+        files_by_content_type = read_archive(path)
+    with phases.measure("parse"):  # Includes inflating the documents, which happens while they are parsed.
+        roots = [parse_model(model_file) for model_file in files_by_content_type.get(MODEL_MIMETYPE, [])]
+    documents = []
+    with phases.measure("read_objects"):
+        for root in roots:
+            reader = ModelReader()
+            reader.read_metadata(root)
+            reader.read_materials(root)
+            reader.read_objects(root)
+            documents.append((reader, reader.read_build(root)))
+    del roots
+
+    with tempfile.TemporaryDirectory() as directory:
+        for index, (reader, build_items) in enumerate(documents):
+            with phases.measure("write_model"):
+                root = writer.new_model()
+                writer.write_resources(root, reader.resource_objects, build_items, 6)
+            with phases.measure("write_archive"):
+                archive = create_archive(os.path.join(directory, f"{index}.3mf"))
+                write_document(archive, root)
+                archive.close()
+            del root
+
+    return {
+        "objects": sum(len(reader.resource_objects) for reader, _ in documents),
+        "triangles": sum(len(resource_object.triangles)
+                         for reader, _ in documents for resource_object in reader.resource_objects.values()),
+        "build_items": sum(len(build_items) for _, build_items in documents),
+    }
+
+
+def run_blender(path, phases):
+    """
+    Imports an archive into an empty scene and exports it again with the operators of the add-on.
+
+    Besides the import and export as a whole, the phases that the operators profile themselves are included, like
+    "import/parse".
+    :param path: The path to the archive.
+    :param phases: The phases to record the measurements in.
+    :return: Counts of what was imported.
+    """
+    import bambu_lab_3mf_tool
+    from bambu_lab_3mf_tool import profiling
+
+    bpy.ops.wm.read_factory_settings(use_empty=True)
+    bambu_lab_3mf_tool.register()
+    os.environ[profiling.ENABLE_VARIABLE] = "1"  # To get the phases within the operators.
+    try:
+        with phases.measure("import"):
+            getattr(bpy.ops.import_mesh, "3mf")(filepath=path)
+        counts = {
+            "objects": len(bpy.context.scene.objects),
+            "triangles": sum(sum(len(polygon.vertices) - 2 for polygon in blender_object.data.polygons)
+                             for blender_object in bpy.context.scene.objects if blender_object.type == 'MESH'),
+        }
+        with tempfile.TemporaryDirectory() as directory:
+            with phases.measure("export"):
+                getattr(bpy.ops.export_mesh, "3mf")(filepath=os.path.join(directory, "export.3mf"))
+    finally:
+        bambu_lab_3mf_tool.unregister()
+    for report in profiling.last_reports:
+        for name, phase in report["phases"].items():
+            phases.results[f"{report['run']}/{name}"] = {"seconds": phase["seconds"]}
+    return counts
+
+
+def main():
+    arguments = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else sys.argv[1:]
+    parser = argparse.ArgumentParser(description="Run a single import/export benchmark case.")
+    parser.add_argument("path", help="The 3MF archive to import and export.")
+    parser.add_argument("--trace-memory", action="store_true", help="Measure the peak memory of each phase.")
+    args = parser.parse_args(arguments)
+
+    phases = Phases(args.trace_memory)
+    if args.trace_memory:
+        tracemalloc.start()
+    baseline_rss = peak_rss()
+    result = {"mode": "blender" if bpy is not None else "core", "status": "ok"}
+    try:
+        if bpy is not None:
+            result.update(run_blender(os.path.abspath(args.path), phases))
+        else:
+            result.update(run_core(args.path, phases))
+    except Exception as e:  # Still report the phases that completed.
+        result["status"] = "error"
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["phases"] = phases.results
+    result["baseline_rss_bytes"] = baseline_rss
+    result["peak_rss_bytes"] = peak_rss()
+    print(RESULT_PREFIX + json.dumps(result), flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,303 @@
+# Bambu Lab 3MF Tools - Synthetic 3MF corpus for benchmarks.
+# Copyright (C) 2025 jsonify
+# This add-on is free software: you can redistribute it and/or modify it under the terms of the GNU General
+# Public License as published by the Free Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+# This add-on is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied
+# warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# details.
+# You should have received a copy of the GNU General Public License along with this plug-in. If not, see
+# <https://gnu.org/licenses/>.
+
+# <pep8 compliant>
+
+"""
+Generates synthetic 3MF archives to benchmark the importer and exporter with.
+
+Run it with plain Python:
+```
+python benchmarks/corpus.py corpus --sizes 10000 100000 1000000
+```
+
+Every archive contains closed tori, so the meshes are manifold like real prints. For each size in triangles there is
+an archive of every kind in `KINDS`. The XML is streamed into the archive, so even archives with tens of millions of
+triangles never have to fit in memory. The same arguments always generate the same archives.
+"""
+
+import argparse  # To parse the command line.
+import math  # To place the vertices of the tori.
+import os  # To create the output directory.
+import sys  # To find the add-on's constants.
+import zipfile  # To write the archives.
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from bambu_lab_3mf_tool.constants import *  # noqa: E402
+
+PRODUCTION_NAMESPACE = "http://schemas.microsoft.com/3dmanufacturing/production/2015/06"
+OBJECTS_FOLDER = "3D/Objects"  # Where Bambu Studio puts the sub-models.
+
+KINDS = {
+    "single": "One object with all of the triangles.",
+    "many": "Many small objects of about 1000 triangles each.",
+    "multimaterial": "One object, with its triangles divided over four materials.",
+    "components": "A three-level hierarchy of components, all referring to one small mesh.",
+    "bambu": "Like Bambu Studio: objects in sub-models that the main model refers to with the production extension.",
+}
+DEFAULT_SIZES = (10000, 100000, 1000000)
+MATERIALS = (("PLA Red", "#C12E1F"), ("PLA Blue", "#0A2989"), ("PETG White", "#FFFFFF"), ("TPU Black", "#000000"))
+SMALL_OBJECT_TRIANGLES = 1000  # Size of the objects in the "many" kind.
+COMPONENT_BRANCHING = 4  # Number of children of each level in the "components" kind.
+CHUNK_LINES = 10000  # Number of XML elements to join before writing them.
+
+
+def torus_segments(triangles):
+    """
+    Choose the resolution of a torus to get close to a number of triangles.
+    :param triangles: The desired number of triangles.
+    :return: The number of segments around the ring and around the tube. The torus has twice their product in
+    triangles.
+    """
+    tube = max(3, int(math.sqrt(triangles / 2 / 4)))
+    ring = max(3, round(triangles / 2 / tube))
+    return ring, tube
+
+
+def write_torus(stream, ring, tube, offset=(0.0, 0.0, 0.0), radius=20.0, thickness=6.0, material_bands=0):
+    """
+    Streams the <mesh> of a torus into a model document.
+    :param stream: The writable stream of the model document.
+    :param ring: The number of segments around the ring.
+    :param tube: The number of segments around the tube.
+    :param offset: Where to place the center of the torus.
+    :param radius: The distance from the center to the middle of the tube, in mm.
+    :param thickness: The radius of the tube, in mm.
+    :param material_bands: If not zero, the ring is divided in this many bands, each assigned to a material index.
+    """
+    ox, oy, oz = offset
+    stream.write(b"<mesh><vertices>")
+    lines = []
+    for i in range(ring):
+        angle = 2 * math.pi * i / ring
+        cos_a = math.cos(angle)
+        sin_a = math.sin(angle)
+        for j in range(tube):
+            tube_angle = 2 * math.pi * j / tube
+            distance = radius + thickness * math.cos(tube_angle)
+            lines.append('<vertex x="%.4f" y="%.4f" z="%.4f"/>' % (
+                ox + distance * cos_a, oy + distance * sin_a, oz + thickness + thickness * math.sin(tube_angle)))
+            if len(lines) >= CHUNK_LINES:
+                stream.write("".join(lines).encode("UTF-8"))
+                lines.clear()
+    stream.write("".join(lines).encode("UTF-8"))
+    lines.clear()
+    stream.write(b"</vertices><triangles>")
+    for i in range(ring):
+        next_i = (i + 1) % ring
+        material = ' p1="%d"' % (i * material_bands // ring) if material_bands else ""
+        for j in range(tube):
+            next_j = (j + 1) % tube
+            a = i * tube + j
+            b = next_i * tube + j
+            c = next_i * tube + next_j
+            d = i * tube + next_j
+            lines.append('<triangle v1="%d" v2="%d" v3="%d"%s/>' % (a, b, c, material))
+            lines.append('<triangle v1="%d" v2="%d" v3="%d"%s/>' % (a, c, d, material))
+            if len(lines) >= CHUNK_LINES:
+                stream.write("".join(lines).encode("UTF-8"))
+                lines.clear()
+    stream.write("".join(lines).encode("UTF-8"))
+    stream.write(b"</triangles></mesh>")
+
+
+def write_package(archive, sub_models=()):
+    """
+    Writes the content types and relationships that every archive needs.
+    :param archive: The archive to write to.
+    :param sub_models: Paths of sub-models that the main model refers to.
+    """
+    archive.writestr(CONTENT_TYPES_LOCATION, (
+        f'<?xml version="1.0" encoding="UTF-8"?><Types xmlns="{CONTENT_TYPES_NAMESPACE}">'
+        f'<Default Extension="rels" ContentType="{RELS_MIMETYPE}"/>'
+        f'<Default Extension="model" ContentType="{MODEL_MIMETYPE}"/>'
+        f'<Default Extension="config" ContentType="text/xml"/></Types>'))
+    archive.writestr(f"{RELS_FOLDER}/.rels", (
+        f'<?xml version="1.0" encoding="UTF-8"?><Relationships xmlns="{RELS_NAMESPACE}">'
+        f'<Relationship Target="/{MODEL_LOCATION}" Id="rel0" Type="{MODEL_REL}"/></Relationships>'))
+    if sub_models:
+        relationships = "".join(f'<Relationship Target="/{path}" Id="rel{index}" Type="{MODEL_REL}"/>'
+                                for index, path in enumerate(sub_models, 1))
+        archive.writestr(f"3D/{RELS_FOLDER}/3dmodel.model.rels", (
+            f'<?xml version="1.0" encoding="UTF-8"?><Relationships xmlns="{RELS_NAMESPACE}">{relationships}'
+            f'</Relationships>'))
+
+
+def open_model(archive, path, extra_attributes=""):
+    """
+    Starts a streamed model document in an archive.
+    :param archive: The archive to write to.
+    :param path: The path of the model document in the archive.
+    :param extra_attributes: Attributes to add to the <model> element, such as namespace declarations.
+    :return: The writable stream. The caller must close it.
+    """
+    stream = archive.open(path, "w", force_zip64=True)
+    stream.write((f'<?xml version="1.0" encoding="UTF-8"?><model xmlns="{MODEL_NAMESPACE}" unit="millimeter"'
+                  f'{extra_attributes}><metadata name="Application">Benchmark Corpus</metadata>').encode("UTF-8"))
+    return stream
+
+
+def generate_single(archive, triangles):
+    """
+    One torus with all of the triangles.
+    :param archive: The archive to write into.
+    :param triangles: The approximate number of triangles to build.
+    :return: The actual number of triangles that get built.
+    """
+    ring, tube = torus_segments(triangles)
+    with open_model(archive, MODEL_LOCATION) as stream:
+        stream.write(b'<resources><object id="1" type="model">')
+        write_torus(stream, ring, tube, radius=80.0, thickness=20.0)
+        stream.write(b'</object></resources><build><item objectid="1"/></build></model>')
+    return 2 * ring * tube
+
+
+def generate_many(archive, triangles):
+    """
+    A grid of small tori, each a separate object and build item.
+    :param archive: The archive to write into.
+    :param triangles: The approximate number of triangles to build.
+    :return: The actual number of triangles that get built.
+    """
+    ring, tube = torus_segments(SMALL_OBJECT_TRIANGLES)
+    count = max(1, triangles // (2 * ring * tube))
+    columns = math.ceil(math.sqrt(count))
+    with open_model(archive, MODEL_LOCATION) as stream:
+        stream.write(b"<resources>")
+        for index in range(count):
+            stream.write(b'<object id="%d" type="model">' % (index + 1))
+            offset = (index % columns * 12.0, index // columns * 12.0, 0.0)
+            write_torus(stream, ring, tube, offset, radius=4.0, thickness=1.5)
+            stream.write(b"</object>")
+        stream.write(b"</resources><build>")
+        stream.write(b"".join(b'<item objectid="%d"/>' % (index + 1) for index in range(count)))
+        stream.write(b"</build></model>")
+    return count * 2 * ring * tube
+
+
+def generate_multimaterial(archive, triangles):
+    """
+    One torus divided in bands of different materials.
+    :param archive: The archive to write into.
+    :param triangles: The approximate number of triangles to build.
+    :return: The actual number of triangles that get built.
+    """
+    ring, tube = torus_segments(triangles)
+    with open_model(archive, MODEL_LOCATION) as stream:
+        stream.write(b'<resources><basematerials id="1">')
+        for name, color in MATERIALS:
+            stream.write(f'<base name="{name}" displaycolor="{color}"/>'.encode("UTF-8"))
+        stream.write(b'</basematerials><object id="2" type="model" pid="1" pindex="0">')
+        write_torus(stream, ring, tube, radius=80.0, thickness=20.0, material_bands=len(MATERIALS))
+        stream.write(b'</object></resources><build><item objectid="2"/></build></model>')
+    return 2 * ring * tube
+
+
+def generate_components(archive, triangles):
+    """
+    A hierarchy of components that ends up building many copies of one small torus.
+    :param archive: The archive to write into.
+    :param triangles: The approximate number of triangles to build.
+    :return: The actual number of triangles that get built.
+    """
+    leaves = COMPONENT_BRANCHING ** 3
+    ring, tube = torus_segments(max(1, triangles // leaves))
+    with open_model(archive, MODEL_LOCATION) as stream:
+        stream.write(b'<resources><object id="1" type="model">')
+        write_torus(stream, ring, tube, radius=4.0, thickness=1.5)
+        stream.write(b"</object>")
+        # Each level places its children in a row, further apart for every level up.
+        for level, spacing in ((2, 12.0), (3, 48.0), (4, 192.0)):
+            stream.write(b'<object id="%d" type="model"><components>' % level)
+            for index in range(COMPONENT_BRANCHING):
+                stream.write(b'<component objectid="%d" transform="1 0 0 0 1 0 0 0 1 %.1f %.1f 0"/>' % (
+                    level - 1, index * spacing if level % 2 == 0 else 0.0, index * spacing if level % 2 else 0.0))
+            stream.write(b"</components></object>")
+        stream.write(b'</resources><build><item objectid="4"/></build></model>')
+    return leaves * 2 * ring * tube
+
+
+def generate_bambu(archive, triangles):
+    """
+    Tori in separate sub-models, which the main model refers to like Bambu Studio does.
+    :param archive: The archive to write into.
+    :param triangles: The approximate number of triangles to build.
+    :return: The actual number of triangles that get built.
+    """
+    objects = 4
+    ring, tube = torus_segments(max(1, triangles // objects))
+    sub_models = [f"{OBJECTS_FOLDER}/object_{index + 1}.model" for index in range(objects)]
+    for index, path in enumerate(sub_models):
+        with open_model(archive, path) as stream:
+            stream.write(b'<resources><object id="%d" type="model">' % (index + 1))
+            write_torus(stream, ring, tube, (index * 60.0, 0.0, 0.0), radius=20.0, thickness=6.0)
+            stream.write(b"</object></resources><build/></model>")
+    with open_model(archive, MODEL_LOCATION, f' xmlns:p="{PRODUCTION_NAMESPACE}" requiredextensions="p"') as stream:
+        stream.write(b"<resources>")
+        for index, path in enumerate(sub_models):
+            stream.write(
+                (f'<object id="{objects + index + 1}" p:UUID="00000000-0000-0000-0000-{index + 1:012d}" type="model">'
+                 f'<components><component p:path="/{path}" objectid="{index + 1}"/></components></object>')
+                .encode("UTF-8"))
+        stream.write(b"</resources><build>")
+        for index in range(objects):
+            stream.write(b'<item objectid="%d" printable="1"/>' % (objects + index + 1))
+        stream.write(b"</build></model>")
+    write_package(archive, sub_models)
+    archive.writestr("Metadata/model_settings.config", '<?xml version="1.0" encoding="UTF-8"?>\n<config>' + "".join(
+        f'<object id="{objects + index + 1}"><metadata key="name" value="Torus {index + 1}"/>'
+        f'<metadata key="extruder" value="{index % len(MATERIALS) + 1}"/></object>' for index in range(objects))
+        + "</config>")
+    archive.writestr("Metadata/project_settings.config", '{"layer_height": "0.2", "nozzle_diameter": ["0.4"]}')
+    return objects * 2 * ring * tube
+
+
+GENERATORS = {
+    "single": generate_single,
+    "many": generate_many,
+    "multimaterial": generate_multimaterial,
+    "components": generate_components,
+    "bambu": generate_bambu,
+}
+
+
+def generate(directory, kind, triangles):
+    """
+    Writes one archive of the corpus.
+    :param directory: The directory to write the archive into.
+    :param kind: The kind of archive, one of the keys of `KINDS`.
+    :param triangles: The approximate number of triangles in the archive.
+    :return: A tuple of the path to the archive and the actual number of triangles that get built from it.
+    """
+    path = os.path.join(directory, f"{kind}-{triangles}.3mf")
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED, allowZip64=True) as archive:
+        built = GENERATORS[kind](archive, triangles)
+        if kind != "bambu":  # The Bambu generator needs its own relationships for the sub-models.
+            write_package(archive)
+    return path, built
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic 3MF archives for benchmarks.")
+    parser.add_argument("directory", help="Directory to write the archives to.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Numbers of triangles.")
+    parser.add_argument("--kinds", nargs="+", choices=sorted(KINDS), default=sorted(KINDS), help="Kinds to generate.")
+    args = parser.parse_args()
+
+    os.makedirs(args.directory, exist_ok=True)
+    for triangles in args.sizes:
+        for kind in args.kinds:
+            path, built = generate(args.directory, kind, triangles)
+            print(f"{path}: {built} triangles, {os.path.getsize(path)} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+# Bambu Lab 3MF Tools - Large model document benchmark.
+# Copyright (C) 2025 jsonify
+# This add-on is free software: you can redistribute it and/or modify it under the terms of the GNU General
+# Public License as published by the Free Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+# This add-on is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied
+# warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# details.
+# You should have received a copy of the GNU General Public License along with this plug-in. If not, see
+# <https://gnu.org/licenses/>.
+
+# <pep8 compliant>
+
+"""
+Checks that 3MF archives can hold model documents past the 4GB limit of zip archives, and measures the memory it takes
+to write and read them.
+
+Run it with plain Python:
+```
+python benchmarks/large_part.py large.3mf --gigabytes 5
+```
+A synthetic model document of the given size is streamed into an archive in chunks, followed by a file that is copied
+into the archive still compressed, like the exporter does with preserved files. The archive is then read back the way
+the importer opens it, and the document is streamed through a checksum. The result is printed as a single line of JSON
+after `RESULT_PREFIX`, like the other benchmarks. The peak memory should stay far below the size of the document.
+
+This measures the archive only. The importer and exporter still hold the XML tree of a document in memory.
+"""
+
+import argparse  # To parse the command line.
+import json  # To report the results.
+import os  # To find the add-on and measure the archive.
+import resource  # To measure the peak memory.
+import sys  # To find the add-on.
+import time  # To time the writing and reading.
+import zipfile  # For the compression constants.
+import zlib  # To checksum the document, and to compress the file that gets copied.
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from bambu_lab_3mf_tool.constants import *  # noqa: E402
+from bambu_lab_3mf_tool.core.archive import (  # noqa: E402
+    CompressedFile,
+    create_archive,
+    open_document,
+    read_archive,
+    read_compressed,
+    write_compressed,
+)
+from corpus import write_package  # noqa: E402
+
+RESULT_PREFIX = "BENCHMARK_RESULT "  # Same as in `case.py`.
+CHUNK_VERTICES = 100000  # Number of <vertex> elements to generate at once.
+READ_CHUNK = 1 << 20  # Bytes to read from the document at once.
+PRESERVED_LOCATION = "Metadata/plate_1.png"  # Where the compressed file gets copied to, after the document.
+
+
+def peak_memory():
+    """
+    Get the peak memory that this process used so far.
+    :return: The peak resident set size, in megabytes.
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        return peak / 1e6  # Bytes on macOS.
+    return peak / 1e3  # Kilobytes on Linux.
+
+
+def compress(contents):
+    """
+    Compress a file the same way as files in a zip archive.
+    :param contents: The contents of the file, as bytes.
+    :return: A `CompressedFile`.
+    """
+    compressor = zlib.compressobj(6, zlib.DEFLATED, -zlib.MAX_WBITS)
+    data = compressor.compress(contents) + compressor.flush()
+    return CompressedFile(data=data, compression=zipfile.ZIP_DEFLATED, crc=zlib.crc32(contents), size=len(contents))
+
+
+def write(path, size):
+    """
+    Writes an archive with a synthetic model document of a certain size.
+    :param path: The path to write the archive to.
+    :param size: The minimum size of the document, in bytes.
+    :return: The actual size of the document, and its CRC-32.
+    """
+    archive = create_archive(path)
+    written = 0
+    crc = 0
+    with open_document(archive) as stream:
+        def write_chunk(chunk):
+            nonlocal written, crc
+            stream.write(chunk)
+            written += len(chunk)
+            crc = zlib.crc32(chunk, crc)
+
+        write_chunk((f'<?xml version="1.0" encoding="UTF-8"?><model xmlns="{MODEL_NAMESPACE}" unit="millimeter">'
+                     f'<resources><object id="1" type="model"><mesh><vertices>').encode("UTF-8"))
+        vertex = 0
+        while written < size:
+            write_chunk("".join('<vertex x="%d.125" y="%d.25" z="%d.5"/>' % (index % 256, index // 256 % 256, index)
+                                for index in range(vertex, vertex + CHUNK_VERTICES)).encode("UTF-8"))
+            vertex += CHUNK_VERTICES
+        write_chunk(b'</vertices><triangles/></mesh></object></resources><build><item objectid="1"/></build></model>')
+    write_compressed(archive, PRESERVED_LOCATION, compress(os.urandom(READ_CHUNK)))
+    write_package(archive)
+    archive.close()
+    return written, crc
+
+
+def read(path):
+    """
+    Reads an archive back, streaming its model document through a checksum.
+    :param path: The path of the archive to read.
+    :return: The size of the document, its CRC-32, and whether the compressed file could be read.
+    """
+    size = 0
+    crc = 0
+    for stream in read_archive(path).get(MODEL_MIMETYPE, []):
+        with stream:
+            chunk = stream.read(READ_CHUNK)
+            while chunk:
+                size += len(chunk)
+                crc = zlib.crc32(chunk, crc)
+                chunk = stream.read(READ_CHUNK)
+    return size, crc, PRESERVED_LOCATION in read_compressed(path, [PRESERVED_LOCATION])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write and read a 3MF archive with a very large model document.")
+    parser.add_argument("path", help="Where to write the archive. It is deleted afterwards, unless --keep is given.")
+    parser.add_argument("--gigabytes", type=float, default=5, help="Size of the model document.")
+    parser.add_argument("--keep", action="store_true", help="Don't delete the archive afterwards.")
+    args = parser.parse_args()
+
+    start_time = time.perf_counter()
+    written_size, written_crc = write(args.path, int(args.gigabytes * 1e9))
+    write_seconds = time.perf_counter() - start_time
+    write_peak = peak_memory()
+
+    start_time = time.perf_counter()
+    read_size, read_crc, preserved = read(args.path)
+    read_seconds = time.perf_counter() - start_time
+
+    result = {
+        "document_bytes": written_size,
+        "archive_bytes": os.path.getsize(args.path),
+        "write_seconds": write_seconds,
+        "read_seconds": read_seconds,
+        "write_peak_mb": write_peak,
+        "read_peak_mb": peak_memory(),
+        "intact": read_size == written_size and read_crc == written_crc and preserved,
+    }
+    if not args.keep:
+        os.remove(args.path)
+    print(RESULT_PREFIX + json.dumps(result), flush=True)
+
+
+if __name__ == "__main__":
+    main()
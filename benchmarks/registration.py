@@ -0,0 +1,72 @@
+# Bambu Lab 3MF Tools - Registration benchmark.
+# Copyright (C) 2025 jsonify
+# This add-on is free software: you can redistribute it and/or modify it under the terms of the GNU General
+# Public License as published by the Free Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+# This add-on is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied
+# warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# details.
+# You should have received a copy of the GNU General Public License along with this plug-in. If not, see
+# <https://gnu.org/licenses/>.
+
+# <pep8 compliant>
+
+"""
+Measures how long it takes to import and register the add-on, which Blender does on every start.
+
+Run it in Blender:
+```
+blender --background --factory-startup --python benchmarks/registration.py
+```
+The result is printed as a single line of JSON after `RESULT_PREFIX`, like the other benchmarks. It contains the time to
+import the add-on and to register it, and which of the slow modules got loaded in the process. The operators and
+panels only load their implementations when they are first used, so none of those modules should be loaded by then.
+Run it on an older commit to see the difference.
+"""
+
+import json  # To report the results.
+import os  # To find the add-on.
+import sys  # To see which modules got loaded.
+import time  # To time the import and registration.
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+RESULT_PREFIX = "BENCHMARK_RESULT "  # Same as in `case.py`.
+
+# Modules that take a noticeable time to import, and that registering the add-on shouldn't need.
+HEAVY_MODULES = [
+    "xml.etree.ElementTree",
+    "zipfile",
+    "base64",
+    "numpy",
+    "bpy_extras.node_shader_utils",
+    "bambu_lab_3mf_tool.import_3mf",
+    "bambu_lab_3mf_tool.export_3mf",
+    "bambu_lab_3mf_tool.core",
+]
+
+
+def main():
+    modules_before = set(sys.modules)
+
+    start_time = time.perf_counter()
+    import bambu_lab_3mf_tool
+    import_time = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    bambu_lab_3mf_tool.register()
+    register_time = time.perf_counter() - start_time
+    bambu_lab_3mf_tool.unregister()
+
+    loaded = set(sys.modules) - modules_before
+    result = {
+        "import_seconds": import_time,
+        "register_seconds": register_time,
+        "modules_loaded": len(loaded),
+        "heavy_modules_loaded": [name for name in HEAVY_MODULES if name in loaded],
+    }
+    print(RESULT_PREFIX + json.dumps(result), flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+# Bambu Lab 3MF Tools - Benchmark runner.
+# Copyright (C) 2025 jsonify
+# This add-on is free software: you can redistribute it and/or modify it under the terms of the GNU General
+# Public License as published by the Free Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+# This add-on is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied
+# warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# details.
+# You should have received a copy of the GNU General Public License along with this plug-in. If not, see
+# <https://gnu.org/licenses/>.
+
+# <pep8 compliant>
+
+"""
+Runs the import/export benchmarks over a corpus of 3MF archives and writes the results as JSON.
+
+Generate a corpus with `corpus.py` first. Then for instance:
+```
+python benchmarks/run.py corpus -o results.json --blender /path/to/blender --repeat 3
+python benchmarks/run.py corpus -o results-new.json --blender /path/to/blender --repeat 3 --compare results.json
+```
+
+Every case runs in a fresh process (see `case.py`), so the peak memory of that process belongs to that case alone. The
+`core` mode measures the Blender-independent library with the Python that runs this script. The `blender` mode
+measures the import and export operators, and is only run if the path to Blender is given. Of repeated runs, the
+fastest time of each phase is kept. The results include the commit and the machine, since they can only be compared
+with results from the same machine.
+"""
+
+import argparse  # To parse the command line.
+import glob  # To find the archives of the corpus.
+import json  # To read and write the results.
+import os  # To find the case script.
+import platform  # To record the machine that the benchmarks ran on.
+import subprocess  # To run every case in a fresh process.
+import sys  # To run cases with the same Python.
+import time  # To record when the benchmarks ran.
+
+CASE_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "case.py")
+RESULT_PREFIX = "BENCHMARK_RESULT "  # Must be the same as in `case.py`.
+
+
+def current_commit():
+    """
+    Get the commit of the add-on that is being measured.
+    :return: The commit hash, with a `+` appended if there are uncommitted changes, or `None` if it's not a Git
+    repository.
+    """
+    directory = os.path.dirname(CASE_SCRIPT)
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=directory, capture_output=True, text=True,
+                                check=True).stdout.strip()
+        changes = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=directory,
+                                 capture_output=True, text=True, check=True).stdout.strip()
+    except (EnvironmentError, subprocess.CalledProcessError):
+        return None
+    return commit + ("+" if changes else "")
+
+
+def run_case(command, timeout):
+    """
+    Runs one case in a fresh process.
+    :param command: The command line to run.
+    :param timeout: The maximum time in seconds that the case may take.
+    :return: The result that the case reported.
+    """
+    try:
+        process = subprocess.run(command, capture_output=True, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return {"status": "error", "error": f"Timed out after {timeout} seconds."}
+    for line in process.stdout.splitlines():
+        if line.startswith(RESULT_PREFIX):
+            return json.loads(line[len(RESULT_PREFIX):])
+    return {"status": "error", "error": f"No result, exit code {process.returncode}: {process.stderr[-2000:]}"}
+
+
+def merge_repeats(results):
+    """
+    Combines the results of repeated runs of the same case.
+
+    Of every phase, the fastest duration is kept, since slower runs are slowed down by other things on the machine.
+    :param results: The results of the runs.
+    :return: A single result.
+    """
+    merged = dict(results[0])
+    merged["runs"] = len(results)
+    failed = [result for result in results if result["status"] != "ok"]
+    if failed:
+        return dict(failed[0], runs=len(results))
+    phases = {}
+    for result in results:
+        for name, phase in result["phases"].items():
+            if name not in phases or phase["seconds"] < phases[name]["seconds"]:
+                phases[name] = phase
+    merged["phases"] = phases
+    merged["peak_rss_bytes"] = max((result["peak_rss_bytes"] or 0) for result in results) or None
+    return merged
+
+
+def compare(results, baseline_path):
+    """
+    Prints how much faster or slower each phase became relative to earlier results.
+    :param results: The new results.
+    :param baseline_path: The path to the JSON file with the earlier results.
+    """
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    if baseline["machine"] != results["machine"]:
+        print("Warning: the baseline was measured on a different machine.", file=sys.stderr)
+    baseline_cases = {(case["archive"], case["mode"]): case for case in baseline["cases"]}
+    print(f"{'archive':<32} {'mode':<8} {'phase':<14} {'before':>10} {'after':>10} {'ratio':>7}")
+    for case in results["cases"]:
+        before = baseline_cases.get((case["archive"], case["mode"]))
+        if before is None or before["status"] != "ok" or case["status"] != "ok":
+            continue
+        for name, phase in case["phases"].items():
+            if name not in before["phases"]:
+                continue
+            old_seconds = before["phases"][name]["seconds"]
+            ratio = phase["seconds"] / old_seconds if old_seconds > 0 else float("inf")
+            print(f"{case['archive']:<32} {case['mode']:<8} {name:<14} {old_seconds:>10.3f} {phase['seconds']:>10.3f}"
+                  f" {ratio:>7.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the 3MF importer and exporter.")
+    parser.add_argument("corpus", help="Directory with the archives generated by corpus.py.")
+    parser.add_argument("-o", "--output", default="benchmark-results.json", help="Where to write the results.")
+    parser.add_argument("--blender", help="Path to the Blender executable, to benchmark the operators too.")
+    parser.add_argument("--no-core", action="store_true", help="Don't benchmark the Blender-independent library.")
+    parser.add_argument("--repeat", type=int, default=1, help="Number of runs of every case.")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="Measure the peak memory of every phase. Makes the durations unrepresentative.")
+    parser.add_argument("--timeout", type=float, default=3600, help="Maximum seconds for a single run.")
+    parser.add_argument("--filter", default="*", help="Only run archives matching this pattern, like 'single-*'.")
+    parser.add_argument("--compare", help="Earlier results to compare with.")
+    args = parser.parse_args()
+
+    archives = sorted(glob.glob(os.path.join(args.corpus, args.filter + ".3mf")))
+    if not archives:
+        parser.error(f"no archives in {args.corpus}; generate them with corpus.py")
+
+    modes = {}
+    if not args.no_core:
+        modes["core"] = [sys.executable, CASE_SCRIPT]
+    if args.blender:
+        modes["blender"] = [args.blender, "--background", "--factory-startup", "--python", CASE_SCRIPT, "--"]
+    extra = ["--trace-memory"] if args.trace_memory else []
+
+    results = {
+        "commit": current_commit(),
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "machine": {
+            "platform": platform.platform(),
+            "processor": platform.processor() or platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "python": platform.python_version(),
+        },
+        "trace_memory": args.trace_memory,
+        "cases": [],
+    }
+    for path in archives:
+        for mode, command in modes.items():
+            runs = [run_case(command + [path] + extra, args.timeout) for _ in range(max(1, args.repeat))]
+            case = merge_repeats(runs)
+            case["archive"] = os.path.basename(path)
+            case["archive_bytes"] = os.path.getsize(path)
+            case["mode"] = mode
+            results["cases"].append(case)
+            if case["status"] == "ok":
+                total = sum(phase["seconds"] for phase in case["phases"].values())
+                peak = (case["peak_rss_bytes"] or 0) / 2 ** 20
+                print(f"{case['archive']} [{mode}]: {total:.3f}s, peak {peak:.0f} MiB", file=sys.stderr)
+            else:
+                print(f"{case['archive']} [{mode}]: {case['error']}", file=sys.stderr)
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
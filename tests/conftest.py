@@ -0,0 +1,45 @@
+# Bambu Lab 3MF Tools - Shared fixtures for the tests.
+# Copyright (C) 2025 jsonify
+#
+# This add-on is free software: you can redistribute it and/or modify it under the terms of the GNU General
+# Public License as published by the Free Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+# This add-on is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied
+# warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# details.
+# You should have received a copy of the GNU General Public License along with this plug-in. If not, see
+# <https://gnu.org/licenses/>.
+
+# <pep8 compliant>
+
+"""
+Fixtures that the tests share, like the synthetic archives of the benchmark corpus.
+"""
+
+import importlib.util  # To load the corpus generator, which is a script rather than a package.
+import os.path  # To find the corpus generator.
+
+import pytest  # For fixtures.
+
+
+@pytest.fixture(scope="session")
+def corpus():
+    """
+    The module that generates the synthetic 3MF archives of the benchmarks.
+    """
+    path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "corpus.py")
+    spec = importlib.util.spec_from_file_location("corpus", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def generate(corpus, tmp_path):
+    """
+    Writes an archive of the benchmark corpus.
+
+    Call it with the kind of archive and the approximate number of triangles. It returns the path to the archive and the
+    number of triangles that get built from it.
+    """
+    return lambda kind, triangles=1000: corpus.generate(str(tmp_path), kind, triangles)
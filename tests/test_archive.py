@@ -0,0 +1,113 @@
+# Bambu Lab 3MF Tools - Tests for the zip archives of 3MF files.
+# Copyright (C) 2025 jsonify
+#
+# This add-on is free software: you can redistribute it and/or modify it under the terms of the GNU General
+# Public License as published by the Free Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+# This add-on is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied
+# warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# details.
+# You should have received a copy of the GNU General Public License along with this plug-in. If not, see
+# <https://gnu.org/licenses/>.
+
+# <pep8 compliant>
+
+"""
+Tests copying compressed files from one archive into another without compressing them again.
+"""
+
+import io  # To write archives in memory.
+import struct  # To read the Zip64 extra field.
+import zipfile  # To create and check the archives.
+
+from bambu_lab_3mf_tool.core import archive as archive_module  # To make the zipfile internals unavailable.
+from bambu_lab_3mf_tool.core.archive import LOCAL_HEADER, CompressedFile, read_compressed, write_compressed
+
+# Files with the compressions that are copied as they are.
+FILES = {
+    "Metadata/plate_1.png": (b"\x89PNG" + bytes(range(256)) * 40, zipfile.ZIP_STORED),
+    "Metadata/project_settings.config": (b'{"layer_height": "0.2"}' * 500, zipfile.ZIP_DEFLATED),
+}
+ZIP64_EXTRA = 0x0001  # The header ID of the Zip64 extended information in the extra field.
+
+
+def source_archive():
+    """
+    Creates an archive with the files to copy.
+    :return: A file-like object containing the archive.
+    """
+    stream = io.BytesIO()
+    with zipfile.ZipFile(stream, "w") as archive:
+        for file_path, (data, compression) in FILES.items():
+            archive.writestr(file_path, data, compress_type=compression)
+    stream.seek(0)
+    return stream
+
+
+def copy_files():
+    """
+    Copies all files of the source archive into a new archive, still compressed.
+    :return: A file-like object containing the new archive.
+    """
+    compressed_files = read_compressed(source_archive(), list(FILES))
+    assert set(compressed_files) == set(FILES)
+    stream = io.BytesIO()
+    with zipfile.ZipFile(stream, "w") as archive:
+        for file_path, compressed_file in compressed_files.items():
+            write_compressed(archive, file_path, compressed_file)
+    stream.seek(0)
+    return stream
+
+
+def check_copies(stream):
+    """
+    Checks that an archive contains all files, intact.
+    :param stream: A file-like object containing the archive.
+    """
+    with zipfile.ZipFile(stream) as archive:
+        assert archive.testzip() is None
+        for file_path, (data, compression) in FILES.items():
+            assert archive.read(file_path) == data
+            assert archive.getinfo(file_path).compress_type == compression
+
+
+def test_round_trip():
+    """
+    Files copied without decompressing them come out the same.
+    """
+    check_copies(copy_files())
+
+
+def test_round_trip_without_zipfile_internals(monkeypatch):
+    """
+    If the internals of the zipfile module are different, the files get compressed again and still come out the same.
+    """
+    def missing_internals(*_):
+        raise AttributeError("'ZipFile' object has no attribute '_writing'")
+    monkeypatch.setattr(archive_module, "_write_raw", missing_internals)
+    check_copies(copy_files())
+
+
+def test_zip64_header():
+    """
+    Files larger than 4GB get the Zip64 extension in their local header, with their real sizes.
+    """
+    size = zipfile.ZIP64_LIMIT + 1
+    compressed_file = CompressedFile(data=b"\x03\x00", compression=zipfile.ZIP_DEFLATED, crc=0, size=size)
+    thumbnail = FILES["Metadata/plate_1.png"][0]
+    stream = io.BytesIO()
+    with zipfile.ZipFile(stream, "w") as archive:
+        write_compressed(archive, "3D/3dmodel.model", compressed_file)  # Only the header is checked, not the data.
+        write_compressed(archive, "Metadata/plate_1.png", CompressedFile(
+            data=thumbnail, compression=zipfile.ZIP_STORED, crc=zipfile.crc32(thumbnail), size=len(thumbnail)))
+
+    stream.seek(0)
+    with zipfile.ZipFile(stream) as archive:
+        assert archive.getinfo("3D/3dmodel.model").file_size == size
+        assert archive.read("Metadata/plate_1.png") == thumbnail  # The file after it is where the header says.
+    header = LOCAL_HEADER.unpack(stream.getvalue()[:LOCAL_HEADER.size])
+    assert header[-3] == 0xFFFFFFFF  # The uncompressed size is in the Zip64 extension instead.
+    extra = stream.getvalue()[LOCAL_HEADER.size + header[-2]:][:header[-1]]
+    header_id, _, file_size, compress_size = struct.unpack("<HHQQ", extra[:20])
+    assert header_id == ZIP64_EXTRA
+    assert (file_size, compress_size) == (size, len(compressed_file.data))
@@ -0,0 +1,45 @@
+# Bambu Lab 3MF Tools - Tests for the batch conversion.
+# Copyright (C) 2025 jsonify
+#
+# This add-on is free software: you can redistribute it and/or modify it under the terms of the GNU General
+# Public License as published by the Free Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+# This add-on is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied
+# warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# details.
+# You should have received a copy of the GNU General Public License along with this plug-in. If not, see
+# <https://gnu.org/licenses/>.
+
+# <pep8 compliant>
+
+"""
+Tests converting archives of the benchmark corpus with the command line tool.
+"""
+
+import os.path  # To find the converted files.
+
+import pytest  # For parametrised tests.
+
+from bambu_lab_3mf_tool.cli import convert  # The code under test.
+from bambu_lab_3mf_tool.core import inspect_archive  # To check the converted archives.
+
+OPTIONS = {"output": None, "printer": None, "center": False, "check_only": False, "precision": 6}
+
+
+@pytest.mark.parametrize("kind", ["bambu", "components", "single"])
+def test_convert_corpus(generate, tmp_path, kind):
+    """
+    Converting keeps every triangle that gets built, also when objects are in sub-models.
+    """
+    path, built = generate(kind)
+    output_path = str(tmp_path / "out" / os.path.basename(path))
+    result = convert(path, output_path, OPTIONS)
+    assert result["status"] == "ok", result.get("error")
+    assert result["output"] == output_path
+
+    original = inspect_archive(path)
+    converted = inspect_archive(output_path)
+    assert converted.error is None
+    assert converted.triangles == original.triangles == built
+    size = [converted.maximum[axis] - converted.minimum[axis] for axis in range(3)]
+    assert size == pytest.approx(result["size"], abs=1e-3)
@@ -0,0 +1,58 @@
+# Bambu Lab 3MF Tools - Tests for indexing the objects of 3MF archives.
+# Copyright (C) 2025 jsonify
+#
+# This add-on is free software: you can redistribute it and/or modify it under the terms of the GNU General
+# Public License as published by the Free Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+# This add-on is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied
+# warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# details.
+# You should have received a copy of the GNU General Public License along with this plug-in. If not, see
+# <https://gnu.org/licenses/>.
+
+# <pep8 compliant>
+
+"""
+Tests listing the objects of archives and choosing from them.
+"""
+
+from bambu_lab_3mf_tool.constants import MODEL_LOCATION  # The root model document.
+from bambu_lab_3mf_tool.core.index import index_archive, select_objects  # The code under test.
+
+
+def test_select_bambu_object(generate):
+    """
+    Choosing an object of a Bambu Studio project also requires the part in its sub-model, and nothing else.
+    """
+    path, _ = generate("bambu")
+    index = index_archive(path)
+    assert [indexed.name for indexed in index if indexed.document == MODEL_LOCATION] == [
+        "Torus 1", "Torus 2", "Torus 3", "Torus 4"]
+    torus = next(indexed for indexed in index if indexed.name == "Torus 2")
+    assert torus.components == [("3D/Objects/object_2.model", "2")]
+
+    selections = select_objects(index, ["Torus 2"])
+    assert set(selections) == {MODEL_LOCATION, "3D/Objects/object_2.model"}
+    assert selections[MODEL_LOCATION].chosen == {torus.objectid}
+    assert selections[MODEL_LOCATION].required == {torus.objectid}
+    assert selections["3D/Objects/object_2.model"].chosen == set()
+    assert selections["3D/Objects/object_2.model"].required == {"2"}
+
+
+def test_select_ignores_other_documents(generate):
+    """
+    Resource IDs are only unique within a document, so choosing by ID doesn't choose the parts in other documents.
+    """
+    path, _ = generate("bambu")
+    selections = select_objects(index_archive(path), ["2"])
+    assert selections == {}  # Object 2 only exists in a sub-model.
+
+
+def test_select_assembly(generate):
+    """
+    Choosing an assembly requires its components, and theirs.
+    """
+    path, _ = generate("components")
+    selections = select_objects(index_archive(path), ["3"])
+    assert selections[MODEL_LOCATION].chosen == {"3"}
+    assert selections[MODEL_LOCATION].required == {"1", "2", "3"}
@@ -0,0 +1,76 @@
+# Bambu Lab 3MF Tools - Tests for summarising 3MF archives.
+# Copyright (C) 2025 jsonify
+#
+# This add-on is free software: you can redistribute it and/or modify it under the terms of the GNU General
+# Public License as published by the Free Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+# This add-on is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied
+# warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# details.
+# You should have received a copy of the GNU General Public License along with this plug-in. If not, see
+# <https://gnu.org/licenses/>.
+
+# <pep8 compliant>
+
+"""
+Tests summarising archives without importing them.
+"""
+
+import zipfile  # To create broken archives.
+
+import pytest  # For parametrised tests.
+
+from bambu_lab_3mf_tool.constants import MODEL_LOCATION  # The root model document.
+from bambu_lab_3mf_tool.core.inspection import inspect_archive, inspect_archives  # The code under test.
+
+
+@pytest.mark.parametrize("kind", ["single", "many", "multimaterial", "components", "bambu"])
+def test_built_triangles(generate, kind):
+    """
+    The summary counts the triangles of everything that gets built, and nothing else.
+    """
+    path, built = generate(kind)
+    summary = inspect_archive(path)
+    assert summary.error is None
+    assert summary.unit == "millimeter"
+    assert summary.triangles == built
+    assert all(low < high for low, high in zip(summary.minimum, summary.maximum))
+
+
+def test_bambu_objects(generate):
+    """
+    The objects of a Bambu Studio project get their names from its model settings, and list their parts by document.
+    """
+    path, _ = generate("bambu")
+    summary = inspect_archive(path)
+    built = [indexed for indexed in summary.objects if indexed.built]
+    assert [indexed.name for indexed in built] == ["Torus 1", "Torus 2", "Torus 3", "Torus 4"]
+    assert all(indexed.document == MODEL_LOCATION for indexed in built)
+    assert built[0].components == [("3D/Objects/object_1.model", "1")]
+    assert sum(indexed.triangles for indexed in summary.objects) == summary.triangles  # Every part is built once.
+
+
+def test_broken_archives(tmp_path):
+    """
+    Archives that can't be read get a summary with the error, instead of raising it.
+    """
+    not_a_zip = tmp_path / "not_a_zip.3mf"
+    not_a_zip.write_bytes(b"This is no archive.")
+    summary = inspect_archive(str(not_a_zip))
+    assert summary.error.startswith("BadZipFile")
+    assert (summary.objects, summary.triangles, summary.minimum) == ([], 0, None)
+
+    without_model = tmp_path / "without_model.3mf"
+    with zipfile.ZipFile(without_model, "w") as archive:
+        archive.writestr("Metadata/notes.txt", "Nothing to see here.")
+    assert inspect_archive(str(without_model)).error == "ValueError: The archive contains no 3D model."
+
+
+def test_inspect_in_parallel(generate, tmp_path):
+    """
+    Inspecting archives in worker processes gives the same summaries as inspecting them one by one.
+    """
+    paths = [generate("single")[0], str(tmp_path / "missing.3mf")]
+    summaries = {summary.path: summary for summary in inspect_archives(paths, workers=2)}
+    assert summaries == {path: inspect_archive(path) for path in paths}
+    assert list(inspect_archives([])) == []
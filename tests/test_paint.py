@@ -0,0 +1,109 @@
+# Bambu Lab 3MF Tools - Tests for the filaments painted onto triangles.
+# Copyright (C) 2025 jsonify
+#
+# This add-on is free software: you can redistribute it and/or modify it under the terms of the GNU General
+# Public License as published by the Free Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+# This add-on is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied
+# warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# details.
+# You should have received a copy of the GNU General Public License along with this plug-in. If not, see
+# <https://gnu.org/licenses/>.
+
+# <pep8 compliant>
+
+"""
+Tests encoding and decoding the filaments that triangles are painted with, and the colors of those filaments.
+"""
+
+import io  # To read documents and settings from memory.
+import xml.etree.ElementTree  # To serialize the written documents.
+
+import pytest  # For parametrised tests.
+
+from bambu_lab_3mf_tool.constants import MODEL_NAMESPACE  # To create the elements.
+from bambu_lab_3mf_tool.core.paint import DEFAULT_FILAMENT_COLORS, MAX_FILAMENT, PAINT_CODES, decode_paint, \
+    filament_color, read_filament_colors  # The code under test.
+from bambu_lab_3mf_tool.core.reader import ModelReader, parse_model  # To read the paint back.
+from bambu_lab_3mf_tool.core.writer import new_model, write_triangles, write_vertices  # To write the paint.
+
+
+def read_painted(paint):
+    """
+    Writes a document with a triangle for each filament, and reads it back.
+    :param paint: The filament of every triangle.
+    :return: The reader that read the document, with the triangles in object 1.
+    """
+    root = new_model()
+    resources = xml.etree.ElementTree.SubElement(root, f"{{{MODEL_NAMESPACE}}}resources")
+    object_element = xml.etree.ElementTree.SubElement(resources, f"{{{MODEL_NAMESPACE}}}object")
+    object_element.attrib[f"{{{MODEL_NAMESPACE}}}id"] = "1"
+    mesh = xml.etree.ElementTree.SubElement(object_element, f"{{{MODEL_NAMESPACE}}}mesh")
+    write_vertices(mesh, [(0, 0, 0), (1, 0, 0), (0, 1, 0)], 3)
+    write_triangles(mesh, [(0, 1, 2)] * len(paint), paint=paint)
+    document = xml.etree.ElementTree.tostring(root, default_namespace=MODEL_NAMESPACE)
+
+    reader = ModelReader()
+    reader.read_objects(parse_model(io.BytesIO(document)))
+    return reader
+
+
+def test_paint_round_trip():
+    """
+    Every filament that a triangle is painted with is read back the same, after writing it to a document.
+    """
+    states = list(range(MAX_FILAMENT + 1)) + [0]
+    reader = read_painted(states)
+    assert reader.resource_objects["1"].paint == states
+    assert not reader.diagnostics
+
+
+def test_unpainted_triangles():
+    """
+    Objects without paint don't get a list of filaments.
+    """
+    assert read_painted([0, 0]).resource_objects["1"].paint is None
+
+
+@pytest.mark.parametrize("state", range(MAX_FILAMENT + 1))
+def test_decode_whole_triangle(state):
+    """
+    The codes of triangles that are painted as a whole are decoded the same bit by bit as from the table.
+    """
+    assert decode_paint(PAINT_CODES[state]) == state
+    assert decode_paint("0" + PAINT_CODES[state]) == state  # A leading zero misses the table, but adds no bits.
+
+
+@pytest.mark.parametrize("code, state", [
+    ("4882", 2),  # Split in three parts, two of which are painted with filament 2 and one with filament 1.
+    ("4442", 1),  # All three parts are painted with filament 1.
+    ("41C1", 4),  # Split in two, with filament 4 winning the tie from filament 1 by being read first.
+])
+def test_decode_split_triangle(code, state):
+    """
+    Triangles that are split get the filament that covers the largest part of them.
+    """
+    assert decode_paint(code) == state
+
+
+@pytest.mark.parametrize("code", ["1", "G", "4X"])
+def test_decode_malformed(code):
+    """
+    Codes that end in the middle of a triangle or aren't hexadecimal are rejected.
+    """
+    with pytest.raises(ValueError):
+        decode_paint(code)
+
+
+def test_filament_colors():
+    """
+    The filament colors of a project are read from its print settings, with defaults for what is missing or invalid.
+    """
+    colors = read_filament_colors(io.BytesIO(b'{"filament_colour": ["#FF0000", "red"]}'))
+    assert colors == [(1.0, 0.0, 0.0, 1.0), None]
+    assert filament_color(1, colors) == (1.0, 0.0, 0.0, 1.0)
+    assert filament_color(2, colors) == DEFAULT_FILAMENT_COLORS[1]
+    assert filament_color(len(DEFAULT_FILAMENT_COLORS) + 3, colors) == DEFAULT_FILAMENT_COLORS[2]
+
+    assert read_filament_colors(io.BytesIO(b"{not json")) == []
+    assert read_filament_colors(io.BytesIO(b"[]")) == []
@@ -0,0 +1,202 @@
+# Bambu Lab 3MF Tools - Tests for reading 3D model documents.
+# Copyright (C) 2025 jsonify
+#
+# This add-on is free software: you can redistribute it and/or modify it under the terms of the GNU General
+# Public License as published by the Free Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+# This add-on is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied
+# warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# details.
+# You should have received a copy of the GNU General Public License along with this plug-in. If not, see
+# <https://gnu.org/licenses/>.
+
+# <pep8 compliant>
+
+"""
+Tests parsing model documents and reading their objects.
+"""
+
+import io  # To parse documents from memory.
+import xml.etree.ElementTree  # To compare the parsed documents.
+
+import pytest  # For parametrised tests.
+
+from bambu_lab_3mf_tool.constants import MATERIAL_NAMESPACE, MODEL_NAMESPACE, MODEL_NAMESPACES, \
+    PRODUCTION_NAMESPACE  # To find and write the elements.
+from bambu_lab_3mf_tool.core.paint import SLIC3RPE_NAMESPACE  # To paint the way PrusaSlicer does.
+from bambu_lab_3mf_tool.core.reader import DEFAULT_CORNER_COLOR, ModelReader, ResourceMaterial, parse_model, \
+    parse_model_incrementally  # The code under test.
+
+# A document with its core namespace under a prefix, objects with and without meshes, an empty mesh and attributes
+# that look like the end of a tag.
+SKIPPABLE_DOCUMENT = f"""<?xml version="1.0" encoding="UTF-8"?>
+<m:model xmlns:m="{MODEL_NAMESPACE}" unit="millimeter">
+  <m:resources>
+    <m:object id="1" name="Cube &amp; co">
+      <m:metadatagroup><m:metadata name="Part">yes</m:metadata></m:metadatagroup>
+      <m:mesh><m:vertices><m:vertex x="0" y="0" z="0"/><m:vertex x="1" y="0" z="0"/><m:vertex x="0" y="1" z="0"/>
+      </m:vertices><m:triangles><m:triangle v1="0" v2="1" v3="2"/></m:triangles></m:mesh>
+    </m:object>
+    <m:object id="2" name="a > b"><m:mesh/></m:object>
+    <m:object id='3' name='Kept'>
+      <m:mesh><m:vertices><m:vertex x="2" y="2" z="2"/></m:vertices><m:triangles/></m:mesh>
+    </m:object>
+    <m:object id="4"><m:components><m:component objectid="1"/></m:components></m:object>
+  </m:resources>
+  <m:build><m:item objectid="4"/></m:build>
+</m:model>
+""".encode("UTF-8")
+
+# A document with materials, properties for every corner and paint, including a few invalid ones.
+PROPERTIES_DOCUMENT = f"""<?xml version="1.0" encoding="UTF-8"?>
+<model xmlns="{MODEL_NAMESPACE}" xmlns:m="{MATERIAL_NAMESPACE}" xmlns:p="{PRODUCTION_NAMESPACE}"
+    xmlns:slic3rpe="{SLIC3RPE_NAMESPACE}" unit="millimeter">
+  <resources>
+    <basematerials id="1"><base name="PLA" displaycolor="#FF0000"/><base name="PETG" displaycolor="#00FF00"/>
+    </basematerials>
+    <m:colorgroup id="2"><m:color color="#0000FF"/><m:color color="#FFFFFF80"/><m:color color="blue"/></m:colorgroup>
+    <m:texture2dgroup id="3" texid="9"><m:tex2coord u="0.25" v="0.5"/><m:tex2coord u="1" v="0"/></m:texture2dgroup>
+    <object id="4" pid="1" pindex="0">
+      <mesh>
+        <vertices><vertex x="0" y="0" z="0"/><vertex x="1" y="0" z="0"/><vertex x="0" y="1" z="0"/></vertices>
+        <triangles>
+          <triangle v1="0" v2="1" v3="2"/>
+          <triangle v1="0" v2="1" v3="2" p1="1" paint_color="8"/>
+          <triangle v1="0" v2="1" v3="2" p1="5" slic3rpe:mmu_segmentation="4"/>
+          <triangle v1="0" v2="1" v3="2" paint_color="X"/>
+          <triangle v1="0" v2="-1" v3="2"/>
+        </triangles>
+      </mesh>
+    </object>
+    <object id="5">
+      <mesh>
+        <vertices><vertex x="0" y="0" z="0"/><vertex x="1" y="0" z="0"/><vertex x="0" y="1" z="0"/></vertices>
+        <triangles>
+          <triangle v1="0" v2="1" v3="2" pid="2" p1="0" p2="1" p3="2"/>
+          <triangle v1="0" v2="1" v3="2" pid="3" p1="1"/>
+          <triangle v1="0" v2="1" v3="2" pid="2" p1="0" p2="7"/>
+          <triangle v1="0" v2="1" v3="2"/>
+        </triangles>
+      </mesh>
+    </object>
+    <object id="6"><components><component objectid="4" p:path="/3D/Objects/object_4.model"/></components></object>
+  </resources>
+  <build><item objectid="6"/></build>
+</model>
+""".encode("UTF-8")
+
+
+def parse(document, chunk_size, keep_mesh):
+    """
+    Parses a document incrementally, to completion.
+    :return: The root element.
+    """
+    parser = parse_model_incrementally(io.BytesIO(document), chunk_size, keep_mesh)
+    try:
+        while True:
+            next(parser)
+    except StopIteration as done:
+        return done.value
+
+
+def serialize(root):
+    """
+    Serializes an element tree without the whitespace between elements, to compare documents.
+    :return: The serialized document.
+    """
+    for element in root.iter():
+        element.text = element.text.strip() if element.text else None
+        element.tail = None
+    return xml.etree.ElementTree.tostring(root)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64, 1 << 20])
+def test_skip_meshes(chunk_size):
+    """
+    The meshes of the objects that aren't needed are left out, whatever the chunks are, and everything else is kept.
+    """
+    seen = []
+
+    def keep_mesh(attrib):
+        seen.append(dict(attrib))
+        return attrib.get("name") == "Kept"
+
+    root = parse(SKIPPABLE_DOCUMENT, chunk_size, keep_mesh)
+    expected = parse_model(io.BytesIO(SKIPPABLE_DOCUMENT))
+    for object_node in expected.iterfind("./3mf:resources/3mf:object", MODEL_NAMESPACES):
+        if object_node.attrib.get("name") != "Kept":
+            for mesh_node in object_node.findall("./3mf:mesh", MODEL_NAMESPACES):
+                object_node.remove(mesh_node)
+    assert serialize(root) == serialize(expected)
+    assert [attrib.get("name") for attrib in seen] == ["Cube & co", "a > b", "Kept", None]
+
+
+def test_keep_all_meshes():
+    """
+    If every mesh is needed, the document is parsed the same as without skipping.
+    """
+    root = parse(SKIPPABLE_DOCUMENT, 5, lambda attrib: True)
+    expected = parse_model(io.BytesIO(SKIPPABLE_DOCUMENT))
+    assert serialize(root) == serialize(expected)
+
+
+def read_properties():
+    """
+    Reads all objects of the document with materials, properties and paint.
+    :return: The reader that read the document.
+    """
+    reader = ModelReader()
+    root = parse_model(io.BytesIO(PROPERTIES_DOCUMENT))
+    reader.read_materials(root)
+    reader.read_objects(root)
+    return reader
+
+
+def test_materials_and_paint():
+    """
+    Triangles get the material of their object or their own, and the filaments that either slicer painted them with.
+    """
+    reader = read_properties()
+    painted = reader.resource_objects["4"]
+    pla = ResourceMaterial(name="PLA", color=(1.0, 0.0, 0.0, 1.0))
+    petg = ResourceMaterial(name="PETG", color=(0.0, 1.0, 0.0, 1.0))
+    assert painted.triangles == [(0, 1, 2)] * 4  # The triangle with a negative index is left out.
+    assert painted.materials == [pla, petg, pla, pla]  # The missing material becomes the object's.
+    assert painted.paint == [0, 2, 1, 0]  # The invalid paint is left unpainted.
+    assert painted.corner_colors is None and painted.corner_uvs is None
+
+
+def test_corner_properties():
+    """
+    The corners of triangles get the colors and texture coordinates of their groups, or defaults where they have none.
+    """
+    reader = read_properties()
+    colored = reader.resource_objects["5"]
+    blue = (0.0, 0.0, 1.0, 1.0)
+    translucent = (1.0, 1.0, 1.0, 128 / 255)
+    expected_colors = [blue, translucent, DEFAULT_CORNER_COLOR]  # The invalid color becomes the default.
+    expected_colors += [DEFAULT_CORNER_COLOR] * 3  # The corners with texture coordinates have no color.
+    expected_colors += [DEFAULT_CORNER_COLOR] * 3  # The triangle with a missing color gets the object's.
+    expected_colors += [DEFAULT_CORNER_COLOR] * 3
+    assert colored.corner_colors.tolist() == pytest.approx([channel for color in expected_colors for channel in color])
+    expected_uvs = [(0.0, 0.0)] * 3 + [(1.0, 0.0)] * 3 + [(0.0, 0.0)] * 6  # Corners without index take the first's.
+    assert colored.corner_uvs.tolist() == pytest.approx([coordinate for uv in expected_uvs for coordinate in uv])
+    assert colored.materials == [None] * 4
+
+
+def test_components_and_diagnostics():
+    """
+    Components keep the path to the document of their object, and every problem is summarised by its category.
+    """
+    reader = read_properties()
+    component, = reader.resource_objects["6"].components
+    assert (component.resource_object, component.path) == ("4", "3D/Objects/object_4.model")
+    assert reader.diagnostics.counts == {
+        "invalid_group_color": 1,
+        "missing_triangle_material": 1,
+        "invalid_paint": 1,
+        "negative_vertex_index": 1,
+        "missing_triangle_property": 1,
+    }
+    assert len(reader.emit_diagnostics("test")) == 5
+    assert not reader.diagnostics  # Collecting starts anew for the next document.
@@ -0,0 +1,98 @@
+# Bambu Lab 3MF Tools - Tests for the layer cross-sections.
+# Copyright (C) 2025 jsonify
+#
+# This add-on is free software: you can redistribute it and/or modify it under the terms of the GNU General
+# Public License as published by the Free Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+# This add-on is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied
+# warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# details.
+# You should have received a copy of the GNU General Public License along with this plug-in. If not, see
+# <https://gnu.org/licenses/>.
+
+# <pep8 compliant>
+
+"""
+Tests slicing meshes whose vertices lie on or near the layer planes.
+"""
+
+import pytest  # To skip the tests where numpy is not available.
+
+numpy = pytest.importorskip("numpy")
+
+from bambu_lab_3mf_tool.slicing import layer_heights, layer_segments, slice_statistics  # The code under test.
+
+
+def box(width, depth, height, bottom=0.0):
+    """
+    Creates a closed box with outward facing triangles.
+    :param width: The size in X.
+    :param depth: The size in Y.
+    :param height: The size in Z.
+    :param bottom: The height of the bottom face.
+    :return: A tuple of the vertex coordinates and the vertex indices of the triangles.
+    """
+    coordinates = numpy.array([
+        [x, y, z] for z in (bottom, bottom + height) for y in (0.0, depth) for x in (0.0, width)])
+    triangles = numpy.array([
+        [0, 2, 3], [0, 3, 1],  # Bottom.
+        [4, 5, 7], [4, 7, 6],  # Top.
+        [0, 1, 5], [0, 5, 4],  # Front.
+        [2, 6, 7], [2, 7, 3],  # Back.
+        [0, 4, 6], [0, 6, 2],  # Left.
+        [1, 3, 7], [1, 7, 5]])  # Right.
+    return coordinates, triangles
+
+
+def check_box(coordinates, triangles, layer_height, num_layers, width, depth):
+    """
+    Slices a box and checks that every layer it spans has the full cross-section, and every other layer is empty.
+    """
+    perimeters, areas = slice_statistics(coordinates, triangles, layer_height, num_layers)
+    planes = layer_heights(num_layers, layer_height)
+    inside = (planes > coordinates[:, 2].min()) & (planes <= coordinates[:, 2].max())
+    numpy.testing.assert_allclose(perimeters[inside], 2 * (width + depth))
+    numpy.testing.assert_allclose(areas[inside], width * depth)
+    numpy.testing.assert_array_equal(perimeters[~inside], 0)
+
+
+def test_box_top_near_plane():
+    """
+    The top of a 1.4 mm box lies within rounding error of a plane at 0.08 mm layers.
+    """
+    coordinates, triangles = box(10.0, 10.0, 1.4)
+    check_box(coordinates, triangles, 0.08, 20, 10.0, 10.0)
+
+
+def test_vertices_exactly_on_planes():
+    """
+    Boxes whose bottom and top are exactly at the height of a plane.
+    """
+    layer_height = 0.2
+    planes = layer_heights(30, layer_height)
+    for bottom_layer, top_layer in ((0, 10), (3, 4), (5, 29)):
+        coordinates, triangles = box(4.0, 2.0, planes[top_layer] - planes[bottom_layer], planes[bottom_layer])
+        coordinates[4:, 2] = planes[top_layer]  # Exactly, without the rounding error of the addition.
+        check_box(coordinates, triangles, layer_height, 30, 4.0, 2.0)
+
+
+def test_random_heights():
+    """
+    Boxes of random heights at random layer heights slice without errors.
+    """
+    generator = numpy.random.default_rng(28)
+    for _ in range(200):
+        layer_height = generator.choice([0.04, 0.08, 0.1, 0.12, 0.16, 0.2, 0.24, 0.28])
+        height = round(generator.uniform(0.1, 5.0), 2)
+        coordinates, triangles = box(3.0, 5.0, height)
+        check_box(coordinates, triangles, layer_height, int(numpy.ceil(height / layer_height)) + 2, 3.0, 5.0)
+
+
+def test_layer_segments_on_vertex():
+    """
+    A plane through the top corners of a box gives the full outline.
+    """
+    coordinates, triangles = box(10.0, 10.0, 1.0)
+    segments = layer_segments(coordinates, triangles, 1.0)
+    direction = segments[:, 1] - segments[:, 0]
+    assert numpy.hypot(direction[:, 0], direction[:, 1]).sum() == pytest.approx(40.0)
@@ -0,0 +1,149 @@
+# Bambu Lab 3MF Tools - Tests for writing 3D model documents.
+# Copyright (C) 2025 jsonify
+#
+# This add-on is free software: you can redistribute it and/or modify it under the terms of the GNU General
+# Public License as published by the Free Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+# This add-on is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied
+# warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# details.
+# You should have received a copy of the GNU General Public License along with this plug-in. If not, see
+# <https://gnu.org/licenses/>.
+
+# <pep8 compliant>
+
+"""
+Tests writing what was read from a model document into a new document, and reading that back.
+"""
+
+import io  # To read documents from memory.
+import xml.etree.ElementTree  # To serialize the written documents.
+
+import pytest  # For parametrised tests.
+
+from bambu_lab_3mf_tool.constants import MODEL_NAMESPACE  # The namespace of the documents.
+from bambu_lab_3mf_tool.core.reader import ModelReader, parse_model  # To read the documents.
+from bambu_lab_3mf_tool.core.writer import format_number, format_transformation, new_model, \
+    write_resources  # The code under test.
+
+# A document with materials, paint, metadata, an assembly and transformations. The resource IDs aren't numbered from 1.
+DOCUMENT = f"""<?xml version="1.0" encoding="UTF-8"?>
+<model xmlns="{MODEL_NAMESPACE}" unit="millimeter">
+  <resources>
+    <basematerials id="7"><base name="PLA" displaycolor="#FF0000"/><base name="PETG" displaycolor="#00FF0080"/>
+    </basematerials>
+    <object id="10" pid="7" pindex="1" partnumber="A-1">
+      <metadatagroup><metadata name="Designer" preserve="1">Someone</metadata></metadatagroup>
+      <mesh>
+        <vertices>
+          <vertex x="0" y="0" z="0"/><vertex x="1.25" y="0" z="0"/><vertex x="0" y="1.0000004" z="0"/>
+          <vertex x="0" y="0" z="-2"/>
+        </vertices>
+        <triangles>
+          <triangle v1="0" v2="1" v3="2" p1="0"/>
+          <triangle v1="0" v2="1" v3="3" paint_color="4C"/>
+          <triangle v1="0" v2="2" v3="3"/>
+          <triangle v1="1" v2="2" v3="3" paint_color="8"/>
+        </triangles>
+      </mesh>
+    </object>
+    <object id="20" type="other">
+      <components>
+        <component objectid="10" transform="1 0 0 0 1 0 0 0 1 5 0 0"/>
+        <component objectid="10"/>
+      </components>
+    </object>
+  </resources>
+  <build>
+    <item objectid="20" transform="0 1 0 -1 0 0 0 0 1 0.5 0 12" partnumber="B-2"/>
+    <item objectid="10"/>
+  </build>
+</model>
+""".encode("UTF-8")
+
+
+def read(document):
+    """
+    Reads all objects and build items of a document.
+    :param document: The document, as bytes.
+    :return: The resource objects and the build items.
+    """
+    reader = ModelReader()
+    root = parse_model(io.BytesIO(document))
+    reader.read_materials(root)
+    reader.read_objects(root)
+    return reader.resource_objects, reader.read_build(root)
+
+
+def metadata_values(metadata):
+    """
+    Lists the values of a collection of metadata.
+    :return: A dictionary with the value of every entry, by its name.
+    """
+    return {entry.name: entry.value for entry in metadata.values()}
+
+
+def test_round_trip():
+    """
+    Everything that the reader reads is written so that it's read back the same, apart from the resource IDs.
+    """
+    resource_objects, build_items = read(DOCUMENT)
+    root = new_model()
+    write_resources(root, resource_objects, build_items, precision=6)
+    written_objects, written_items = read(xml.etree.ElementTree.tostring(root, default_namespace=MODEL_NAMESPACE))
+
+    assert len(written_objects) == len(resource_objects)
+    new_ids = dict(zip(resource_objects, written_objects))  # Objects are written in the same order.
+    for original_id, new_id in new_ids.items():
+        original = resource_objects[original_id]
+        written = written_objects[new_id]
+        assert [coordinate for vertex in written.vertices for coordinate in vertex] \
+            == pytest.approx([coordinate for vertex in original.vertices for coordinate in vertex])
+        assert written.triangles == original.triangles
+        assert written.materials == original.materials
+        assert written.paint == original.paint
+        assert [(new_ids[component.resource_object], component.transformation) for component in original.components] \
+            == [(component.resource_object, component.transformation) for component in written.components]
+        assert metadata_values(written.metadata) == metadata_values(original.metadata)
+
+    assert [(new_ids[item.objectid], item.transformation) for item in build_items] \
+        == [(item.objectid, item.transformation) for item in written_items]
+    assert [metadata_values(item.metadata) for item in written_items] \
+        == [metadata_values(item.metadata) for item in build_items]
+
+
+def test_single_material_group():
+    """
+    All materials that are used go into a single group, and objects get the material that most of their triangles have.
+    """
+    resource_objects, build_items = read(DOCUMENT)
+    root = new_model()
+    write_resources(root, resource_objects, build_items, precision=6)
+    namespaces = {"3mf": MODEL_NAMESPACE}
+    groups = root.findall("./3mf:resources/3mf:basematerials", namespaces)
+    assert len(groups) == 1
+    assert [base.get(f"{{{MODEL_NAMESPACE}}}displaycolor") for base in groups[0]] == ["#FF0000", "#00FF0080"]
+    mesh_object = root.find("./3mf:resources/3mf:object/3mf:mesh/..", namespaces)
+    assert mesh_object.get(f"{{{MODEL_NAMESPACE}}}pindex") == "1"  # Three of the four triangles have PETG.
+
+
+@pytest.mark.parametrize("number, decimals, formatted", [
+    (1.0, 6, "1"),
+    (0.0, 3, "0"),
+    (1.23456789, 4, "1.2346"),
+    (1e-7, 6, "0"),
+    (123456789.5, 1, "123456789.5"),
+])
+def test_format_number(number, decimals, formatted):
+    """
+    Numbers are written without scientific notation or trailing zeros.
+    """
+    assert format_number(number, decimals) == formatted
+
+
+def test_format_transformation():
+    """
+    Transformations are written column by column, without the last row.
+    """
+    transformation = [[0, -1, 0, 0.5], [1, 0, 0, 0], [0, 0, 1, 12], [0, 0, 0, 1]]
+    assert format_transformation(transformation) == "0 1 0 -1 0 0 0 0 1 0.5 0 12"